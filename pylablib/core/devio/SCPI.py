@@ -5,6 +5,8 @@ from . import comm_backend
 from ..utils import general as general_utils
 from ..utils import funcargparse
 
+import numpy as np
+
 import time
 import contextlib
 import warnings
@@ -45,6 +47,8 @@ class SCPIDevice(comm_backend.ICommBackendWrapper):
     _failsafe_warnings=False # whether invocation of failsafe emits a warning
     _allow_concatenate_write=False # allow automatic concatenation of several write operations (see :meth:`using_write_buffer`)
     _concatenate_write_separator=";\n" # separator to join different commands in concatenated write operation (with :meth:`using_write_buffer`)
+    _default_query_pipeline=None # query pipelining mode used in :meth:`ask_multiple` and settings queries (see :meth:`setup_query_pipeline`)
+    _default_query_pipeline_size=16 # maximal number of queries in a single pipelined batch
     Error=DeviceError
     BackendError=comm_backend.DeviceBackendError
     ReraiseError=None
@@ -79,9 +83,14 @@ class SCPIDevice(comm_backend.ICommBackendWrapper):
         self._concatenate_write=0
         self._write_buffer=""
         self._scpi_parameters={}
+        self._scpi_variable_parameters={}
+        self._scpi_parameters_prefetched={}
+        self._scpi_parameters_log=None
+        self._query_pipeline=self._default_query_pipeline
+        self._query_pipeline_size=self._default_query_pipeline_size
         self._command_validity_cache={}
         if self._id_comm is not None:
-            self._add_info_variable("scpi_id",self.get_id)
+            self._add_info_variable("scpi_id",self.get_id,cache="constant")
     
     
     def _instr_read(self, raw=False, size=None):
@@ -90,10 +99,12 @@ class SCPIDevice(comm_backend.ICommBackendWrapper):
         else:
             data=self.instr.readline(remove_term=not raw)
         return data
+    def _instr_read_into(self, buffer):
+        return self.instr.read_into(buffer)
     def _instr_write(self, msg):
         return self.instr.write(msg)
 
-    def _add_scpi_parameter(self, name, comm, kind="float", parameter=None, set_delay=0, set_echo=False, add_variable=False):
+    def _add_scpi_parameter(self, name, comm, kind="float", parameter=None, set_delay=0, set_echo=False, add_variable=False, cache=None):
         """
         Add a new SCPI parameter description for easier access.
 
@@ -106,13 +117,16 @@ class SCPIDevice(comm_backend.ICommBackendWrapper):
             parameter: for ``"param"`` kind it is a device parameter class used to convert this device parameter
             set_delay: delay between setting and getting commands on parameter setting
             add_variable: if ``True``, automatically add a settings variable with the corresponding name
+            cache: caching policy for the added settings variable (see :meth:`.IDevice._add_device_variable`);
+                cached values of all variables using this parameter are invalidated on :meth:`_set_scpi_parameter` call
         """
         funcargparse.check_parameter_range(kind,"kind",["string","int","float","param","bool"])
         parameter=self._parameters.get(parameter,parameter)
         self._scpi_parameters[name]=(comm,kind,parameter,set_delay,set_echo)
         if add_variable:
             setter=(lambda v: self._set_scpi_parameter(name,v)) if add_variable!="readonly" else None
-            self._add_device_variable(name,"settings",lambda: self._get_scpi_parameter(name),setter,multiarg=False)
+            self._add_device_variable(name,"settings",lambda: self._get_scpi_parameter(name),setter,multiarg=False,cache=cache)
+            self._scpi_variable_parameters[name]=[name]
     def _modify_scpi_parameter(self, name, comm=None, kind=None, parameter=None, set_delay=None, set_echo=None):
         """
         Modify the properties of the existing SCPI parameter.
@@ -132,11 +146,49 @@ class SCPIDevice(comm_backend.ICommBackendWrapper):
     def _get_scpi_parameter(self, name):
         """Get SCPI parameter with a given name"""
         comm,kind,parameter,_,_=self._scpi_parameters[name]
-        if kind in ["string","int","float","bool"]:
-            return self.ask(comm+"?",kind)
-        elif kind=="param":
-            value=self.ask(comm+"?","string")
-            return parameter.i(value)
+        if self._scpi_parameters_log is not None:
+            self._scpi_parameters_log.append(name)
+        data_type=kind if kind in ["string","int","float","bool"] else "string"
+        reply=self._scpi_parameters_prefetched.pop(name,None)
+        if reply is not None and self._check_reply(reply,comm+"?"):
+            value=self._parse_msg(reply,data_type)
+        else:
+            value=self.ask(comm+"?",data_type)
+        return parameter.i(value) if kind=="param" else value
+    @contextlib.contextmanager
+    def _prefetching_scpi_parameters(self, names):
+        """
+        Context manager for prefetching SCPI parameters with the given names using a pipelined query.
+
+        Inside the block, the first :meth:`_get_scpi_parameter` call for each of these parameters uses the prefetched reply instead of querying the device.
+        If query pipelining is disabled, or if the pipelined query fails, do nothing (the parameters are queried one-by-one as usual).
+        """
+        names=[n for n in dict.fromkeys(names) if n in self._scpi_parameters and n not in self._scpi_parameters_prefetched]
+        if self._query_pipeline and len(names)>1:
+            try:
+                replies=self._ask_multiple_raw([self._scpi_parameters[n][0]+"?" for n in names])
+                self._scpi_parameters_prefetched.update(zip(names,replies))
+            except self.Error:
+                self.flush()
+        try:
+            yield
+        finally:
+            for n in names:
+                self._scpi_parameters_prefetched.pop(n,None)
+    def _call_device_variable_getter(self, path, getter):
+        log,self._scpi_parameters_log=self._scpi_parameters_log,[]
+        try:
+            return getter()
+        finally:
+            self._scpi_variable_parameters[path]=self._scpi_parameters_log
+            self._scpi_parameters_log=log
+            if log is not None:
+                log.extend(self._scpi_variable_parameters[path])
+    def _get_device_variables(self, kinds, include=0):
+        variables=[v for _,v in self._select_device_variables(kinds,include=include) if not self._device_vars_cache.is_valid(v)]
+        names=[n for v in variables for n in self._scpi_variable_parameters.get(v,[])]
+        with self._prefetching_scpi_parameters(names):
+            return comm_backend.ICommBackendWrapper._get_device_variables(self,kinds,include=include)
     def _set_scpi_parameter(self, name, value, result=False):
         """
         Set SCPI parameter with a given name.
@@ -144,6 +196,7 @@ class SCPIDevice(comm_backend.ICommBackendWrapper):
         If ``result==True``, query the parameter afterwards and return its value.
         """
         comm,kind,parameter,set_delay,set_echo=self._scpi_parameters[name]
+        self.invalidate_cache([v for v,ps in self._scpi_variable_parameters.items() if name in ps])
         if kind in ["string","int","float","bool"]:
             self.write(comm,value,kind)
         elif kind=="param":
@@ -258,6 +311,33 @@ class SCPIDevice(comm_backend.ICommBackendWrapper):
                     warnings.warn(error_msg)
                 self.sleep(self._retry_delay)
                 self._try_recover(t.try_number)
+    def _split_pipelined_reply(self, reply, n):
+        replies=as_str(reply).split(";")
+        if len(replies)!=n:
+            raise self.Error("pipelined query returned {} replies instead of {}: {}".format(len(replies),n,reply))
+        return replies
+    def _ask_pipelined_retry(self, msgs, timeout=None, retry=None):
+        self._write_retry(flush=True)
+        retry=(timeout is None) if (retry is None) else retry
+        locking_timeout=self._operation_timeout if timeout is None else timeout
+        for t in general_utils.RetryOnException(self._retry_times,exceptions=self.Error):
+            with t:
+                with self.instr.locking(timeout=locking_timeout):
+                    if self._query_pipeline=="concatenate":
+                        self._instr_write(";".join(m if m[:1] in [":","*"] else ":"+m for m in msgs))
+                        reply=self._read_one_try(timeout=timeout)
+                        break
+                    for m in msgs:
+                        self._instr_write(m)
+                    return [self._read_one_try(timeout=timeout) for _ in msgs]
+            if not retry:
+                t.reraise()
+            error_msg="pipelined ask raises error '{}'; waiting {} sec before trying to recover".format(t.error,self._retry_delay)
+            if self._failsafe_warnings:
+                warnings.warn(error_msg)
+            self.sleep(self._retry_delay)
+            self._try_recover(t.try_number)
+        return self._split_pipelined_reply(reply,len(msgs))  # wrong number of replies is not a communication error, so it is not retried
     def _ask_retry(self, msg, delay=0., raw=False, size=None, timeout=None, wait_callback=None, retry=None):
         self._write_retry(flush=True)
         retry=(timeout is None) if (retry is None) else retry
@@ -530,6 +610,51 @@ class SCPIDevice(comm_backend.ICommBackendWrapper):
             self.sleep(0.5)
             self.flush()
             self._try_recover(t.try_number)
+    def setup_query_pipeline(self, mode="concatenate", size=None):
+        """
+        Setup query pipelining, which is used in :meth:`ask_multiple` and in settings, status, and info queries.
+
+        `mode` can be ``None`` (no pipelining, the queries are sent one-by-one),
+        ``"concatenate"`` (queries are joined with ``";"`` into a single message, and the single reply is split on ``";"``; standard SCPI compound query),
+        or ``"separate"`` (queries are sent as separate messages, and then all the replies are read; requires the device to queue the replies).
+        `size` is the maximal number of queries in a single pipelined batch (limited by the device input buffer);
+        ``None`` means keeping the current value.
+        """
+        funcargparse.check_parameter_range(mode,"mode",[None,"concatenate","separate"])
+        self._query_pipeline=mode
+        if size is not None:
+            self._query_pipeline_size=size
+    def _ask_multiple_raw(self, msgs, timeout=None):
+        if not self._query_pipeline:
+            return [self._ask_retry(m,raw=True,timeout=timeout) for m in msgs]
+        replies=[]
+        size=max(self._query_pipeline_size or len(msgs),1)
+        for i in range(0,len(msgs),size):
+            replies+=self._ask_pipelined_retry(msgs[i:i+size],timeout=timeout)
+        return replies
+    def ask_multiple(self, msgs, data_type="string", timeout=None):
+        """
+        Send several queries and read their replies.
+
+        `msgs` is a list of query messages or tuples ``(msg, data_type)``; in the first case, `data_type` is applied to all replies.
+        If query pipelining is enabled (see :meth:`setup_query_pipeline`), the queries are sent in batches instead of one round trip per query.
+        If a pipelined batch fails, the device input is flushed, and the queries are repeated one-by-one.
+        Return list of replies, which are parsed same as in :meth:`read`.
+        """
+        msgs=[(m,data_type) if isinstance(m,anystring) else tuple(m) for m in msgs]
+        try:
+            replies=self._ask_multiple_raw([m for m,_ in msgs],timeout=timeout)
+        except self.Error:
+            if not self._query_pipeline:
+                raise
+            self.flush()
+            return [self.ask(m,dt,timeout=timeout) for m,dt in msgs]
+        results=[]
+        for (m,dt),reply in zip(msgs,replies):
+            if not self._check_reply(reply,m):
+                raise self.Error("query {} returned unexpected reply: {}".format(m,reply))
+            results.append(self._parse_msg(reply,data_type=dt))
+        return results
     def flush(self, one_line=False):
         """
         Flush the read buffer (read all the available data and return the number of bytes read).
@@ -567,6 +692,88 @@ class SCPIDevice(comm_backend.ICommBackendWrapper):
         if flush_term:
             self.flush(one_line=True)
         return (header+data) if include_header else data
+    def _read_into_one_try(self, buffer, timeout=None):
+        self._write_retry(flush=True)
+        timeout=self._operation_timeout if timeout is None else timeout
+        with self.instr.locking(timeout=timeout):
+            with self.instr.using_timeout(timeout):
+                nread=self._instr_read_into(buffer)
+        if nread!=len(buffer):
+            raise DeviceError("read returned less data than expected: {} instead of {}".format(nread,len(buffer)))
+    def _read_block_header(self, timeout=None, skip_separators=False):
+        start=self._read_retry(raw=True,size=1,timeout=timeout)
+        while skip_separators and start in [b",",b";",b" ",b"\t",b"\r",b"\n"]:
+            start=self._read_retry(raw=True,size=1,timeout=timeout)
+        if start!=b"#":
+            raise DeviceError("malformatted data")
+        len_size=int(self._read_retry(raw=True,size=1,timeout=timeout))
+        return int(self._read_retry(raw=True,size=len_size,timeout=timeout)) if len_size else None
+    def _read_indefinite_block(self, timeout=None):
+        data=self._read_retry(raw=True,timeout=timeout)
+        for t in [b"\n",b"\r"]:
+            if data.endswith(t):
+                data=data[:-1]
+        return data
+    def read_binary_block(self, dtype="u1", out=None, nblocks=1, timeout=None, flush_term=True):
+        """
+        Read binary data blocks directly into a numpy array.
+
+        Each block has the standard binary transfer format: ``"#"`` symbol, then a single digit with the size of the length string,
+        then the length string containing the length of the binary data (in bytes), and then the data.
+        Length size of ``0`` (``"#0"`` header) denotes an indefinite-length block, which lasts until the read terminator;
+        such block is read as a whole line, so it can contain terminator characters only if the backend detects the end of message by other means.
+        Data of definite-length blocks is read directly into the output buffer without intermediate copies, if the backend supports it.
+
+        Args:
+            dtype: data type, either a numpy dtype or a :class:`.DataFormat` description in numpy format (e.g., ``"<u2"``).
+            out: if not ``None``, a preallocated contiguous numpy array large enough to fit the data; the data is written starting from its beginning.
+            nblocks: number of consecutive blocks to read (e.g., replies to a compound query or a chunked transfer);
+                blocks can be separated by ``","``, ``";"``, or whitespace characters, and their data is concatenated.
+            timeout: overrides the default timeout for each read operation.
+            flush_term: if ``True``, flush the following line to skip terminator characters after the last definite-length block.
+
+        Return a numpy array with the given dtype, which is a view of `out` if it is supplied.
+        """
+        if not isinstance(dtype,np.dtype):
+            fmt=data_format.DataFormat.from_desc(dtype)
+            if fmt.is_ascii():
+                raise ValueError("binary blocks require a binary data format")
+            dtype=fmt.to_desc("numpy")
+        dtype=np.dtype(dtype)
+        if out is not None:
+            if not out.flags.c_contiguous:
+                raise ValueError("output array should be contiguous")
+            buffer=out.reshape(-1).view(np.uint8)
+        else:
+            chunks=[]
+        pos=0
+        indefinite=False
+        for i in range(nblocks):
+            length=self._read_block_header(timeout=timeout,skip_separators=i>0)
+            indefinite=length is None
+            if indefinite:
+                data=self._read_indefinite_block(timeout=timeout)
+                length=len(data)
+            if out is not None and pos+length>len(buffer):
+                raise DeviceError("output buffer is too small: need at least {} bytes, got {}".format(pos+length,len(buffer)))
+            if indefinite:
+                chunk=np.frombuffer(data,dtype=np.uint8)
+                if out is not None:
+                    buffer[pos:pos+length]=chunk
+            else:
+                chunk=buffer[pos:pos+length] if out is not None else np.empty(length,dtype=np.uint8)
+                self._read_into_one_try(memoryview(chunk),timeout=timeout)
+            if out is None:
+                chunks.append(chunk)
+            pos+=length
+        if flush_term and not indefinite:
+            self.flush(one_line=True)
+        if pos%dtype.itemsize:
+            raise DeviceError("data length {} is not a multiple of the item size {}".format(pos,dtype.itemsize))
+        data=buffer[:pos] if out is not None else (chunks[0] if len(chunks)==1 else np.concatenate(chunks))
+        if out is None and not data.flags.writeable:
+            data=data.copy()
+        return data.view(dtype)
     @staticmethod
     def parse_array_data(data, fmt, include_header=False):
         """
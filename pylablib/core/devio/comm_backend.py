@@ -126,6 +126,10 @@ class IDeviceCommBackend:
         """Log the operation (used for testing and debugging)"""
         if logger:
             logger.log(operation,value)
+    def _log_buffer(self, operation, buffer):
+        """Log the operation with the data contained in a buffer (only converted to bytes if logging is enabled)"""
+        if logger:
+            logger.log(operation,memoryview(buffer).tobytes())
     
     def lock(self, timeout=None):
         """Lock the access to the device from other threads/processes (isn't necessarily implemented)"""
@@ -209,6 +213,17 @@ class IDeviceCommBackend:
         If `size` is not None, read `size` bytes (the standard timeout applies); otherwise, read all available data (return immediately).
         """
         raise NotImplementedError("IDeviceCommBackend.read")
+    def read_into(self, buffer):
+        """
+        Read data from the device into a writable `buffer` (e.g., ``bytearray``, ``memoryview``, or a contiguous numpy array), filling it completely.
+
+        Return the number of bytes read (equal to the buffer size in bytes; the usual timeout applies).
+        By default, read the data using :meth:`read` and copy it into the buffer; some backends read directly into the buffer.
+        """
+        buffer=memoryview(buffer).cast("B")
+        data=py3.as_builtin_bytes(self.read(len(buffer)))
+        buffer[:len(data)]=data
+        return len(data)
     def flush_read(self):
         """Flush the device output (read all the available data; return the number of bytes read)"""
         return len(self.read())
@@ -257,8 +272,96 @@ def remove_longest_term(msg, terms):
     for t in terms:
         if msg.endswith(py3.as_builtin_bytes(t)):
             tcs=max(tcs,len(t))
-    return msg[:-tcs]
-    
+    return msg[:-tcs] if tcs else msg
+
+
+class BufferedTermReader:
+    """
+    Buffered reader of terminated messages for stream-like backends (serial, FT232, HID).
+
+    Reads the data in blocks of all the currently available bytes (or a single byte, if nothing is available, to wait for the new data with the standard timeout),
+    searches the terminators in the accumulated buffer, and returns the completed messages while keeping the remainder for the following reads.
+
+    Args:
+        read_func: function which takes a single argument (number of bytes) and returns at most this number of bytes
+            (empty result means timeout)
+        pending_func: function which returns the number of bytes which can be read without waiting;
+            if ``None``, the data is read byte-by-byte
+        max_block_size: maximal size of a single read block
+        readinto_func: function which takes a single argument (writable buffer), reads at most its size bytes into it, and returns the number of read bytes;
+            if ``None``, use `read_func` and copy the result
+    """
+    def __init__(self, read_func, pending_func=None, max_block_size=65536, readinto_func=None):
+        self.read_func=read_func
+        self.readinto_func=readinto_func
+        self.pending_func=pending_func
+        self.max_block_size=max_block_size
+        self.buffer=bytearray()
+    def read_block(self):
+        """Read a single block of all the currently available bytes (at least one byte) from the device"""
+        size=(self.pending_func() or 1) if self.pending_func is not None else 1
+        return self.read_func(min(size,self.max_block_size))
+    def pop(self, size=None):
+        """Pop at most `size` bytes (all, if `size` is ``None``) from the buffer"""
+        buf=self.buffer
+        if size is None or size>=len(buf):
+            data=bytes(buf)
+            buf.clear()
+        else:
+            data=bytes(buf[:size])
+            del buf[:size]
+        return data
+    def clear(self):
+        """Clear the buffer"""
+        self.buffer.clear()
+    def __len__(self):
+        return len(self.buffer)
+    def read(self, size):
+        """Read `size` bytes, first from the buffer and then from the device"""
+        data=self.pop(size)
+        if len(data)<size:
+            data+=self.read_func(size-len(data))
+        return data
+    def read_into(self, buffer):
+        """Read data into a writable `buffer`, first from the internal buffer and then from the device; return the number of read bytes"""
+        buffer=memoryview(buffer).cast("B")
+        nread=min(len(self.buffer),len(buffer))
+        if nread:
+            buffer[:nread]=self.pop(nread)
+        if nread<len(buffer):
+            if self.readinto_func is not None:
+                nread+=self.readinto_func(buffer[nread:])
+            else:
+                data=self.read_func(len(buffer)-nread)
+                buffer[nread:nread+len(data)]=data
+                nread+=len(data)
+        return nread
+    def read_terms(self, terms=()):
+        """
+        Read a message ending with one of the terminators `terms`.
+
+        Return the message (including the terminator), or ``None`` if the read timed out before a terminator has been found
+        (in which case the received data is kept in the buffer, and can be obtained using :meth:`pop`).
+        If `terms` is empty, keep reading until timeout.
+        """
+        buf=self.buffer
+        terms=[py3.as_builtin_bytes(t) for t in terms]
+        max_term_len=max([len(t) for t in terms],default=0)
+        start=0
+        while True:
+            end=None
+            for t in terms:
+                pos=buf.find(t,start)
+                if pos>=0 and (end is None or pos+len(t)<end):
+                    end=pos+len(t)
+            if end is not None:
+                return self.pop(end)
+            start=max(len(buf)-max_term_len+1,0) # terminator can be split between the blocks
+            data=self.read_block()
+            if not data:
+                return None
+            buf+=data
+
 
 
 ### Specific backends ###
@@ -475,6 +578,20 @@ try:
             self.cooldown("read")
             self._log("read",result)
             return self._to_datatype(result)
+        @logerror
+        @reraise
+        def read_into(self, buffer):
+            buffer=memoryview(buffer).cast("B")
+            chunk_size=self.instr.chunk_size
+            nread=0
+            with self.instr.ignore_warning(visa.constants.VI_SUCCESS_DEV_NPRESENT,visa.constants.VI_SUCCESS_MAX_CNT):
+                while nread<len(buffer):
+                    chunk,_=self.instr.visalib.read(self.instr.session,min(chunk_size,len(buffer)-nread))
+                    buffer[nread:nread+len(chunk)]=chunk
+                    nread+=len(chunk)
+            self.cooldown("read")
+            self._log_buffer("read",buffer)
+            return nread
         
         @logerror
         @reraise
@@ -561,6 +678,7 @@ try:
             super().__init__(conn_dict.copy(),term_write=term_write,term_read=term_read,datatype=datatype,reraise_error=reraise_error)
             port=conn_dict.pop("port")
             self.instr=None
+            self._reader=BufferedTermReader(lambda n: self.instr.read(n),lambda: self.instr.in_waiting,readinto_func=lambda b: self.instr.readinto(b))
             try:
                 self.instr=serial.serial_for_url(port,do_not_open=True,**conn_dict)
                 self.opened=True
@@ -583,9 +701,11 @@ try:
         @reraise
         def _do_open(self):
             general.retry_wait(self.instr.open, self._open_retry_times, 0.3)
+            self._reader.clear()
         @reraise
         def _do_close(self):
             general.retry_wait(self.instr.close, self._open_retry_times, 0.3)
+            self._reader.clear()
         def open(self):
             """Open the connection"""
             if not self._connect_on_operation and not self.opened:
@@ -634,26 +754,15 @@ try:
             return self.instr.timeout
         
         @reraise
-        def _read_terms(self, terms=(), read_block_size=8, timeout=None, error_on_timeout=True):
-            result=b""
-            singlechar_terms=all(len(t)==1 for t in terms)
-            terms=[py3.as_builtin_bytes(t) for t in terms]
+        def _read_terms(self, terms=(), timeout=None, error_on_timeout=True):
             with self.single_op():
                 with self.using_timeout(timeout):
-                    while True:
-                        c=self.instr.read(1 if terms else read_block_size)
-                        result=result+c
-                        if c==b"":
-                            if error_on_timeout and terms:
-                                raise self.Error("timeout during read")
-                            return result
-                        if singlechar_terms:
-                            if c in terms:
-                                return result
-                        else:
-                            for t in terms:
-                                if result.endswith(t):
-                                    return result
+                    result=self._reader.read_terms(terms)
+            if result is None:
+                if error_on_timeout and terms:
+                    raise self.Error("timeout during read")
+                result=self._reader.pop()
+            return result
         @logerror
         def readline(self, remove_term=True, timeout=None, skip_empty=True, error_on_timeout=True):  # pylint: disable=arguments-differ
             """
@@ -686,13 +795,24 @@ try:
                 if size is None:
                     result=self._read_terms(timeout=0,error_on_timeout=False)
                 else:
-                    result=self.instr.read(size=size)
+                    result=self._reader.read(size)
                     if len(result)!=size:
                         raise self.Error("read returned less than expected: {} instead of {}".format(len(result),size))
                 self.cooldown("read")
                 self._log("read",result)
                 return self._to_datatype(result)
         @logerror
+        @reraise
+        def read_into(self, buffer):
+            buffer=memoryview(buffer).cast("B")
+            with self.single_op():
+                nread=self._reader.read_into(buffer)
+                if nread!=len(buffer):
+                    raise self.Error("read returned less than expected: {} instead of {}".format(nread,len(buffer)))
+                self.cooldown("read")
+                self._log_buffer("read",buffer[:nread])
+                return nread
+        @logerror
         def read_multichar_term(self, term, remove_term=True, timeout=None, error_on_timeout=True):
             """
             Read a single line with multiple possible terminators.
@@ -805,6 +925,7 @@ try:
             port=conn_dict.pop("port")
             self.opened=False
             self.instr=None
+            self._reader=BufferedTermReader(lambda n: self.instr.read(n),lambda: self.instr.inWaiting())
             try:
                 self.instr=self._open_instr(port,conn_dict)
                 self.opened=True
@@ -830,11 +951,13 @@ try:
                 self.set_timeout(self._conn_params[2])
                 self.opened=True
             general.retry_wait(reopen, self._open_retry_times, 0.3)
+            self._reader.clear()
         @reraise
         def _do_close(self):
             if self.is_opened():
                 general.retry_wait(self.instr.close, self._open_retry_times, 0.3)
                 self.opened=False
+                self._reader.clear()
         def open(self):
             """Open the connection"""
             self._do_open()
@@ -868,26 +991,15 @@ try:
         
         
         @reraise
-        def _read_terms(self, terms=(), read_block_size=8, timeout=None, error_on_timeout=True):
-            result=b""
-            singlechar_terms=all(len(t)==1 for t in terms)
-            terms=[py3.as_builtin_bytes(t) for t in terms]
+        def _read_terms(self, terms=(), timeout=None, error_on_timeout=True):
             with self.single_op():
                 with self.using_timeout(timeout):
-                    while True:
-                        c=self.instr.read(1 if terms else read_block_size)
-                        result=result+c
-                        if c==b"":
-                            if error_on_timeout and terms:
-                                raise self.Error("timeout during read")
-                            return result
-                        if singlechar_terms:
-                            if c in terms:
-                                return result
-                        else:
-                            for t in terms:
-                                if result.endswith(t):
-                                    return result
+                    result=self._reader.read_terms(terms)
+            if result is None:
+                if error_on_timeout and terms:
+                    raise self.Error("timeout during read")
+                result=self._reader.pop()
+            return result
         @logerror
         def readline(self, remove_term=True, timeout=None, skip_empty=True, error_on_timeout=True):  # pylint: disable=arguments-differ
             """
@@ -920,13 +1032,24 @@ try:
                 if size is None:
                     result=self._read_terms(timeout=0,error_on_timeout=False)
                 else:
-                    result=self.instr.read(size=size)
+                    result=self._reader.read(size)
                     if len(result)!=size:
                         raise self.Error("read returned less data than expected")
                 self.cooldown("read")
                 self._log("read",result)
                 return self._to_datatype(result)
         @logerror
+        @reraise
+        def read_into(self, buffer):
+            buffer=memoryview(buffer).cast("B")
+            with self.single_op():
+                nread=self._reader.read_into(buffer)
+                if nread!=len(buffer):
+                    raise self.Error("read returned less than expected: {} instead of {}".format(nread,len(buffer)))
+                self.cooldown("read")
+                self._log_buffer("read",buffer[:nread])
+                return nread
+        @logerror
         def read_multichar_term(self, term, remove_term=True, timeout=None, error_on_timeout=True):
             """
             Read a single line with multiple possible terminators.
@@ -1119,6 +1242,13 @@ class NetworkDeviceBackend(IDeviceCommBackend):
         return self._to_datatype(result)
     @logerror
     @reraise
+    def read_into(self, buffer):
+        nread=self.socket.recv_fixedlen_into(buffer)
+        self.cooldown("read")
+        self._log_buffer("read",buffer)
+        return nread
+    @logerror
+    @reraise
     def read_multichar_term(self, term, remove_term=True, timeout=None):
         """
         Read a single line with multiple possible terminators.
@@ -1427,6 +1557,8 @@ try:
                 term_read=[term_read]
             super().__init__(conn_dict.copy(),term_write=term_write,term_read=term_read,datatype=datatype,reraise_error=reraise_error)
             self.instr=None
+            self._reader=BufferedTermReader(self._read_instr,lambda: self.instr.get_pending())
+            self._read_timeout=None
             try:
                 self.instr=hid.HIDevice(path=self.conn["path"],timeout=timeout,rep_fmt=self.conn["rep_fmt"])
                 self.open()
@@ -1438,11 +1570,13 @@ try:
         def open(self):
             """Open the connection"""
             self.instr.open()
+            self._reader.clear()
             self.cooldown("open")
         @reraise
         def close(self):
             """Close the connection"""
             self.instr.close()
+            self._reader.clear()
             self.cooldown("close")
         def is_opened(self):
             return self.instr.is_opened()
@@ -1456,30 +1590,22 @@ try:
             """Get operations timeout (in seconds)"""
             return self.instr.get_timeout()
         
+        def _read_instr(self, size):
+            try:
+                return self.instr.read(size,timeout=self._read_timeout)
+            except self.BackendError:
+                return b""
         @reraise
-        def _read_terms(self, terms=(), read_block_size=8, timeout=None, error_on_timeout=True):
-            result=b""
-            singlechar_terms=all(len(t)==1 for t in terms)
-            terms=[py3.as_builtin_bytes(t) for t in terms]
-            while True:
-                try:
-                    c=self.instr.read(1 if terms else read_block_size,timeout=timeout)
-                except self.BackendError:
-                    c=b""
-                result=result+c
-                if c==b"":
-                    if error_on_timeout and terms:
-                        raise self.Error("timeout during read")
-                    return result
-                if not terms:
-                    return result
-                if singlechar_terms:
-                    if c in terms:
-                        return result
-                else:
-                    for t in terms:
-                        if result.endswith(t):
-                            return result
+        def _read_terms(self, terms=(), timeout=None, error_on_timeout=True):
+            self._read_timeout=timeout
+            if not terms:
+                return self._reader.pop() or self._reader.read_block()
+            result=self._reader.read_terms(terms)
+            if result is None:
+                if error_on_timeout and terms:
+                    raise self.Error("timeout during read")
+                result=self._reader.pop()
+            return result
         @logerror
         def readline(self, remove_term=True, timeout=None, skip_empty=True, error_on_timeout=True):  # pylint: disable=arguments-differ
             """
@@ -1508,7 +1634,9 @@ try:
             
             If `size` is not None, read `size` bytes (usual timeout applies); otherwise, read all available data (return immediately).
             """
-            result=self.instr.read(size)
+            result=self._reader.pop(size)
+            if size is None or len(result)<size:
+                result+=self.instr.read(None if size is None else size-len(result))
             if size is not None and len(result)!=size:
                 raise self.Error("read returned less than expected {} instead of {}".format(len(result),size))
             self.cooldown("read")
@@ -1537,7 +1665,7 @@ try:
         @reraise
         def get_pending(self):
             """Get the number of bytes in the read buffer"""
-            return self.instr.get_pending()
+            return len(self._reader)+self.instr.get_pending()
         @logerror
         @reraise
         def write(self, data, flush=True, read_echo=False, read_echo_delay=0, read_echo_lines=1):
@@ -1815,9 +1943,11 @@ class ICommBackendWrapper(interface.IDevice):
         
     def open(self):
         """Open the backend"""
+        self.invalidate_cache(constant=True)
         return self.instr.open()
     def close(self):
         """Close the backend"""
+        self.invalidate_cache(constant=True)
         return self.instr.close()
     def is_opened(self):
         """Check if the device is connected"""
@@ -5,9 +5,78 @@ from .base import DeviceError
 import functools
 import contextlib
 import collections
+import time
 
 _device_var_kinds=["settings","status","info"]
 
+
+class DeviceVariableCache:
+    """
+    Read-through cache for device variables with per-variable policies.
+
+    Policy can be ``None`` or ``"live"`` (not cached, the getter is always called),
+    ``"constant"`` (the value is read once and kept until the variable is explicitly invalidated or the device is reconnected),
+    ``"set"`` (the value is kept until it is invalidated, e.g., by setting this variable or by :meth:`invalidate` call),
+    or a number (time-to-live in seconds; the value is additionally invalidated same as for ``"set"`` policy).
+    """
+    def __init__(self):
+        self._policies={}
+        self._values={}
+        self._stats={}
+    def set_policy(self, key, policy):
+        """Set caching policy for a given key"""
+        if policy=="live":
+            policy=None
+        if not (policy is None or policy in ["constant","set"] or isinstance(policy,(int,float))):
+            raise ValueError("unrecognized cache policy: {}".format(policy))
+        self._values.pop(key,None)
+        if policy is None:
+            self._policies.pop(key,None)
+            self._stats.pop(key,None)
+        else:
+            self._policies[key]=policy
+            self._stats.setdefault(key,[0,0])
+    def get_policy(self, key):
+        """Get caching policy for a given key (``None`` for non-cached keys)"""
+        return self._policies.get(key)
+    def is_valid(self, key):
+        """Check if there is a valid cached value for the given key"""
+        if key not in self._values:
+            return False
+        policy=self._policies[key]
+        return not isinstance(policy,(int,float)) or time.time()<self._values[key][1]+policy
+    def get(self, key, getter):
+        """Get value for the given key, calling `getter` if it is not cached or the cached value is invalid"""
+        if key not in self._policies:
+            return getter()
+        stats=self._stats[key]
+        if self.is_valid(key):
+            stats[0]+=1
+            return self._values[key][0]
+        stats[1]+=1
+        value=getter()
+        self._values[key]=(value,time.time())
+        return value
+    def invalidate(self, keys=None, constant=False):
+        """
+        Invalidate cached values for the given keys (or for all keys, if `keys` is ``None``).
+
+        If `keys` is ``None`` and ``constant==False``, keep the values with ``"constant"`` policy.
+        """
+        if keys is None:
+            keys=[k for k in self._values if constant or self._policies[k]!="constant"]
+        elif isinstance(keys,py3.anystring):
+            keys=[keys]
+        for k in keys:
+            self._values.pop(k,None)
+    def get_stats(self):
+        """Get cache statistics as a dictionary ``{key: (hits, misses)}`` for all cached keys"""
+        return {k:tuple(v) for k,v in self._stats.items()}
+    def reset_stats(self):
+        """Reset cache statistics"""
+        for v in self._stats.values():
+            v[:]=[0,0]
+
 class IDevice:
     """
     A base class for an instrument.
@@ -19,8 +88,9 @@ class IDevice:
         self._device_var_ignore_error={"get":(),"set":()}
         self._device_vars=dict([(ik,{}) for ik in _device_var_kinds])
         self._device_vars_order=dict([(ik,[]) for ik in _device_var_kinds])
-        self._add_info_variable("cls",lambda: self.__class__.__name__)
-        self._add_info_variable("conn",self._get_connection_parameters,ignore_error=NotImplementedError)
+        self._device_vars_cache=DeviceVariableCache()
+        self._add_info_variable("cls",lambda: self.__class__.__name__,cache="constant")
+        self._add_info_variable("conn",self._get_connection_parameters,ignore_error=NotImplementedError,cache="constant")
         self.dv=dictionary.ItemAccessor(getter=self.get_device_variable,setter=self.set_device_variable)
         self._setup_parameter_classes()
         self._wap=self.NoParameterCaller(self,"wap")
@@ -132,7 +202,7 @@ class IDevice:
         order=self._device_vars_order[kind]
         del order[order.index(path)]
         order.append(path)
-    def _add_device_variable(self, path, kind, getter=None, setter=None, ignore_error=(), mux=None, multiarg=True, priority=0):
+    def _add_device_variable(self, path, kind, getter=None, setter=None, ignore_error=(), mux=None, multiarg=True, priority=0, cache=None):
         """
         Adds a device variable.
          
@@ -149,6 +219,9 @@ class IDevice:
             priority(int): variable priority between -10 and 10;
                 when querying all variables using :meth:`get_settings`, :meth:`get_full_status`, or :meth:`get_full_info`,
                 only values with a priority equal to higher then specified (0 by default) are returned.
+            cache: caching policy for the getter results; can be ``None`` or ``"live"`` (no caching, default), ``"constant"``, ``"set"``,
+                or a number (time-to-live in seconds); see :class:`DeviceVariableCache` for details.
+                Any cached value is invalidated when the variable is set through :meth:`apply_settings` or :meth:`set_device_variable`.
         """
         if kind not in self._device_vars:
             raise ValueError("unrecognized device variable kind: {}".format(kind))
@@ -162,41 +235,68 @@ class IDevice:
         if mux:
             getter=self._multiplex_func(getter,*mux[:2],multiarg=multiarg) if getter else None
             setter=self._multiplex_func(setter,*mux[:2],multiarg=multiarg) if setter else None
+        if setter:
+            setter=self._invalidating_setter(path,setter)
+        self._device_vars_cache.set_policy(path,cache)
         self._device_vars[kind][path]=(getter,setter,ignore_error,priority)
         if path not in self._device_vars_order[kind]:
             self._device_vars_order[kind].append(path)
-    def _add_info_variable(self, path, getter=None, ignore_error=(), mux=None, priority=0):
-        return self._add_device_variable(path,"info",getter=getter,ignore_error=ignore_error,mux=mux,priority=priority)
-    def _add_status_variable(self, path, getter=None, ignore_error=(), mux=None, priority=0):
-        return self._add_device_variable(path,"status",getter=getter,ignore_error=ignore_error,mux=mux,priority=priority)
-    def _add_settings_variable(self, path, getter=None, setter=None, ignore_error=(), mux=None, multiarg=True, priority=0):
-        return self._add_device_variable(path,"settings",getter=getter,setter=setter,ignore_error=ignore_error,mux=mux,multiarg=multiarg,priority=priority)
-    def _get_device_variables(self, kinds, include=0):
+    def _invalidating_setter(self, path, setter):
+        def invalidating_setter(v):
+            try:
+                return setter(v)
+            finally:
+                self._device_vars_cache.invalidate(path)
+        return invalidating_setter
+    def _add_info_variable(self, path, getter=None, ignore_error=(), mux=None, priority=0, cache=None):
+        return self._add_device_variable(path,"info",getter=getter,ignore_error=ignore_error,mux=mux,priority=priority,cache=cache)
+    def _add_status_variable(self, path, getter=None, ignore_error=(), mux=None, priority=0, cache=None):
+        return self._add_device_variable(path,"status",getter=getter,ignore_error=ignore_error,mux=mux,priority=priority,cache=cache)
+    def _add_settings_variable(self, path, getter=None, setter=None, ignore_error=(), mux=None, multiarg=True, priority=0, cache=None):
+        return self._add_device_variable(path,"settings",getter=getter,setter=setter,ignore_error=ignore_error,mux=mux,multiarg=multiarg,priority=priority,cache=cache)
+    def _select_device_variables(self, kinds, include=0):
         """
-        Get dict ``{name: value}`` containing all the device settings.
-         
-        `kinds` is the list of info variables kinds to be included in the info.
-        `include` specifies either a list of variables (only these variables are returned),
-        a priority threshold (only values with the priority equal or higher are returned), or ``"all"`` (all available variables).
-        Since the lowest priority is -10, setting ``include=-10`` queries all available variables, which is equivalent to ``include="all"``.
+        Get list of ``(kind, name)`` of all readable device variables of the given kinds selected by `include`.
+
+        Arguments are the same as in :meth:`_get_device_variables`.
         """
         for kind in kinds:
             if kind not in self._device_vars:
                 raise ValueError("unrecognized device variable kind: {}".format(kind))
-        info={}
         if include=="all":
             include=-10
         variables,priority=(None,include) if isinstance(include,int) else (include,None)
+        selected=[]
         for kind in kinds:
             for k in self._device_vars_order[kind]:
                 if variables is None or k in variables:
-                    g,_,err,pr=self._device_vars[kind][k]
+                    g,_,_,pr=self._device_vars[kind][k]
                     if (g is not None) and (priority is None or pr>=priority):
-                        all_err=err+self._device_var_ignore_error["get"]
-                        try:
-                            info[k]=g()
-                        except all_err:
-                            pass
+                        selected.append((kind,k))
+        return selected
+    def _call_device_variable_getter(self, path, getter):  # pylint: disable=unused-argument
+        """Call the getter of the device variable with the given path (can be overloaded to add pre- or post-processing)"""
+        return getter()
+    def _get_device_variable_value(self, path, getter):
+        """Get the value of the device variable with the given path, taking the cache into account"""
+        return self._device_vars_cache.get(path,lambda: self._call_device_variable_getter(path,getter))
+    def _get_device_variables(self, kinds, include=0):
+        """
+        Get dict ``{name: value}`` containing all the device settings.
+         
+        `kinds` is the list of info variables kinds to be included in the info.
+        `include` specifies either a list of variables (only these variables are returned),
+        a priority threshold (only values with the priority equal or higher are returned), or ``"all"`` (all available variables).
+        Since the lowest priority is -10, setting ``include=-10`` queries all available variables, which is equivalent to ``include="all"``.
+        """
+        info={}
+        for kind,k in self._select_device_variables(kinds,include=include):
+            g,_,err,_=self._device_vars[kind][k]
+            all_err=err+self._device_var_ignore_error["get"]
+            try:
+                info[k]=self._get_device_variable_value(k,g)
+            except all_err:
+                pass
         return info
     def _remove_device_variable(self, path, kind=None):
         """Remove a device variable"""
@@ -210,6 +310,7 @@ class IDevice:
         if path not in self._device_vars[kind]:
             raise ValueError("variable {} does not exist".format(path))
         del self._device_vars[kind][path]
+        self._device_vars_cache.set_policy(path,None)
         order=self._device_vars_order[kind]
         del order[order.index(path)]
     def get_settings(self, include=0):
@@ -260,7 +361,7 @@ class IDevice:
             if key in self._device_vars[kind]:
                 g=self._device_vars[kind][key][0]
                 if g:
-                    return g()
+                    return self._get_device_variable_value(key,g)
                 raise ValueError("no getter for value '{}'".format(key))
         raise KeyError("no property '{}'".format(key))
     def set_device_variable(self, key, value):
@@ -271,6 +372,17 @@ class IDevice:
                 return s(value)
             raise ValueError("no setter for value '{}'".format(key))
         raise KeyError("no property '{}'".format(key))
+    def invalidate_cache(self, variables=None, constant=False):
+        """
+        Invalidate cached values of the device variables.
+
+        `variables` is a variable name or a list of names; if ``None``, invalidate all cached variables
+        (except for the ones with ``"constant"`` cache policy, unless ``constant==True``).
+        """
+        self._device_vars_cache.invalidate(variables,constant=constant)
+    def get_cache_stats(self):
+        """Get device variables cache statistics as a dictionary ``{name: (hits, misses)}`` for all cached variables"""
+        return self._device_vars_cache.get_stats()
 
 
 
@@ -3,6 +3,8 @@ from .loadfile import load_generic, load_raw, load_csv, load_csv_desc, load_bin,
 from .savefile import save_generic, save_raw, save_csv, save_csv_desc, save_bin, save_bin_desc, save_dict
 from .location import LocationName, LocationFile, get_location
 from .table_stream import TableStreamFile
+from .stream_writer import StreamFileWriter
+from .frame_stack import FrameStackWriter, FrameStackReader
 from .dict_entry import IDictionaryEntry, ExternalTextTableDictionaryEntry, ExternalBinTableDictionaryEntry, \
-    IExternalFileDictionaryEntry, ExternalNumpyDictionaryEntry, ExpandedContainerDictionaryEntry
+    IExternalFileDictionaryEntry, ExternalNumpyDictionaryEntry, ExternalFrameStackDictionaryEntry, ExpandedContainerDictionaryEntry
 from .dict_entry import add_dict_entry_builder, add_dict_entry_parser, add_dict_entry_class
\ No newline at end of file
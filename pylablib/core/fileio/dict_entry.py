@@ -606,6 +606,54 @@ IExternalFileDictionaryEntry.add_file_format(ExternalNumpyDictionaryEntry)
 
 
 
+class ExternalFrameStackDictionaryEntry(IExternalFileDictionaryEntry):
+    """
+    A dictionary entry which stores a stack of frames into an external chunked and (optionally) compressed frame stack file.
+
+    The file format is described in :mod:`.frame_stack`; the stored data can also be accessed directly via :class:`.FrameStackReader`.
+
+    Args:
+        data: 3D numpy array with the frames, or a tuple ``(frames, frame_info)``, where ``frame_info`` is a 2D array with one row per frame.
+        name (str): Name template for the external file (default is the full path connected with ``"_"`` symbol).
+        force_name (bool): If ``False`` and the target file already exists, generate a new unique name; otherwise, overwrite the file.
+        chunk_size (int): Number of frames per stored chunk.
+        compression (str): Compression method (``"none"``, ``"zlib"``, or ``"lz4"``).
+        info_fields (list): If not ``None``, a list of frame info column names.
+    """
+    def __init__(self, data, name="", force_name=True, chunk_size=64, compression="zlib", info_fields=None):
+        if isinstance(data,tuple):
+            data=np.asarray(data[0]) if data[1] is None else (np.asarray(data[0]),np.asarray(data[1]))
+        else:
+            data=np.asarray(data)
+        IExternalFileDictionaryEntry.__init__(self,data,name=name,force_name=force_name)
+        self.chunk_size=chunk_size
+        self.compression=compression
+        self.info_fields=info_fields
+    file_format="frame_stack"
+    def _get_frames_info(self):
+        return self.data if isinstance(self.data,tuple) else (self.data,None)
+    def get_preamble(self):
+        """Generate preamble (dictionary with supplementary data which allows to load the data from the file)"""
+        frames,_=self._get_frames_info()
+        return {"shape":frames.shape,"dtype":frames.dtype.str,"compression":self.compression}
+    def save_file(self, location_file):
+        """Save stored data into the given location"""
+        from . import frame_stack
+        with location_file.open("wb") as stream:
+            with frame_stack.FrameStackWriter(stream,chunk_size=self.chunk_size,compression=self.compression,info_fields=self.info_fields) as writer:
+                writer.add_frames(*self._get_frames_info())
+    @classmethod
+    def load_file(cls, location_file, preamble):
+        """Load stored data from the given location, using the supplied preamble"""
+        from . import frame_stack
+        with location_file.open("rb") as stream:
+            with frame_stack.FrameStackReader(stream) as reader:
+                frames,info=reader.read_all(return_info=True)
+        return frames if info is None else (frames,info)
+IExternalFileDictionaryEntry.add_file_format(ExternalFrameStackDictionaryEntry)
+
+
+
 
 
 
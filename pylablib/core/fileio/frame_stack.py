@@ -0,0 +1,373 @@
+"""
+Chunked frame stack container.
+
+A frame stack file consists of a header followed by a sequence of chunks.
+The header starts with the ``b"PLFSTACK"`` signature, followed by the 4-byte little-endian description length and the JSON description
+(frame shape, data type, compression method, and frame info columns).
+Each chunk contains a fixed number of frames (except, possibly, the last one) and starts with a fixed-size header
+(``b"CHNK"`` signature, number of frames, and sizes of the stored frames data and frame info),
+which is followed by the (possibly compressed) frames data and frame info.
+Chunks can be appended to an existing file, and the chunk index is built on opening by jumping between the chunk headers.
+"""
+
+import numpy as np
+
+import zlib
+import json
+import struct
+import mmap
+import os
+import collections
+import threading
+import concurrent.futures
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame=None
+
+
+
+_file_signature=b"PLFSTACK"
+_chunk_signature=b"CHNK"
+_chunk_header=struct.Struct("<4sIQQ")
+
+def _get_compressor(compression, level=None):
+    if compression=="none":
+        return None,None
+    if compression=="zlib":
+        return (lambda data: zlib.compress(data,-1 if level is None else level)),zlib.decompress
+    if compression=="lz4":
+        if lz4_frame is None:
+            raise ImportError("lz4 compression requires lz4 package; install it by running 'pip install lz4'")
+        return (lambda data: lz4_frame.compress(data,compression_level=level or 0)),lz4_frame.decompress
+    raise ValueError("unrecognized compression method: {}".format(compression))
+def get_available_compressions():
+    """Get the list of available compression methods"""
+    return ["none","zlib"]+(["lz4"] if lz4_frame is not None else [])
+
+def _dtype_to_desc(dtype):
+    """Convert info dtype into a JSON-compatible description (type string, or a field list for structured dtypes)"""
+    if dtype is None:
+        return None
+    return dtype.descr if dtype.names is not None else dtype.str
+def _dtype_from_desc(desc):
+    """Convert a description generated by :func:`_dtype_to_desc` back into dtype"""
+    if not desc:
+        return None
+    def _to_fields(d):  # JSON turns field tuples ``(name, type[, shape])`` into lists
+        if not isinstance(d,list):
+            return d
+        return [(fd[0],_to_fields(fd[1]))+tuple(tuple(s) for s in fd[2:]) for fd in d]
+    return np.dtype(_to_fields(desc))
+
+
+
+class FrameStackWriter:
+    """
+    Frame stack file writer.
+
+    The frames are accumulated until a complete chunk is formed, which is then compressed and written into the file.
+    The frame shape, data type, and frame info columns are determined by the first added frames, unless specified explicitly.
+
+    Args:
+        path: destination file path or an opened binary stream
+        chunk_size(int): number of frames per chunk
+        compression(str): compression method; can be ``"none"``, ``"zlib"``, or ``"lz4"`` (requires ``lz4`` package)
+        compression_level: compression level (``None`` means the compressor default)
+        append(bool): if ``True`` and `path` is an existing file, append the frames to it;
+            in this case, the frame parameters and compression are taken from the existing file
+        info_fields: names of the frame info columns (e.g., taken from ``"frame_info_field"`` metainfo of :class:`.FramesMessage`);
+            for structured (record array) frame info they are taken from the dtype field names by default
+    """
+    def __init__(self, path, chunk_size=64, compression="zlib", compression_level=None, append=False, info_fields=None):
+        self.chunk_size=chunk_size
+        self.compression=compression
+        self.compression_level=compression_level
+        self.info_fields=list(info_fields) if info_fields is not None else None
+        self.shape=None
+        self.dtype=None
+        self.info_dtype=None
+        self._info_ncols=None
+        self._header_written=False
+        if isinstance(path,(str,bytes,os.PathLike)):
+            if append and os.path.exists(path) and os.path.getsize(path):
+                desc,_=_read_header(_FileBuffer(path).data)
+                self._set_desc(desc)
+                self._header_written=True
+            self.stream=open(path,"ab" if self._header_written else "wb")
+            self._own_stream=True
+        else:
+            self.stream=path
+            self._own_stream=False
+        self._compress,_=_get_compressor(self.compression,self.compression_level)
+        self._frames=[]
+        self._infos=[]
+        self._nbuffered=0
+
+    def _set_desc(self, desc):
+        self.shape=tuple(desc["shape"])
+        self.dtype=np.dtype(desc["dtype"])
+        self.chunk_size=desc["chunk_size"]
+        self.compression=desc["compression"]
+        self.info_fields=desc["info_fields"]
+        self.info_dtype=_dtype_from_desc(desc["info_dtype"])
+        self._info_ncols=desc["info_ncols"]
+    def _get_desc(self):
+        return {"shape":list(self.shape),"dtype":self.dtype.str,"chunk_size":self.chunk_size,"compression":self.compression,
+            "info_fields":self.info_fields,"info_dtype":_dtype_to_desc(self.info_dtype),"info_ncols":self._info_ncols}
+    def _write_header(self):
+        desc=json.dumps(self._get_desc()).encode()
+        self.stream.write(_file_signature+struct.pack("<I",len(desc))+desc)
+        self._header_written=True
+
+    def add_frames(self, frames, frame_info=None):
+        """
+        Add frames to the stack.
+
+        `frames` is a 3D array (or a list of 2D arrays) with the frames, or a single 2D frame.
+        `frame_info`, if supplied, is a 2D array with one row of frame info per frame (or a single 1D row for a single frame),
+        or a 1D structured (record) array with one record per frame (or a single record for a single frame);
+        frame info should be supplied either for all frames in the file or for none of them.
+        """
+        frames=np.asarray(frames)
+        if frames.ndim==2:
+            frames=frames[None]
+            if frame_info is not None:
+                frame_info=np.asarray(frame_info)[None]
+        if self.shape is None:
+            self.shape=frames.shape[1:]
+            self.dtype=frames.dtype
+        elif frames.shape[1:]!=self.shape:
+            raise ValueError("frame shape {} is different from the stack frame shape {}".format(frames.shape[1:],self.shape))
+        if frame_info is not None:
+            frame_info=np.asarray(frame_info)
+            if self.info_dtype is None and not self._header_written:
+                self.info_dtype=frame_info.dtype
+                if frame_info.dtype.names is not None:  # structured array: one record per frame
+                    self._info_ncols=None
+                    if self.info_fields is None:
+                        self.info_fields=list(frame_info.dtype.names)
+                elif frame_info.ndim==2:
+                    self._info_ncols=frame_info.shape[1]
+                else:
+                    raise ValueError("frame info should be a 2D array or a 1D structured array; got shape {}".format(frame_info.shape))
+            info_shape=(self._info_ncols,) if self._info_ncols is not None else ()
+            if len(frame_info)!=len(frames) or frame_info.shape[1:]!=info_shape:
+                raise ValueError("frame info shape {} is inconsistent with {} frames and {} info columns".format(frame_info.shape,len(frames),self._info_ncols))
+        if (frame_info is None)!=(self.info_dtype is None):
+            raise ValueError("frame info should be supplied either for all frames or for none of them")
+        self._frames.append(frames)
+        if frame_info is not None:
+            self._infos.append(frame_info)
+        self._nbuffered+=len(frames)
+        if self._nbuffered>=self.chunk_size:
+            self._write_chunks(final=False)
+    def _write_chunks(self, final=True):
+        if not self._nbuffered:
+            return
+        if not self._header_written:
+            self._write_header()
+        frames=np.concatenate(self._frames,axis=0).astype(self.dtype,copy=False)
+        infos=np.concatenate(self._infos,axis=0).astype(self.info_dtype,copy=False) if self._infos else None
+        nwrite=len(frames) if final else (len(frames)//self.chunk_size)*self.chunk_size
+        for s in range(0,nwrite,self.chunk_size):
+            e=min(s+self.chunk_size,nwrite)
+            data=np.ascontiguousarray(frames[s:e]).tobytes()
+            info=np.ascontiguousarray(infos[s:e]).tobytes() if infos is not None else b""
+            if self._compress is not None:
+                data=self._compress(data)
+                if info:
+                    info=self._compress(info)
+            self.stream.write(_chunk_header.pack(_chunk_signature,e-s,len(data),len(info)))
+            self.stream.write(data)
+            self.stream.write(info)
+        self._frames=[frames[nwrite:]] if nwrite<len(frames) else []
+        self._infos=[infos[nwrite:]] if (infos is not None and nwrite<len(frames)) else []
+        self._nbuffered=len(frames)-nwrite
+    def flush(self):
+        """Write all buffered frames into the file (possibly, as an incomplete chunk)"""
+        self._write_chunks(final=True)
+        self.stream.flush()
+    def close(self):
+        """Write all buffered frames and close the file"""
+        if self.stream is not None:
+            try:
+                self.flush()
+            finally:
+                if self._own_stream:
+                    self.stream.close()
+                self.stream=None
+    def __enter__(self):
+        return self
+    def __exit__(self, *args):
+        self.close()
+
+
+
+
+class _FileBuffer:
+    """Read-only buffer with the file data (memory-mapped if possible)"""
+    def __init__(self, src):
+        if isinstance(src,(str,bytes,os.PathLike)):
+            with open(src,"rb") as f:
+                self.data=self._map(f)
+        else:
+            self.data=self._map(src)
+    @staticmethod
+    def _map(f):
+        try:
+            return memoryview(mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ))
+        except (AttributeError,OSError,ValueError):  # not a real file, or an empty file
+            return memoryview(f.read())
+
+def _read_header(data):
+    ls=len(_file_signature)
+    if bytes(data[:ls])!=_file_signature:
+        raise IOError("data is not a frame stack file")
+    desc_len,=struct.unpack("<I",data[ls:ls+4])
+    desc=json.loads(bytes(data[ls+4:ls+4+desc_len]).decode())
+    return desc,ls+4+desc_len
+
+TChunkIndex=collections.namedtuple("TChunkIndex",["offset","start","nframes","data_size","info_size"])
+class FrameStackReader:
+    """
+    Frame stack file reader.
+
+    Allows random access to frames by index; only the chunks containing the requested frames are read and decompressed.
+    Reading several chunks is done in parallel in a thread pool (both zlib and lz4 release GIL during decompression).
+    The most recently decompressed chunks are cached, so sequential access to individual frames is efficient.
+
+    Args:
+        path: source file path or an opened binary stream
+        nthreads(int): number of decompression threads (by default, the number of CPUs)
+        cache_size(int): number of decompressed chunks to cache
+    """
+    def __init__(self, path, nthreads=None, cache_size=4):
+        self.path=path
+        self.nthreads=nthreads or os.cpu_count() or 1
+        self.cache_size=cache_size
+        self._cache=collections.OrderedDict()
+        self._cache_lock=threading.Lock()
+        self._pool=None
+        self.update()
+
+    def update(self):
+        """
+        Re-read the file and update the chunk index.
+
+        Useful if the file has been appended since opening.
+        Return the new number of frames.
+        """
+        self._data=_FileBuffer(self.path).data
+        desc,offset=_read_header(self._data)
+        self.shape=tuple(desc["shape"])
+        self.dtype=np.dtype(desc["dtype"])
+        self.chunk_size=desc["chunk_size"]
+        self.compression=desc["compression"]
+        self.info_fields=desc["info_fields"]
+        self.info_dtype=_dtype_from_desc(desc["info_dtype"])
+        self._info_ncols=desc["info_ncols"]
+        _,self._decompress=_get_compressor(self.compression)
+        index=[]
+        nframes=0
+        while offset+_chunk_header.size<=len(self._data):
+            sig,n,data_size,info_size=_chunk_header.unpack(self._data[offset:offset+_chunk_header.size])
+            if sig!=_chunk_signature:
+                raise IOError("corrupted frame stack file: wrong chunk signature at position {}".format(offset))
+            if offset+_chunk_header.size+data_size+info_size>len(self._data):  # incomplete chunk (e.g., still being written)
+                break
+            index.append(TChunkIndex(offset+_chunk_header.size,nframes,n,data_size,info_size))
+            offset+=_chunk_header.size+data_size+info_size
+            nframes+=n
+        self.chunks=index
+        self._chunk_starts=np.array([ch.start for ch in index],dtype="i8")
+        self._nframes=nframes
+        with self._cache_lock:
+            self._cache.clear()
+        return nframes
+    def close(self):
+        """Close the reader and stop the decompression threads"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool=None
+        self._data=None
+        self._cache.clear()
+    def __enter__(self):
+        return self
+    def __exit__(self, *args):
+        self.close()
+
+    def size(self):
+        """Get the total number of frames"""
+        return self._nframes
+    __len__=size
+
+    def _read_chunk(self, ci):
+        with self._cache_lock:
+            if ci in self._cache:
+                self._cache.move_to_end(ci)
+                return self._cache[ci]
+        ch=self.chunks[ci]
+        data=self._data[ch.offset:ch.offset+ch.data_size]
+        info=self._data[ch.offset+ch.data_size:ch.offset+ch.data_size+ch.info_size] if ch.info_size else None
+        if self._decompress is not None:
+            data=self._decompress(data)
+            if info is not None:
+                info=self._decompress(info)
+        frames=np.frombuffer(data,dtype=self.dtype).reshape((ch.nframes,)+self.shape)
+        if info is not None:
+            info=np.frombuffer(info,dtype=self.info_dtype).reshape((ch.nframes,)+self._info_shape())
+        with self._cache_lock:
+            self._cache[ci]=(frames,info)
+            while len(self._cache)>self.cache_size:
+                self._cache.popitem(last=False)
+        return frames,info
+    def _info_shape(self):
+        return (self._info_ncols,) if self._info_ncols is not None else ()
+    def _read_chunks(self, cis):
+        if len(cis)>1 and self.nthreads>1 and self._decompress is not None:
+            if self._pool is None:
+                self._pool=concurrent.futures.ThreadPoolExecutor(self.nthreads)
+            return dict(zip(cis,self._pool.map(self._read_chunk,cis)))
+        return {ci:self._read_chunk(ci) for ci in cis}
+
+    def read(self, idx, return_info=False):
+        """
+        Read frames with the given index.
+
+        `idx` can be an integer (including negative), a slice, or an index list/array.
+        Return a single 2D frame for an integer index, and a 3D array with the stacked frames otherwise.
+        If ``return_info==True``, return tuple ``(frames, info)``, where ``info`` is the frame info array (or ``None``, if the file has no frame info).
+        """
+        single=np.ndim(idx)==0 and not isinstance(idx,slice)
+        indices=np.arange(self._nframes)[idx] if isinstance(idx,slice) else np.asarray(idx,dtype="i8").reshape(-1)
+        if len(indices) and (indices.min()<-self._nframes or indices.max()>=self._nframes):
+            raise IndexError("index {} is out of range".format(idx))
+        indices=indices%self._nframes if self._nframes else indices
+        cidx=np.searchsorted(self._chunk_starts,indices,side="right")-1
+        chunks=self._read_chunks(sorted(set(cidx.tolist())))
+        frames=np.empty((len(indices),)+self.shape,dtype=self.dtype)
+        info=np.empty((len(indices),)+self._info_shape(),dtype=self.info_dtype) if (return_info and self.info_dtype is not None) else None
+        for ci,chunk in chunks.items():
+            sel=np.nonzero(cidx==ci)[0]
+            local=indices[sel]-self._chunk_starts[ci]
+            frames[sel]=chunk[0][local]
+            if info is not None:
+                info[sel]=chunk[1][local]
+        if single:
+            frames=frames[0]
+            info=info[0] if info is not None else None
+        return (frames,info) if return_info else frames
+    def __getitem__(self, idx):
+        return self.read(idx)
+    def read_info(self, idx=slice(None)):
+        """Read frame info for the given index (``None`` if the file has no frame info)"""
+        return self.read(idx,return_info=True)[1]
+    def __iter__(self):
+        for ci in range(len(self.chunks)):
+            for f in self._read_chunk(ci)[0]:
+                yield f
+    def read_all(self, return_info=False):
+        """Read all frames as a 3D array"""
+        return self.read(slice(None),return_info=return_info)
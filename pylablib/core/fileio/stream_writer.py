@@ -0,0 +1,253 @@
+"""
+Background binary stream writer.
+
+Coalesces incoming data into large preallocated aligned buffers and writes them into the file from a separate I/O thread.
+"""
+
+import numpy as np
+
+import os
+import threading
+import collections
+import time
+
+
+
+def aligned_empty(size, alignment=4096):
+    """Allocate a flat byte array of the given size whose data pointer is aligned to `alignment` bytes"""
+    raw=np.empty(size+alignment,dtype="u1")
+    offset=(-raw.ctypes.data)%alignment
+    return raw[offset:offset+size]
+
+
+TStreamWriterStatus=collections.namedtuple("TStreamWriterStatus",["written","write_time","queue_depth","queue_depth_max","nbuffers","waits","direct"])
+class StreamFileWriter:
+    """
+    Binary file writer which coalesces the data into large buffers and writes them from a background I/O thread.
+
+    The incoming data is copied into one of `nbuffers` preallocated buffers of `buffer_size` bytes;
+    once the buffer is full, it is passed to the I/O thread, and the next free buffer is used (double buffering for ``nbuffers==2``).
+    Hence, the writing call only blocks if all buffers are filled and waiting to be written, which is usually avoided by checking :meth:`wait_space` beforehand.
+
+    Args:
+        path(str): destination file path
+        append(bool): if ``True``, append to the existing file; otherwise, overwrite it
+        buffer_size(int): size of a single buffer in bytes (rounded up to the alignment)
+        nbuffers(int): number of buffers
+        preallocate(int): if not ``None``, specifies the preallocation step in bytes: the file space is reserved ahead of writing in blocks of this size
+            (only on systems supporting ``posix_fallocate``); the file is truncated to the actual size on closing
+        direct(bool): if ``True`` and supported by the system, open the file with ``O_DIRECT`` flag, bypassing the OS page cache;
+            if the file system does not support it, fall back to the standard buffered writing
+        fadvise(bool): if ``True`` and supported by the system, use ``posix_fadvise`` to mark the file as sequentially accessed,
+            and to drop the written data from the page cache (which avoids filling the system memory during long recordings)
+        alignment(int): buffer and write size alignment (required for the direct writing)
+    """
+    def __init__(self, path, append=False, buffer_size=2**24, nbuffers=2, preallocate=None, direct=False, fadvise=True, alignment=4096):
+        if nbuffers<2:
+            raise ValueError("at least 2 buffers are required")
+        self.path=path
+        self.alignment=alignment
+        self.buffer_size=((buffer_size-1)//alignment+1)*alignment
+        self._buffers=[aligned_empty(self.buffer_size,alignment) for _ in range(nbuffers)]
+        self._fd=None
+        self._open(append,direct)
+        self.fadvise=fadvise and hasattr(os,"posix_fadvise")
+        if self.fadvise:
+            os.posix_fadvise(self._fd,0,0,os.POSIX_FADV_SEQUENTIAL)
+        self.preallocate=preallocate if hasattr(os,"posix_fallocate") else None
+        self._allocated=self._start_pos
+        self._written=self._start_pos
+        self._written_total=0
+        self._write_time=0.
+        self._waits=0
+        self._queue_depth_max=0
+        self._error=None
+        self._free=collections.deque(range(1,nbuffers))
+        self._queue=collections.deque()
+        self._cond=threading.Condition()
+        self._current=0
+        self._pos=0
+        self._closing=False
+        self._thread=threading.Thread(target=self._write_loop,daemon=True)
+        self._thread.start()
+
+    def _open(self, append, direct):
+        flags=os.O_WRONLY|os.O_CREAT|getattr(os,"O_BINARY",0)
+        if not append:
+            flags|=os.O_TRUNC
+        self.direct=False
+        if direct and hasattr(os,"O_DIRECT"):
+            start_pos=os.path.getsize(self.path) if (append and os.path.exists(self.path)) else 0
+            if start_pos%self.alignment==0:
+                try:
+                    self._fd=os.open(self.path,flags|os.O_DIRECT)
+                    self.direct=True
+                except OSError:  # file system does not support direct I/O
+                    pass
+        if self._fd is None:
+            self._fd=os.open(self.path,flags)
+        self._start_pos=os.lseek(self._fd,0,os.SEEK_END)
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closing:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                idx,nbytes=self._queue[0]
+            try:
+                if self._error is None:
+                    self._write_buffer(self._buffers[idx],nbytes)
+            except OSError as err:
+                self._error=err
+            with self._cond:
+                self._queue.popleft()
+                self._free.append(idx)
+                self._cond.notify_all()
+    def _write_buffer(self, buffer, nbytes):
+        t0=time.time()
+        end=self._written+nbytes
+        if self.preallocate and end>self._allocated:
+            nalloc=((end-self._allocated-1)//self.preallocate+1)*self.preallocate
+            try:
+                os.posix_fallocate(self._fd,self._allocated,nalloc)
+                self._allocated+=nalloc
+            except OSError:  # file system does not support preallocation
+                self.preallocate=None
+        wsize=nbytes
+        if self.direct and nbytes%self.alignment:  # only happens for the last buffer; the file is truncated to the correct size afterwards
+            wsize=((nbytes-1)//self.alignment+1)*self.alignment
+        data=memoryview(buffer)[:wsize]
+        while len(data):
+            n=os.write(self._fd,data)
+            data=data[n:]
+        if self.fadvise:
+            os.posix_fadvise(self._fd,self._written,nbytes,os.POSIX_FADV_DONTNEED)
+        self._written=end
+        self._written_total+=nbytes
+        self._write_time+=time.time()-t0
+
+    def _check_error(self):
+        if self._error is not None:
+            raise self._error
+    def _get_free_buffer(self, timeout=None):
+        with self._cond:
+            if not self._free:
+                self._waits+=1
+                if not self._cond.wait_for(lambda: self._free,timeout=timeout):
+                    return None
+            return self._free.popleft()
+    def _submit(self, nbytes):
+        with self._cond:
+            self._queue.append((self._current,nbytes))
+            self._queue_depth_max=max(self._queue_depth_max,len(self._queue))
+            self._cond.notify_all()
+    def _next_buffer(self):
+        self._submit(self._pos)
+        self._current=self._get_free_buffer()
+        self._pos=0
+
+    def wait_space(self, nbytes, timeout=None):
+        """
+        Wait until `nbytes` can be written without blocking.
+
+        If ``timeout==0``, return immediately. Return ``True`` if the space is available and ``False`` otherwise.
+        If `nbytes` exceeds the total buffers capacity, wait until all the buffers are free (the writing will still block afterwards).
+        """
+        self._check_error()
+        def has_space():
+            nfree=len(self._free)
+            return (self.buffer_size-self._pos)+nfree*self.buffer_size>=nbytes or nfree==len(self._buffers)-1
+        with self._cond:
+            if has_space():
+                return True
+            if timeout==0:
+                return False
+            self._waits+=1
+            return self._cond.wait_for(has_space,timeout=timeout)
+    def get_free_view(self):
+        """
+        Get the byte array view of the free space remaining in the current buffer.
+
+        The view can be filled directly, after which :meth:`advance` must be called with the number of filled bytes.
+        """
+        return self._buffers[self._current][self._pos:]
+    def advance(self, nbytes):
+        """Mark `nbytes` in the current buffer as filled (after filling the view returned by :meth:`get_free_view`)"""
+        if nbytes>self.buffer_size-self._pos:
+            raise ValueError("can not advance by {} bytes; only {} bytes are available".format(nbytes,self.buffer_size-self._pos))
+        self._pos+=nbytes
+        if self._pos==self.buffer_size:
+            self._next_buffer()
+    def write(self, data):
+        """
+        Write the data (bytes or numpy array) to the file.
+
+        The data is copied into the internal buffer, so it can be released or changed right after the call.
+        If no buffers are available, wait until one is written.
+        """
+        self._check_error()
+        if isinstance(data,np.ndarray):
+            data=np.ascontiguousarray(data).reshape(-1).view("u1")
+        else:
+            data=np.frombuffer(data,dtype="u1")
+        while len(data):
+            n=min(len(data),self.buffer_size-self._pos)
+            self._buffers[self._current][self._pos:self._pos+n]=data[:n]
+            data=data[n:]
+            self.advance(n)
+    def flush(self):
+        """
+        Pass the currently filled data to the I/O thread, and wait until all data is written.
+
+        In the direct mode only the aligned part of the data is written; the rest is kept in the buffer until the next write or closing.
+        """
+        self._check_error()
+        nbytes=self._pos
+        if self.direct:
+            nbytes-=nbytes%self.alignment
+        if nbytes:
+            rest=self._pos-nbytes
+            buffer=self._buffers[self._current]
+            self._pos=nbytes
+            self._next_buffer()
+            if rest:
+                self._buffers[self._current][:rest]=buffer[nbytes:nbytes+rest]
+                self._pos=rest
+        with self._cond:
+            self._cond.wait_for(lambda: not self._queue)
+        self._check_error()
+
+    def close(self):
+        """Write all the remaining data and close the file"""
+        if self._fd is None:
+            return
+        try:
+            if self._pos:
+                self._submit(self._pos)
+            with self._cond:
+                self._closing=True
+                self._cond.notify_all()
+            self._thread.join()
+            if self._written!=os.fstat(self._fd).st_size:  # remove preallocated space and direct-mode padding
+                os.ftruncate(self._fd,self._written)
+        finally:
+            os.close(self._fd)
+            self._fd=None
+        self._check_error()
+    def __enter__(self):
+        return self
+    def __exit__(self, *args):
+        self.close()
+
+    def get_status(self):
+        """
+        Get the writer status.
+
+        Return tuple ``(written, write_time, queue_depth, queue_depth_max, nbuffers, waits, direct)`` with the total number of written bytes,
+        total time spent writing, current and maximal number of buffers waiting to be written, the total number of buffers,
+        number of times the caller had to wait for a free buffer, and whether direct I/O is used.
+        """
+        with self._cond:
+            return TStreamWriterStatus(self._written_total,self._write_time,len(self._queue),self._queue_depth_max,len(self._buffers),self._waits,self.direct)
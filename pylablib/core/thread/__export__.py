@@ -1,9 +1,8 @@
 # pylint: disable-all
-from ..gui import qt_present
-if qt_present:
-    from .threadprop import ThreadError, NoControllerThreadError, DuplicateControllerThreadError, TimeoutThreadError, NoMessageThreadError, SkippedCallError, InterruptExceptionStop
-    from .threadprop import is_gui_thread, current_controller
-    from .controller import exint, exsafe, exsafeSlot, toploopSlot, remote_call, call_in_thread, call_in_gui_thread, gui_thread_method
-    from .controller import QThreadController, QTaskThread, get_controller, sync_controller, get_gui_controller, stop_controller, stop_all_controllers, stop_app
-    from .synchronizing import QThreadNotifier, QMultiThreadNotifier
-    from .multicast_pool import MulticastPool
\ No newline at end of file
+from .threadprop import ThreadError, NoControllerThreadError, DuplicateControllerThreadError, TimeoutThreadError, NoMessageThreadError, SkippedCallError, InterruptExceptionStop
+from .threadprop import is_gui_thread, current_controller
+from .controller import exint, exsafe, exsafeSlot, toploopSlot, remote_call, call_in_thread, call_in_gui_thread, gui_thread_method
+from .controller import QThreadController, QTaskThread, get_controller, sync_controller, get_gui_controller, stop_controller, stop_all_controllers, stop_app
+from .synchronizing import QThreadNotifier, QMultiThreadNotifier
+from .multicast_pool import MulticastPool
+from .asyncio_bridge import QAsyncioThread
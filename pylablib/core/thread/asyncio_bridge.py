@@ -0,0 +1,442 @@
+"""
+Asyncio integration for thread controllers.
+
+Provides awaitable versions of the blocking inter-thread calls (command calls, variable synchronization, message waiting),
+multicast subscriptions as async iterators, and :class:`QAsyncioThread` controller, which runs an asyncio event loop
+and keeps processing the controller messages while the coroutines are waiting.
+Any number of the outstanding awaitable calls share the same event loop thread, so, e.g., a single orchestrating thread
+can wait on commands in many device threads simultaneously.
+
+The awaitable functions can be used from any running asyncio event loop (not necessarily in a controlled thread),
+as long as the target threads are running.
+"""
+
+from . import controller, threadprop
+
+import asyncio
+import collections
+
+
+
+class FutureResultSynchronizer:
+    """
+    Result synchronizer which passes the call result to an asyncio future.
+
+    Can be passed as a `sync_result` argument to :meth:`.QScheduler.build_call`.
+    The future result is set in the event loop thread, so the synchronizer is notified from any thread.
+
+    Args:
+        future: :class:`asyncio.Future` object which receives the result tuple ``(kind, value)``
+        loop: event loop owning the future (by default, the future's loop)
+    """
+    def __init__(self, future, loop=None):
+        self.future=future
+        self.loop=loop or future.get_loop()
+    def _set_result(self, value):
+        if not self.future.done():
+            self.future.set_result(value)
+    def notify(self, value):
+        """Notify the future with the result tuple ``(kind, value)`` (can be called from any thread)"""
+        try:
+            self.loop.call_soon_threadsafe(self._set_result,value)
+        except RuntimeError: # loop is already closed, so nobody is waiting for the result
+            pass
+
+def unpack_call_result(result, default=None, error_on_fail=True, error_on_skip=True, pass_exception=True):
+    """
+    Unpack the call result tuple ``(kind, value)`` passed to a result synchronizer.
+
+    The arguments have the same meaning as in :meth:`.QCallResultSynchronizer.get_value_sync`.
+    """
+    kind,value=result
+    if kind=="result":
+        return value
+    if kind=="exception":
+        if pass_exception:
+            raise value
+        return default
+    if kind=="skip":
+        if error_on_skip:
+            raise threadprop.SkippedCallError()
+        return default
+    if kind=="fail":
+        if error_on_fail:
+            raise threadprop.NoControllerThreadError("failed executing remote call: controller is stopped")
+        return default
+    raise ValueError("unrecognized return value kind: {}".format(kind))
+
+async def _wait_for(aw, timeout):
+    try:
+        return await asyncio.wait_for(aw,timeout)
+    except asyncio.TimeoutError:
+        raise threadprop.TimeoutThreadError from None
+
+def _as_controller(thread):
+    return controller.get_controller(thread,sync=False) if isinstance(thread,(str,int)) else thread
+
+
+
+
+async def call_command(thread, name, args=None, kwargs=None, timeout=None, ignore_errors=False):
+    """
+    Invoke command call with the given name and arguments and wait for its result.
+
+    Awaitable analogue of :meth:`.QTaskThread.call_command` with ``sync=True``.
+    `thread` is a :class:`.QTaskThread` object or its name.
+    If the call is not done within `timeout`, raise :exc:`.threadprop.TimeoutThreadError` (the call itself is not cancelled).
+    If ``ignore_errors==True``, ignore all possible problems with the call (controller stopped, call raised an exception, call was skipped)
+    and return ``None`` instead; otherwise, these problems raise exceptions in the awaiting coroutine.
+    """
+    thread=_as_controller(thread)
+    if not thread._check_running(error=not ignore_errors):
+        return None
+    if thread._commands[name].scheduler in ["direct","direct_sync"] or thread.is_in_controlled():
+        return thread.call_command_direct(name,args=args,kwargs=kwargs)
+    future=asyncio.get_running_loop().create_future()
+    thread._schedule_comm(name,args,kwargs,sync_result=FutureResultSynchronizer(future))
+    try:
+        result=await _wait_for(future,timeout)
+    except threadprop.TimeoutThreadError:
+        if ignore_errors:
+            return None
+        raise
+    return unpack_call_result(result,error_on_fail=not ignore_errors,error_on_skip=not ignore_errors,pass_exception=not ignore_errors)
+
+async def call_in_thread(thread, func, args=None, kwargs=None, timeout=None, priority=0, ignore_errors=False):
+    """
+    Call a function in the given thread and wait for its result.
+
+    Awaitable analogue of :meth:`.QTaskThread.call_in_thread_commsync` (i.e., the call is synchronous with the thread commands and jobs).
+    `priority` is the call priority (same as for :meth:`.QTaskThread.call_in_thread_commsync`);
+    the rest of the arguments are the same as in :func:`call_command`.
+    """
+    thread=_as_controller(thread)
+    if not thread._check_running(error=not ignore_errors):
+        return None
+    if thread.is_in_controlled():
+        return func(*(args or []),**(kwargs or {}))
+    future=asyncio.get_running_loop().create_future()
+    sched=thread._get_priority_queue(priority)
+    call=sched.build_call(func,args,kwargs,sync_result=FutureResultSynchronizer(future))
+    sched.schedule(call)
+    try:
+        result=await _wait_for(future,timeout)
+    except threadprop.TimeoutThreadError:
+        if ignore_errors:
+            return None
+        raise
+    return unpack_call_result(result,error_on_fail=not ignore_errors,error_on_skip=not ignore_errors,pass_exception=not ignore_errors)
+
+
+
+class _VariableWaiter:
+    """Variable change waiter which passes new values to the event loop queue"""
+    def __init__(self, loop):
+        self.loop=loop
+        self.queue=asyncio.Queue()
+    def send_interrupt(self, tag, value):  # pylint: disable=unused-argument
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait,value)
+        except RuntimeError:
+            pass
+async def sync_variable(thread, name, pred, timeout=None):
+    """
+    Wait until thread variable with the given `name` satisfies the condition given by `pred`.
+
+    Awaitable analogue of :meth:`.QThreadController.sync_variable`.
+    `thread` is a :class:`.QThreadController` object or its name.
+    `pred` can be a variable values, a container (list, set, tuple) of possible values,
+    or a function which takes one argument (variable value) and returns whether the condition is satisfied.
+    It is executed in the event loop thread. Return the variable value which satisfied the condition.
+    If the condition is not satisfied within `timeout`, raise :exc:`.threadprop.TimeoutThreadError`.
+    """
+    thread=_as_controller(thread)
+    if not hasattr(pred,"__call__"):
+        v=pred
+        if isinstance(pred,(tuple,list,set,dict)):
+            pred=lambda x: x in v
+        else:
+            pred=lambda x: x==v
+    waiter=_VariableWaiter(asyncio.get_running_loop())
+    split_name=thread._add_variable_waiter(name,waiter)
+    async def wait():
+        value=thread.get_variable(name)
+        while not pred(value):
+            value=await waiter.queue.get()
+        return value
+    try:
+        return await _wait_for(wait(),timeout)
+    finally:
+        thread._remove_variable_waiter(split_name,waiter)
+
+
+
+TMulticast=collections.namedtuple("TMulticast",["src","tag","value"])
+class MulticastIterator:
+    """
+    Multicast subscription as an async iterator.
+
+    Every received multicast is yielded as a tuple ``(src, tag, value)``.
+    The subscription callback is called in the sending thread, and it only passes the multicast to the event loop,
+    so the sending thread is never blocked by the consumer.
+    Can be used as an async context manager, which closes the subscription on exit.
+
+    Args:
+        srcs(str or [str]): multicast source name or list of source names to filter the subscription;
+            can be ``"any"`` (any source) or ``"all"`` (only multicasts specifically having ``"all"`` as a source).
+        tags: multicast tag or list of tags to filter the subscription (any tag by default);
+            can also contain Unix shell style pattern (``"*"`` matches everything, ``"?"`` matches one symbol, etc.)
+        dsts(str or [str]): multicast destination name or list of destination names to filter the subscription;
+            can be ``"any"`` (any destination) or ``"all"`` (only source specifically having ``"all"`` as a destination).
+        filt(callable): additional filter function which takes 4 arguments: source, destination, tag, and value,
+            and checks whether multicast passes the requirements.
+        limit_queue(int): maximal number of queued multicasts (0 means no limit);
+            if the queue is full, the oldest multicasts are dropped (their number is available as :attr:`skipped`)
+        pool: :class:`.MulticastPool` to subscribe to (by default, use the current thread controller's pool or the default pool)
+        ctl: if not ``None``, a thread controller which owns the subscription;
+            in this case, the subscription is made through :meth:`.QThreadController.subscribe_direct` (so it is removed when the thread is stopped)
+        loop: event loop which receives the multicasts (by default, the running loop)
+    """
+    def __init__(self, srcs="any", tags=None, dsts="any", filt=None, limit_queue=0, pool=None, ctl=None, loop=None):
+        self.loop=loop or asyncio.get_running_loop()
+        self.limit_queue=limit_queue
+        self.skipped=0
+        self._queue=collections.deque()
+        self._waiter=None
+        self._closed=False
+        self._ctl=ctl
+        if ctl is not None:
+            self._pool=None
+            self.sid=ctl.subscribe_direct(self._on_multicast,srcs=srcs,tags=tags,dsts=dsts,filt=filt)
+        else:
+            if pool is None:
+                ctl=threadprop.current_controller(require_controller=False)
+                pool=ctl._multicast_pool if ctl is not None else controller._default_multicast_pool
+            self._pool=pool
+            self.sid=pool.subscribe_direct(self._on_multicast,srcs=srcs,tags=tags,dsts=dsts,filt=filt)
+    def _on_multicast(self, src, tag, value):
+        try:
+            self.loop.call_soon_threadsafe(self._put,TMulticast(src,tag,value))
+        except RuntimeError:
+            pass
+    def _put(self, msg):
+        if self._closed:
+            return
+        if self.limit_queue and len(self._queue)>=self.limit_queue:
+            self._queue.popleft()
+            self.skipped+=1
+        self._queue.append(msg)
+        self._wake()
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def close(self):
+        """Close the subscription (the already queued multicasts can still be received)"""
+        if self._closed:
+            return
+        self._closed=True
+        if self._ctl is not None:
+            if self._ctl.is_in_controlled() and self._ctl.running():
+                self._ctl.unsubscribe(self.sid)
+        else:
+            self._pool.unsubscribe(self.sid)
+        self._wake()
+    def closed(self):
+        """Check if the subscription is closed"""
+        return self._closed
+    def qsize(self):
+        """Get the number of queued multicasts"""
+        return len(self._queue)
+    async def get(self, timeout=None):
+        """
+        Get the next multicast.
+
+        If no multicast is received within `timeout`, raise :exc:`.threadprop.TimeoutThreadError`.
+        If the subscription is closed and no multicasts are queued, raise :exc:`StopAsyncIteration`.
+        """
+        if not self._queue:
+            async def wait():
+                while not self._queue:
+                    if self._closed:
+                        raise StopAsyncIteration
+                    self._waiter=self.loop.create_future()
+                    try:
+                        await self._waiter
+                    finally:
+                        self._waiter=None
+            await _wait_for(wait(),timeout)
+        return self._queue.popleft()
+
+    def __aiter__(self):
+        return self
+    async def __anext__(self):
+        return await self.get()
+    async def __aenter__(self):
+        return self
+    async def __aexit__(self, *args):
+        self.close()
+
+def subscribe(srcs="any", tags=None, dsts="any", filt=None, limit_queue=0, pool=None):
+    """
+    Subscribe to multicasts and return :class:`MulticastIterator` object which asynchronously yields them.
+
+    Should be called from a running event loop. For the meaning of the arguments, see :class:`MulticastIterator`.
+    """
+    return MulticastIterator(srcs=srcs,tags=tags,dsts=dsts,filt=filt,limit_queue=limit_queue,pool=pool)
+
+
+
+
+class QAsyncioThread(controller.QThreadController):
+    """
+    Thread controller which runs an asyncio event loop.
+
+    The main thread code is implemented in :meth:`run_async` coroutine; the thread is stopped after it is complete.
+    While the coroutines are waiting, the event loop keeps processing the controller messages, calls, and stop requests;
+    stop request cancels :meth:`run_async` task and stops the thread.
+    Blocking synchronous calls (e.g., ``call_command(sync=True)`` or :meth:`.QThreadController.wait_for_message`) still work,
+    but they block the whole event loop, so the awaitable versions (methods with ``_async`` suffix, or functions from :mod:`.asyncio_bridge`) should be used instead.
+
+    Args:
+        name(str): thread name (by default, generate a new unique name)
+        multicast_pool: :class:`.MulticastPool` for this thread (by default, use the default common pool)
+        message_check_period: maximal period between checking the controller messages;
+            normally, the messages are checked as soon as they are sent, so it only affects the events which bypass the controller (e.g., Qt timers)
+
+    Methods to overload:
+        - :meth:`on_start`: executed on the thread startup (between synchronization points ``"start"`` and ``"run"``)
+        - :meth:`on_finish`: executed on thread cleanup (attempts to execute in any case, including exceptions)
+        - :meth:`run_async`: coroutine executed once per thread in the event loop; thread is stopped afterwards
+        - :meth:`process_message`: function that takes 2 arguments (tag and value) of the message and processes it (see :class:`.QThreadController`)
+    """
+    def __init__(self, name=None, multicast_pool=None, message_check_period=0.1):
+        super().__init__(name=name,kind="run",multicast_pool=multicast_pool)
+        self.message_check_period=message_check_period
+        self.loop=None
+        self._wake_future=None
+        self._message_waiters={}
+
+    def _wake_loop(self):
+        if self._wake_future is not None and not self._wake_future.done():
+            self._wake_future.set_result(None)
+    def _wake_loop_threadsafe(self):
+        loop=self.loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._wake_loop)
+            except RuntimeError:
+                pass
+    def _process_message_waiters(self):
+        for tag,waiters in list(self._message_waiters.items()):
+            while waiters and self.new_messages_number(tag):
+                fut=waiters.pop(0)
+                if not fut.done():
+                    fut.set_result(self.pop_message(tag))
+            if not waiters:
+                del self._message_waiters[tag]
+    async def _run_loop(self):
+        task=asyncio.ensure_future(self.run_async())
+        try:
+            while True:
+                self._wake_future=self.loop.create_future()
+                self.check_messages(top_loop=True)
+                self._process_message_waiters()
+                if task.done():
+                    return task.result()
+                await asyncio.wait([task,self._wake_future],timeout=self.message_check_period,return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self._wake_future=None
+            if not task.done():
+                task.cancel()
+                await asyncio.wait([task])
+    def run(self):
+        self.loop=asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._run_loop())
+        finally:
+            try:
+                tasks=asyncio.all_tasks(self.loop)
+                for t in tasks:
+                    t.cancel()
+                if tasks:
+                    self.loop.run_until_complete(asyncio.wait(tasks))
+                self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            finally:
+                asyncio.set_event_loop(None)
+                loop,self.loop=self.loop,None
+                loop.close()
+    async def run_async(self):
+        """
+        Coroutine executed in the thread event loop (the thread is stopped after it is complete).
+
+        Local call method, called automatically.
+        """
+
+    async def wait_for_message_async(self, tag, timeout=None):
+        """
+        Wait for a single message with a given tag.
+
+        Awaitable analogue of :meth:`.QThreadController.wait_for_message`.
+        Return value of a received message with this tag.
+        If timeout is passed, raise :exc:`.threadprop.TimeoutThreadError`.
+        Local call method.
+        """
+        if self.new_messages_number(tag):
+            return self.pop_message(tag)
+        fut=self.loop.create_future()
+        self._message_waiters.setdefault(tag,[]).append(fut)
+        try:
+            return await _wait_for(fut,timeout)
+        finally:
+            waiters=self._message_waiters.get(tag,[])
+            if fut in waiters:
+                waiters.remove(fut)
+    async def call_command_async(self, thread, name, args=None, kwargs=None, timeout=None, ignore_errors=False):
+        """
+        Invoke command call in the given thread and wait for its result (see :func:`call_command`).
+
+        Local call method.
+        """
+        return await call_command(thread,name,args=args,kwargs=kwargs,timeout=timeout,ignore_errors=ignore_errors)
+    async def sync_variable_async(self, thread, name, pred, timeout=None):
+        """
+        Wait until a variable of the given thread satisfies the condition given by `pred` (see :func:`sync_variable`).
+
+        Local call method.
+        """
+        return await sync_variable(thread,name,pred,timeout=timeout)
+    def subscribe_async(self, srcs="any", tags=None, dsts="any", filt=None, limit_queue=0):
+        """
+        Subscribe to multicasts and return :class:`MulticastIterator` object which asynchronously yields them.
+
+        The subscription is removed when the thread is stopped (or when the iterator is closed).
+        For the meaning of the arguments, see :class:`MulticastIterator`.
+        Local call method.
+        """
+        return MulticastIterator(srcs=srcs,tags=tags,dsts=dsts,filt=filt,limit_queue=limit_queue,ctl=self,loop=self.loop)
+
+    def send_message(self, tag, value, priority=0):
+        super().send_message(tag,value,priority=priority)
+        self._wake_loop_threadsafe()
+    def send_interrupt(self, tag, value, priority=0):
+        super().send_interrupt(tag,value,priority=priority)
+        self._wake_loop_threadsafe()
+    def send_sync(self, tag, uid):
+        super().send_sync(tag,uid)
+        self._wake_loop_threadsafe()
+    def request_stop(self):
+        super().request_stop()
+        self._wake_loop_threadsafe()
+    def stop(self, code=0, sync=False):
+        if not self.is_in_controlled():
+            self.thread.quit_sync()
+            self._wake_loop_threadsafe()
+        super().stop(code=code,sync=sync)
+    def poke(self):
+        super().poke()
+        self._wake_loop_threadsafe()
+    def _place_call(self, call, tag=None, priority=0, interrupt=True):
+        super()._place_call(call,tag=tag,priority=priority,interrupt=interrupt)
+        self._wake_loop_threadsafe()
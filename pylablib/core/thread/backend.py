@@ -0,0 +1,29 @@
+"""
+Event loop backend of the thread controllers.
+
+Thread controllers can run either on top of Qt (required when GUI is used), or on top of :mod:`.headless`,
+which is a pure-Python implementation of the relevant subset of QtCore (does not import Qt, so it starts faster and takes less memory).
+The backend is selected on import via ``PYLABLIB_THREAD_BACKEND`` environment variable, which can be ``"qt"``, ``"headless"``,
+or ``"auto"`` (default; use Qt if it is installed, and the headless backend otherwise).
+If the headless backend is selected explicitly, Qt is not imported by :mod:`pylablib.core.gui` either.
+
+The selected backend name is stored in :data:`backend`, and the backend QtCore-like module in :data:`QtCore`.
+In particular, if the headless backend is used, the application object should be created as ``backend.QtCore.QCoreApplication([])``.
+"""
+
+import os
+
+backend=os.environ.get("PYLABLIB_THREAD_BACKEND","auto").lower()
+if backend not in {"auto","qt","headless"}:
+    raise ValueError("unrecognized thread backend: {}; should be 'auto', 'qt', or 'headless'".format(backend))
+if backend!="headless":
+    from ..gui import qt_present
+    if qt_present:
+        from ..gui import QtCore, Slot, Signal
+        backend="qt"
+    elif backend=="qt":
+        raise ImportError("Qt thread backend requires PyQt5 or PySide2; install it by running 'pip install pyqt5'")
+if backend!="qt":
+    from . import headless as QtCore
+    from .headless import Slot, Signal
+    backend="headless"
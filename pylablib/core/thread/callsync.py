@@ -145,6 +145,14 @@ class QScheduledCall:
             otherwise, the exception is raised in both threads
         result_synchronizer: result synchronizer object; can be ``None`` (create new :class:`QCallResultSynchronizer`),
             ``"async"`` (no result synchronization), or a :class:`QCallResultSynchronizer` object. 
+
+    Attributes:
+        name: call name, which is used to collect timing metrics in the destination thread (``None`` means that the function name is used)
+        schedule_time: time when the call was first placed into a queue scheduler (``None`` if it has not been queued)
+        deadline: latest time (in ``time.time()`` units) when the call should be started, or ``None`` if there is no deadline;
+            calls with deadlines are ordered by :class:`QDeadlineScheduler`
+        on_expired: action to take if the call is popped from the queue after its deadline: ``"execute"`` (execute it and record it as late)
+            or ``"skip"`` (skip the call)
     """
     Callback=collections.namedtuple("Callback",["func","pass_result","call_on_exception","call_on_unschedule"])
     def __init__(self, func, args=None, kwargs=None, silent=False, result_synchronizer=None):
@@ -160,6 +168,10 @@ class QScheduledCall:
         self.callbacks=[]
         self._notified=[0] # hack to avoid use of locks ([0] is False, [] is True, use .pop() to atomically check and change)
         self.state="wait"
+        self.name=None # call name used in the thread metrics
+        self.schedule_time=None
+        self.deadline=None
+        self.on_expired="execute"
     def _check_notified(self):
         try:
             self._notified.pop()
@@ -226,6 +238,7 @@ class QScheduledCall:
 ### Call schedulers ###
 
 TDefaultCallInfo=collections.namedtuple("TDefaultCallInfo",["call_time"])
+TQueueStats=collections.namedtuple("TQueueStats",["length","max_length","scheduled","popped","skipped","wait_mean","wait_max"])
 class QScheduler:
     """
     Generic call scheduler.
@@ -255,9 +268,13 @@ class QScheduler:
             pass_result (bool): if ``True``, pass `func` result as a single argument to the callback; otherwise, give no arguments
             callback_on_exception (bool): if ``True``, execute the callback on call fail or skip (if it requires an argument, ``None`` is supplied);
                 otherwise, only execute it if the call was successful
-            sync_result: if ``True``, the call has a default result synchronizer; otherwise, no synchronization is made.
+            sync_result: if ``True``, the call has a default result synchronizer; otherwise, no synchronization is made;
+                can also be a result synchronizer object (any object with ``notify`` method which takes the result tuple as a single argument)
         """
-        result_synchronizer=None if sync_result else "async"
+        if hasattr(sync_result,"notify"):
+            result_synchronizer=sync_result
+        else:
+            result_synchronizer=None if sync_result else "async"
         scheduled_call=QScheduledCall(func,args,kwargs,result_synchronizer=result_synchronizer)
         if self.call_info_argname:
             scheduled_call.kwargs[self.call_info_argname]=self.build_call_info()
@@ -325,6 +342,7 @@ class QQueueScheduler(QScheduler):
         self.call_popped_notifier=QMultiThreadNotifier() if on_full_queue=="wait" else None
         self.working=True
         self._last_popped=[None]
+        self.reset_stats()
     def can_schedule(self, call):  # pylint: disable=unused-argument
         """Check if the call can be scheduled"""
         return True
@@ -336,9 +354,14 @@ class QQueueScheduler(QScheduler):
         
         `idx` determines the call position within the queue.
         """
-    def _add_call(self, call):
+    def _insert_call(self, call):
         self.call_queue.append(call)
+    def _add_call(self, call):
+        self._insert_call(call)
         self.call_added(call)
+        self._stats_scheduled+=1
+        if len(self.call_queue)>self._stats_max_len:
+            self._stats_max_len=len(self.call_queue)
     def _pop_call(self, head=False):
         try:
             call=self.call_queue.popleft() if head else self.call_queue.pop()
@@ -354,6 +377,8 @@ class QQueueScheduler(QScheduler):
         if not self.working:
             call.fail()
             return
+        if call.schedule_time is None:
+            call.schedule_time=time.time()
         if self.on_full_queue=="wait":
             while True:
                 with self.lock:
@@ -389,6 +414,8 @@ class QQueueScheduler(QScheduler):
                 execute_call=call
             else:
                 scheduled=False
+            if skipped_call is not None:
+                self._stats_skipped+=1
         if skipped_call is not None:
             skipped_call.skip()
         if execute_call is not None:
@@ -401,7 +428,14 @@ class QQueueScheduler(QScheduler):
         If the queue is empty, return ``None``
         """
         with self.lock:
-            return self._pop_call(head=True)
+            call=self._pop_call(head=True)
+            if call is not None:
+                self._stats_popped+=1
+                if call.schedule_time is not None:
+                    wait=time.time()-call.schedule_time
+                    self._stats_wait_total+=wait
+                    self._stats_wait_max=max(self._stats_wait_max,wait)
+        return call
     def unschedule(self, call):
         """
         Unschedule a given call.
@@ -423,6 +457,24 @@ class QQueueScheduler(QScheduler):
     def has_calls(self):
         """Check if there are queued calls"""
         return bool(self.call_queue)
+    def reset_stats(self):
+        """Reset the queue statistics"""
+        self._stats_scheduled=0
+        self._stats_popped=0
+        self._stats_skipped=0
+        self._stats_max_len=len(self.call_queue)
+        self._stats_wait_total=0
+        self._stats_wait_max=0
+    def get_stats(self):
+        """
+        Get the queue statistics.
+
+        Return tuple ``(length, max_length, scheduled, popped, skipped, wait_mean, wait_max)`` with the current and the maximal queue length,
+        the number of scheduled calls, calls popped for execution (via :meth:`pop_call`), and calls skipped because the queue was full,
+        and the mean and the maximal time between scheduling and popping the calls.
+        """
+        wait_mean=self._stats_wait_total/self._stats_popped if self._stats_popped else 0
+        return TQueueStats(len(self.call_queue),self._stats_max_len,self._stats_scheduled,self._stats_popped,self._stats_skipped,wait_mean,self._stats_wait_max)
     def __len__(self):
         return len(self.call_queue)
     def clear(self, close=True):  # pylint: disable=arguments-differ
@@ -444,6 +496,7 @@ class QQueueScheduler(QScheduler):
             if close:
                 c.fail()
             else:
+                self._stats_skipped+=1
                 c.skip()
         if self.call_popped_notifier is not None:
             self.call_popped_notifier.notify()
@@ -556,6 +609,28 @@ class QQueueSizeLimitScheduler(QQueueScheduler):
 
 
 
+class QDeadlineScheduler(QQueueScheduler):
+    """
+    Call scheduler which orders the calls by their deadlines (earliest deadline first).
+
+    Calls without a deadline are placed after all the calls with deadlines in the order of scheduling.
+    The calls are not dropped on expiration here; it is up to the executing thread to check :attr:`QScheduledCall.deadline` of the popped call.
+    The arguments are the same as for :class:`QQueueScheduler`.
+    """
+    def _insert_call(self, call):
+        queue=self.call_queue
+        deadline=call.deadline
+        idx=len(queue)
+        if deadline is not None: # deadlines are mostly increasing, so the position is usually found within a few steps from the end
+            while idx>0 and (queue[idx-1].deadline is None or queue[idx-1].deadline>deadline):
+                idx-=1
+        if idx==len(queue):
+            queue.append(call)
+        else:
+            queue.insert(idx,call)
+
+
+
 def schedule_multiple_queues(call, queues):
     """
     Schedule the call simultaneously in several queues.
@@ -592,12 +667,21 @@ class QMultiQueueScheduler:
 
     Support additional notifiers, which are called if the scheduling is successful
     (e.g., to notify and wake up the destination thread).
+    If `deadline` is not ``None``, it specifies the relative deadline (in seconds after the call is built) assigned to all built calls,
+    and `on_expired` specifies the action for the expired calls (see :class:`QScheduledCall`).
     """
-    def __init__(self, schedulers, notifiers):
+    def __init__(self, schedulers, notifiers, deadline=None, on_expired="execute"):
         self.schedulers=schedulers
         self.notifiers=notifiers
+        funcargparse.check_parameter_range(on_expired,"on_expired",{"execute","skip"})
+        self.deadline=deadline
+        self.on_expired=on_expired
     def build_call(self, *args, **kwargs):
-        return self.schedulers[0].build_call(*args,**kwargs)
+        call=self.schedulers[0].build_call(*args,**kwargs)
+        if self.deadline is not None:
+            call.deadline=time.time()+self.deadline
+            call.on_expired=self.on_expired
+        return call
     def schedule(self, call):
         if schedule_multiple_queues(call,self.schedulers):
             for n in self.notifiers:
@@ -644,15 +728,37 @@ class QMulticastThreadCallScheduler(QThreadCallScheduler):
         self.limit_queue=limit_queue or 0
         self.queue_cnt=0
         self.queue_cnt_lock=threading.Lock()
+        self.reset_stats()
     def _call_done(self):
         with self.queue_cnt_lock:
             self.queue_cnt-=1
+            self._stats_done+=1
     def schedule(self, call):
         if self.limit_queue<=0 or self.queue_cnt<self.limit_queue:
             with self.queue_cnt_lock:
                 self.queue_cnt+=1
+                self._stats_scheduled+=1
+                self._stats_max_len=max(self._stats_max_len,self.queue_cnt)
             call.add_callback(self._call_done,pass_result=False,call_on_exception=True,front=True)
             return super().schedule(call)
         else:
+            with self.queue_cnt_lock:
+                self._stats_skipped+=1
             call.skip()
-            return False
\ No newline at end of file
+            return False
+    def reset_stats(self):
+        """Reset the queue statistics"""
+        with self.queue_cnt_lock:
+            self._stats_scheduled=0
+            self._stats_done=0
+            self._stats_skipped=0
+            self._stats_max_len=self.queue_cnt
+    def get_stats(self):
+        """
+        Get the queue statistics.
+
+        Return tuple ``(length, max_length, scheduled, popped, skipped, wait_mean, wait_max)`` in the same format as :meth:`QQueueScheduler.get_stats`.
+        Here `popped` is the number of finished calls; the calls are queued in the thread message queue, so the waiting times are not tracked and are always zero.
+        """
+        with self.queue_cnt_lock:
+            return TQueueStats(self.queue_cnt,self._stats_max_len,self._stats_scheduled,self._stats_done,self._stats_skipped,0,0)
\ No newline at end of file
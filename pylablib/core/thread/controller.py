@@ -1,7 +1,7 @@
 from ..utils import general, funcargparse, dictionary, functions as func_utils, py3
-from . import multicast_pool as mpool, threadprop, synchronizing, callsync
+from . import multicast_pool as mpool, threadprop, synchronizing, callsync, metrics
 
-from ..gui import QtCore, Slot, Signal
+from .backend import QtCore, Slot, Signal
 
 import threading
 import contextlib
@@ -194,6 +194,30 @@ def gui_thread_method(func):
 
 
 
+class VariableHandle:
+    """
+    Precompiled thread variable path.
+
+    Created using :meth:`QThreadController.get_variable_handle`.
+    Can be used in place of the variable name in :meth:`QThreadController.get_variable` and :meth:`QThreadController.set_variable`,
+    or directly via :meth:`get` and :meth:`set` methods; in this case, the path does not need to be parsed on every access.
+    """
+    __slots__=["controller","path","name"]
+    def __init__(self, controller, path):
+        self.controller=controller
+        self.path=path
+        self.name="/".join(path)
+    def get(self, default=None, missing_error=False):
+        """Get the variable value (same as :meth:`QThreadController.get_variable`)"""
+        return self.controller.get_variable(self,default=default,missing_error=missing_error)
+    def set(self, value, update=False, notify=False, notify_tag="changed/*"):
+        """Set the variable value (same as :meth:`QThreadController.set_variable`)"""
+        self.controller.set_variable(self,value,update=update,notify=notify,notify_tag=notify_tag)
+    def __repr__(self):
+        return "{}({}, {})".format(type(self).__name__,self.controller.name,self.name)
+
+
+
 class QThreadController(QtCore.QObject):
     """
     Generic Qt thread controller.
@@ -262,6 +286,9 @@ class QThreadController(QtCore.QObject):
         # set up variable and methods handling
         self._params_val=dictionary.Dictionary()
         self._params_val_lock=threading.Lock()
+        self._params_cache={}
+        self._params_version=0
+        self._params_paths={}
         self._params_exp={}
         self._params_exp_lock=threading.Lock()
         self._params_funcs=dictionary.Dictionary()
@@ -555,6 +582,10 @@ class QThreadController(QtCore.QObject):
                 value=heapq.heappop(self._message_queue[tag])[-1]
                 return True,value
             return False,None
+        done,value=done_check() # message could have been received during the previous waiting
+        if done:
+            self._check_stop_request()
+            return value
         return self._wait_in_process_loop(done_check,timeout=timeout,as_toploop=top_loop)
     def new_messages_number(self, tag):
         """
@@ -702,7 +733,17 @@ class QThreadController(QtCore.QObject):
 
 
     ### Managing multicast pool interaction ###
-    def subscribe_sync(self, callback, srcs="any", tags=None, dsts="any", filt=None, subscription_priority=0, limit_queue=None, call_interrupt=True, add_call_info=False, return_result=False, sid=None):
+    def _make_multicast_credit(self, flow_control, limit_queue):
+        if flow_control is None or flow_control is False:
+            return None
+        if isinstance(flow_control,mpool.MulticastCredit):
+            return flow_control
+        if flow_control is True:
+            if not limit_queue or limit_queue<=0:
+                raise ValueError("flow control window can only be deduced from a positive queue limit")
+            return mpool.MulticastCredit(limit_queue)
+        return mpool.MulticastCredit(flow_control)
+    def subscribe_sync(self, callback, srcs="any", tags=None, dsts="any", filt=None, subscription_priority=0, limit_queue=None, call_interrupt=True, add_call_info=False, return_result=False, flow_control=None, sid=None):
         """
         Subscribe a synchronous callback to a multicast.
 
@@ -729,13 +770,21 @@ class QThreadController(QtCore.QObject):
             call_interrupt: whether the call is an interrupt (call inside any loop, e.g., during waiting or sleeping), or it should be called in the main event loop
             add_call_info(bool): if ``True``, add a fourth argument containing a call information (tuple with a single element, a timestamps of the call).
             return_result: if ``True``, use a result synchronizer to return the result of the subscribed call; otherwise, ignore the result
+            flow_control: if not ``None``, enable credit-based flow control for the subscription, so that the producers can check how many more multicasts
+                can be queued (see :meth:`get_multicast_credit`); can be an integer credit window,
+                ``True`` (use `limit_queue` as the window), or a :class:`.multicast_pool.MulticastCredit` object (e.g., to grant the credit manually)
             sid(int): subscription ID (by default, generate a new unique name).
         """
         if self._multicast_pool:
             scheduler=callsync.QMulticastThreadCallScheduler(thread=self,limit_queue=limit_queue,
                 interrupt=call_interrupt,call_info_argname="call_info" if add_call_info else None)
-            return self.subscribe_direct(callback,srcs=srcs,dsts=dsts,tags=tags,filt=filt,subscription_priority=subscription_priority,scheduler=scheduler,return_result=return_result,sid=sid)
-    def subscribe_direct(self, callback, srcs="any", tags=None, dsts="any", filt=None, subscription_priority=0, scheduler=None, return_result=False, sid=None):
+            credit=self._make_multicast_credit(flow_control,limit_queue)
+            sid=self.subscribe_direct(callback,srcs=srcs,dsts=dsts,tags=tags,filt=filt,subscription_priority=subscription_priority,scheduler=scheduler,return_result=return_result,credit=credit,sid=sid)
+            self._add_subscription_metrics(callback,sid,scheduler)
+            return sid
+    def _add_subscription_metrics(self, callback, sid, scheduler):
+        """Register the subscription scheduler in the thread metrics (no metrics are collected in the basic controller)"""
+    def subscribe_direct(self, callback, srcs="any", tags=None, dsts="any", filt=None, subscription_priority=0, scheduler=None, return_result=False, credit=None, sid=None):
         """
         Subscribe asynchronous callback to a multicast.
         
@@ -757,10 +806,11 @@ class QThreadController(QtCore.QObject):
             subscription_priority(int): subscription priority (higher priority subscribers are called first).
             scheduler: if defined, multicast call gets scheduled using this scheduler instead of being called directly (which is the default behavior)
             return_result: if ``True``, use a result synchronizer to return the result of the subscribed call; otherwise, ignore the result
+            credit(.multicast_pool.MulticastCredit): if not ``None``, flow control credit of the subscription (see :class:`.multicast_pool.MulticastCredit`)
             sid(int): subscription ID (by default, generate a new unique id and return it).
         """
         if self._multicast_pool:
-            sid=self._multicast_pool.subscribe_direct(callback,srcs=srcs,dsts=dsts or self.name,tags=tags,filt=filt,priority=subscription_priority,scheduler=scheduler,return_result=return_result,sid=sid)
+            sid=self._multicast_pool.subscribe_direct(callback,srcs=srcs,dsts=dsts or self.name,tags=tags,filt=filt,priority=subscription_priority,scheduler=scheduler,return_result=return_result,credit=credit,sid=sid)
             self._multicast_pool_sids.add(sid)
             return sid
     def unsubscribe(self, sid):
@@ -794,6 +844,36 @@ class QThreadController(QtCore.QObject):
         if filter_results:
             result=[r for r in result if not getattr(r,"_not_synchronizer",False)]
         return result
+    def get_multicast_credit(self, tag=None, dst="any", src=None, relative=False):
+        """
+        Get the available flow control credit for a multicast with the given tag and destination.
+
+        Return the smallest credit among all flow-controlled subscribers which would receive this multicast,
+        or ``None`` if there are no such subscribers (see :class:`.multicast_pool.MulticastCredit`).
+        If ``relative==True``, return the smallest ratio of the available credit to the credit window (between 0 and 1) instead.
+        Can be used by producers to adapt the multicast rate to the consumers.
+        Local call method.
+        """
+        return self._multicast_pool.get_credit(src or self.name,dst=dst,tag=tag,relative=relative)
+    def wait_for_multicast_credit(self, tag=None, credit=1, dst="any", src=None, timeout=None, top_loop=False):
+        """
+        Wait until all flow-controlled subscribers of the multicast with the given tag and destination have at least `credit` units of credit available.
+
+        Return immediately if there are no flow-controlled subscribers.
+        If timeout is passed, raise :exc:`.threadprop.TimeoutThreadError`.
+        If ``top_loop==True``, treat the waiting as the top message loop (i.e., any top loop message or signal can be executed here).
+        Local call method.
+        """
+        credits=self._multicast_pool.get_credits(src or self.name,dst=dst,tag=tag)
+        if not credits:
+            return
+        for c in credits:
+            c.add_listener(self.poke)
+        try:
+            self.wait_until(lambda: all(c.available()>=min(credit,c.window) for c in credits),timeout=timeout,top_loop=top_loop)
+        finally:
+            for c in credits:
+                c.remove_listener(self.poke)
     def send_multicast_sync(self, dst="any", tag=None, value=None, src=None, timeout=None, default_result=None, pass_exception=True):
         """
         Send a multicast to the multicast pool and synchronize the results, if available.
@@ -820,40 +900,86 @@ class QThreadController(QtCore.QObject):
 
     ### Variable management ###
     _variable_change_tag="#sync.wait.variable"
-    def set_variable(self, name, value, update=False, notify=False, notify_tag="changed/*", simple=False):
+    _max_variable_paths=2**12
+    def _get_variable_path(self, name):
+        """Get the normalized variable path (as a tuple) from the name or the handle"""
+        if isinstance(name,VariableHandle):
+            return name.path
+        try:
+            return self._params_paths[name]
+        except (KeyError,TypeError):
+            path=tuple(dictionary.normalize_path(name))
+            if isinstance(name,(py3.textstring,tuple)) and len(self._params_paths)<self._max_variable_paths:
+                self._params_paths[name]=path
+            return path
+    def get_variable_handle(self, name):
+        """
+        Get a precompiled handle for the variable with the given name.
+
+        The handle can be used instead of the name to access the variable, which saves on parsing the variable path.
+        Universal call method.
+        """
+        return VariableHandle(self,self._get_variable_path(name))
+    def get_variables_version(self):
+        """
+        Get the variables version.
+
+        The version is incremented on every variable change, so it can be used to check whether any variables have changed since the last access.
+        Universal call method.
+        """
+        return self._params_version
+    def _update_variables_cache(self, path, leaf):
+        """
+        Update the cache of the leaf variable values after the value at the given `path` has been changed (called under the variables lock).
+
+        Setting a leaf only affects its own entry and the entries of its parents (if they used to be leaves), so only they are removed;
+        on any branch change the cache is replaced by an empty one, so the lock-free readers never observe partially updated branches.
+        """
+        if leaf:
+            cache=self._params_cache
+            for i in range(1,len(path)):
+                cache.pop(path[:i],None)
+            cache.pop(path,None)
+        else:
+            self._params_cache={}
+    def set_variable(self, name, value, update=False, notify=False, notify_tag="changed/*", simple=False):  # pylint: disable=unused-argument
         """
         Set thread variable.
 
         Can be called in any thread (controlled or external).
+        `name` can be a variable name or a handle returned by :meth:`get_variable_handle`.
         If ``notify==True``, send an multicast with the given `notify_tag` (where ``"*"`` symbol is replaced by the variable name).
         If ``update==True`` and the value is a dictionary, update the branch rather than overwrite it.
-        If ``simple==True``, assume that the result is a single atomic variable, in which case the lock is not used;
-        note that in this case the threads waiting on this variable (or branches containing it) will not be notified.
+        `simple` is kept for compatibility; the variable is always set atomically, and the threads waiting on this variable (or branches containing it) are notified.
         Local call method.
         """
-        if simple:
+        path=self._get_variable_path(name)
+        lpath=list(path)
+        leaf=not dictionary.is_dictionary(value,generic=True)
+        notify_list=[]
+        with self._params_val_lock:
+            if self._params_funcs and lpath in self._params_funcs:
+                del self._params_funcs[lpath]
+            cached=leaf and path in self._params_cache
+            if not cached and leaf and self._params_val.is_branch_path(lpath):
+                leaf=False
             if update:
-                self._params_val.merge(value,name)
+                self._params_val.merge(value,lpath)
             else:
-                self._params_val.add_entry(name,value,force=True)
-        else:
-            split_name=tuple(dictionary.normalize_path(name))
-            notify_list=[]
-            with self._params_val_lock:
-                if name in self._params_funcs:
-                    del self._params_funcs[name]
-                if update:
-                    self._params_val.merge(value,name)
-                else:
-                    self._params_val.add_entry(name,value,force=True)
-                for exp_name in self._params_exp:
-                    if exp_name==split_name[:len(exp_name)] or split_name==exp_name[:len(split_name)]:
-                        notify_list.append((self._params_val[exp_name],self._params_exp[exp_name]))
-            for val,lst in notify_list:
-                for ctl in lst:
-                    ctl.send_interrupt(self._variable_change_tag,val)
+                self._params_val.add_entry(lpath,value,force=True)
+            if cached:
+                self._params_cache[path]=value
+            else:
+                self._update_variables_cache(path,leaf)
+            self._params_version+=1
+            for exp_name in self._params_exp:
+                if exp_name==path[:len(exp_name)] or path==exp_name[:len(path)]:
+                    notify_list.append((self._params_val.get(list(exp_name)),self._params_exp[exp_name]))
+        for val,lst in notify_list:
+            for ctl in lst:
+                ctl.send_interrupt(self._variable_change_tag,val)
         if notify:
-            notify_tag=notify_tag.replace("*",name)
+            notify_tag=notify_tag.replace("*",name.name if isinstance(name,VariableHandle) else name)
             self.send_multicast("any",notify_tag,value)
     def delete_variable(self, name, missing_error=False):
         """
@@ -862,13 +988,16 @@ class QThreadController(QtCore.QObject):
         If ``missing_error==False`` and no variable exists, do nothing; otherwise, raise and error.
         Local call method.
         """
+        lpath=list(self._get_variable_path(name))
         with self._params_val_lock:
-            if name in self._params_val:
-                del self._params_val[name]
-            elif name in self._params_funcs:
-                del self._params_funcs[name]
+            if lpath in self._params_val:
+                del self._params_val[lpath]
+            elif lpath in self._params_funcs:
+                del self._params_funcs[lpath]
             elif not missing_error:
                 raise KeyError("no thread variable {}".format(name))
+            self._params_cache={}
+            self._params_version+=1
     def set_func_variable(self, name, func, use_lock=True):
         """
         Set a 'function' variable.
@@ -881,13 +1010,19 @@ class QThreadController(QtCore.QObject):
         i.e., it won't run concurrently with other variable access.
         Local call method.
         """
+        lpath=list(self._get_variable_path(name))
         with self._params_val_lock:
-            self._params_funcs[name]=func,use_lock
-            if name in self._params_val:
-                del self._params_val[name]
+            self._params_funcs[lpath]=func,use_lock
+            if lpath in self._params_val:
+                del self._params_val[lpath]
+            self._params_cache={}
+            self._params_version+=1
     def _has_variable(self, name):
+        path=self._get_variable_path(name)
+        if path in self._params_cache:
+            return True
         with self._params_val_lock:
-            return name in self._params_val
+            return list(path) in self._params_val
 
 
     ### Thread methods management ###
@@ -948,34 +1083,42 @@ class QThreadController(QtCore.QObject):
 
 
     ### Variables access ###
-    def get_variable(self, name, default=None, copy_branch=True, missing_error=False, simple=False):
+    def get_variable(self, name, default=None, copy_branch=True, missing_error=False, simple=False):  # pylint: disable=unused-argument
         """
         Get thread variable.
 
+        `name` can be a variable name or a handle returned by :meth:`get_variable_handle`.
         If ``missing_error==False`` and no variable exists, return `default`; otherwise, raise and error.
         If ``copy_branch==True`` and the variable is a :class:`.Dictionary` branch, return its copy to ensure that it stays unaffected on possible further variable assignments.
-        If ``simple==True``, assume that the result is a single atomic variable, in which case the lock is not used;
-        this only works with actual variables and not function variables.
+        Leaf (non-branch) values are cached after the first access, so the subsequent reads do not use the lock;
+        `simple` is kept for compatibility and does not affect the behavior.
         Universal call method.
         """
-        if simple:
-            return self._params_val[name] if missing_error else self._params_val.get(name,default)
+        path=self._get_variable_path(name)
+        try:
+            return self._params_cache[path]
+        except KeyError:
+            pass
+        lpath=list(path)
+        func=None
         with self._params_val_lock:
-            if name in self._params_val:
-                var=self._params_val[name]
-                if copy_branch and dictionary.is_dictionary(var):
-                    var=var.copy()
-            elif name in self._params_funcs:
-                func,use_lock=self._params_funcs[name]
+            if lpath in self._params_val:
+                var=self._params_val[lpath]
+                if dictionary.is_dictionary(var):
+                    if copy_branch:
+                        var=var.copy()
+                elif path:
+                    self._params_cache[path]=var
+            elif lpath in self._params_funcs:
+                func,use_lock=self._params_funcs[lpath]
                 if use_lock:
-                    with self._params_val_lock:
-                        var=func()
-                else:
                     var=func()
             elif missing_error:
                 raise KeyError("no thread variable {}".format(name))
             else:
                 var=default
+        if func is not None and not use_lock:
+            var=func()
         return var
     def sync_variable(self, name, pred, timeout=None):
         """
@@ -993,9 +1136,7 @@ class QThreadController(QtCore.QObject):
             else:
                 pred=lambda x: x==v
         ctl=threadprop.current_controller()
-        split_name=tuple(dictionary.normalize_path(name))
-        with self._params_exp_lock:
-            self._params_exp.setdefault(split_name,[]).append(ctl)
+        split_name=self._add_variable_waiter(name,ctl)
         ctd=general.Countdown(timeout)
         try:
             value=self.get_variable(name)
@@ -1004,10 +1145,23 @@ class QThreadController(QtCore.QObject):
                     return value
                 value=ctl.wait_for_message(self._variable_change_tag,timeout=ctd.time_left())
         finally:
-            with self._params_exp_lock:
-                self._params_exp[split_name].remove(ctl)
-                if not self._params_exp[split_name]:
-                    del self._params_exp[split_name]
+            self._remove_variable_waiter(split_name,ctl)
+    def _add_variable_waiter(self, name, waiter):
+        """
+        Add an object notified on the changes of the variable with the given name.
+
+        On every change of the variable (or its branch) ``waiter.send_interrupt(tag, value)`` is called from the thread which changed the variable.
+        Return the variable path to be passed to :meth:`_remove_variable_waiter`.
+        """
+        split_name=self._get_variable_path(name)
+        with self._params_exp_lock:
+            self._params_exp.setdefault(split_name,[]).append(waiter)
+        return split_name
+    def _remove_variable_waiter(self, split_name, waiter):
+        with self._params_exp_lock:
+            self._params_exp[split_name].remove(waiter)
+            if not self._params_exp[split_name]:
+                del self._params_exp[split_name]
 
 
     ### Thread execution control ###
@@ -1230,6 +1384,11 @@ class QTaskThread(QThreadController):
     """
     Thread which allows to set up and run jobs and batch jobs with a certain time period, and execute commands in the meantime.
 
+    Commands, jobs and multicast subscriptions are executed according to their priority, and in the order of scheduling within the same priority.
+    Commands and multicasts can also have deadlines (see :meth:`add_command` and :meth:`subscribe_commsync`);
+    such calls are executed before all calls without deadlines in the earliest-deadline-first order,
+    and the calls which have missed their deadlines are either executed late or skipped.
+
     Args:
         name(str): thread name (by default, generate a new unique name)
         args: args supplied to :meth:`setup_task` method
@@ -1266,6 +1425,7 @@ class QTaskThread(QThreadController):
     _direct_comm_call_action="warning"
     _loop_wait_period=1. # time to wait in the main loop between scheduling events, if no events come; exact value does not affect anything
     TBatchJob=collections.namedtuple("TBatchJob",["job","cleanup","min_run_time","priority"])
+    TJobStats=collections.namedtuple("TJobStats",["calls","lateness_mean","lateness_max","jitter_mean","jitter_max","overruns"])
     TCommand=collections.namedtuple("TCommand",["command","scheduler","priority"])
     def __init__(self, name=None, args=None, kwargs=None, multicast_pool=None):
         super().__init__(name=name,kind="run",multicast_pool=multicast_pool)
@@ -1273,7 +1433,7 @@ class QTaskThread(QThreadController):
         self.min_schedule_time=0. # minimal time to sleep between scheduling checks; acts as a quantum of scheduling
         self._last_sync_time=0
         self.jobs={}
-        self._jobs_list=[]
+        self._jobs_heap=[]
         self.batch_jobs={}
         self._batch_jobs_args={}
         self._batch_jobs_stopreq=set()
@@ -1286,6 +1446,10 @@ class QTaskThread(QThreadController):
         self._priority_queues={}
         self._priority_queues_order=[]
         self._priority_queues_lock=threading.Lock()
+        self._metric_queues={}
+        self._call_metrics={}
+        self._deadline_queue=callsync.QDeadlineScheduler()
+        self._metric_queues["deadline"]=self._deadline_queue
         self._command_warned=set()
         self._pause_lock=synchronizing.QLockNotifier()
         self.ca=self.CommandAccess(self,sync=False)
@@ -1304,32 +1468,67 @@ class QTaskThread(QThreadController):
         A single job loop.
 
         Deals with scheduling, time counting, pausing, and cleanup.
+        While the job is waiting for its next call, it is stored in the controller's jobs heap ordered by the call time;
+        the heap entries are lists ``[call_time, order, job]``, and the outdated entries are marked by setting their job to ``None``.
 
         Args:
             job: job function
             period: job period
             queue: thread controller's scheduling queue, to which the job must be added
-            jobs_order: thread controller's job queue which determines the jobs scheduling order
+            jobs_heap: thread controller's jobs heap which determines the jobs scheduling order
+            name: job name (used in the thread metrics)
         """
-        def __init__(self, job, period, queue, jobs_order):
+        _order=general.UIDGenerator(thread_safe=True)
+        def __init__(self, job, period, queue, jobs_heap, name=None):
             self.job=job
+            self.name=name
             self.ctd=general.Countdown(period)
             self.queue=queue
-            self.jobs_order=jobs_order
-            self.jobs_order.append(self)
+            self.jobs_heap=jobs_heap
+            self.heap_entry=None
             self.paused=False
             self.call=None
             self.scheduled=False
+            self.reset_stats()
+            self._push()
+        def _push(self):
+            """Update the job entry in the jobs heap"""
+            if self.heap_entry is not None:
+                self.heap_entry[-1]=None
+                self.heap_entry=None
+            if self.paused or self.scheduled or self.ctd.end is None:
+                return
+            self.heap_entry=[self.ctd.end,self._order(),self]
+            heapq.heappush(self.jobs_heap,self.heap_entry)
+        def _execute(self):
+            t=time.time()
+            if self._due is not None:
+                lateness=max(t-self._due,0)
+                self._lateness_sum+=lateness
+                self._lateness_max=max(self._lateness_max,lateness)
+            if self._last_call is not None and self.ctd.timeout is not None:
+                jitter=abs(t-self._last_call-self.ctd.timeout)
+                self._jitter_sum+=jitter
+                self._jitter_max=max(self._jitter_max,jitter)
+                self._jitter_calls+=1
+            self._last_call=t
+            self._calls+=1
+            try:
+                return self.job()
+            finally:
+                if self.ctd.timeout and time.time()-t>self.ctd.timeout:
+                    self._overruns+=1
         def schedule(self):
             """Schedule the job"""
             if self.scheduled:
                 raise RuntimeError("job is already scheduled")
-            self.call=self.queue.build_call(self.job,sync_result=False)
+            self.call=self.queue.build_call(self._execute,sync_result=False)
+            self.call.name="job/{}".format(self.name)
             self.call.add_callback(self.mark_unscheduled,pass_result=False,call_on_unschedule=True)
             self.scheduled=True
+            self._push()
+            self._due=self.ctd.end
             self.queue.schedule(self.call)
-            self.jobs_order.remove(self)
-            self.jobs_order.append(self)
             self.ctd.add_time(self.ctd.timeout)
         def mark_unscheduled(self):
             """
@@ -1339,6 +1538,7 @@ class QTaskThread(QThreadController):
             """
             self.call=None
             self.scheduled=False
+            self._push()
         def unschedule(self):
             """Manually unschedule the job (e.g., when paused or removed)"""
             if not self.scheduled:
@@ -1346,28 +1546,53 @@ class QTaskThread(QThreadController):
             self.queue.unschedule(self.call)
             self.call=None
             self.scheduled=False
+            self._push()
         def clear(self):
-            """Clear the job and remove it from the jobs list"""
+            """Clear the job and remove it from the jobs heap"""
             if self.scheduled:
                 self.unschedule()
-            self.jobs_order.remove(self)
+            self.paused=True
+            self._push()
         def change_period(self, period):
             """Change the job period"""
             self.ctd.set_timeout(period)
+            self._push()
         def pause(self, paused=True, unschedule=True):
             """
             Pause or resume the job.
 
             If pausing and ``unschedule==True``, remove already scheduled job from the queue.
             """
-            if not self.paused and paused and unschedule:
+            if not self.paused and paused and unschedule and self.scheduled:
                 self.unschedule()
             self.paused=paused
+            self._push()
         def time_left(self, t=None):
             """Get the amount of time left till the next call, or ``None`` if the job is paused"""
             if self.paused:
                 return None
             return self.ctd.time_left(t)
+        def reset_stats(self):
+            """Reset the job timing statistics"""
+            self._due=None
+            self._last_call=None
+            self._calls=0
+            self._lateness_sum=self._lateness_max=0
+            self._jitter_sum=self._jitter_max=0
+            self._jitter_calls=0
+            self._overruns=0
+        def get_stats(self):
+            """
+            Get the job timing statistics.
+
+            Return tuple ``(calls, lateness_mean, lateness_max, jitter_mean, jitter_max, overruns)``,
+            where lateness is the delay between the scheduled and the actual call time,
+            jitter is the absolute difference between the actual interval between the consecutive calls and the job period,
+            and overruns is the number of calls which took longer than the job period.
+            """
+            lateness_mean=self._lateness_sum/self._calls if self._calls else 0
+            jitter_mean=self._jitter_sum/self._jitter_calls if self._jitter_calls else 0
+            return QTaskThread.TJobStats(self._calls,lateness_mean,self._lateness_max,jitter_mean,self._jitter_max,self._overruns)
         
 
     def add_job(self, name, job, period, initial_call=True, priority=-10):
@@ -1382,7 +1607,7 @@ class QTaskThread(QThreadController):
         """
         if name in self.jobs:
             raise ValueError("job {} already exists".format(name))
-        self.jobs[name]=self.Job(job,period,self._get_priority_queue(priority),self._jobs_list)
+        self.jobs[name]=self.Job(job,period,self._get_priority_queue(priority),self._jobs_heap,name=name)
         if initial_call:
             job()
     def change_job_period(self, name, period):
@@ -1404,6 +1629,26 @@ class QTaskThread(QThreadController):
             raise ValueError("job {} doesn't exists".format(name))
         self.jobs[name].clear()
         del self.jobs[name]
+    def get_job_stats(self, name=None, reset=False):
+        """
+        Get timing statistics of the job `name`.
+
+        Return tuple ``(calls, lateness_mean, lateness_max, jitter_mean, jitter_max, overruns)``,
+        where lateness is the delay between the scheduled and the actual call time,
+        jitter is the absolute difference between the actual interval between the consecutive calls and the job period,
+        and overruns is the number of calls which took longer than the job period (e.g., batch job steps running over their period).
+        If `name` is ``None``, return a dictionary with statistics of all jobs (including running batch jobs).
+        If ``reset==True``, reset the statistics after returning it.
+        Local call method.
+        """
+        if name is None:
+            return {n:self.get_job_stats(n,reset=reset) for n in list(self.jobs)}
+        if name not in self.jobs:
+            raise ValueError("job {} doesn't exists".format(name))
+        stats=self.jobs[name].get_stats()
+        if reset:
+            self.jobs[name].reset_stats()
+        return stats
         
     def add_batch_job(self, name, job, cleanup=None, min_runtime=0, priority=-10):
         """
@@ -1570,21 +1815,50 @@ class QTaskThread(QThreadController):
             with self._priority_queues_lock:
                 q=callsync.QQueueScheduler()
                 self._priority_queues[priority]=q
+                self._metric_queues["priority/{}".format(priority)]=q
                 self._priority_queues_order=[self._priority_queues[p] for p in sorted(self._priority_queues,reverse=True)]
         return self._priority_queues[priority]
     def _check_priority_queues(self):
         """
         Check all priority queues for pending calls.
 
-        If calls are available, execute the oldest highest priority call and return ``True``; otherwise, return ``False``.
+        If calls are available, execute the call with the earliest deadline, or, if there are no such calls, the oldest highest priority call,
+        and return ``True``; otherwise, return ``False``.
         """
+        if self._deadline_queue.has_calls():
+            call=self._deadline_queue.pop_call()
+            if call is not None:
+                self._execute_deadline_call(call)
+                return True
         for scheduler in self._priority_queues_order:
             call=scheduler.pop_call()
             if call is not None:
-                with self._pause_lock:
-                    call.execute()
+                self._execute_scheduled_call(call)
                 return True
         return False
+    def _execute_scheduled_call(self, call):
+        with self._pause_lock:
+            t=time.time()
+            try:
+                call.execute()
+            finally:
+                self._get_call_metrics(call).add(None if call.schedule_time is None else t-call.schedule_time,time.time()-t)
+    def _execute_deadline_call(self, call):
+        lateness=time.time()-call.deadline if call.deadline is not None else 0
+        if lateness>0:
+            if call.on_expired=="skip":
+                self._get_call_metrics(call).add_expired()
+                call.skip()
+                return
+            self._get_call_metrics(call).add_late(lateness)
+        self._execute_scheduled_call(call)
+    def _get_call_metrics(self, call):
+        """Get the metrics object for the given call"""
+        name=call.name or getattr(call.func,"__name__",None) or str(call.func)
+        cm=self._call_metrics.get(name)
+        if cm is None:
+            cm=self._call_metrics[name]=metrics.CallMetrics()
+        return cm
     def _schedule_pending_jobs(self, t=None):
         """
         Check if there are any pending jobs and schedule them.
@@ -1592,17 +1866,23 @@ class QTaskThread(QThreadController):
         Return the time to wait until the next job needs to be scheduled.
         Return time is 0 if a job has been scheduled during that call,
         and ``None`` if there are not jobs to schedule.
+        Only the jobs which are due are checked, since the waiting jobs are stored in the heap ordered by their call time.
         """
-        wait_time=None
+        heap=self._jobs_heap
+        if not heap:
+            return None
         t=t or time.time()
-        for job in self._jobs_list:
-            if not job.scheduled:
-                l=job.time_left(t)
-                if l is not None:
-                    if l<=0:
-                        job.schedule()
-                    wait_time=l if wait_time is None else min(wait_time,l)
-        return wait_time
+        scheduled=False
+        while heap:
+            call_time,_,job=heap[0]
+            if job is None:
+                heapq.heappop(heap)
+            elif call_time<=t:
+                job.schedule()
+                scheduled=True
+            else:
+                return 0 if scheduled else call_time-t
+        return 0 if scheduled else None
     def _exhaust_queued_calls(self):
         """Keep extracting and executing queued calls (commands, jobs, multicasts) as long as there are any available"""
         self._in_command_loop=True
@@ -1626,6 +1906,52 @@ class QTaskThread(QThreadController):
             self.poke()
             self._poked=True
     
+    ### Metrics ###
+
+    def _add_subscription_metrics(self, callback, sid, scheduler):
+        self._metric_queues["multicast/{}/{}".format(getattr(callback,"__name__","callback"),sid)]=scheduler
+    def get_thread_metrics(self, reset=False):
+        """
+        Get the thread performance metrics.
+
+        Return a dictionary with three entries:
+            - ``"queues"``: dictionary ``{name: stats}`` with statistics of the call queues (see :meth:`.QQueueScheduler.get_stats`),
+              which includes the priority queues (``"priority/<priority>"``) and the deadline queue (``"deadline"``), as well as the commands (``"command/<name>"``)
+              and the multicast subscriptions (``"multicast/<callback>/<sid>"``) with their own limited queues
+              (for :meth:`subscribe_sync` subscriptions, see :meth:`.QMulticastThreadCallScheduler.get_stats`)
+            - ``"calls"``: dictionary ``{name: stats}`` with the call timing statistics (see :meth:`.metrics.CallMetrics.get_stats`)
+              for commands (``"command/<name>"``), jobs (``"job/<name>"``), and other calls (named by the called function, e.g., the multicast callback),
+              including the number of calls which missed their deadlines
+            - ``"jobs"``: dictionary ``{name: stats}`` with the job timing statistics (see :meth:`get_job_stats`)
+
+        If ``reset==True``, reset all the statistics after returning them.
+        Local call method.
+        """
+        result={"queues":{n:q.get_stats() for n,q in list(self._metric_queues.items())},
+                "calls":{n:m.get_stats() for n,m in list(self._call_metrics.items())},
+                "jobs":self.get_job_stats(reset=reset)}
+        if reset:
+            for q in self._metric_queues.values():
+                q.reset_stats()
+            for m in self._call_metrics.values():
+                m.reset()
+        return result
+    def _send_metrics_multicast(self, tag, reset):
+        self.send_multicast("any",tag,self.get_thread_metrics(reset=reset))
+    def setup_metrics_multicast(self, period=1., tag="metrics/snapshot", reset=False):
+        """
+        Set up periodic multicast with the thread metrics (see :meth:`get_thread_metrics`) sent with the given tag every `period` seconds.
+
+        If ``reset==True``, reset the statistics after every multicast, so that each snapshot only includes the calls since the previous one.
+        If `period` is ``None``, stop sending the multicast.
+        Local call method.
+        """
+        if "metrics_multicast" in self.jobs:
+            self.remove_job("metrics_multicast")
+        if period is not None:
+            self.add_job("metrics_multicast",lambda: self._send_metrics_multicast(tag,reset),period,initial_call=False)
+
+
     ### Start/run/stop control (called automatically) ###
 
     def run(self):
@@ -1652,6 +1978,9 @@ class QTaskThread(QThreadController):
         self.add_command("add_job",priority=10)
         self.add_command("change_job_period",priority=10)
         self.add_command("remove_job",priority=10)
+        self.add_command("get_job_stats",priority=10)
+        self.add_command("get_thread_metrics",priority=10)
+        self.add_command("setup_metrics_multicast",priority=10)
         self.add_command("add_batch_job",priority=10)
         self.add_command("change_batch_job_parameters",priority=10)
         self.add_command("remove_batch_job",priority=10)
@@ -1674,6 +2003,7 @@ class QTaskThread(QThreadController):
         finally:
             for q in self._priority_queues.values():
                 q.clear()
+            self._deadline_queue.clear()
 
 
     ### Command call methods ###
@@ -1735,7 +2065,7 @@ class QTaskThread(QThreadController):
 
     ### Command control ###
     
-    def add_command(self, name, command=None, scheduler=None, limit_queue=None, on_full_queue="skip_current", priority=0):
+    def add_command(self, name, command=None, scheduler=None, limit_queue=None, on_full_queue="skip_current", priority=0, deadline=None, on_expired="execute"):
         """
         Add a new command to the command set.
 
@@ -1759,6 +2089,11 @@ class QTaskThread(QThreadController):
                 ``"call_oldest"`` (execute the oldest call in the queue immediately in the caller thread), or
                 ``"wait"`` (wait until the call can be scheduled, which is checked after every call removal from the queue; place the call)
             priority: command priority; higher-priority multicasts and commands are always executed before the lower-priority ones.
+            deadline: if not ``None``, the relative deadline (in seconds after the call) for each command call;
+                such calls are executed before all calls without deadlines (regardless of `priority`) in the earliest-deadline-first order
+            on_expired: action to be taken if the call is about to be started after its deadline; can be
+                ``"execute"`` (execute it anyway; it is recorded as late in the thread metrics), or
+                ``"skip"`` (skip the call, which raises :exc:`.threadprop.SkippedCallError` for synchronous calls)
         """
         if name in self._commands:
             raise ValueError("command {} already exists".format(name))
@@ -1770,7 +2105,11 @@ class QTaskThread(QThreadController):
         elif isinstance(scheduler,py3.textstring):
             multischeduler=self._commands[scheduler].scheduler
             scheduler=multischeduler.schedulers[0]
-        multischeduler=callsync.QMultiQueueScheduler([psch] if scheduler is None else [scheduler,psch],[self._command_poke])
+        if isinstance(scheduler,callsync.QQueueScheduler) and scheduler not in self._metric_queues.values():
+            self._metric_queues["command/{}".format(name)]=scheduler
+        if deadline is not None:
+            psch=self._deadline_queue
+        multischeduler=callsync.QMultiQueueScheduler([psch] if scheduler is None else [scheduler,psch],[self._command_poke],deadline=deadline,on_expired=on_expired)
         self._commands[name]=self.TCommand(command,multischeduler,priority)
         self._override_command_method(name)
         return scheduler
@@ -1795,7 +2134,8 @@ class QTaskThread(QThreadController):
             command=getattr(self,name)
         self._commands[name]=self.TCommand(command,"direct_sync" if error_on_async else "direct",None)
 
-    def subscribe_commsync(self, callback, srcs="any", tags=None, dsts="any", filt=None, subscription_priority=0, scheduler=None, limit_queue=None, on_full_queue="skip_current", priority=0, add_call_info=False, return_result=False, sid=None):
+    def subscribe_commsync(self, callback, srcs="any", tags=None, dsts="any", filt=None, subscription_priority=0, scheduler=None, limit_queue=None, on_full_queue="skip_current", priority=0,
+            deadline=None, on_expired="execute", add_call_info=False, return_result=False, flow_control=None, sid=None):
         """
         Subscribe a callback to a multicast which is synchronized with commands and jobs execution.
 
@@ -1826,27 +2166,48 @@ class QTaskThread(QThreadController):
                 ``"call_newest"`` (execute the most recent call immediately in the caller thread), 
                 ``"call_oldest"`` (execute the oldest call in the queue immediately in the caller thread), or
                 ``"wait"`` (wait until the call can be scheduled, which is checked after every call removal from the queue; place the call)
+            priority: subscription call priority; higher-priority multicasts and commands are always executed before the lower-priority ones.
+            deadline: if not ``None``, the relative deadline (in seconds after the multicast is sent) for each subscribed call (see :meth:`add_command`)
+            on_expired: action to be taken if the call is about to be started after its deadline (``"execute"`` or ``"skip"``; see :meth:`add_command`)
             add_call_info(bool): if ``True``, add a fourth argument containing a call information (tuple with a single element, a timestamps of the call).
             return_result: if ``True``, use a result synchronizer to return the result of the subscribed call; otherwise, ignore the result
+            flow_control: if not ``None``, enable credit-based flow control for the subscription, so that the producers can check how many more multicasts
+                can be queued (see :meth:`.QThreadController.get_multicast_credit`); can be an integer credit window,
+                ``True`` (use `limit_queue` as the window), or a :class:`.multicast_pool.MulticastCredit` object (e.g., to grant the credit manually)
             sid(int): subscription ID (by default, generate a new unique id and return it).
         """
         if self._multicast_pool:
-            psch=self._get_priority_queue(priority)
+            credit=self._make_multicast_credit(flow_control,limit_queue)
+            psch=self._get_priority_queue(priority) if deadline is None else self._deadline_queue
             if scheduler is None and (limit_queue is not None or add_call_info):
                 scheduler=callsync.QQueueLengthLimitScheduler(max_len=limit_queue or 0,on_full_queue=on_full_queue,call_info_argname="call_info" if add_call_info else None)
-            multischeduler=callsync.QMultiQueueScheduler([psch] if scheduler is None else [scheduler,psch],[self._command_poke])
-            sid=self.subscribe_direct(callback,srcs=srcs,tags=tags,dsts=dsts or self.name,filt=filt,subscription_priority=subscription_priority,scheduler=multischeduler,return_result=return_result,sid=sid)
+            multischeduler=callsync.QMultiQueueScheduler([psch] if scheduler is None else [scheduler,psch],[self._command_poke],deadline=deadline,on_expired=on_expired)
+            sid=self.subscribe_direct(callback,srcs=srcs,tags=tags,dsts=dsts or self.name,filt=filt,subscription_priority=subscription_priority,scheduler=multischeduler,return_result=return_result,credit=credit,sid=sid)
+            if isinstance(scheduler,callsync.QQueueScheduler):
+                self._add_subscription_metrics(callback,sid,scheduler)
             return sid
 
     ##########  EXTERNAL CALLS  ##########
     ## Methods to be called by functions executing in other thread ##
 
     ### Request calls ###
-    def _schedule_comm(self, name, args, kwargs, callback=None, sync_result=True):
+    def _schedule_comm(self, name, args, kwargs, callback=None, sync_result=True, deadline=None, on_expired=None):
         comm,sched,_=self._commands[name]
         call=sched.build_call(comm,args,kwargs,callback=callback,pass_result=True,callback_on_exception=False,sync_result=sync_result)
-        sched.schedule(call)
+        call.name="command/{}".format(name)
+        if on_expired is not None:
+            funcargparse.check_parameter_range(on_expired,"on_expired",{"execute","skip"})
+            call.on_expired=on_expired
+        if deadline is None:
+            sched.schedule(call)
+        else:
+            call.deadline=time.time()+deadline
+            self._schedule_deadline_call(call,sched.schedulers[:-1])
         return call.result_synchronizer
+    def _schedule_deadline_call(self, call, queues=()):
+        """Schedule the call with a deadline into the given command queues and the deadline queue"""
+        if callsync.schedule_multiple_queues(call,list(queues)+[self._deadline_queue]):
+            self._command_poke()
     def call_command_direct(self, name, args=None, kwargs=None):
         """
         Invoke a command directly and immediately in the current thread.
@@ -1856,11 +2217,13 @@ class QTaskThread(QThreadController):
         self._check_running()
         comm=self._commands[name].command
         return comm(*(args or []),**(kwargs or {}))
-    def call_command(self, name, args=None, kwargs=None, sync=False, callback=None, timeout=None, ignore_errors=False):
+    def call_command(self, name, args=None, kwargs=None, sync=False, callback=None, timeout=None, ignore_errors=False, deadline=None, on_expired=None):
         """
         Invoke command call with the given name and arguments
         
         If `callback` is not ``None``, call it after the command is successfully executed (from the target thread), with a single parameter being the command result.
+        If `deadline` is not ``None``, it specifies the relative deadline (in seconds from now) for this call, which overrides the command default (see :meth:`add_command`);
+        if `on_expired` is not ``None``, it overrides the default action for the expired call (``"execute"`` or ``"skip"``).
         If ``sync==True``, pause caller thread execution (for at most `timeout` seconds) until the command has been executed by the target thread, and then return the command result.
         If ``sync=="delayed"``, return :class:`.QCallResultSynchronizer` object which can be used to wait for and read the command result;
         otherwise, return ``None``.
@@ -1882,12 +2245,12 @@ class QTaskThread(QThreadController):
             if sync:
                 return value
             return None
-        synchronizer=self._schedule_comm(name,args,kwargs,callback=callback,sync_result=bool(sync))
+        synchronizer=self._schedule_comm(name,args,kwargs,callback=callback,sync_result=bool(sync),deadline=deadline,on_expired=on_expired)
         if sync=="delayed":
             return synchronizer
         elif sync:
             return synchronizer.get_value_sync(timeout=timeout,error_on_fail=not ignore_errors,error_on_skip=not ignore_errors,pass_exception=not ignore_errors)
-    def call_in_thread_commsync(self, func, args=None, kwargs=None, sync=True, timeout=None, priority=0, ignore_errors=False, same_thread_shortcut=True):
+    def call_in_thread_commsync(self, func, args=None, kwargs=None, sync=True, timeout=None, priority=0, ignore_errors=False, same_thread_shortcut=True, deadline=None, on_expired="execute"):
         """
         Call a function in this thread such that it is synchronous with other commands, and jobs.
 
@@ -1898,6 +2261,7 @@ class QTaskThread(QThreadController):
         If ``sync=="delayed"``, return :class:`.QCallResultSynchronizer` object which can be used to wait for and read the command result;
         otherwise, return ``None``.
         `priority` sets the call priority (by default, the same as the standard commands).
+        `deadline` and `on_expired` set the relative call deadline and the action for the expired call (see :meth:`add_command`).
         In the ``sync==True`` case, if ``ignore_errors==True``, ignore all possible problems with the call (controller stopped, call raised an exception, call was skipped)
         and return ``None`` instead; otherwise, these problems raise exceptions in the caller thread.
         If ``same_thread_shortcut==True`` (default) and the caller thread is the same as the controlled thread, call the function directly.
@@ -1914,16 +2278,128 @@ class QTaskThread(QThreadController):
             return None
         sched=self._get_priority_queue(priority)
         call=sched.build_call(func,args,kwargs,pass_result=True,callback_on_exception=False,sync_result=bool(sync))
-        sched.schedule(call)
+        if deadline is None:
+            sched.schedule(call)
+        else:
+            funcargparse.check_parameter_range(on_expired,"on_expired",{"execute","skip"})
+            call.deadline=time.time()+deadline
+            call.on_expired=on_expired
+            self._schedule_deadline_call(call)
         synchronizer=call.result_synchronizer
         if sync=="delayed":
             return synchronizer
         elif sync:
             return synchronizer.get_value_sync(timeout=timeout,error_on_fail=not ignore_errors,error_on_skip=not ignore_errors,pass_exception=not ignore_errors)
+    @staticmethod
+    def _default_coalesce_key(name, args, kwargs):
+        if not name.startswith("set_"):
+            return None
+        try:
+            key=(name,tuple(args[:-1]),frozenset(kwargs.items()))  # the last positional argument is the value being set
+            hash(key)
+            return key
+        except TypeError:  # unhashable arguments; do not coalesce
+            return None
+    def _normalize_command_batch(self, calls, coalesce):
+        """Turn the batch calls into a list of tuples ``(name, args, kwargs)`` and find the indices of the calls which are executed"""
+        norm_calls=[]
+        for c in calls:
+            if isinstance(c,py3.textstring):
+                c=(c,)
+            name,args,kwargs=(tuple(c)+((),{}))[:3]
+            if name not in self._commands:
+                raise KeyError("unknown command: {}".format(name))
+            norm_calls.append((name,args or (),kwargs or {}))
+        if coalesce is True:
+            coalesce=self._default_coalesce_key
+        targets=list(range(len(norm_calls)))
+        if coalesce:
+            last={}
+            for i,(name,args,kwargs) in enumerate(norm_calls):
+                key=coalesce(name,args,kwargs)
+                if key is not None:
+                    last[key]=i
+            for i,(name,args,kwargs) in enumerate(norm_calls):
+                key=coalesce(name,args,kwargs)
+                if key is not None:
+                    targets[i]=last[key]
+        return norm_calls,targets
+    def _run_command_batch(self, calls, targets):
+        results={}
+        for i,(name,args,kwargs) in enumerate(calls):
+            if targets[i]==i:
+                results[i]=self._commands[name].command(*args,**kwargs)
+        return [results[t] for t in targets]
+    def call_command_batch(self, calls, sync=True, timeout=None, ignore_errors=False, coalesce=False):
+        """
+        Invoke several commands as a single call.
+
+        The commands are executed in the thread one after another within a single scheduled call,
+        so the batch only takes a single cross-thread round trip, and no other commands or jobs are executed in-between.
+        Note that the command queues are bypassed, so their length limits do not apply.
+        `calls` is a list of commands, where each element is either a command name, or a tuple ``(name, args)`` or ``(name, args, kwargs)``.
+        If `coalesce` is ``True``, repeated calls of ``set_*`` commands are coalesced, so only the last call of each command is executed (at the position of the last call);
+        the last positional argument is assumed to be the value being set, so only the calls with the same remaining positional arguments (e.g., axis or channel)
+        and the same keyword arguments are coalesced (calls with unhashable arguments are never coalesced);
+        it can also be a function which takes 3 arguments (command name, args and kwargs) and returns the coalescing key for the call
+        (calls with the same key are coalesced), or ``None`` if the call should not be coalesced.
+        If ``sync==True``, pause caller thread execution (for at most `timeout` seconds) until all commands have been executed by the target thread,
+        and then return the list of results (for the coalesced calls, the result of the executed call is returned).
+        If ``sync=="delayed"``, return :class:`.QCallResultSynchronizer` object which can be used to wait for and read the results list;
+        otherwise, return ``None``.
+        If one of the commands raises an exception, the remaining commands are not executed;
+        in the ``sync==True`` case, if ``ignore_errors==True``, ignore all possible problems with the call (controller stopped, command raised an exception)
+        and return ``None`` instead; otherwise, these problems raise exceptions in the caller thread.
+        Universal call method.
+        """
+        calls,targets=self._normalize_command_batch(calls,coalesce)
+        priority=max([self._commands[n].priority or 0 for n,_,_ in calls],default=0)
+        return self.call_in_thread_commsync(self._run_command_batch,args=(calls,targets),sync=sync,timeout=timeout,priority=priority,ignore_errors=ignore_errors)
+    def command_batch(self, sync=True, timeout=None, ignore_errors=False, coalesce=False):
+        """
+        Create a :class:`CommandBatch` accessor, which collects the command calls and then invokes them as a single batch.
+
+        The parameters are the same as in :meth:`call_command_batch`.
+        Universal call method.
+        """
+        return self.CommandBatch(self,sync=sync,timeout=timeout,ignore_errors=ignore_errors,coalesce=coalesce)
     def comm_paused(self):
         """Context manager, which allows to temporarily pause all calls (commands, jobs, etc.)"""
         return self._pause_lock
 
+    class CommandBatch:
+        """
+        Accessor object which collects command calls and invokes them as a single batch (see :meth:`QTaskThread.call_command_batch`).
+
+        Calls are added using the command accessor syntax (``batch.comm(*args,**kwargs)``), and are executed either on an explicit :meth:`execute` call,
+        or on exit from the ``with`` block; in the latter case, the results are stored in the ``results`` attribute.
+        Usually created using :meth:`QTaskThread.command_batch`.
+        """
+        def __init__(self, parent, sync=True, timeout=None, ignore_errors=False, coalesce=False):
+            self.parent=parent
+            self.sync=sync
+            self.timeout=timeout
+            self.ignore_errors=ignore_errors
+            self.coalesce=coalesce
+            self.calls=[]
+            self.results=None
+        def __getattr__(self, name):
+            if name.startswith("_"):
+                raise AttributeError(name)
+            def add_call(*args, **kwargs):
+                self.calls.append((name,args,kwargs))
+            return add_call
+        def execute(self):
+            """Execute all the collected calls, clear the list, and return the results (same as :meth:`QTaskThread.call_command_batch`)"""
+            calls,self.calls=self.calls,[]
+            self.results=self.parent.call_command_batch(calls,sync=self.sync,timeout=self.timeout,ignore_errors=self.ignore_errors,coalesce=self.coalesce)
+            return self.results
+        def __enter__(self):
+            return self
+        def __exit__(self, *args):
+            if args[0] is None:
+                self.execute()
+
     class CommandAccess:
         """
         Accessor object designed to simplify command syntax.
@@ -0,0 +1,339 @@
+"""
+Pure-Python implementation of the QtCore subset used by the thread controllers.
+
+Implements objects with thread affinity (:class:`QObject`), signals with direct and queued connections (:class:`Signal`),
+threads with event loops (:class:`QThread`), the application object (:class:`QCoreApplication`), and timers,
+with the same interface as the corresponding Qt classes.
+Used as the headless backend of the thread controllers (see :mod:`.backend`), which does not require Qt.
+Only the functionality required by the controllers is implemented (e.g., there are no event filters, thread priorities, or object parents).
+"""
+
+import threading
+import collections
+import heapq
+import itertools
+import time
+import sys
+
+
+
+class Qt:
+    """Signal connection types"""
+    AutoConnection=0
+    DirectConnection=1
+    QueuedConnection=2
+
+class QEventLoop:
+    """Event processing flags"""
+    AllEvents=0x00
+    WaitForMoreEvents=0x04
+
+class QTimerEvent:
+    """Timer event passed to :meth:`QObject.timerEvent`"""
+    def __init__(self, timer_id):
+        self._timer_id=timer_id
+    def timerId(self):
+        return self._timer_id
+
+
+
+def _call_slot(slot, args):
+    try:
+        slot(*args)
+    except Exception:  # pylint: disable=broad-except
+        sys.excepthook(*sys.exc_info())
+
+_timer_ids=itertools.count(1)
+class _ThreadData:
+    """Event queue, timers, and event loop state of a single thread"""
+    def __init__(self, thread):
+        self.thread=thread
+        self.events=collections.deque()
+        self.cond=threading.Condition(threading.Lock())
+        self.timers=[] # heap of (due time, timer id)
+        self.timer_objects={} # timer id -> (object, interval)
+        self.woken=False
+        self.quit_requested=False
+        self.exit_code=0
+    def post(self, slot, args):
+        """Post the slot call to the thread event queue"""
+        with self.cond:
+            self.events.append((slot,args))
+            self.cond.notify()
+    def request_quit(self, code=0):
+        """Request the running event loop to quit"""
+        with self.cond:
+            self.quit_requested=True
+            self.exit_code=code
+            self.woken=True
+            self.cond.notify()
+
+    def add_timer(self, obj, interval):
+        """Add a periodic timer which calls ``obj.timerEvent`` every `interval` seconds; return timer id"""
+        timer_id=next(_timer_ids)
+        with self.cond:
+            self.timer_objects[timer_id]=(obj,interval)
+            heapq.heappush(self.timers,(time.monotonic()+interval,timer_id))
+            self.cond.notify()
+        return timer_id
+    def remove_timer(self, timer_id):
+        """Remove the timer (the heap entry is discarded later)"""
+        with self.cond:
+            self.timer_objects.pop(timer_id,None)
+    def _next_timer(self):
+        while self.timers and self.timers[0][1] not in self.timer_objects:
+            heapq.heappop(self.timers)
+        return self.timers[0][0] if self.timers else None
+    def _pop_due_timers(self, now):
+        due=[]
+        while self._next_timer() is not None and self.timers[0][0]<=now:
+            due.append(heapq.heappop(self.timers))
+        calls=[]
+        for t,timer_id in due:
+            obj,interval=self.timer_objects[timer_id]
+            calls.append((obj.timerEvent,(QTimerEvent(timer_id),)))
+            heapq.heappush(self.timers,(max(t+interval,now),timer_id))
+        return calls
+
+    def process_events(self, wait=False, until_quit=False):
+        """
+        Process all pending events.
+
+        If ``wait==True``, wait until there is at least one event (or the loop is woken up, e.g., by the quit request).
+        If ``until_quit==True``, keep waiting until the quit is requested.
+        """
+        with self.cond:
+            if wait:
+                while not (self.events or self.woken or (until_quit and self.quit_requested)):
+                    next_timer=self._next_timer()
+                    timeout=None if next_timer is None else next_timer-time.monotonic()
+                    if timeout is not None and timeout<=0:
+                        break
+                    self.cond.wait(timeout)
+            self.woken=False
+            calls=list(self.events)
+            self.events.clear()
+            if self.timers:
+                calls+=self._pop_due_timers(time.monotonic())
+        for slot,args in calls:
+            _call_slot(slot,args)
+    def exec_loop(self):
+        """Run the event loop until the quit is requested and return the exit code"""
+        try:
+            while True:
+                with self.cond:
+                    if self.quit_requested:
+                        return self.exit_code
+                self.process_events(wait=True,until_quit=True)
+        finally:
+            with self.cond:
+                self.quit_requested=False
+                self.exit_code=0
+
+_local_data=threading.local()
+def _current_thread():
+    try:
+        return _local_data.thread
+    except AttributeError:
+        _local_data.thread=_AdoptedThread()
+        return _local_data.thread
+def _current_thread_data():
+    return _current_thread()._hl_data
+
+
+
+
+class BoundSignal:
+    """Signal bound to a specific sender object"""
+    def __init__(self, sender):
+        self._sender=sender
+        self._connections=[]
+        self._lock=threading.Lock()
+    def connect(self, slot, type=Qt.AutoConnection):  # pylint: disable=redefined-builtin
+        """
+        Connect the signal to the slot.
+
+        If the slot is a bound method of a :class:`QObject`, the queued calls are executed in this object's thread;
+        otherwise, they are executed in the sender's thread.
+        """
+        with self._lock:
+            self._connections=self._connections+[(slot,type)]
+    def disconnect(self, slot=None):
+        """Disconnect the slot (or all slots, if `slot` is ``None``)"""
+        with self._lock:
+            connections=[c for c in self._connections if slot is not None and c[0]!=slot]
+            if len(connections)==len(self._connections):
+                raise TypeError("disconnect() failed between signal and {}".format(slot))
+            self._connections=connections
+    def emit(self, *args):
+        """Emit the signal with the given arguments"""
+        for slot,ctype in self._connections:
+            receiver=getattr(slot,"__self__",None)
+            data=(receiver if isinstance(receiver,QObject) else self._sender)._hl_thread_data
+            if ctype==Qt.DirectConnection or (ctype==Qt.AutoConnection and data is _current_thread_data()):
+                _call_slot(slot,args)
+            else:
+                data.post(slot,args)
+class Signal:
+    """Signal descriptor (analogous to Qt ``Signal``/``pyqtSignal``); argument types are only used for the documentation purposes"""
+    def __init__(self, *types, **kwargs):  # pylint: disable=unused-argument
+        self.types=types
+        self._key="_hl_signal_{}".format(id(self))
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        try:
+            return obj.__dict__[self._key]
+        except KeyError:
+            return obj.__dict__.setdefault(self._key,BoundSignal(obj))
+
+def Slot(*args, **kwargs):  # pylint: disable=unused-argument
+    """Slot decorator (does nothing, present for compatibility with Qt)"""
+    return lambda func: func
+
+
+
+
+class QObject:
+    """
+    Basic object with thread affinity.
+
+    The object belongs to the thread where it was created, which can be changed using :meth:`moveToThread`;
+    queued signals connected to the object methods are executed in this thread.
+    """
+    def __init__(self, parent=None):  # pylint: disable=unused-argument
+        self._hl_thread_data=_current_thread_data()
+    def moveToThread(self, thread):
+        self._hl_thread_data=thread._hl_data
+    def thread(self):
+        return self._hl_thread_data.thread
+    def startTimer(self, interval):
+        """Start a periodic timer with the given interval (in ms) which calls :meth:`timerEvent`; return timer id"""
+        return self._hl_thread_data.add_timer(self,interval/1E3)
+    def killTimer(self, timer_id):
+        self._hl_thread_data.remove_timer(timer_id)
+    def timerEvent(self, event):
+        pass
+
+class QBasicTimer:
+    """Periodic timer which calls ``timerEvent`` method of the given object"""
+    def __init__(self):
+        self._timer_id=None
+        self._data=None
+    def start(self, msec, obj):
+        self.stop()
+        self._data=obj._hl_thread_data
+        self._timer_id=self._data.add_timer(obj,msec/1E3)
+    def stop(self):
+        if self._timer_id is not None:
+            self._data.remove_timer(self._timer_id)
+            self._timer_id=None
+    def isActive(self):
+        return self._timer_id is not None
+    def timerId(self):
+        return self._timer_id or 0
+
+
+
+class QThread(QObject):
+    """
+    Thread with an event loop.
+
+    By default, :meth:`run` executes the event loop (:meth:`exec_`) until :meth:`quit` is called.
+    The underlying Python threads are daemonic, so they do not prevent the interpreter from exiting.
+    """
+    started=Signal()
+    finished=Signal()
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._hl_data=_ThreadData(self)
+        self._hl_pythread=None
+        self._hl_running=False
+    def _hl_bootstrap(self):
+        _local_data.thread=self
+        try:
+            self.started.emit()
+            self.run()
+        finally:
+            self._hl_running=False
+            self.finished.emit()
+    def start(self):
+        if self._hl_running:
+            return
+        self._hl_running=True
+        self._hl_pythread=threading.Thread(target=self._hl_bootstrap,daemon=True)
+        self._hl_pythread.start()
+    def run(self):
+        self.exec_()
+    def exec_(self):
+        """Run the thread event loop until :meth:`quit` or :meth:`exit` is called"""
+        return self._hl_data.exec_loop()
+    exec=exec_
+    def exit(self, code=0):
+        self._hl_data.request_quit(code)
+    def quit(self):
+        self.exit(0)
+    def isRunning(self):
+        return self._hl_running
+    def isFinished(self):
+        return self._hl_pythread is not None and not self._hl_running
+    def wait(self, time=None):  # pylint: disable=redefined-outer-name
+        """Wait until the thread is finished (for at most `time` ms); return ``True`` if the thread is finished"""
+        thread=self._hl_pythread
+        if thread is None or thread is threading.current_thread():
+            return True
+        thread.join(None if time is None else time/1E3)
+        return not thread.is_alive()
+    @staticmethod
+    def currentThread():
+        return _current_thread()
+class _AdoptedThread(QThread):
+    """Thread object for a thread which is not started via :class:`QThread` (e.g., the main thread)"""
+    def __init__(self):  # pylint: disable=super-init-not-called
+        self._hl_data=_ThreadData(self)
+        self._hl_thread_data=self._hl_data
+        self._hl_pythread=threading.current_thread()
+        self._hl_running=True
+    def start(self):
+        raise RuntimeError("adopted thread can not be started")
+
+
+
+class QCoreApplication(QObject):
+    """
+    Application object.
+
+    Only one instance can exist at a time; it belongs to the thread where it is created, which becomes the main thread.
+    """
+    aboutToQuit=Signal()
+    lastWindowClosed=Signal()
+    _instance=None
+    def __init__(self, argv=None):
+        if QCoreApplication._instance is not None:
+            raise RuntimeError("application instance already exists")
+        super().__init__()
+        self._hl_argv=list(argv or [])
+        QCoreApplication._instance=self
+    @staticmethod
+    def instance():
+        return QCoreApplication._instance
+    def arguments(self):
+        return list(self._hl_argv)
+    def exec_(self):
+        """Run the main event loop until :meth:`quit` or :meth:`exit` is called and return the exit code"""
+        code=self._hl_thread_data.exec_loop()
+        self.aboutToQuit.emit()
+        return code
+    exec=exec_
+    def exit(self, code=0):
+        self._hl_thread_data.request_quit(code)
+    def quit(self):
+        self.exit(0)
+    @staticmethod
+    def processEvents(flags=QEventLoop.AllEvents):
+        """Process pending events of the current thread; if `flags` include ``QEventLoop.WaitForMoreEvents``, wait for new events if there are none"""
+        _current_thread_data().process_events(wait=bool(flags&QEventLoop.WaitForMoreEvents))
+    def quitOnLastWindowClosed(self):
+        return False
+    def closeAllWindows(self):
+        pass
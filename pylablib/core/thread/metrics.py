@@ -0,0 +1,98 @@
+"""
+Lightweight timing metrics used by thread controllers and call schedulers.
+"""
+
+import bisect
+import collections
+
+
+
+TTimeStats=collections.namedtuple("TTimeStats",["count","mean","max"])
+class TimeHistogram:
+    """
+    Histogram of time intervals with logarithmically spaced bins.
+
+    Adding a value takes a single binary search, so it can be used for every call without a noticeable overhead.
+
+    Args:
+        min_time: upper edge of the first bin (all shorter intervals end up there)
+        max_time: lower edge of the last bin (all longer intervals end up there)
+        bins_per_decade: number of bins per a factor of 10 in time
+    """
+    def __init__(self, min_time=1E-5, max_time=10., bins_per_decade=4):
+        self.edges=[]
+        e=min_time
+        while e<max_time*(1+1E-9):
+            self.edges.append(e)
+            e*=10**(1/bins_per_decade)
+        self.reset()
+    def reset(self):
+        """Reset the histogram"""
+        self.counts=[0]*(len(self.edges)+1)
+        self.count=0
+        self.total=0
+        self.max=0
+    def add(self, dt):
+        """Add a time interval to the histogram"""
+        self.counts[bisect.bisect_right(self.edges,dt)]+=1
+        self.count+=1
+        self.total+=dt
+        if dt>self.max:
+            self.max=dt
+    def get_stats(self):
+        """Get the interval statistics as a tuple ``(count, mean, max)``"""
+        return TTimeStats(self.count,self.total/self.count if self.count else 0,self.max)
+    def get_histogram(self):
+        """
+        Get the histogram as a tuple ``(edges, counts)``.
+
+        `counts` is one element longer than `edges`: its first element contains the number of intervals shorter than ``edges[0]``,
+        and the last element contains the number of intervals longer than ``edges[-1]``.
+        """
+        return list(self.edges),list(self.counts)
+
+
+
+TCallStats=collections.namedtuple("TCallStats",["count","wait_mean","wait_max","exec_mean","exec_max","exec_hist","late","late_max","expired"])
+class CallMetrics:
+    """
+    Timing metrics of a single kind of calls (e.g., a single command).
+
+    Keeps track of the waiting time (between scheduling and execution of the call) and the execution time histogram,
+    as well as the calls which missed their deadlines.
+    """
+    def __init__(self):
+        self.wait=TimeHistogram()
+        self.exec=TimeHistogram()
+        self.late=TimeHistogram()
+        self.expired=0
+    def add(self, wait_time, exec_time):
+        """Add the call with the given waiting time (``None`` if unknown) and execution time"""
+        if wait_time is not None:
+            self.wait.add(max(wait_time,0))
+        self.exec.add(exec_time)
+    def add_late(self, lateness):
+        """Add the call which has been started `lateness` seconds after its deadline"""
+        self.late.add(lateness)
+    def add_expired(self):
+        """Add the call which has been skipped, since it expired before being started"""
+        self.expired+=1
+    def reset(self):
+        """Reset the metrics"""
+        self.wait.reset()
+        self.exec.reset()
+        self.late.reset()
+        self.expired=0
+    def get_stats(self):
+        """
+        Get the call statistics.
+
+        Return tuple ``(count, wait_mean, wait_max, exec_mean, exec_max, exec_hist, late, late_max, expired)``,
+        where ``exec_hist`` is a tuple ``(edges, counts)`` describing the execution time histogram (see :meth:`TimeHistogram.get_histogram`),
+        ``late`` is the number of calls executed after their deadline, ``late_max`` is the maximal delay past the deadline,
+        and ``expired`` is the number of calls skipped because of the missed deadline.
+        """
+        wait=self.wait.get_stats()
+        ex=self.exec.get_stats()
+        late=self.late.get_stats()
+        return TCallStats(ex.count,wait.mean,wait.max,ex.mean,ex.max,self.exec.get_histogram(),late.count,late.max,self.expired)
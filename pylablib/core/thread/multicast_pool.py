@@ -1,8 +1,9 @@
-from ..utils import observer_pool, py3, general
+from ..utils import py3, general
 from . import callsync
 from .utils import ReadChangeLock
 
 import collections
+import threading
 import fnmatch
 import re
 
@@ -14,7 +15,7 @@ def _as_name_list(lst):
         return [lst]
     return lst
 def _split_pattern_list(lst):
-    vals,pvals=general.partition_list(lambda s: s.find("*")>=0,lst)
+    pvals,vals=general.partition_list(lambda s: s.find("*")>=0 or s.find("?")>=0 or s.find("[")>=0,lst)
     pvals=[re.compile(fnmatch.translate(v)) for v in pvals]
     return vals,pvals
 def _match_pattern_list(lst, v):
@@ -23,6 +24,71 @@ def _match_pattern_list(lst, v):
             return True
     return False
 TMulticast=collections.namedtuple("TMulticast",["src","tag","value"])
+TSubscription=collections.namedtuple("TSubscription",["sid","callback","srcs","dsts","tags","ptags","filt","priority","order","credit"])
+def _match_subscription(sub, src, dst, tag):
+    """Check if the multicast with the given source, destination and tag passes the subscription filters (except for the additional filter function)"""
+    if (sub.srcs is not None) and (src!="all") and (src not in sub.srcs):
+        return False
+    if (sub.dsts is not None) and (dst!="all") and (dst not in sub.dsts):
+        return False
+    if (sub.tags is not None) and (tag is not None):
+        return (tag in sub.tags) or _match_pattern_list(sub.ptags,tag)
+    return True
+class MulticastCredit:
+    """
+    Credit-based flow control of a multicast subscription.
+
+    The subscriber grants a window of `window` multicasts. Every delivered multicast consumes one unit of credit,
+    which is returned when the subscriber calls :meth:`grant`; if ``auto_grant==True``, this happens automatically
+    once the subscribed call is executed or skipped.
+    Producers can query the available credit (see :meth:`MulticastPool.get_credit`) and adapt their output
+    before the subscriber queue overflows and the multicasts start getting dropped.
+
+    Args:
+        window(int): total number of multicasts which can be outstanding at any time
+        auto_grant(bool): if ``True``, grant the credit back automatically after the subscribed call is done;
+            otherwise, :meth:`grant` should be called explicitly by the subscriber (e.g., after the multicast data is completely processed)
+    """
+    def __init__(self, window, auto_grant=True):
+        if window<=0:
+            raise ValueError("credit window should be positive; got {}".format(window))
+        self.window=window
+        self.auto_grant=auto_grant
+        self._used=0
+        self._lock=threading.Lock()
+        self._listeners=[]
+    def consume(self, n=1):
+        """Consume `n` units of credit (called on the multicast delivery)"""
+        with self._lock:
+            self._used+=n
+    def grant(self, n=1):
+        """Grant `n` units of credit back to the producers"""
+        with self._lock:
+            self._used=max(self._used-n,0)
+            listeners=self._listeners
+        for l in listeners:
+            l()
+    def available(self):
+        """Get the number of multicasts which can be delivered without exceeding the window (can be 0, but not negative)"""
+        return max(self.window-self._used,0)
+    def outstanding(self):
+        """Get the number of delivered multicasts whose credit has not been granted back yet"""
+        return self._used
+    def reset(self):
+        """Reset the credit to the full window"""
+        with self._lock:
+            self._used=0
+    def add_listener(self, listener):
+        """Add a function without arguments which is called (from the granting thread) whenever the credit is granted"""
+        with self._lock:
+            self._listeners=self._listeners+[listener]
+    def remove_listener(self, listener):
+        """Remove the credit grant listener"""
+        with self._lock:
+            self._listeners=[l for l in self._listeners if l is not listener]
+
+
+
 class MulticastPool:
     """
     Multicast dispatcher (somewhat similar in functionality to Qt signals).
@@ -31,12 +97,71 @@ class MulticastPool:
     Each multicast has defined source, destination (both can also be ``"all"`` or ``"any"``, see methods descriptions for details), tag and value.
     Any thread can send a multicast or subscribe for a multicast with given filters (source, destination, tag, additional filters).
     If a multicast is emitted, it is checked against filters for all subscribers, and the passing ones are then called.
+
+    The subscriptions are indexed by their tags (exact tags are hashed, tag patterns are checked separately),
+    and the list of subscriptions passing the source, destination, and tag filters, ordered by priority, is cached for every ``(src, dst, tag)`` combination.
+    Hence, sending a multicast only involves a dictionary lookup and calling the additional filter functions (if any) of the found subscribers;
+    the cache is reset whenever the subscriptions change.
+
+    Subscriptions can optionally use credit-based flow control (see :class:`MulticastCredit`),
+    in which case the producers can check the available credit using :meth:`get_credit` before sending.
     """
     def __init__(self):
-        self._pool=observer_pool.ObserverPool()
+        self._subscriptions={}
+        self._tag_index={}
+        self._pattern_subscriptions={}
+        self._any_tag_subscriptions={}
+        self._routes={}
         self._pool_lock=ReadChangeLock()
+        self._order=0
+
+    _names_generator=general.NamedUIDGenerator(thread_safe=True)
+    _max_routes=2**12
+    def _add_subscription(self, sub):
+        self._subscriptions[sub.sid]=sub
+        if sub.tags is None:
+            self._any_tag_subscriptions[sub.sid]=sub
+        else:
+            for t in sub.tags:
+                self._tag_index.setdefault(t,{})[sub.sid]=sub
+            if sub.ptags:
+                self._pattern_subscriptions[sub.sid]=sub
+        self._routes={}
+    def _remove_subscription(self, sid):
+        sub=self._subscriptions.pop(sid)
+        if sub.tags is None:
+            del self._any_tag_subscriptions[sid]
+        else:
+            for t in sub.tags:
+                del self._tag_index[t][sid]
+                if not self._tag_index[t]:
+                    del self._tag_index[t]
+            self._pattern_subscriptions.pop(sid,None)
+        self._routes={}
+    def _find_route(self, src, dst, tag):
+        """Find all subscriptions passing the source, destination and tag filters, and order them by priority"""
+        if tag is None:
+            candidates=list(self._subscriptions.values())
+        else:
+            candidates=list(self._any_tag_subscriptions.values())
+            candidates+=self._tag_index.get(tag,{}).values()
+            candidates+=[sub for sub in self._pattern_subscriptions.values() if sub.sid not in self._tag_index.get(tag,{})]
+        route=[sub for sub in candidates if _match_subscription(sub,src,dst,tag)]
+        route.sort(key=lambda sub: (-sub.priority,sub.order))
+        return tuple(route)
 
-    def subscribe_direct(self, callback, srcs="any", dsts="any", tags=None, filt=None, priority=0, scheduler=None, return_result=False, sid=None):
+    def _get_route(self, src, dst, tag):
+        key=(src,dst,tag)
+        with self._pool_lock.reading():
+            route=self._routes.get(key)
+            if route is None:
+                route=self._find_route(src,dst,tag)
+                if len(self._routes)>=self._max_routes:
+                    self._routes={}
+                self._routes[key]=route
+        return route
+
+    def subscribe_direct(self, callback, srcs="any", dsts="any", tags=None, filt=None, priority=0, scheduler=None, return_result=False, credit=None, sid=None):
         """
         Subscribe an asynchronous callback to a multicast.
 
@@ -56,6 +181,7 @@ class MulticastPool:
             priority(int): subscription priority (higher priority subscribers are called first).
             scheduler: if defined, multicast call gets scheduled using this scheduler instead of being called directly (which is the default behavior)
             return_result: if ``True``, use a result synchronizer to return the result of the subscribed call; otherwise, ignore the result
+            credit(MulticastCredit): if not ``None``, flow control credit of the subscription, which is consumed on every delivered multicast
             sid(int): subscription ID (by default, generate a new unique name).
 
         Returns:
@@ -64,25 +190,30 @@ class MulticastPool:
         srcs=_as_name_list(srcs)
         dsts=_as_name_list(dsts)
         tags=_as_name_list(tags)
+        ptags=[]
         if tags is not None:
             tags,ptags=_split_pattern_list(tags)
-        src_any="any" in srcs
-        dst_any="any" in dsts
-        def full_filt(tag, value):
-            src,dst,tag=tag
-            if (tags is not None) and (tag is not None):
-                match=(tag in tags) or _match_pattern_list(ptags,tag)
-                if not match:
-                    return False
-            if (not src_any) and (src!="all") and (src not in srcs):
-                return False
-            if (not dst_any) and (dst!="all") and (dst not in dsts):
-                return False
-            return filt(src,dst,tag,value) if (filt is not None) else True
+            tags=set(tags)
+        srcs=None if "any" in srcs else set(srcs)
+        dsts=None if "any" in dsts else set(dsts)
+        if credit is not None and scheduler is None:
+            _credit_callback=callback
+            def credit_call(*args, **kwargs):
+                credit.consume()
+                try:
+                    return _credit_callback(*args,**kwargs)
+                finally:
+                    if credit.auto_grant:
+                        credit.grant()
+            callback=credit_call
         if scheduler is not None:
             _orig_callback=callback
             def schedule_call(*args, **kwargs):
                 call=scheduler.build_call(_orig_callback,args,kwargs,sync_result=return_result)
+                if credit is not None:
+                    credit.consume()
+                    if credit.auto_grant:
+                        call.add_callback(credit.grant,pass_result=False,call_on_unschedule=True)
                 scheduler.schedule(call)
                 return call.result_synchronizer
             callback=schedule_call
@@ -93,12 +224,17 @@ class MulticastPool:
                 return callsync.QDirectResultSynchronizer(result)
             callback=sync_call
         with self._pool_lock.changing():
-            sid=self._pool.add_observer(callback,name=sid,filt=full_filt,priority=priority,cacheable=(filt is None))
+            if sid is None:
+                sid=self._names_generator("subscription")
+            elif sid in self._subscriptions:
+                raise ValueError("subscription {} already exists".format(sid))
+            self._add_subscription(TSubscription(sid,callback,srcs,dsts,tags,ptags,filt,priority,self._order,credit))
+            self._order+=1
         return sid
     def unsubscribe(self, sid):
         """Unsubscribe from a subscription with a given ID"""
         with self._pool_lock.changing():
-            self._pool.remove_observer(sid)
+            self._remove_subscription(sid)
 
     def send(self, src, dst="any", tag=None, value=None):
         """
@@ -112,6 +248,27 @@ class MulticastPool:
             tag(str): multicast tag.
             value: multicast value.
         """
-        with self._pool_lock.reading():
-            to_call=self._pool.find_observers(TMulticast(src,dst,tag),value)
-        return [obs.callback(src,tag,value) for _,obs in to_call]
\ No newline at end of file
+        route=self._get_route(src,dst,tag)
+        return [sub.callback(src,tag,value) for sub in route if (sub.filt is None) or sub.filt(src,dst,tag,value)]
+
+    def get_credits(self, src, dst="any", tag=None):
+        """
+        Get the list of :class:`MulticastCredit` objects of all flow-controlled subscriptions receiving a multicast with the given source, destination, and tag.
+
+        The additional subscription filter functions are not checked, since they depend on the multicast value.
+        """
+        return [sub.credit for sub in self._get_route(src,dst,tag) if sub.credit is not None]
+    def get_credit(self, src, dst="any", tag=None, relative=False):
+        """
+        Get the available credit for a multicast with the given source, destination, and tag.
+
+        Return the smallest available credit among all flow-controlled subscriptions receiving this multicast,
+        or ``None`` if there are no such subscriptions.
+        If ``relative==True``, return the smallest ratio of the available credit to the credit window (between 0 and 1) instead.
+        """
+        credits=self.get_credits(src,dst=dst,tag=tag)
+        if not credits:
+            return None
+        if relative:
+            return min(c.available()/c.window for c in credits)
+        return min(c.available() for c in credits)
\ No newline at end of file
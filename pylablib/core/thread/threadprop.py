@@ -1,6 +1,6 @@
 from ..utils import general
 
-from ..gui import QtCore
+from .backend import QtCore
 
 import threading
 
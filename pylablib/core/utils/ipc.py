@@ -9,8 +9,9 @@ import ctypes
 import collections
 import pickle
 import numpy as np
+import time
 
-from . import strpack
+from . import strpack, general
 
 
 class IIPCChannel:
@@ -136,6 +137,222 @@ class SharedMemIPCChannel(PipeIPCChannel):
 
 
 
+TShmemRingStatus=collections.namedtuple("TShmemRingStatus",["nslots","slot_size","queued","sent","received","dropped"])
+class SharedMemRingChannel(IIPCChannel):
+    """
+    Single-producer single-consumer IPC channel based on a multi-slot shared memory ring.
+
+    Each message (a set of numpy arrays with an optional picklable info, or an arbitrary picklable object) occupies a single slot.
+    The sender copies the data directly into a free slot, and the receiver gets the arrays as views of the slot memory (i.e., without copying),
+    which stay valid until the next receive call or an explicit :meth:`release`.
+    Slots are handed over using only the message counters stored in the shared memory and written by a single side each, so no locks or pipe round-trips are involved,
+    and the waiting is done by polling. The only exception is the ``"drop_oldest"`` policy, where a lock is used to coordinate dropping of not yet received messages.
+    Only one process should send and one process should receive the data through the channel.
+
+    Args:
+        nslots: number of slots in the ring
+        slot_size: size of a single slot in bytes (determines the maximal message size)
+        on_full: sending policy when all the slots are occupied; can be ``"wait"`` (wait until a slot is free, possibly with a timeout),
+            ``"drop"`` (drop the new message), or ``"drop_oldest"`` (drop the oldest message which has not been received yet;
+            if it is currently being held by the receiver, drop the new message instead)
+        name: name of the existing shared memory block (used when creating the peer channel); if ``None``, create a new block
+        lock: multiprocessing lock (used when creating the peer channel)
+    """
+    _meta_size=4096
+    _align=64
+    _ctrl_size=64
+    # control block entries; head and dropped are written by the sender, claimed and tail are written by the receiver
+    _c_head,_c_tail,_c_claimed,_c_dropped=range(4)
+    def __init__(self, nslots=16, slot_size=2**24, on_full="wait", name=None, lock=None):
+        if on_full not in ["wait","drop","drop_oldest"]:
+            raise ValueError("unrecognized on_full policy: {}".format(on_full))
+        from multiprocessing import shared_memory, Lock
+        IIPCChannel.__init__(self)
+        self.nslots=nslots
+        self.slot_size=((slot_size-1)//self._align+1)*self._align
+        self.on_full=on_full
+        size=self._ctrl_size+self.nslots*(self._meta_size+self.slot_size)
+        self.owner=name is None
+        if self.owner:
+            self.shm=shared_memory.SharedMemory(create=True,size=size)
+            self.shm.buf[:self._ctrl_size]=bytes(self._ctrl_size)
+        else:
+            self.shm=shared_memory.SharedMemory(name=name)
+        self.lock=(lock or Lock()) if on_full=="drop_oldest" else None
+        self._buf=np.frombuffer(self.shm.buf,dtype="u1")
+        self._ctrl=self._buf[:self._ctrl_size].view("<u8")
+        self._held=False
+        self._received=0
+
+    def get_peer_args(self):
+        """Get arguments required to create a peer connection"""
+        return (self.nslots,self.slot_size,self.on_full,self.shm.name,self.lock)
+    def close(self):
+        """
+        Close the channel.
+
+        All the arrays received without copying should be deleted beforehand.
+        The shared memory block is removed once it is closed by the creating side.
+        """
+        if self.shm is None:
+            return
+        self.release()
+        self._ctrl=self._buf=None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm=None
+
+    def _slot_meta(self, n):
+        start=self._ctrl_size+(n%self.nslots)*(self._meta_size+self.slot_size)
+        return self._buf[start:start+self._meta_size]
+    def _slot_data(self, n):
+        start=self._ctrl_size+(n%self.nslots)*(self._meta_size+self.slot_size)+self._meta_size
+        return self._buf[start:start+self.slot_size]
+    def _wait_for(self, check, timeout):
+        ctd=None if timeout is None else general.Countdown(timeout)
+        delay=1E-5
+        while not check():
+            if ctd is not None and ctd.passed():
+                return False
+            time.sleep(delay)
+            delay=min(delay*2,1E-3)
+        return True
+    def _drop_oldest(self):
+        """Drop the oldest message which is not held by the receiver; return ``True`` if it was dropped"""
+        with self.lock:
+            tail,claimed=self._ctrl[self._c_tail],self._ctrl[self._c_claimed]
+            if claimed>tail:  # the oldest message is being held by the receiver
+                return False
+            self._ctrl[self._c_claimed]=self._ctrl[self._c_tail]=tail+1
+            self._ctrl[self._c_dropped]+=1
+            return True
+    def _put(self, arrays, info, timeout=None):
+        arrays=[np.ascontiguousarray(a) for a in arrays]
+        descs=[]
+        size=0
+        for a in arrays:
+            descs.append((a.dtype.str if a.dtype.names is None else a.dtype.descr,a.shape,size))
+            size+=((a.nbytes-1)//self._align+1)*self._align if a.nbytes else 0
+        if size>self.slot_size:
+            raise ValueError("message size {} exceeds the slot size {}".format(size,self.slot_size))
+        meta=pickle.dumps((descs,info))
+        if len(meta)+8>self._meta_size:
+            raise ValueError("message info size {} exceeds the maximal size {}".format(len(meta),self._meta_size-8))
+        head=int(self._ctrl[self._c_head])
+        def has_space():
+            return head-self._ctrl[self._c_tail]<self.nslots
+        if not has_space():
+            if self.on_full=="drop_oldest":
+                if not self._drop_oldest():
+                    self._ctrl[self._c_dropped]+=1
+                    return False
+            elif self.on_full=="drop" or not self._wait_for(has_space,timeout):
+                self._ctrl[self._c_dropped]+=1
+                return False
+        smeta,sdata=self._slot_meta(head),self._slot_data(head)
+        smeta[:8].view("<u8")[0]=len(meta)
+        smeta[8:8+len(meta)]=np.frombuffer(meta,dtype="u1")
+        for a,(_,_,offset) in zip(arrays,descs):
+            sdata[offset:offset+a.nbytes]=a.reshape(-1).view("u1")
+        self._ctrl[self._c_head]=head+1  # publish the message after the data is written
+        return True
+    def _claim(self, timeout=None):
+        self.release()
+        if not self._wait_for(lambda: self._ctrl[self._c_head]>self._ctrl[self._c_tail],timeout):
+            raise TimeoutError
+        if self.lock is not None:
+            with self.lock:
+                n=int(self._ctrl[self._c_tail])
+                self._ctrl[self._c_claimed]=n+1
+        else:
+            n=int(self._ctrl[self._c_tail])
+        self._held=True
+        self._received+=1
+        return n
+    def _get(self, timeout=None, copy=False):
+        n=self._claim(timeout=timeout)
+        smeta,sdata=self._slot_meta(n),self._slot_data(n)
+        lmeta=int(smeta[:8].view("<u8")[0])
+        descs,info=pickle.loads(smeta[8:8+lmeta].tobytes())
+        arrays=[]
+        for dtype,shape,offset in descs:
+            dtype=np.dtype(dtype)
+            nbytes=int(np.prod(shape))*dtype.itemsize
+            a=sdata[offset:offset+nbytes].view(dtype).reshape(shape)
+            arrays.append(a.copy() if copy else a)
+        if copy:
+            self.release()
+        return arrays,info
+    def release(self):
+        """Release the currently held received message, so that its slot can be reused by the sender"""
+        if self._held:
+            if self.lock is not None:
+                with self.lock:
+                    self._ctrl[self._c_tail]=self._ctrl[self._c_claimed]
+            else:
+                self._ctrl[self._c_tail]+=1
+            self._held=False
+
+    def send(self, data, timeout=None):  # pylint: disable=arguments-differ
+        """
+        Send a picklable object.
+
+        Return ``True`` if the data was sent, or ``False`` if it was dropped because the ring is full.
+        """
+        return self._put([],data,timeout=timeout)
+    def recv(self, timeout=None):
+        """Receive a picklable object"""
+        return self._get(timeout=timeout,copy=True)[1]
+    def send_numpy(self, data, info=None, timeout=None):  # pylint: disable=arguments-differ
+        """
+        Send numpy array along with an optional picklable `info`.
+
+        Return ``True`` if the data was sent, or ``False`` if it was dropped because the ring is full.
+        """
+        return self._put([data],info,timeout=timeout)
+    def recv_numpy(self, timeout=None, copy=False, return_info=False):  # pylint: disable=arguments-differ
+        """
+        Receive numpy array.
+
+        If ``copy==False``, the returned array is a view of the shared memory, which is only valid until the next receive call or :meth:`release`.
+        If ``return_info==True``, return tuple ``(data, info)``.
+        """
+        arrays,info=self._get(timeout=timeout,copy=copy)
+        return (arrays[0],info) if return_info else arrays[0]
+    def send_arrays(self, arrays, info=None, timeout=None):
+        """
+        Send a list of numpy arrays (e.g., frame chunks of a single frames message) as a single message, along with an optional picklable `info`.
+
+        Return ``True`` if the data was sent, or ``False`` if it was dropped because the ring is full.
+        """
+        return self._put(arrays,info,timeout=timeout)
+    def recv_arrays(self, timeout=None, copy=False):
+        """
+        Receive a list of numpy arrays sent with :meth:`send_arrays`.
+
+        Return tuple ``(arrays, info)``. If ``copy==False``, the returned arrays are views of the shared memory, which are only valid until the next receive call or :meth:`release`.
+        """
+        return self._get(timeout=timeout,copy=copy)
+
+    def get_status(self):
+        """
+        Get the channel status.
+
+        Return tuple ``(nslots, slot_size, queued, sent, received, dropped)`` with the number of slots, slot size in bytes,
+        number of messages waiting to be received, the total number of sent messages, the number of messages received by this side,
+        and the number of messages dropped because the ring was full.
+        """
+        head,tail=int(self._ctrl[self._c_head]),int(self._ctrl[self._c_tail])
+        return TShmemRingStatus(self.nslots,self.slot_size,head-tail-(1 if self._held else 0),head,self._received,int(self._ctrl[self._c_dropped]))
+    def __enter__(self):
+        return self
+    def __exit__(self, *args):
+        self.close()
+
+
+
+
 
 TShmemVarDesc=collections.namedtuple("TShmemVarDesc",["offset","size","kind","fixed_size"])
 class SharedMemIPCTable:
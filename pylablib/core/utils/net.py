@@ -89,6 +89,8 @@ class ClientSocket:
         decllen_bo (str): Byteorder of the prepended length for ``'decllen'`` sending method.
             Can be either ``'>'`` (big-endian, default) or ``'<'``.
         decllen_ll (int): Length of the prepended length for ``'decllen'`` sending method; default is 4 bytes (corresponding to maximum of 4Gb per single length-prepended message)
+        recv_block_size (int): Size of the data block requested from the socket when receiving delimited messages in the strict mode;
+            the data received after the delimiter is kept in the internal buffer and returned by the following receiving operations.
     """
     _default_wait_callback_timeout=0.1
     def __init__(self, sock=None, timeout=None, wait_callback=None, send_method="decllen", recv_method="decllen", datatype="auto", nodelay=False):
@@ -111,6 +113,8 @@ class ClientSocket:
         self.datatype=datatype
         self.decllen_bo=">"
         self.decllen_ll=4
+        self.recv_block_size=65536
+        self._recv_buffer=bytearray()
         
     def set_wait_callback(self, wait_callback=None):
         """Set callback function for waiting during connecting or sending/receiving"""
@@ -152,6 +156,7 @@ class ClientSocket:
             self.wait_callback()
     def connect(self, host, port):
         """Connect to a remote host"""
+        self._recv_buffer.clear()
         def sock_func():
             self.sock.connect((host,port))
             self.connected=True
@@ -166,6 +171,7 @@ class ClientSocket:
             self.sock.close()
         except socket.error:
             pass
+        self._recv_buffer.clear()
         self.connected=False
     def is_connected(self):
         """Check if the connection is opened"""
@@ -191,19 +197,57 @@ class ClientSocket:
         if len(recvd)==0:
             raise SocketError("connection closed while receiving")
         return recvd
+    def _recv_into_wait(self, buffer):
+        sock_func=lambda: self.sock.recv_into(buffer)
+        try:
+            nrecvd=_wait_sock_func(sock_func,self.timeout,self.wait_callback)
+        except socket.timeout:
+            raise SocketTimeout("timeout while receiving")
+        except ConnectionResetError:
+            raise SocketError("connection closed while receiving")
+        if nrecvd==0:
+            raise SocketError("connection closed while receiving")
+        return nrecvd
+    def _pop_buffer(self, l=None):
+        """Pop at most `l` bytes (all, if `l` is ``None``) from the receive buffer"""
+        buf=self._recv_buffer
+        if l is None or l>=len(buf):
+            data=bytes(buf)
+            buf.clear()
+        else:
+            data=bytes(buf[:l])
+            del buf[:l]
+        return data
+    def get_buffered_length(self):
+        """Get the length of the data which has been received from the socket, but not returned yet"""
+        return len(self._recv_buffer)
     def _send_wait(self, msg):
         sock_func=lambda: self.sock.send(py3.as_builtin_bytes(msg))
         return _wait_sock_func(sock_func,self.timeout,self.wait_callback)
     
     def recv_fixedlen(self, l):
         """Receive fixed-length message of length `l`"""
-        chunks=[]
-        lread=0
+        chunks=[self._pop_buffer(l)] if self._recv_buffer else []
+        lread=len(chunks[0]) if chunks else 0
         while lread<l:
             chunks.append(self._recv_wait(l-lread))
             lread+=len(chunks[-1])
         buf=b"".join(chunks)
         return py3.as_datatype(buf,self.datatype)
+    def recv_fixedlen_into(self, buffer):
+        """
+        Receive fixed-length message directly into a writable `buffer` (e.g., ``bytearray`` or a contiguous numpy array), filling it completely.
+
+        Return the number of received bytes (equal to the buffer size in bytes).
+        """
+        buffer=memoryview(buffer).cast("B")
+        l=len(buffer)
+        lread=min(len(self._recv_buffer),l)
+        if lread:
+            buffer[:lread]=self._pop_buffer(lread)
+        while lread<l:
+            lread+=self._recv_into_wait(buffer[lread:])
+        return l
     def recv_delimiter(self, delim, lmax=None, chunk_l=1024, strict=False):
         """
         Receive a single message ending with a delimiter `delim` (can be several characters, or list several possible delimiter strings).
@@ -211,19 +255,36 @@ class ClientSocket:
         `lmax` specifies the maximal received length (`None` means no limit).
         `chunk_l` specifies the size of data chunk to be read in one try.
         If ``strict==False``, keep receiving as much data as possible until a delimiter is found in the end (only works properly if a single line is expected);
-        otherwise, receive the data byte-by-byte and stop as soon as a delimiter is found (equivalent to setting ``chunk_l=1``).
+        otherwise, stop as soon as a delimiter is found (same as receiving the data byte-by-byte);
+        in this case the data is received in blocks of ``recv_block_size`` bytes, and the data after the delimiter is kept for the following receiving operations.
         """
-        buf=b""
         if isinstance(delim, py3.anystring):
             delim=[delim]
         delim=[py3.as_builtin_bytes(d) for d in delim]
         if strict:
-            chunk_l=1
+            return py3.as_datatype(self._recv_delimiter_buffered(delim,lmax),self.datatype)
+        buf=bytearray(self._pop_buffer())
         while not any([buf.endswith(d) for d in delim]):
-            buf=buf+self._recv_wait(chunk_l)
+            buf+=self._recv_wait(chunk_l)
             if (lmax is not None) and len(buf)>lmax:
                 break
-        return py3.as_datatype(buf,self.datatype)
+        return py3.as_datatype(bytes(buf),self.datatype)
+    def _recv_delimiter_buffered(self, delim, lmax=None):
+        buf=self._recv_buffer
+        max_delim_len=max(len(d) for d in delim)
+        start=0
+        while True:
+            end=None
+            for d in delim:
+                pos=buf.find(d,start)
+                if pos>=0 and (end is None or pos+len(d)<end):
+                    end=pos+len(d)
+            if end is not None and (lmax is None or end<=lmax+1):
+                return self._pop_buffer(end)
+            if (lmax is not None) and len(buf)>lmax:
+                return self._pop_buffer(lmax+1)
+            start=max(len(buf)-max_delim_len+1,0) # delimiter can be split between the blocks
+            buf+=self._recv_wait(self.recv_block_size)
     def recv_decllen(self):
         """
         Receive variable-length message (prepended by its length).
@@ -248,14 +309,14 @@ class ClientSocket:
         `chunk_l` specifies the size of data chunk to be read in one try.
         For technical reasons, use 1ms timeout (i.e., this operation takes 1ms).
         """
-        buf=b""
+        buf=bytearray(self._pop_buffer())
         with self.using_timeout(1E-3):
             try:
                 while True:
                     buf+=self._recv_wait(chunk_l)
             except SocketTimeout:
                 pass
-        return py3.as_datatype(buf,self.datatype)
+        return py3.as_datatype(bytes(buf),self.datatype)
     def recv_ack(self, l=None):
         """Receive a message using the default method and send an acknowledgement (message length)"""
         msg=self.recv(l=l)
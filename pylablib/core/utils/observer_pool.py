@@ -57,22 +57,20 @@ class ObserverPool:
         self._call_cache={}
     
     def find_observers(self, tag, value):
+        """Find all observers passing the tag and value, and return them as a list of tuples ``(name, observer)`` ordered by priority"""
         try:
             to_call=self._call_cache[tag]
         except KeyError:
             to_call=[]
             for n,o in self._observers.items():
-                if (o.filt is None) or o.filt(tag,value):
+                if o.cacheable and ((o.filt is None) or o.filt(tag,value)):
                     to_call.append((n,o))
             to_call.sort(key=lambda x: -x[1].priority)
             self._call_cache[tag]=to_call
-        found_uncachable=False
-        for n,o in self._observers_uncacheable.items():
-            if (o.filt is None) or o.filt(tag,value):
-                to_call.append((n,o))
-                found_uncachable=True
-        if found_uncachable:
-            to_call.sort(key=lambda x: -x[1].priority)
+        uncacheable=[(n,o) for n,o in self._observers_uncacheable.items() if (o.filt is None) or o.filt(tag,value)]
+        if uncacheable:
+            order={n:i for i,n in enumerate(self._observers)}
+            to_call=sorted(to_call+uncacheable,key=lambda x: (-x[1].priority,order[x[0]]))
         return to_call
     def _call_observer(self, callback, tag, value):
         if self._expand_tuple and isinstance(value,tuple):
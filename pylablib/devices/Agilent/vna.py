@@ -136,9 +136,8 @@ class AgilentE5071C(SCPI.SCPIDevice):
         if fmt[0]=="ascii":
             data=self.read()
             return np.array([float(v) for v in data.split(",")])
-        data=self.read_binary_array_data()
         dtype="{}f{}".format(("<" if fmt[1]=="swapped" else ">"),(8 if fmt[0]=="float64" else 4))
-        return np.frombuffer(data,dtype=dtype)
+        return self.read_binary_block(dtype)
     def _query_trace(self, comm, fmt=None):
         if fmt is None:
             fmt=self.get_trace_format()
@@ -519,11 +519,15 @@ class AndorSDK3Camera(camera.IBinROICamera, camera.IExposureCamera, camera.IAttr
                     self.buffers=None
                     self.hbuffers=None
                     self.size=0
-        def readn(self, idx, n, size=None, off=0):
-            """Return `n` buffers starting from `idx`, taking `size` bytes from each"""
+        def readn(self, idx, n, size=None, off=0, out=None):
+            """
+            Return `n` buffers starting from `idx`, taking `size` bytes from each.
+
+            If `out` is supplied, it should be a C-contiguous ``"u1"`` array of shape ``(n,size)``, which is filled with the data and returned.
+            """
             if size is None:
                 size=self.size
-            data=np.empty((n,size),dtype="u1")
+            data=np.empty((n,size),dtype="u1") if out is None else out
             copyframes(len(self.hbuffers),ctypes.addressof(self.hbuffers),int(size),idx%len(self.hbuffers),n,off,data.ctypes.data)
             return data
         def reset(self):
@@ -778,7 +782,8 @@ class AndorSDK3Camera(camera.IBinROICamera, camera.IExposureCamera, camera.IAttr
             raise AndorError("missing image data")
         img=chunks.pop(0)
         return img,self._arrange_metadata(chunks,nframes)
-    def _read_frames(self, rng, return_info=False):
+    _support_output_buffer=True
+    def _read_frames(self, rng, return_info=False, out=None):
         height,width=self._get_data_dimensions_rc()
         bpp=self.cav["BytesPerPixel"]
         stride=self.cav["AOIStride"]
@@ -796,6 +801,13 @@ class AndorSDK3Camera(camera.IBinROICamera, camera.IExposureCamera, camera.IAttr
                 img=img[:,:exp_len]
             metadata[:,0]=np.arange(rng[0],rng[0]+nframes)
         else:
+            if out is not None and bpp in [1,2,4] and stride==width*bpp and self._image_indexing=="rct":
+                img,_=self._get_output_chunk(out,nframes,(height,width),"<u{}".format(int(bpp)))
+                if img.flags["C_CONTIGUOUS"]:
+                    self._buffer_mgr.readn(rng[0],nframes,size=height*stride,out=img.reshape(nframes,-1).view("u1"))
+                else:
+                    img[:]=self._buffer_mgr.readn(rng[0],nframes,size=height*stride).view(img.dtype).reshape(img.shape)
+                return [img],None
             img=self._buffer_mgr.readn(rng[0],nframes,size=height*stride)
             metadata=None
         if bpp==1.5:
@@ -807,6 +819,10 @@ class AndorSDK3Camera(camera.IBinROICamera, camera.IExposureCamera, camera.IAttr
                 img=img.view(dtype).reshape(nframes,height,-1)[:,:width]
             else: # only possible with bpp==2 or 4 and non-divisible stride
                 img=img.reshape((nframes,height,stride))[:,:,:width*bpp].view(dtype)
+        if out is not None:
+            oimg,rct_img=self._get_output_chunk(out,nframes,(height,width),img.dtype)
+            rct_img[:]=img
+            return [oimg],([metadata] if metadata is not None else None)
         img=self._convert_indexing(img,"rct",axes=(-2,-1))
         return [img],([metadata] if metadata is not None else None)
     def _zero_frame(self, n):
@@ -814,7 +830,7 @@ class AndorSDK3Camera(camera.IBinROICamera, camera.IExposureCamera, camera.IAttr
         bpp=self.cav["BytesPerPixel"]
         dt="<u{}".format(int(np.ceil(bpp))) # can be fractional (e.g., 1.5)
         return np.zeros((n,)+dim,dtype=dt)
-    def read_multiple_images(self, rng=None, peek=False, missing_frame="skip", return_info=False, return_rng=False):
+    def read_multiple_images(self, rng=None, peek=False, missing_frame="skip", return_info=False, return_rng=False, out=None):
         """
         Read multiple images specified by `rng` (by default, all un-read images).
 
@@ -828,5 +844,6 @@ class AndorSDK3Camera(camera.IBinROICamera, camera.IExposureCamera, camera.IAttr
         if some frames are missing and ``missing_frame!="skip"``, the corresponding frame info is ``None``.
         if ``return_rng==True``, return the range covered resulting frames; if ``missing_frame=="skip"``, the range can be smaller
         than the supplied `rng` if some frames are skipped.
+        `out` specifies an optional caller-supplied output buffer (an array or a function returning chunk arrays; see :meth:`.ICamera.read_multiple_images` for details).
         """
-        return super().read_multiple_images(rng=rng,peek=peek,missing_frame=missing_frame,return_info=return_info,return_rng=return_rng)
\ No newline at end of file
+        return super().read_multiple_images(rng=rng,peek=peek,missing_frame=missing_frame,return_info=return_info,return_rng=return_rng,out=out)
\ No newline at end of file
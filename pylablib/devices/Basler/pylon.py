@@ -674,6 +674,7 @@ class BaslerPylonCamera(camera.IROICamera, camera.IAttributeCamera, camera.IExpo
         else:
             return data.view("<u4").reshape((n,)+shape)
     _support_chunks=True
+    # the frames are returned as views into the driver buffers, so the generic output buffer handling (see ICamera.read_multiple_images) already copies them only once
     def _read_frames(self, rng, return_info=False):
         size=self._buffer_mgr.size
         shape=self.cav["Height"],self.cav["Width"]
@@ -359,7 +359,7 @@ class DCAMCamera(camera.IBinROICamera, camera.IExposureCamera, camera.IAttribute
             self._alloc_nframes=0
     def _read_buffer(self, buffer):
         return lib.dcambuf_lockframe(self.handle,buffer)
-    def _buffer_to_array(self, buffer): # TODO: different packing / color modes (generic for all cameras)
+    def _buffer_to_array(self, buffer, out=None): # TODO: different packing / color modes (generic for all cameras)
         bpp=int(buffer.bpp)
         if bpp==1:
             ct=ctypes.c_uint8*buffer.btot
@@ -370,6 +370,9 @@ class DCAMCamera(camera.IBinROICamera, camera.IExposureCamera, camera.IAttribute
         else:
             raise DCAMError("can't convert data with {} BBP into an array".format(bpp))
         data=ct.from_address(buffer.buf)
+        if out is not None:
+            out[:]=np.ctypeslib.as_array(data).reshape((buffer.height,buffer.width))
+            return out
         img=np.array(data).reshape((buffer.height,buffer.width))
         return self._convert_indexing(img,"rct")
 
@@ -522,11 +525,24 @@ class DCAMCamera(camera.IBinROICamera, camera.IExposureCamera, camera.IAttribute
         Does not advance the read frames counter.
         """
         sframe=self._read_buffer(buffer%self._alloc_nframes)
-        position=camera.TFramePosition(sframe.left,sframe.top)
-        info=TFrameInfo(buffer,sframe.framestamp,sframe.timestamp[0]*10**6+sframe.timestamp[1],sframe.camerastamp,position,sframe.type)
         data=self._buffer_to_array(sframe)
-        return data,info
-    def _read_frames(self, rng, return_info=False):
+        return data,self._get_frame_info(buffer,sframe)
+    def _get_frame_info(self, buffer, sframe):
+        position=camera.TFramePosition(sframe.left,sframe.top)
+        return TFrameInfo(buffer,sframe.framestamp,sframe.timestamp[0]*10**6+sframe.timestamp[1],sframe.camerastamp,position,sframe.type)
+    _support_output_buffer=True
+    def _read_frames(self, rng, return_info=False, out=None):
+        if out is not None:
+            sframes=[self._read_buffer(n%self._alloc_nframes) for n in range(rng[0],rng[1])]
+            fmts=[(sf.height,sf.width,int(sf.bpp)) for sf in sframes]
+            if all(f==fmts[0] for f in fmts):
+                h,w,bpp=fmts[0]
+                chunk,rct_chunk=self._get_output_chunk(out,len(sframes),(h,w),"<u{}".format(bpp))
+                for i,sf in enumerate(sframes):
+                    self._buffer_to_array(sf,out=rct_chunk[i])
+                return [chunk],[self._get_frame_info(n,sf) for n,sf in zip(range(rng[0],rng[1]),sframes)]
+            frames,infos=self._read_frames(rng,return_info=return_info)
+            return out.store(frames),infos
         data=[self._get_single_frame(n) for n in range(rng[0],rng[1])]
         return [d[0] for d in data],[d[1] for d in data]
     def _zero_frame(self, n):
@@ -534,7 +550,7 @@ class DCAMCamera(camera.IBinROICamera, camera.IExposureCamera, camera.IAttribute
         bpp=int(self.get_attribute_value("BIT PER CHANNEL",default=8))
         dt="<u{}".format((bpp-1)//8+1)
         return np.zeros((n,)+dim,dtype=dt)
-    def read_multiple_images(self, rng=None, peek=False, missing_frame="skip", return_info=False, return_rng=False):
+    def read_multiple_images(self, rng=None, peek=False, missing_frame="skip", return_info=False, return_rng=False, out=None):
         """
         Read multiple images specified by `rng` (by default, all un-read images).
 
@@ -548,5 +564,6 @@ class DCAMCamera(camera.IBinROICamera, camera.IExposureCamera, camera.IAttribute
         if some frames are missing and ``missing_frame!="skip"``, the corresponding frame info is ``None``.
         if ``return_rng==True``, return the range covered resulting frames; if ``missing_frame=="skip"``, the range can be smaller
         than the supplied `rng` if some frames are skipped.
+        `out` specifies an optional caller-supplied output buffer (an array or a function returning chunk arrays; see :meth:`.ICamera.read_multiple_images` for details).
         """
-        return super().read_multiple_images(rng=rng,peek=peek,missing_frame=missing_frame,return_info=return_info,return_rng=return_rng)
\ No newline at end of file
+        return super().read_multiple_images(rng=rng,peek=peek,missing_frame=missing_frame,return_info=return_info,return_rng=return_rng,out=out)
\ No newline at end of file
@@ -531,7 +531,7 @@ class IMAQFrameGrabber(camera.IROICamera):
         roi=self.get_roi()
         w,h=roi[1]-roi[0],roi[3]-roi[2]
         return w*h*bpp
-    def _parse_buffer(self, buffer, nframes=1):
+    def _parse_buffer(self, buffer, nframes=1, out=None):
         r,c=self._get_data_dimensions_rc()
         dt=self._get_buffer_dtype()
         # bpp=dt.itemsize
@@ -540,12 +540,17 @@ class IMAQFrameGrabber(camera.IROICamera):
         # return np.frombuffer(buffer,dtype=dt).reshape((nframes,r,c))
         cdt=ctypes.POINTER(np.ctypeslib.as_ctypes_type(dt))
         data=np.ctypeslib.as_array(ctypes.cast(buffer,cdt),shape=((nframes,r,c)))
-        return data.copy()
+        if out is not None:
+            frames,rct_frames=self._get_output_chunk(out,nframes,(r,c),dt)
+            rct_frames[:]=data
+            return frames
+        return self._convert_indexing(data.copy(),"rct",axes=(-2,-1))
     
     _support_chunks=True
-    def _read_frames(self, rng, return_info=False):
+    _support_output_buffer=True
+    def _read_frames(self, rng, return_info=False, out=None):
         raw_frames=self._buffer_mgr.get_frames_data(rng[0],rng[1]-rng[0])
-        parsed_frames=[self._convert_indexing(self._parse_buffer(b,nframes=n),"rct",axes=(-2,-1)) for n,b in raw_frames]
+        parsed_frames=[self._parse_buffer(b,nframes=n,out=out) for n,b in raw_frames]
         return parsed_frames,None
 
 
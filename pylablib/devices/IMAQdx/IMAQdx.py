@@ -415,12 +415,16 @@ class IMAQdxCamera(camera.IROICamera, camera.IAttributeCamera):
         # return last_buffer+1
         return self._cb_manager.get_nbuff()
 
-    def _read_data_raw(self, buffer_num, size_bytes, dtype="<u1", mode=IMAQdxBufferNumberMode.IMAQdxBufferNumberModeBufferNumber):
-        """Return raw bytes string from the given buffer number"""
+    def _read_data_raw(self, buffer_num, size_bytes, dtype="<u1", mode=IMAQdxBufferNumberMode.IMAQdxBufferNumberModeBufferNumber, out=None):
+        """
+        Return raw bytes string from the given buffer number.
+
+        If `out` is supplied, it should be a C-contiguous array with `size_bytes` bytes, which is filled with the data and returned.
+        """
         dtype=np.dtype(dtype)
         if size_bytes%dtype.itemsize:
             raise IMAQdxError("specified buffer size {} is not divisible by the element size {}".format(size_bytes,dtype.itemsize))
-        arr=np.empty(size_bytes//dtype.itemsize,dtype)
+        arr=np.empty(size_bytes//dtype.itemsize,dtype) if out is None else out
         lib.IMAQdxGetImageData(self.sid,arr.ctypes.data,size_bytes,mode,buffer_num)
         return arr
     def _parse_data(self, data, shape, pixel_format):
@@ -457,7 +461,9 @@ class IMAQdxCamera(camera.IROICamera, camera.IAttributeCamera):
         self._raw_readout_format_bypp=bytes_per_pixel if enable else None
         self._raw_readout_format_bypi=bytes_per_image if enable else None
 
-    def _read_frames(self, rng, return_info=False):  # TODO: add parsing and pixel format
+    _pixel_format_dtypes={"mono8":"u1","mono10":"<u2","mono12":"<u2","mono16":"<u2","mono32":"<u4"}
+    _support_output_buffer=True
+    def _read_frames(self, rng, return_info=False, out=None):  # TODO: add parsing and pixel format
         indices=range(*rng)
         shape=self.cav["Height"],self.cav["Width"]
         if self._raw_readout_format_bypi is not None:
@@ -467,6 +473,18 @@ class IMAQdxCamera(camera.IROICamera, camera.IAttributeCamera):
         else:
             size_bytes=self.cav["PayloadSize"]
         pixel_format=self.cav["PixelFormat"]
+        if out is not None:
+            dtype=self._pixel_format_dtypes.get(pixel_format.strip().replace(" ","").lower())
+            if not self._raw_readout_format and dtype is not None and shape[0]*shape[1]*np.dtype(dtype).itemsize==size_bytes:
+                chunk,rct_chunk=self._get_output_chunk(out,len(indices),shape,dtype)
+                for i,b in enumerate(indices):
+                    if rct_chunk[i].flags["C_CONTIGUOUS"]:
+                        self._read_data_raw(b,size_bytes,out=rct_chunk[i].reshape(-1).view("u1"))
+                    else:
+                        rct_chunk[i]=self._read_data_raw(b,size_bytes).view(dtype).reshape(shape)
+                return [chunk],None
+            frames,_=self._read_frames(rng,return_info=return_info)
+            return out.store(frames),None
         frames=[self._read_data_raw(b,size_bytes) for b in indices]
         frames=[self._parse_data(f,shape,pixel_format) for f in frames]
         if not self._raw_readout_format:
@@ -752,16 +752,25 @@ class PCOSC2Camera(camera.IBinROICamera, camera.IExposureCamera):
         return self.get_double_image_mode()
 
     _support_chunks=True
-    def _parse_frames_data(self, ptr, nframes, shape):
+    def _parse_frames_data(self, ptr, nframes, shape, out=None):
         stride=self._buffer_mgr.full_size
         buffer=np.ctypeslib.as_array(ctypes.cast(ptr,ctypes.POINTER(ctypes.c_ubyte)),shape=(stride*nframes,))
         size=shape[0]*shape[1]*2
+        if out is not None:
+            frames,rct_frames=self._get_output_chunk(out,nframes,shape,"<u2")
+            if rct_frames.flags["C_CONTIGUOUS"]:
+                copy_strided(buffer,rct_frames.reshape(-1).view("u1"),nframes,size,stride,0)
+                return frames
         framedata=np.empty(nframes*size,dtype="u1")
         copy_strided(buffer,framedata,nframes,size,stride,0)
+        if out is not None:
+            rct_frames[:]=framedata.view("<u2").reshape((nframes,)+shape)
+            return frames
         frames=framedata.view("<u2").reshape((nframes,)+shape)
         frames=self._convert_indexing(frames,"rct",axes=(1,2))
         return frames
-    def _read_frames(self, rng, return_info=False):
+    _support_output_buffer=True
+    def _read_frames(self, rng, return_info=False, out=None):
         shape=self._get_data_dimensions_rc()
         buffer_frames=self._buffer_mgr.nbuff
         start=rng[0]%buffer_frames
@@ -771,7 +780,7 @@ class PCOSC2Camera(camera.IBinROICamera, camera.IExposureCamera):
         else:
             l0=buffer_frames-start
             chunks=[(rng[0],start,l0),(rng[0]+l0,0,stop-start-l0)]
-        frames=[self._parse_frames_data(self._buffer_mgr.get_buffer_ptr(s),l,shape) for (_,s,l) in chunks]
+        frames=[self._parse_frames_data(self._buffer_mgr.get_buffer_ptr(s),l,shape,out=out) for (_,s,l) in chunks]
         if self._status_line_enabled and frames and len(frames[-1]):
             self._buffer_overruns=max(self._buffer_overruns,get_status_lines(frames[-1][-1,:,:])[0]-rng[-1]-1)
         return frames,None
@@ -802,7 +802,7 @@ class PvcamCamera(camera.IBinROICamera, camera.IExposureCamera, camera.IAttribut
         _,bypp=self._get_frame_params()
         dt="<u{}".format(bypp)
         return np.zeros((n,)+dim,dtype=dt)
-    def read_multiple_images(self, rng=None, peek=False, missing_frame="skip", return_info=False, return_rng=False):
+    def read_multiple_images(self, rng=None, peek=False, missing_frame="skip", return_info=False, return_rng=False, out=None):
         """
         Read multiple images specified by `rng` (by default, all un-read images).
 
@@ -816,8 +816,9 @@ class PvcamCamera(camera.IBinROICamera, camera.IExposureCamera, camera.IAttribut
         if some frames are missing and ``missing_frame!="skip"``, the corresponding frame info is ``None``.
         if ``return_rng==True``, return the range covered resulting frames; if ``missing_frame=="skip"``, the range can be smaller
         than the supplied `rng` if some frames are skipped.
+        `out` specifies an optional caller-supplied output buffer (an array or a function returning chunk arrays; see :meth:`.ICamera.read_multiple_images` for details).
         """
-        return super().read_multiple_images(rng=rng,peek=peek,missing_frame=missing_frame,return_info=return_info,return_rng=return_rng)
+        return super().read_multiple_images(rng=rng,peek=peek,missing_frame=missing_frame,return_info=return_info,return_rng=return_rng,out=out)
     def _get_grab_acquisition_parameters(self, nframes, buff_size):
         params=super()._get_grab_acquisition_parameters(nframes,buff_size)
         if params["mode"]=="snap":
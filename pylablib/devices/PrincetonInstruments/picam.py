@@ -637,7 +637,7 @@ class PicamCamera(camera.IBinROICamera, camera.IExposureCamera, camera.IAttribut
         bpp=(self.cav["Pixel Bit Depth"]-1)//8+1
         dt="<u{}".format(bpp)
         return np.zeros((n,)+dim,dtype=dt)
-    def read_multiple_images(self, rng=None, peek=False, missing_frame="skip", return_info=False, return_rng=False):
+    def read_multiple_images(self, rng=None, peek=False, missing_frame="skip", return_info=False, return_rng=False, out=None):
         """
         Read multiple images specified by `rng` (by default, all un-read images).
 
@@ -651,5 +651,6 @@ class PicamCamera(camera.IBinROICamera, camera.IExposureCamera, camera.IAttribut
         if some frames are missing and ``missing_frame!="skip"``, the corresponding frame info is ``None``.
         if ``return_rng==True``, return the range covered resulting frames; if ``missing_frame=="skip"``, the range can be smaller
         than the supplied `rng` if some frames are skipped.
+        `out` specifies an optional caller-supplied output buffer (an array or a function returning chunk arrays; see :meth:`.ICamera.read_multiple_images` for details).
         """
-        return super().read_multiple_images(rng=rng,peek=peek,missing_frame=missing_frame,return_info=return_info,return_rng=return_rng)
\ No newline at end of file
+        return super().read_multiple_images(rng=rng,peek=peek,missing_frame=missing_frame,return_info=return_info,return_rng=return_rng,out=out)
\ No newline at end of file
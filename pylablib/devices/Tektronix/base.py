@@ -510,9 +510,8 @@ class ITektronixScope(SCPI.SCPIDevice):
         fmt=data_format.DataFormat.from_desc(fmt)
         if fmt.is_ascii():
             data=self.read("raw",timeout=timeout)
-        else:
-            data=self.read_binary_array_data(timeout=timeout)
-        return self.parse_array_data(data,fmt)
+            return self.parse_array_data(data,fmt)
+        return self.read_binary_block(fmt.to_desc("numpy"),timeout=timeout)
     def _scale_data(self, data, wfmpre=None):
         wfmpre=wfmpre or self.get_wfmpre()
         xpts=(np.arange(len(data))-wfmpre["ptoff"])*wfmpre["xincr"]+wfmpre["xzero"]
@@ -526,9 +525,9 @@ class ITektronixScope(SCPI.SCPIDevice):
         self.write(":CURVE?")
         if wfmpre["fmt"].is_ascii():
             data=self.read("raw",timeout=timeout)
+            trace=self.parse_array_data(data,wfmpre["fmt"].to_desc())
         else:
-            data=self.read_binary_array_data(timeout=timeout)
-        trace=self.parse_array_data(data,wfmpre["fmt"].to_desc())
+            trace=self.read_binary_block(wfmpre["fmt"].to_desc("numpy"),timeout=timeout)
         if len(trace)!=wfmpre["pts"]:
             raise TektronixError("received data length {0} is not equal to the number of points {1}".format(len(trace),wfmpre["pts"]))
         return self._scale_data(trace,wfmpre)
@@ -608,7 +608,7 @@ class ThorlabsTLCamera(camera.IBinROICamera, camera.IExposureCamera):
             buff_size=self._default_acq_params.get("nframes",100)
         return {"nframes":buff_size,"frames_per_trigger":None,"auto_start":True}
 
-    def read_multiple_images(self, rng=None, peek=False, missing_frame="skip", return_info=False, return_rng=False):
+    def read_multiple_images(self, rng=None, peek=False, missing_frame="skip", return_info=False, return_rng=False, out=None):
         """
         Read multiple images specified by `rng` (by default, all un-read images).
 
@@ -622,5 +622,6 @@ class ThorlabsTLCamera(camera.IBinROICamera, camera.IExposureCamera):
         if some frames are missing and ``missing_frame!="skip"``, the corresponding frame info is ``None``.
         if ``return_rng==True``, return the range covered resulting frames; if ``missing_frame=="skip"``, the range can be smaller
         than the supplied `rng` if some frames are skipped.
+        `out` specifies an optional caller-supplied output buffer (an array or a function returning chunk arrays; see :meth:`.ICamera.read_multiple_images` for details).
         """
-        return super().read_multiple_images(rng=rng,peek=peek,missing_frame=missing_frame,return_info=return_info,return_rng=return_rng)
\ No newline at end of file
+        return super().read_multiple_images(rng=rng,peek=peek,missing_frame=missing_frame,return_info=return_info,return_rng=return_rng,out=out)
\ No newline at end of file
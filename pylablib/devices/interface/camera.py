@@ -3,6 +3,7 @@ from ...core.dataproc import image as image_utils
 from ...core.utils import functions as function_utils, general as general_utils, dictionary
 
 import numpy as np
+from numpy.lib.recfunctions import structured_to_unstructured
 import collections
 import contextlib
 import time
@@ -317,16 +318,16 @@ class ICamera(interface.IDevice):
         ``"chunks"`` (list of 3D "chunk" arrays; supported for some cameras and provides the best performance),
         or ``"try_chunks"`` (same as ``"chunks"``, but if chunks are not supported, set to ``"list"`` instead).
         If format is ``"chunks"`` and chunks are not supported by the camera, it results in one frame per chunk.
-        Note that if the format is set to ``"array"`` or ``"chunks"``, the frame info format is also automatically set to ``"array"``.
+        Note that if the format is set to ``"array"`` or ``"chunks"``, the frame info format is also automatically set to ``"array"`` (unless it is already ``"struct"``).
         If the format is set to ``"chunks"``, then the image info is also returned in chunks form (list of 2D info arrays with the same length as the corresponding frame chunks).
         """
         if fmt=="try_chunks":
             fmt="chunks" if self._support_chunks else "list"
         self._frame_format=fmt
-        if fmt in ["array","chunks"] and self.get_frame_info_format()!="array":
+        if fmt in ["array","chunks"] and self.get_frame_info_format() not in ["array","struct"]:
             self.set_frame_info_format("array",include_fields=self._frameinfo_include_fields)
         return self._frame_format
-    def _convert_frame_format(self, frames, info=None, chdim=0):
+    def _convert_frame_format(self, frames, info=None, chdim=0, out=None):
         """
         Convert frames and info into the currently specified format.
 
@@ -334,6 +335,7 @@ class ICamera(interface.IDevice):
         `info` can be ``None``, a list of single entries (named tuples or ``None``), or a list of 2D chunks.
         If `info` is not ``None``, its length should agree with `frames`.
         `chdim` specifies the number of additional channel (e.g., color) dimensions used to distinguish between frames and chunks.
+        `out` is an optional :class:`FrameOutputBuffer` holding the frames, which is used to avoid copying when combining them into a single array.
         """
         if self._frame_format=="chunks":
             if frames and frames[0].ndim==2+chdim:
@@ -359,13 +361,18 @@ class ICamera(interface.IDevice):
                     raise ValueError("frames and infos have different lengths: {} and {}".format(len(frames),len(info)))
                 info=[self._convert_frame_info(i) for i in info]
         else:
-            frames=np.array(frames) if frames and frames[0].ndim==2+chdim else np.concatenate(frames,axis=0)
+            if out is not None:
+                frames=out.stack(frames,chdim=chdim)
+            else:
+                frames=np.array(frames) if frames and frames[0].ndim==2+chdim else np.concatenate(frames,axis=0)
             if info is not None:
                 if info and not isinstance(info[0],np.ndarray):
                     info=[self._convert_frame_info(i) for i in info]
                 info=np.array(info) if info and info[0].ndim==1 else np.concatenate(info,axis=0)
                 if len(frames)!=len(info):
                     raise ValueError("frames and infos have different lengths: {} and {}".format(len(frames),len(info)))
+        if info is not None and self._frameinfo_format=="struct":
+            info=[self._frame_info_to_struct(i) for i in info] if self._frame_format=="chunks" else self._frame_info_to_struct(info)
         return frames,info
     
     def get_frame_info_format(self):
@@ -375,10 +382,12 @@ class ICamera(interface.IDevice):
         Can be ``"namedtuple"`` (potentially nested named tuples; convenient to get particular values),
         ``"list"`` (flat list of values, with field names are given by :meth:`get_frame_info_fields`; convenient for building a table),
         ``"array"`` (same as ``"list"``, but with a numpy array, which is easier to use for ``"chunks"`` frame format),
+        ``"struct"`` (numpy structured array with the field names given by :meth:`get_frame_info_fields`; it is a view of the ``"array"`` info,
+        so for ``"array"`` or ``"chunks"`` frame formats a whole chunk is described by a single array, and the conversion does not require copying),
         or ``"dict"`` (flat dictionary with the same fields as the ``"list"`` format; more resilient to future format changes)
         """
         return self._frameinfo_format
-    _p_frameinfo_format=interface.EnumParameterClass("frame_info_format",["namedtuple","list","array","dict"])
+    _p_frameinfo_format=interface.EnumParameterClass("frame_info_format",["namedtuple","list","array","struct","dict"])
     @interface.use_parameters(fmt="frame_info_format")
     def set_frame_info_format(self, fmt, include_fields=None):
         """
@@ -387,11 +396,13 @@ class ICamera(interface.IDevice):
         Can be ``"namedtuple"`` (potentially nested named tuples; convenient to get particular values),
         ``"list"`` (flat list of values, with field names are given by :meth:`get_frame_info_fields`; convenient for building a table),
         ``"array"`` (same as ``"list"``, but with a numpy array, which is easier to use for ``"chunks"`` frame format),
+        ``"struct"`` (numpy structured array with the field names given by :meth:`get_frame_info_fields`; it is a view of the ``"array"`` info,
+        so for ``"array"`` or ``"chunks"`` frame formats a whole chunk is described by a single array, and the conversion does not require copying),
         or ``"dict"`` (flat dictionary with the same fields as the ``"list"`` format; more resilient to future format changes)
         If `include_fields` is not ``None``, it specifies the fields included for non-``"tuple"`` formats;
         note that order or `include_fields` is ignored, and the resulting fields are always ordered same as in the original.
         """
-        if self.get_frame_format()=="array":
+        if self.get_frame_format()=="array" and fmt!="struct":
             fmt="array"
         self._frameinfo_format=fmt
         if include_fields is not None:
@@ -428,7 +439,7 @@ class ICamera(interface.IDevice):
         """
         Get the names of frame info fields.
 
-        Applicable when frame info format (set by :meth:`set_frame_info_format`) is ``"list"`` or ``"array"``.
+        Applicable when frame info format (set by :meth:`set_frame_info_format`) is ``"list"``, ``"array"``, or ``"struct"``.
         """
         if self._frameinfo_include_fields is not None:
             return list(self._frameinfo_include_fields)
@@ -436,13 +447,22 @@ class ICamera(interface.IDevice):
     def _frame_info_to_namedtuple(self, info):
         """Convert frame info array row into the named tuple format"""
         return self._TFrameInfo(*info)
+    def _frame_info_to_struct(self, info):
+        """Convert frame info array (2D array for several frames, or 1D row for a single frame) or a list of rows into the structured format"""
+        if isinstance(info,list):
+            return list(frame_info_to_struct(np.array(info),self.get_frame_info_fields())) if info else []
+        return frame_info_to_struct(info,self.get_frame_info_fields())
     def _convert_frame_info(self, info):
-        """Convert a single frame info element (``None``, named tuple or array) into the current format"""
+        """
+        Convert a single frame info element (``None``, named tuple or array) into the current format.
+
+        For the ``"struct"`` format the element is converted into the plain array format; it is turned into the structured array afterwards for the whole set of frames.
+        """
         if info is None:
-            return self._empty_frame_info(1,"array")[0] if self._frameinfo_format=="array" else None
+            return self._empty_frame_info(1,"array")[0] if self._frameinfo_format in ["array","struct"] else None
         fields=self._frameinfo_fields if self._frameinfo_include_fields is None else self._frameinfo_include_fields
         if isinstance(info,np.ndarray):
-            if self._frameinfo_format=="array":
+            if self._frameinfo_format in ["array","struct"]:
                 return info if self._frameinfo_include_fields is None else info[...,self._frameinfo_fields_mask]
             if info[0]<0:
                 return None
@@ -465,13 +485,13 @@ class ICamera(interface.IDevice):
                 info=[v for v,inc in zip(info,self._frameinfo_fields_mask) if inc]
             if self._frameinfo_format=="list":
                 return list(info)
-            if self._frameinfo_format=="array":
+            if self._frameinfo_format in ["array","struct"]:
                 info=list(info)
                 return np.array(list(info))
             return dict(zip(fields,info))
     def _default_frame_info(self, idx, fmt):
         """Create a default frame info array with the given frame indices and format"""
-        if fmt=="array":
+        if fmt in ["array","struct"]:
             ncols=len(self._frameinfo_include_fields) if self._frameinfo_include_fields is not None else len(self._frameinfo_fields)
             if self._frameinfo_include_fields is None or self._frameinfo_fields_mask[0]:
                 info=np.array(idx,dtype="i4")[:,None]
@@ -488,7 +508,7 @@ class ICamera(interface.IDevice):
         return info
     def _empty_frame_info(self, n, fmt):
         """Create an empty frame info array with the given length and format"""
-        if fmt=="array":
+        if fmt in ["array","struct"]:
             ncols=len(self._frameinfo_include_fields) if self._frameinfo_include_fields is not None else len(self._frameinfo_fields)
             return np.zeros((n,ncols),dtype="i4")-1
         return [None]*n
@@ -531,8 +551,23 @@ class ICamera(interface.IDevice):
         Frames are either in "chunk" format (list of 3D array chunks) or "list" format (list of 2D array frames);
         Infos are in "chunk" format (list of 2D info chunks), "list" format (list of named tuples or ``None``),
         or ``None`` (when not used, or info is not available; filled with default if necessary).
+
+        If the class supports output buffers (``_support_output_buffer`` is ``True``), the method also takes `out` keyword argument,
+        which is either ``None`` or a :class:`FrameOutputBuffer` object; in the latter case, all of the returned frames should be placed into the chunks
+        obtained from it (e.g., using :meth:`_get_output_chunk`). Otherwise, the frames are copied into the buffer after reading.
         """
         return [],None
+    _support_output_buffer=False
+    def _get_output_chunk(self, out, nframes, shape, dtype):
+        """
+        Get a chunk for `nframes` frames with the given shape (in the ``"rct"`` indexing, possibly with additional channel dimensions) and dtype from the output buffer `out`.
+
+        Return tuple ``(chunk, rct_chunk)``, where ``chunk`` is the chunk array in the current image indexing (which should be returned),
+        and ``rct_chunk`` is its view in the ``"rct"`` indexing (which should be filled with the frames data).
+        """
+        shape=tuple(shape)
+        chunk=out.get_chunk(nframes,image_utils.convert_shape_indexing(shape[:2],"rct",self._image_indexing)+shape[2:],dtype)
+        return chunk,image_utils.convert_image_indexing(chunk,self._image_indexing,"rct",axes=(1,2))
     def _zero_frame(self, n):
         """Return `n` zero frames (as a list or 3D numpy array) for padding the :meth:`read_multiple_images` output when ``missing_frame=="zero"``"""
         return np.zeros((n,)+self.get_data_dimensions(),dtype=self._default_image_dtype)
@@ -541,7 +576,7 @@ class ICamera(interface.IDevice):
     _adjustable_frameinfo_period=False
     _p_missing_frame=interface.EnumParameterClass("missing_frame",["none","zero","skip"])
     @interface.use_parameters
-    def read_multiple_images(self, rng=None, peek=False, missing_frame="skip", return_info=False, return_rng=False):
+    def read_multiple_images(self, rng=None, peek=False, missing_frame="skip", return_info=False, return_rng=False, out=None):
         """
         Read multiple images specified by `rng` (by default, all un-read images).
 
@@ -554,6 +589,11 @@ class ICamera(interface.IDevice):
         if some frames are missing and ``missing_frame!="skip"``, the corresponding frame info is ``None``.
         if ``return_rng==True``, return the range covered resulting frames; if ``missing_frame=="skip"``, the range can be smaller
         than the supplied `rng` if some frames are skipped.
+        `out` specifies an optional caller-supplied output buffer: either a C-contiguous numpy array with the first axis enumerating frames
+        (frames are placed there starting from the beginning), or a function which takes two arguments ``(shape, dtype)`` and returns an array with the given shape and dtype
+        (it can be called several times per read, once for every frames chunk); the returned frames are then views into this buffer
+        (zero-filled missing frames are still allocated separately).
+        For cameras which support it, the frames are read directly into the buffer; otherwise, they are copied there after reading.
         """
         if missing_frame=="none" and self._frame_format!="list":
             raise ValueError("'none' missing frames mode is only supported for 'list' file format; current format is {}".format(self._frame_format))
@@ -562,12 +602,19 @@ class ICamera(interface.IDevice):
             result=tuple([None for inc in [True,return_info,return_rng] if inc])
             return result[0] if len(result)==1 else result
         rng,skipped_frames=rng
+        if out is not None and not isinstance(out,FrameOutputBuffer):
+            out=FrameOutputBuffer(out)
         if rng[0]==rng[1]:
             images,info,chdim=[],[],0
         else:
-            frames_data=self._read_frames(rng,return_info=return_info)
+            if out is not None and self._support_output_buffer:
+                frames_data=self._read_frames(rng,return_info=return_info,out=out)  # pylint: disable=unexpected-keyword-arg
+            else:
+                frames_data=self._read_frames(rng,return_info=return_info)
             images,info=frames_data[:2]
             chdim=frames_data[2] if len(frames_data)>2 else 0
+            if out is not None and not self._support_output_buffer:
+                images=out.store(images,chdim=chdim)
         chunks=images and images[0].ndim>2+chdim
         if return_info and info is None:
             if chunks:
@@ -582,14 +629,14 @@ class ICamera(interface.IDevice):
                 images=[None]*skipped_frames+images
             if return_info:
                 if not info:
-                    info=self._empty_frame_info(skipped_frames,self._frameinfo_format)
+                    info=list(self._empty_frame_info(skipped_frames,self._frameinfo_format))
                 elif isinstance(info[0],np.ndarray):
                     info=[self._empty_frame_info(skipped_frames,"array")]+info
                 else:
                     info=self._empty_frame_info(skipped_frames,"list")+info
         if not peek:
             self._frame_counter.advance_read_frames(rng)
-        images,info=self._convert_frame_format(images,(info if return_info else None),chdim=chdim)
+        images,info=self._convert_frame_format(images,(info if return_info else None),chdim=chdim,out=out)
         rrng=rng if missing_frame=="skip" else (rng[0]-skipped_frames,rng[1])
         result=(images,)
         if return_info:
@@ -727,6 +774,33 @@ def _split_chunk_ranges(rng, frames):
     return np.column_stack((starts,ends))
 def _split_chunks_array(a, frames):
     return [a[s:e] for s,e in _split_chunk_ranges((0,len(frames)),frames)]
+def frame_info_to_struct(info, fields):
+    """
+    Convert frame info array into a numpy structured array with the given field names.
+
+    `info` is a 2D array with one row per frame (returns a 1D structured array), or a 1D array with a single frame info (returns a single record).
+    If the array is C-contiguous, the result is its view, so no data is copied. Structured arrays are returned as is.
+    """
+    info=np.asarray(info)
+    if info.dtype.names is not None:
+        return info
+    if info.shape[-1]!=len(fields):
+        raise ValueError("number of frame info columns {} is different from the number of fields {}".format(info.shape[-1],len(fields)))
+    dtype=np.dtype([(f,info.dtype) for f in fields])
+    if info.ndim==1:
+        return np.ascontiguousarray(info).view(dtype)[0]
+    return np.ascontiguousarray(info).view(dtype).reshape(len(info))
+def frame_info_to_array(info):
+    """
+    Convert structured frame info (an array or a single record) into a plain numpy array.
+
+    Return a 2D array with one row per frame for a structured array, or a 1D array for a single record.
+    Plain arrays are returned as is.
+    """
+    info=np.asarray(info)
+    if info.dtype.names is None:
+        return info
+    return structured_to_unstructured(info)
 def _first_frame(frames, info=None, chunks="auto"):
     if chunks=="auto":
         chunks=frames and frames[0].ndim==3
@@ -919,6 +993,86 @@ class FrameNotifier:
 
 
 
+class FrameOutputBuffer:
+    """
+    Output frame buffer, which manages placing the read frames into the caller-supplied memory.
+
+    Args:
+        out: either a C-contiguous numpy array with the first axis enumerating frames (frames are placed there consecutively starting from the beginning),
+            or a function which takes two arguments ``(shape, dtype)`` (shape of a frames chunk, with the first axis enumerating frames)
+            and returns an array with the given shape and dtype
+    """
+    def __init__(self, out):
+        if isinstance(out,np.ndarray) and not out.flags["C_CONTIGUOUS"]:
+            raise ValueError("output buffer should be C-contiguous")
+        self.out=out
+        self.chunks=[]
+        self.nframes=0
+
+    def get_chunk(self, nframes, frame_shape, dtype):
+        """Get an uninitialized chunk array with the shape ``(nframes,)+frame_shape`` and the given dtype to be filled with frames"""
+        shape=(nframes,)+tuple(frame_shape)
+        dtype=np.dtype(dtype)
+        if isinstance(self.out,np.ndarray):
+            if self.out.shape[1:]!=shape[1:] or self.out.dtype!=dtype:
+                raise ValueError("output buffer with frame shape {} and dtype {} does not agree with frame shape {} and dtype {}".format(self.out.shape[1:],self.out.dtype,shape[1:],dtype))
+            if self.nframes+nframes>len(self.out):
+                raise ValueError("output buffer with {} frames is too small to hold {} frames".format(len(self.out),self.nframes+nframes))
+            chunk=self.out[self.nframes:self.nframes+nframes]
+        else:
+            chunk=self.out(shape,dtype)
+            if chunk.shape!=shape or chunk.dtype!=dtype:
+                raise ValueError("supplied output chunk with shape {} and dtype {} does not agree with requested shape {} and dtype {}".format(chunk.shape,chunk.dtype,shape,dtype))
+        self.chunks.append(chunk)
+        self.nframes+=nframes
+        return chunk
+    def put(self, chunk):
+        """Copy a 3D frames chunk into the buffer and return the stored copy"""
+        stored=self.get_chunk(len(chunk),chunk.shape[1:],chunk.dtype)
+        np.copyto(stored,chunk)
+        return stored
+    def store(self, frames, chdim=0):
+        """
+        Copy frames into the buffer.
+
+        `frames` is a list of 2D frames or 3D chunks (with additional `chdim` channel dimensions).
+        Consecutive frames with the same shape are combined into single chunks.
+        Return list of the stored frames or chunks (views into the buffer) in the same format as `frames`.
+        """
+        stored=[]
+        run=[]
+        def _store_run():
+            if run:
+                chunk=self.get_chunk(len(run),run[0].shape,run[0].dtype)
+                np.stack(run,out=chunk)
+                stored.extend(chunk)
+                del run[:]
+        for f in frames:
+            if f.ndim>2+chdim:
+                _store_run()
+                stored.append(self.put(f))
+            else:
+                if run and (run[0].shape!=f.shape or run[0].dtype!=f.dtype):
+                    _store_run()
+                run.append(f)
+        _store_run()
+        return stored
+    def stack(self, frames, chdim=0):
+        """
+        Combine frames (list of 2D frames or 3D chunks stored in the buffer) into a single 3D array.
+
+        If they occupy a continuous memory region in the buffer, return the corresponding view; otherwise, concatenate them.
+        """
+        chunks=frames and frames[0].ndim>2+chdim
+        nframes=sum(len(f) for f in frames) if chunks else len(frames)
+        if nframes==self.nframes:
+            if isinstance(self.out,np.ndarray):
+                return self.out[:self.nframes]
+            if len(self.chunks)==1:
+                return self.chunks[0]
+        return np.concatenate(frames,axis=0) if chunks else np.array(frames)
+
+
 class ChunkBufferManager:
     """
     Buffer manager, which takes care of creating and removing the buffer chunks, and reading out some parts of them.
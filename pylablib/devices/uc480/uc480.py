@@ -626,25 +626,44 @@ class UC480Camera(camera.IBinROICamera,camera.IExposureCamera):
     def _frame_info_to_namedtuple(self, info):
         return self._TFrameInfo(info[0],info[1],TTimestamp(*info[2:9]),info[9],camera.TFrameSize(*info[10:12]),*info[12:14])
     _np_dtypes={8:"u1",16:"<u2",32:"<u4"}
-    def _read_buffer(self, n, return_info=False, nchan=None):
+    def _read_buffer(self, n, return_info=False, nchan=None, out=None):
         buff,dim,bpp=self._buffers[(n-self._buff_offset)%len(self._buffers)]
         frame_info=self.lib.is_GetImageInfo(self.hcam,buff[1]) if return_info else None
         if nchan is None:
             nchan=self._get_pixel_mode_settings()[1]
         shape=dim+((nchan,) if nchan>1 else ())
-        frame=np.empty(shape=shape,dtype=self._np_dtypes[bpp//nchan])
-        self.lib.is_CopyImageMem(self.hcam,buff[0],buff[1],frame.ctypes.data)
-        frame=self._convert_indexing(frame,"rct")
+        if out is not None and out.flags["C_CONTIGUOUS"]:
+            frame=out
+            self.lib.is_CopyImageMem(self.hcam,buff[0],buff[1],frame.ctypes.data)
+        else:
+            frame=np.empty(shape=shape,dtype=self._np_dtypes[bpp//nchan])
+            self.lib.is_CopyImageMem(self.hcam,buff[0],buff[1],frame.ctypes.data)
+            if out is not None:
+                out[:]=frame
+            else:
+                frame=self._convert_indexing(frame,"rct")
         if return_info:
             ts=frame_info.TimestampSystem
             ts=TTimestamp(ts.wYear,ts.wMonth,ts.wDay,ts.wHour,ts.wMinute,ts.wSecond,ts.wMilliseconds)
             size=camera.TFrameSize(frame_info.dwImageWidth,frame_info.dwImageHeight)
             frame_info=TFrameInfo(n,frame_info.u64FrameNumber,ts,frame_info.u64TimestampDevice,size,frame_info.dwIoStatus,frame_info.dwFlags)
         return frame,frame_info
-    def _read_frames(self, rng, return_info=False):
+    _support_output_buffer=True
+    def _read_frames(self, rng, return_info=False, out=None):
         nchan=self._get_pixel_mode_settings()[1]
+        chdim=0 if nchan==1 else 1
+        if out is not None:
+            buffers=[self._buffers[(n-self._buff_offset)%len(self._buffers)][1:] for n in range(rng[0],rng[1])]
+            if any(b!=buffers[0] for b in buffers):  # different frame shapes; read as usual and copy afterwards
+                frames,infos,_=self._read_frames(rng,return_info=return_info)
+                return out.store(frames,chdim=chdim),infos,chdim
+            dim,bpp=buffers[0]
+            shape=dim+((nchan,) if nchan>1 else ())
+            chunk,rct_chunk=self._get_output_chunk(out,rng[1]-rng[0],shape,self._np_dtypes[bpp//nchan])
+            data=[self._read_buffer(n,return_info=return_info and (n%self._frameinfo_period==0),nchan=nchan,out=rct_chunk[n-rng[0]]) for n in range(rng[0],rng[1])]
+            return [chunk],[d[1] for d in data],chdim
         data=[self._read_buffer(n,return_info=return_info and (n%self._frameinfo_period==0),nchan=nchan) for n in range(rng[0],rng[1])]
-        return [d[0] for d in data],[d[1] for d in data],(0 if nchan==1 else 1)
+        return [d[0] for d in data],[d[1] for d in data],chdim
     def _zero_frame(self, n):
         bpp,nchan=self._get_pixel_mode_settings()
         shape=self.get_data_dimensions()+((nchan,) if nchan>1 else ())
@@ -655,7 +674,7 @@ class UC480Camera(camera.IBinROICamera,camera.IExposureCamera):
             buff_size=self._default_acq_params.get("nframes",100)
         return {"nframes":buff_size}
 
-    def read_multiple_images(self, rng=None, peek=False, missing_frame="skip", return_info=False, return_rng=False):
+    def read_multiple_images(self, rng=None, peek=False, missing_frame="skip", return_info=False, return_rng=False, out=None):
         """
         Read multiple images specified by `rng` (by default, all un-read images).
 
@@ -671,5 +690,6 @@ class UC480Camera(camera.IBinROICamera,camera.IExposureCamera):
         if ``return_rng==True``, return the range covered resulting frames; if ``missing_frame=="skip"``, the range can be smaller
         than the supplied `rng` if some frames are skipped.
         Note that obtaining frame info might take about 2ms, so at high frame rates it will become a limiting factor.
+        `out` specifies an optional caller-supplied output buffer (an array or a function returning chunk arrays; see :meth:`.ICamera.read_multiple_images` for details).
         """
-        return super().read_multiple_images(rng=rng,peek=peek,missing_frame=missing_frame,return_info=return_info,return_rng=return_rng)
\ No newline at end of file
+        return super().read_multiple_images(rng=rng,peek=peek,missing_frame=missing_frame,return_info=return_info,return_rng=return_rng,out=out)
\ No newline at end of file
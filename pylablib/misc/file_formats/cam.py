@@ -9,6 +9,7 @@ each of which is prepended by two 4-byte integers denoting the frame dimensions.
 from ...core.utils import files as file_utils
 
 import os
+import mmap
 import numpy as np
 
 
@@ -151,6 +152,202 @@ class CamReader:
 
 
 
+class CamMemmapReader:
+    """
+    Memory-mapped reader class for .cam files.
+
+    Frames are returned as read-only views of the mapped file, so no data is copied or read until it is accessed.
+    The frame offsets are determined on opening; runs of same-size frames are checked at once, and the resulting index can be stored in a sidecar file,
+    so that the subsequent opening of the same file does not require a scan.
+    Supports determining length, indexing (including negative indices), iteration, slicing, and fancy indexing.
+    Slices and index lists return a single 3D array (the frames must have the same shape);
+    if all frames in the file have the same shape, slices are returned as (strided) views of the mapped file.
+    An incomplete frame at the end of the file (e.g., if it is still being written) is ignored; use :meth:`update` to re-scan the file.
+
+    Args:
+        path(str): path to .cam file.
+        same_size(bool): if ``True``, assume that all frames have the same size, which avoids the file scan altogether.
+        index(bool): if ``True``, use a sidecar index file (the .cam file path with added ``".idx"`` extension):
+            if it exists and is valid, load frame offsets from it; otherwise, save the offsets there after scanning the file.
+    """
+    def __init__(self, path, same_size=False, index=True):
+        self.path=file_utils.normalize_path(path)
+        self.same_size=same_size
+        self.index_path=self.path+".idx" if index else None
+        self._offsets=np.zeros(0,dtype="i8")
+        self._end=0
+        self._stride=None
+        self._mmap=None
+        self._data=None
+        self.update()
+
+    def _open_map(self):
+        self._mmap=self._data=None
+        file_size=os.path.getsize(self.path)
+        if file_size:
+            with open(self.path,"rb") as f:
+                self._mmap=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+            self._data=np.frombuffer(self._mmap,dtype="u1")
+        return file_size
+    def close(self):
+        """Release the file mapping (it is closed after all the returned frames are deleted)"""
+        self._mmap=self._data=None
+    def __enter__(self):
+        return self
+    def __exit__(self, *args):
+        self.close()
+
+    def _get_header(self, offset):
+        return self._data[offset:offset+8].view("<u4")
+    def _scan_run(self, offset, file_size):
+        """Find all consecutive complete frames starting at `offset` and having the same size; return their offsets"""
+        if offset+8>file_size:
+            return None
+        shape=self._get_header(offset)
+        recsize=8+int(shape[0])*int(shape[1])*2
+        nmax=(file_size-offset)//recsize
+        if nmax==0:
+            return None
+        if self.same_size:
+            return offset+np.arange(nmax,dtype="i8")*recsize
+        n,nchk=1,16
+        while n<nmax:  # check headers at the predicted positions in geometrically increasing blocks
+            nchk=min(nchk,nmax-n)
+            headers=np.ndarray((nchk,2),dtype="<u4",buffer=self._mmap,offset=offset+n*recsize,strides=(recsize,4))
+            mismatch=np.nonzero((headers!=shape).any(axis=1))[0]
+            if len(mismatch):
+                n+=mismatch[0]
+                break
+            n+=nchk
+            nchk*=2
+        return offset+np.arange(n,dtype="i8")*recsize
+    def _update_stride(self):
+        """Determine the frame stride if all frames are evenly spaced and have the same shape (otherwise, set it to ``None``)"""
+        self._stride=None
+        if len(self._offsets)>1:
+            stride=int(self._offsets[1]-self._offsets[0])
+            if self._offsets[-1]-self._offsets[0]==stride*(len(self._offsets)-1) and np.all(np.diff(self._offsets)==stride):
+                headers=np.ndarray((len(self._offsets),2),dtype="<u4",buffer=self._mmap,offset=int(self._offsets[0]),strides=(stride,4))
+                if (headers==headers[0]).all():  # same-size frames can still have different shapes
+                    self._stride=stride
+        elif len(self._offsets)==1:
+            self._stride=self._end-int(self._offsets[0])
+    def update(self):
+        """
+        Update the file mapping and the frame offsets.
+
+        Useful if the file has been expanded since opening.
+        Return the new number of frames.
+        """
+        file_size=self._open_map()
+        if self.index_path is not None and not len(self._offsets) and os.path.exists(self.index_path):
+            self.load_index()
+        if self._end>file_size:
+            self._offsets=np.zeros(0,dtype="i8")
+            self._end=0
+        runs=[self._offsets]
+        while True:
+            run=self._scan_run(self._end,file_size)
+            if run is None:
+                break
+            runs.append(run)
+            self._end=int(run[-1])+8+int(np.prod(self._get_header(run[-1]),dtype="i8"))*2
+            if self.same_size:
+                break
+        if len(runs)>1:
+            self._offsets=np.concatenate(runs)
+            if self.index_path is not None:
+                self.save_index()
+        self._update_stride()
+        return len(self._offsets)
+
+    def save_index(self, path=None):
+        """
+        Save the frame offsets index.
+
+        By default, save it into the sidecar file (the .cam file path with added ``".idx"`` extension).
+        """
+        path=path or self.path+".idx"
+        with open(path,"wb") as f:
+            np.save(f,np.append(self._offsets,self._end).astype("<i8"))
+    def load_index(self, path=None):
+        """
+        Load the frame offsets index.
+
+        By default, load it from the sidecar file (the .cam file path with added ``".idx"`` extension).
+        If the index is inconsistent with the file (e.g., the file has been overwritten), ignore it.
+        Return ``True`` if the index has been loaded and ``False`` otherwise.
+        """
+        path=path or self.path+".idx"
+        try:
+            with open(path,"rb") as f:
+                index=np.load(f).astype("i8")
+        except (OSError,ValueError):
+            return False
+        offsets,end=index[:-1],int(index[-1]) if len(index) else 0
+        if self._data is None or end>len(self._data) or (len(offsets) and offsets[-1]+8>end):
+            return False
+        if len(offsets):
+            last_shape=self._get_header(offsets[-1])
+            if offsets[0]!=0 or offsets[-1]+8+int(last_shape[0])*int(last_shape[1])*2!=end:
+                return False
+        self._offsets,self._end=offsets,end
+        return True
+
+    def size(self):
+        """Get the total number of frames"""
+        return len(self._offsets)
+    __len__=size
+
+    def _frame_at(self, offset):
+        h,w=self._get_header(offset)
+        return self._data[offset+8:offset+8+int(h)*int(w)*2].view("<u2").reshape((h,w))
+    def _strided_frames(self):
+        offset=int(self._offsets[0])
+        h,w=self._get_header(offset)
+        return np.ndarray((len(self._offsets),h,w),dtype="<u2",buffer=self._mmap,offset=offset+8,strides=(self._stride,int(w)*2,2))
+    def _stack_frames(self, offsets):
+        if not len(offsets):
+            return np.zeros((0,0,0),dtype="<u2")
+        headers=self._data[offsets[:,None]+np.arange(8)].view("<u4")
+        if (headers!=headers[0]).any():
+            raise ValueError("can not stack frames with different sizes")
+        return np.stack([self._frame_at(o) for o in offsets])
+    def __getitem__(self, idx):
+        nframes=len(self._offsets)
+        if isinstance(idx,slice):
+            if self._stride is not None and nframes:
+                return self._strided_frames()[idx]
+            return self._stack_frames(self._offsets[idx])
+        if np.ndim(idx)==0:
+            idx=int(idx)
+            if idx<-nframes or idx>=nframes:
+                raise IndexError("index {} is out of range".format(idx))
+            return self._frame_at(int(self._offsets[idx]))
+        idx=np.asarray(idx)
+        if self._stride is not None and nframes:
+            return self._strided_frames()[idx]
+        return self._stack_frames(self._offsets[idx])
+    def get_data(self, idx):
+        """Get a single frame at the given index"""
+        return self[idx]
+    def __iter__(self):
+        return self.iterrange()
+    def iterrange(self, *args):
+        """
+        iterrange([start,] stop[, step])
+
+        Iterate over frames starting with `start` ending at `stop` (``None`` means until the end of file) with the given `step`.
+        """
+        for o in self._offsets[slice(*args)] if args else self._offsets:
+            yield self._frame_at(int(o))
+    def read_all(self):
+        """Read all available frames as a list of views"""
+        return list(self.iterrange())
+
+
+
+
 ##### Simple interface functions #####
 def iter_cam_frames(path, start=0, step=1):
     """
@@ -1,5 +1,5 @@
 from ... import device_thread
-from ...stream import stream_manager, stream_message
+from ...stream import stream_manager, stream_message, frame_pool
 from ....core.utils import dictionary, funcargparse
 from ....devices.interface import camera as cam_utils
 
@@ -63,10 +63,14 @@ class GenericCameraThread(device_thread.DeviceThread):
         - ``"frames/fps"``: calculated frame streaming fps (averaged over 1 second)
         - ``"frames/last_idx"``: index of the last acquired frame
         - ``"frames/last_frame"``: last acquired frame
+        - ``"frames/pool"``: frame pool status (see :meth:`.FramePool.get_status`), or ``None`` if the pool is not used
         - ``"parameters"``: camera settings
 
     Multicasts:
         - ``"frames/new"``: newly acquired frames; a list of tuples ``(idx, frame)`` of frame index and frame value (except for :class:`IMAQPhotonFocusCameraThread`)
+            if the frame pool is used (see :meth:`setup_frame_pool`), the frame chunks are views into the pool blocks, and the blocks are stored in the message ``pool_blocks`` attribute;
+            if ``"add_info"`` parameter is ``True``, the message also contains frame info, which is a 2D array per chunk,
+            or a 1D structured array with the field names given by the ``"frame_info_fields"`` metainfo entry if ``"info_format"`` parameter is ``"struct"``
 
     External methods (deal with synchronization, so should be called directly):
         - ``wait_acq``: wait until streaming is in a given state (started or stopped)
@@ -79,6 +83,7 @@ class GenericCameraThread(device_thread.DeviceThread):
         - ``acq_stop``: stop camera acquisition loop
         - ``wait_acq``: wait until a given acquisition status (used for waiting until the camera enters or exits the acquisition loop)
         - ``wait_for_next_frame``: wait unit the next frame is acquired
+        - ``setup_frame_pool``: set up preallocated frame pool
     """
     parameter_variables={"frame_info_fields"} # list of settings to be updated when camera thread is running (to be overloaded in subclasses)
     parameter_freeze_running={} # list of settings which do not need to be updated when running
@@ -106,6 +111,8 @@ class GenericCameraThread(device_thread.DeviceThread):
         def_time,def_frames=self._default_min_buffer_size
         self.min_buffer_size=self.misc.get("buffer/min_size/time",def_time),self.misc.get("buffer/min_size/frames",def_frames)
         self.fps_calc=RateCalculator(1.)
+        self.frame_pool=None
+        self.setup_frame_pool(self.misc.get("buffer/pool/nblocks",0),self.misc.get("buffer/pool/block_size",None))
         self.open()
         self.add_job("update_parameters",self.update_parameters,self.parameters_update_time)
         self._update_aux_parameters()
@@ -116,6 +123,7 @@ class GenericCameraThread(device_thread.DeviceThread):
         self.add_command("modify_updated_camera_attributes",self.modify_updated_camera_attributes)
         self.add_command("set_camera_attributes_error_action",self.set_camera_attributes_error_action)
         self.add_command("clear_camera_attributes_error",self.clear_camera_attributes_error)
+        self.add_command("setup_frame_pool",self.setup_frame_pool)
         self.add_batch_job("acq_loop",self.acq_loop,self.acq_finalize)
         self.add_acq_loop("regular",self.acq_loop_regular,self.acq_finalize_regular)
         self.v["stream/sn"]=self.name
@@ -127,6 +135,7 @@ class GenericCameraThread(device_thread.DeviceThread):
         self.TimeoutError=self.rpyc_obtain(self.device.TimeoutError)
         self.FrameTransferError=self.rpyc_obtain(self.device.FrameTransferError)
         self.v["parameters/add_info"]=False
+        self.v["parameters/info_format"]="array"
         if self._default_updated_camera_attributes=="all":
             self._updated_camera_attributes={a:True for a in self.rpyc_obtain(self.device.get_all_attributes())}
         else:
@@ -245,6 +254,24 @@ class GenericCameraThread(device_thread.DeviceThread):
                 aux_info.update({"camera_attributes_desc":self.device.ca[""]})
         return aux_info
 
+    def setup_frame_pool(self, nblocks=0, block_size=None):
+        """
+        Set up the preallocated frame pool.
+
+        If the pool is used, the frames are read directly into chunks stored in a ring of `nblocks` preallocated blocks of `block_size` bytes each
+        (by default, the maximal chunk size, which is 1Mb by default), so that the steady state acquisition does not allocate new frame memory.
+        The block size should be at least the size of a single frame; the reading is then split into chunks fitting into a single block.
+        The blocks are reused as soon as all the frame chunks referencing them are released by the consumers;
+        if the pool is exhausted, the new chunks are allocated as usual, which is reflected in the pool status (``"frames/pool"`` variable).
+        If ``nblocks==0``, do not use the pool.
+        """
+        self._pool_frame_nbytes=None
+        if nblocks:
+            self.frame_pool=frame_pool.FramePool(nblocks,block_size or self._max_chunk_size_bytes)
+            self.v["frames/pool"]=self.frame_pool.get_status()._asdict()
+        else:
+            self.frame_pool=None
+            self.v["frames/pool"]=None
     def _reset_frame_counters(self):
         self.v["frames/acquired"]=0
         self.v["frames/read"]=0
@@ -269,7 +296,7 @@ class GenericCameraThread(device_thread.DeviceThread):
     def _set_camera_attribute(self, name, value):
         self.device.cav[name]=value
     def _apply_additional_parameters(self, parameters):
-        for k in ["add_info"]:
+        for k in ["add_info","info_format"]:
             if k in parameters:
                 self.v["parameters",k]=parameters.pop(k)
         parameters=dictionary.Dictionary(parameters)
@@ -312,20 +339,26 @@ class GenericCameraThread(device_thread.DeviceThread):
             if "tag" in parameters:
                 self.v["parameters/tag"]=parameters["tag"]
 
+    def _get_frame_info_fields(self):
+        """Get the names of the expanded frame info fields"""
+        fields=self.v["parameters/frame_info_fields"]
+        return fields[:1]+["acq_timestamp_ms","width","height"]+fields[1:]
     def _get_metainfo(self, frames, indices, infos):  # pylint: disable=unused-argument
         metainfo={}
         parameters=self.v["parameters"]
         if parameters["add_info"]:
-            fields=parameters["frame_info_fields"]
-            metainfo["frame_info_fields"]=fields[:1]+["acq_timestamp_ms","width","height"]+fields[1:]
+            metainfo["frame_info_fields"]=self._get_frame_info_fields()
         if "roi" in parameters:
             metainfo["roi"]=parameters["roi"]
         return metainfo
     def _build_chunks(self, frames, infos, max_size=None, chandim=0):
         if infos is not None and not all(isinstance(inf,np.ndarray) for inf in infos):
-            return frames,infos
+            return frames,infos,None
         if any(f.ndim==3+chandim for f in frames):
-            return frames,infos
+            return frames,infos,None
+        pool=self.frame_pool
+        if pool is not None:
+            max_size=pool.block_size
         max_size=max_size or self._max_chunk_size_bytes
         chunks=[]
         s=None
@@ -333,31 +366,111 @@ class GenericCameraThread(device_thread.DeviceThread):
         for i,f in enumerate(frames):
             if s is None:
                 s=i
-            elif curr_size>max_size or frames[s].shape!=f.shape or (infos is not None and infos[s].shape!=infos[i].shape):
+            elif (curr_size+f.nbytes>max_size if pool is not None else curr_size>max_size) or frames[s].shape!=f.shape or (infos is not None and infos[s].shape!=infos[i].shape):
                 chunks.append((s,i))
                 s=i
                 curr_size=0
             curr_size+=f.nbytes
         if s is not None:
             chunks.append((s,len(frames)))
-        frames=[np.asarray(frames[s:e]) for s,e in chunks]
+        if pool is not None:
+            blocks=[]
+            chunked_frames=[]
+            for s,e in chunks:
+                ch,blk=pool.acquire((e-s,)+frames[s].shape,frames[s].dtype)
+                np.stack(frames[s:e],out=ch)
+                chunked_frames.append(ch)
+                blocks.append(blk)
+            frames=chunked_frames
+        else:
+            blocks=None
+            frames=[np.asarray(frames[s:e]) for s,e in chunks]
         if infos is not None:
             infos=[np.asarray(infos[s:e]) for s,e in chunks]
-        return frames,infos
+        return frames,infos,blocks
+    def _read_pooled_images(self, rng, return_info=False):
+        """
+        Read images in the given range directly into the frame pool blocks.
+
+        The range is split into several reads, so that each resulting chunk fits into a single block.
+        Return tuple ``(frames, infos, pool_chunks)``, where ``pool_chunks`` is a list of tuples ``(chunk, block)`` with the used pool chunks.
+        """
+        pool_chunks=[]
+        def get_pool_chunk(shape, dtype):
+            chunk,block=self.frame_pool.acquire(shape,dtype)
+            pool_chunks.append((chunk,block))
+            return chunk
+        frames,infos=[],([] if return_info else None)
+        s=rng[0]
+        while s<rng[1]:
+            n=max(self.frame_pool.block_size//self._pool_frame_nbytes,1) if self._pool_frame_nbytes else 1
+            e=min(s+n,rng[1])
+            if return_info:
+                new_frames,new_infos=self.device.read_multiple_images((s,e),return_info=True,out=get_pool_chunk)
+                if isinstance(new_infos,np.ndarray):  # "array" frame format
+                    infos.append(new_infos)
+                else:
+                    infos+=new_infos
+            else:
+                new_frames=self.device.read_multiple_images((s,e),out=get_pool_chunk)
+            if isinstance(new_frames,np.ndarray):  # "array" frame format
+                frames.append(new_frames)
+            else:
+                frames+=new_frames
+            if pool_chunks and len(pool_chunks[-1][0]):
+                self._pool_frame_nbytes=pool_chunks[-1][0][0].nbytes
+            s=e
+        return frames,infos,pool_chunks
+    def _collect_pool_chunks(self, frames, infos, pool_chunks, chandim=0):
+        """Replace read frames with the frame pool chunks holding them, and split infos correspondingly"""
+        nframes=sum(len(f) for f in frames) if (frames and frames[0].ndim==3+chandim) else len(frames)
+        if sum(len(ch) for ch,_ in pool_chunks)!=nframes:
+            return self._build_chunks(frames,infos,chandim=chandim)
+        if infos and not all(isinstance(inf,np.ndarray) for inf in infos):  # per-frame info tuples (e.g., for "list" frame info format)
+            try:
+                arr_infos=np.asarray(infos)  # info tuples are converted into arrays when expanded in any case
+            except ValueError:
+                arr_infos=None
+            if arr_infos is None or arr_infos.ndim!=2 or arr_infos.dtype==object:  # irregular infos; send the pooled frames unchunked
+                return frames,infos,[blk for _,blk in pool_chunks]
+            infos=arr_infos
+        chunks=[ch for ch,_ in pool_chunks]
+        if infos is not None:
+            if not isinstance(infos,np.ndarray):
+                infos=np.concatenate(infos,axis=0) if (infos and infos[0].ndim==2) else np.asarray(infos)
+            ends=np.cumsum([len(ch) for ch in chunks])
+            infos=[infos[e-len(ch):e] for ch,e in zip(chunks,ends)]
+        return chunks,infos,[blk for _,blk in pool_chunks]
     def _expand_frame_infos(self, frames, indices, infos, chandim=0):  # pylint: disable=unused-argument
         if infos is None:
             return None
         timestamp=int(time.time()*1E3)
-        infos=[np.column_stack([i[:,0],[timestamp]*len(i),[f.shape[-1-chandim]]*len(i),[f.shape[-2-chandim]]*len(i),i[:,1:]]) for i,f in zip(infos,frames)]
-        infos=[i[0] if f.ndim==2+chandim else i for i,f in zip(infos,frames)]
-        return infos
+        fields=self._get_frame_info_fields() if self.v["parameters/info_format"]=="struct" else None
+        expanded=[]
+        for i,f in zip(infos,frames):
+            i=np.asarray(i)
+            if i.ndim==1:
+                i=i[None,:]
+            ei=np.empty((len(i),i.shape[1]+3),dtype=np.result_type(i.dtype,np.int64))
+            ei[:,0]=i[:,0]
+            ei[:,1]=timestamp
+            ei[:,2]=f.shape[-1-chandim]
+            ei[:,3]=f.shape[-2-chandim]
+            ei[:,4:]=i[:,1:]
+            if fields is not None:
+                ei=cam_utils.frame_info_to_struct(ei,fields)
+            expanded.append(ei[0] if f.ndim==2+chandim else ei)
+        return expanded
     def _read_send_images(self):
         """Read and send new available images"""
         rng=self.device.get_new_images_range()
         nsent=0
         frame_fmt=self.device.get_frame_format()
         if rng:
-            if self.v["parameters/add_info"]:
+            pool_chunks=None
+            if self.frame_pool is not None and self.rpyc_serv is None:
+                frames,infos,pool_chunks=self._read_pooled_images(rng,return_info=self.v["parameters/add_info"])
+            elif self.v["parameters/add_info"]:
                 frames,infos=self.device.read_multiple_images(rng,return_info=self.v["parameters/add_info"])
                 if frame_fmt=="array":
                     infos=[self.rpyc_obtain(infos)]
@@ -366,15 +479,19 @@ class GenericCameraThread(device_thread.DeviceThread):
             else:
                 frames=self.device.read_multiple_images(rng)
                 infos=None
-            if frame_fmt=="array":
-                frames=[self.rpyc_obtain(frames)]
-            else:
-                frames=self.rpyc_obtain(frames)
+            if pool_chunks is None:
+                if frame_fmt=="array":
+                    frames=[self.rpyc_obtain(frames)]
+                else:
+                    frames=self.rpyc_obtain(frames)
             if frames:
                 chandim=frames[0].ndim-(2 if frame_fmt=="list" else 3)
             else:
                 chandim=0
-            frames,infos=self._build_chunks(frames,infos,chandim=chandim)
+            if pool_chunks:
+                frames,infos,blocks=self._collect_pool_chunks(frames,infos,pool_chunks,chandim=chandim)
+            else:
+                frames,infos,blocks=self._build_chunks(frames,infos,chandim=chandim)
             if frames and frames[0].ndim==3+chandim:
                 lch=np.array([len(f) for f in frames])
                 nread=int(sum(lch))
@@ -389,9 +506,10 @@ class GenericCameraThread(device_thread.DeviceThread):
             self.v["frames/last_idx"]=rng[1]-1
             nsent=len(frames)
             if nsent:
-                msg=self.frames_src.build_message(frames,indices,infos,source="camera",metainfo=self._get_metainfo(frames,indices,infos),chandim=chandim,sn=self.name)
+                msg=self.frames_src.build_message(frames,indices,infos,source="camera",metainfo=self._get_metainfo(frames,indices,infos),chandim=chandim,pool_blocks=blocks,sn=self.name)
                 self.send_multicast("any","frames/new",msg)
-                self.v["frames/last_frame"]=frames[-1] if frames[-1].ndim==2 else frames[-1][-1]
+                last_frame=frames[-1] if frames[-1].ndim==2 else frames[-1][-1]
+                self.v["frames/last_frame"]=last_frame.copy() if blocks else last_frame # avoid holding the pool block
         return nsent
 
     def add_acq_loop(self, name, loop, finalize=None):
@@ -460,6 +578,8 @@ class GenericCameraThread(device_thread.DeviceThread):
             if dt<self.min_poll_period:
                 self.sleep(self.min_poll_period-dt)
             self.v["frames/fps"]=self.fps_calc.update(self.v["frames/acquired"])
+            if self.frame_pool is not None:
+                self.v["frames/pool"]=self.frame_pool.get_status()._asdict()
             yield
     def acq_finalize_regular(self):
         """Finalize regular acquisition loop"""
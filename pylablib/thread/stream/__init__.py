@@ -1,2 +1,4 @@
 from .stream_message import IStreamMessage, DataStreamMessage, GenericDataStreamMessage, DataBlockMessage, FramesMessage, FramesAccumulator
-from .stream_manager import StreamIDCounter, MultiStreamIDCounter, StreamSource, AccumulatorStreamReceiver
\ No newline at end of file
+from .stream_manager import StreamIDCounter, MultiStreamIDCounter, StreamSource, AccumulatorStreamReceiver
+from .frame_pool import FramePool
+from .frame_ipc import FramesMessageRingSender, FramesMessageRingReceiver
@@ -0,0 +1,241 @@
+"""
+Incremental running statistics over a sliding window of frames.
+
+Used to update running backgrounds with the cost proportional to the number of pixels (instead of the number of pixels times the number of frames) per frame.
+"""
+
+import numpy as np
+
+
+
+class RunningSumAccumulator:
+    """
+    Running sum and mean accumulator.
+
+    Frames are added to and removed from the accumulated sum one by one.
+    For integer frames the sum is accumulated in 64-bit integers, so the result is exact;
+    for float frames it is accumulated in double precision floats.
+    """
+    def __init__(self):
+        self.clear()
+    def clear(self):
+        """Remove all frames from the accumulator"""
+        self._sum=None
+        self.count=0
+    def add(self, frame):
+        """Add the frame to the accumulator"""
+        if self._sum is None:
+            self._sum=np.zeros(frame.shape,dtype="i8" if frame.dtype.kind in "uib" else "f8")
+        self._sum+=frame
+        self.count+=1
+    def remove(self, frame):
+        """Remove the frame (previously added to the accumulator)"""
+        self._sum-=frame
+        self.count-=1
+        if not self.count:
+            self.clear()
+    def get_value(self, mode="mean"):
+        """Get the accumulated value; `mode` can be ``"mean"`` or ``"sum"``"""
+        if self._sum is None:
+            return None
+        if mode=="sum":
+            return self._sum.copy()
+        if mode=="mean":
+            return self._sum/self.count
+        raise ValueError("unsupported accumulator mode: {}".format(mode))
+
+
+class RunningHistogramAccumulator:
+    """
+    Approximate running percentile (e.g., median) accumulator.
+
+    Keeps a per-pixel histogram of the values with a fixed number of bins, and tracks the percentile bin of every pixel as the frames are added and removed.
+    Both adding and removing a frame, as well as the percentile calculation, take time proportional to the number of pixels.
+    Same as in :func:`numpy.percentile`, the percentile value is linearly interpolated between the values at the two neighboring (integer) ranks (e.g., the median of an even number of frames
+    is the mean of the two middle values), and each of these values is linearly interpolated within its bin;
+    hence, the result is exact for the integer frames with the bin width of 1 (e.g., 8-bit frames with at least 256 bins),
+    and otherwise is within one bin width of the actual value (e.g., for 16-bit frames with the range determined automatically the bin width is ``span/128``,
+    where ``span`` is the values span of the frames used to set up the range).
+    Values outside of the histogram range are assigned to the edge bins, which makes the result inaccurate.
+    If the range is determined automatically, such frames are tracked (see :meth:`is_clipped`), and the accumulator can be rebuilt with a new range using :meth:`rebuild`.
+    Histogram takes ``nbins*npixels*2`` bytes (or ``nbins*npixels*4`` bytes if `max_count` is above 65535);
+    if this size exceeds `max_memory`, setting up the histogram raises an error (see :meth:`get_histogram_size`).
+
+    Args:
+        q: calculated percentile (between 0 and 100; 50 corresponds to the median)
+        nbins: maximal number of histogram bins
+        hist_range: histogram range ``(min, max)``; if ``None``, use the whole range for 8-bit integer frames,
+            and otherwise determine it from the first added frame, or from all the frames passed to :meth:`rebuild` (their values span plus a half of the span on each side)
+        max_count: maximal number of simultaneously accumulated frames
+        max_memory: maximal histogram size in bytes
+    """
+    def __init__(self, q=50, nbins=256, hist_range=None, max_count=2**16-1, max_memory=2**30):
+        if not 0<=q<=100:
+            raise ValueError("percentile should be between 0 and 100; got {}".format(q))
+        self.q=q
+        self.nbins=nbins
+        self.hist_range=hist_range
+        self.max_count=max_count
+        self.max_memory=max_memory
+        self.clear()
+    def clear(self):
+        """Remove all frames from the accumulator"""
+        self._hist=None
+        self._shape=None
+        self._integer=False
+        self._range=None
+        self._auto_range=False
+        self._nclipped=0
+        self._bin_width=None
+        self._bin=None
+        self._below=None
+        self._lazy_updates=0
+        self.count=0
+
+    def get_histogram_size(self, shape):
+        """Get the maximal histogram size (in bytes) for the frames with the given shape"""
+        return self.nbins*int(np.prod(shape))*(2 if self.max_count<2**16 else 4)
+    def _setup(self, frames):
+        frame=frames[0]
+        size=self.get_histogram_size(frame.shape)
+        if size>self.max_memory:
+            raise ValueError("histogram size {} bytes for frame shape {} exceeds the maximal size {} bytes".format(size,frame.shape,self.max_memory))
+        self._shape=frame.shape
+        self._integer=frame.dtype.kind in "uib"
+        self._auto_range=False
+        if self.hist_range is not None:
+            lo,hi=self.hist_range
+        elif self._integer and frame.dtype.itemsize==1:
+            lo,hi=np.iinfo(frame.dtype).min,np.iinfo(frame.dtype).max+1
+        else:
+            lo=min([np.nanmin(f) for f in frames])
+            hi=max([np.nanmax(f) for f in frames])+(1 if self._integer else 0)
+            span=max(hi-lo,1)
+            lo,hi=lo-span/2,hi+span/2
+            self._auto_range=True
+        if self._integer:
+            lo,hi=int(np.floor(lo)),int(np.ceil(hi))
+            width=max((hi-lo-1)//self.nbins+1,1)
+            nbins=(hi-lo-1)//width+1
+        else:
+            nbins=self.nbins
+            width=(hi-lo)/nbins if hi>lo else 1.
+        self._range=(lo,hi)
+        self._bin_width=width
+        npix=int(np.prod(frame.shape))
+        self._hist=np.zeros((nbins,npix),dtype="u2" if self.max_count<2**16 else "u4")
+        self._pix=np.arange(npix)
+        self._bin=np.zeros(npix,dtype="i8")
+        self._below=np.zeros(npix,dtype="i8")
+    def _get_bins(self, frame):
+        lo=self._range[0]
+        if self._integer:
+            bins=(frame.ravel().astype("i8")-lo)//self._bin_width
+        else:
+            bins=np.floor((frame.ravel()-lo)/self._bin_width).astype("i8")
+        return np.clip(bins,0,len(self._hist)-1,out=bins)
+    def _is_outside(self, frame):
+        """Check if the frame has values outside of the histogram range"""
+        lo,hi=self._range
+        return np.min(frame)<lo or (np.max(frame)>=hi if self._integer else np.max(frame)>hi)
+    def _update(self, frame, delta):
+        if self._auto_range and self._is_outside(frame):
+            self._nclipped+=delta
+        bins=self._get_bins(frame)
+        below=bins<self._bin
+        flat_hist=self._hist.reshape(-1)
+        bins*=len(self._pix)
+        bins+=self._pix
+        if delta>0:  # every pixel is updated exactly once, so there are no repeated indices
+            flat_hist[bins]+=1
+            self._below+=below
+        else:
+            flat_hist[bins]-=1
+            self._below-=below
+        self.count+=delta
+        self._lazy_updates+=1
+    def add(self, frame):
+        """Add the frame to the accumulator"""
+        if self._hist is None:
+            self._setup([frame])
+        elif frame.shape!=self._shape:
+            raise ValueError("frame shape {} is different from the accumulated shape {}".format(frame.shape,self._shape))
+        if self.count>=self.max_count:
+            raise ValueError("maximal number of accumulated frames {} is exceeded".format(self.max_count))
+        self._update(frame,1)
+    def remove(self, frame):
+        """Remove the frame (previously added to the accumulator)"""
+        self._update(frame,-1)
+        if not self.count:
+            self.clear()
+    def is_clipped(self):
+        """
+        Check if any of the accumulated frames has values outside of the automatically determined histogram range.
+
+        In this case, the accumulated percentile can be inaccurate, and the accumulator should be rebuilt using :meth:`rebuild`.
+        """
+        return self._nclipped>0
+    def rebuild(self, frames):
+        """Clear the accumulator and add all the given frames, determining the histogram range (if it is not specified explicitly) from all of them"""
+        self.clear()
+        if len(frames):
+            self._setup(frames)
+            for f in frames:
+                self.add(f)
+
+    def _get_rank(self):
+        return self.q/100*(self.count-1)
+    _max_lazy_updates=16
+    def _locate(self, r):
+        """Find the bins containing the rank `r` from scratch using the cumulative histogram"""
+        cum=np.zeros(len(self._pix),dtype="i8")
+        self._bin[:]=0
+        self._below[:]=0
+        for h in self._hist:
+            cum+=h
+            below=cum<=r
+            if not below.any():
+                break
+            self._bin+=below
+            np.copyto(self._below,cum,where=below)
+    def _rebalance(self):
+        """Move the tracked bins so that for each pixel the percentile rank lies within the bin"""
+        r=int(np.floor(self._get_rank()))
+        if self._lazy_updates>self._max_lazy_updates:  # many frames are added at once, so the full search is faster
+            self._locate(r)
+            self._lazy_updates=0
+            return
+        self._lazy_updates=0
+        idx=np.nonzero(self._below>r)[0]
+        while len(idx):  # move down until the number of values below the bin is not above the rank
+            self._bin[idx]-=1
+            self._below[idx]-=self._hist[self._bin[idx],idx]
+            idx=idx[self._below[idx]>r]
+        self._move_up(r,self._bin,self._below)
+    def _move_up(self, r, bins, below):
+        """Move the bins `bins` (with `below` values below them) up until they contain the rank `r`"""
+        idx=np.nonzero(below+self._hist[bins,self._pix]<=r)[0]
+        while len(idx):
+            below[idx]+=self._hist[bins[idx],idx]
+            bins[idx]+=1
+            idx=idx[below[idx]+self._hist[bins[idx],idx]<=r]
+    def _get_rank_value(self, r, bins, below):
+        """Get the value with the integer rank `r` contained in the bins `bins` (with `below` values below them)"""
+        frac=(r-below)/self._hist[bins,self._pix]
+        lo,width=self._range[0],self._bin_width
+        if self._integer:
+            return lo+bins*width+np.floor(frac*width)
+        return lo+(bins+frac)*width
+    def get_value(self):
+        """Get the accumulated percentile value as a float array"""
+        if self._hist is None:
+            return None
+        self._rebalance()
+        rank=self._get_rank()
+        r=int(np.floor(rank))
+        value=self._get_rank_value(r,self._bin,self._below).astype("f8")
+        if rank>r:  # interpolate between the two neighboring ranks
+            bins,below=self._bin.copy(),self._below.copy()
+            self._move_up(r+1,bins,below)
+            value+=(rank-r)*(self._get_rank_value(r+1,bins,below)-value)
+        return value.reshape(self._shape)
@@ -0,0 +1,168 @@
+"""
+Fused spatial and temporal frame binning.
+
+Implemented using Numba library (JIT high-performance compilation) if possible.
+"""
+
+from ...devices.interface import camera as camera_utils
+
+import numpy as np
+import functools
+
+try:
+    import numba as nb
+    from ...core.utils import nbtools
+except ImportError:
+    nb=None
+
+
+
+_binning_modes={"skip":0,"sum":1,"mean":2,"min":3,"max":4}
+
+if nb is not None:
+    @functools.lru_cache(1024)
+    def _bin_frames_nb(tsrc="u2", par=False, nogil=True):
+        if isinstance(tsrc,np.dtype):
+            tsrc="{}{}".format(tsrc.kind,tsrc.itemsize)
+        ain=nbtools.c_array(base=tsrc,ndim=3,readonly=True,contiguous="A")
+        aacc=nbtools.c_array(base="f8",ndim=2)
+        aout=nbtools.c_array(base="f8",ndim=3)
+        @nb.njit(nb.void(ain,aacc,aout,nb.i8,nb.i8,nb.i8,nb.i8,nb.i8,nb.i8),parallel=par,nogil=nogil)
+        def bin_frames(src, acc, dst, nacc, tbin, ibin, jbin, smode, tmode):
+            n=src.shape[0]
+            h,w=acc.shape
+            for i in nb.prange(h):  # pylint: disable=not-an-iterable
+                rb=np.empty(w,dtype=np.float64)
+                cnt=nacc
+                k=0
+                for f in range(n):
+                    # spatial binning of the row into rb
+                    if smode==0:
+                        for j in range(w):
+                            rb[j]=src[f,i*ibin,j*jbin]
+                    else:
+                        for di in range(ibin):
+                            r=i*ibin+di
+                            for j in range(w):
+                                for dj in range(jbin):
+                                    v=src[f,r,j*jbin+dj]
+                                    if di==0 and dj==0:
+                                        rb[j]=v
+                                    elif smode<=2:
+                                        rb[j]+=v
+                                    elif smode==3:
+                                        rb[j]=min(rb[j],v)
+                                    else:
+                                        rb[j]=max(rb[j],v)
+                        if smode==2:
+                            for j in range(w):
+                                rb[j]/=ibin*jbin
+                    # temporal binning of rb into the accumulator row
+                    if cnt==0:
+                        for j in range(w):
+                            acc[i,j]=rb[j]
+                    elif tmode==1 or tmode==2:
+                        for j in range(w):
+                            acc[i,j]+=rb[j]
+                    elif tmode==3:
+                        for j in range(w):
+                            acc[i,j]=min(acc[i,j],rb[j])
+                    elif tmode==4:
+                        for j in range(w):
+                            acc[i,j]=max(acc[i,j],rb[j])
+                    cnt+=1
+                    if cnt==tbin:
+                        for j in range(w):
+                            dst[k,i,j]=acc[i,j]/tbin if tmode==2 else acc[i,j]
+                        k+=1
+                        cnt=0
+        return bin_frames
+
+
+
+def is_fused_binning_available():
+    """Check if the fused binning is available (i.e., if Numba is installed)"""
+    return nb is not None
+
+class FusedFrameBinner:
+    """
+    Stateful fused spatial and temporal frame binner.
+
+    Performs spatial and temporal binning in a single pass over the frames without creating intermediate arrays.
+    Incomplete temporal bins are accumulated between the calls; incomplete spatial bins on the frame edges are dropped.
+    The results are identical to the consecutive decimation with :func:`.filters.decimate`, first spatial then temporal.
+
+    Args:
+        spat_bin: tuple ``(i_bin, j_bin)`` with the binning factors along the two spatial axes
+        spat_mode: spatial binning mode; can be ``"skip"``, ``"sum"``, ``"mean"``, ``"min"``, or ``"max"``
+        time_bin: binning factor along the time axis
+        time_mode: temporal binning mode, same as `spat_mode`
+        par: if ``True``, parallelize the binning over the frame rows; if ``None``, only do it for sufficiently large frames
+    """
+    def __init__(self, spat_bin=(1,1), spat_mode="skip", time_bin=1, time_mode="skip", par=None):
+        if nb is None:
+            raise ImportError("fused binning requires Numba; install it by running 'pip install numba'")
+        for m in [spat_mode,time_mode]:
+            if m not in _binning_modes:
+                raise ValueError("unsupported binning mode: {}".format(m))
+        self.spat_bin=tuple(spat_bin)
+        self.spat_mode=spat_mode
+        self.time_bin=time_bin
+        self.time_mode=time_mode
+        self.par=par
+        self.clear()
+    @staticmethod
+    def is_mode_supported(mode):
+        """Check if the given binning mode is supported"""
+        return mode in _binning_modes
+
+    def clear(self):
+        """Clear the temporal accumulator"""
+        self._acc=None
+        self._acc_frame_num=0
+        self._acc_shape=None
+        self._acc_sline=None
+    def get_accumulated_number(self):
+        """Get the number of frames in the current (incomplete) temporal bin"""
+        return self._acc_frame_num
+
+    def bin_frames(self, frames, status_line=None, dtype=None):
+        """
+        Bin the frames.
+
+        `frames` is a 3D array with the frames (or a single 2D frame), and `status_line` is a status line descriptor (defined in :class:`FramesMessage`);
+        status line of each resulting frame is copied from the first frame in the temporal bin.
+        `dtype` is the resulting array type (by default, same as the source).
+        Return a 3D array with all complete binned frames, or ``None`` if the frame shape changed mid-bin (in which case the accumulator is cleared).
+        """
+        if frames.ndim==2:
+            frames=frames[None]
+        dtype=frames.dtype if dtype is None else dtype
+        n,r,c=frames.shape
+        ibin,jbin=self.spat_bin
+        h,w=r//ibin,c//jbin
+        if self._acc_frame_num and self._acc_shape!=(r,c):
+            self.clear()
+            return None
+        if self._acc is None or self._acc.shape!=(h,w):
+            self._acc=np.zeros((h,w),dtype="f8")
+        self._acc_shape=(r,c)
+        nacc=self._acc_frame_num
+        tbin=self.time_bin
+        nout=(nacc+n)//tbin
+        result=np.empty((nout,h,w),dtype="f8")
+        par=self.par if self.par is not None else (h*w*n>=2**18)
+        if n and h and w:
+            _bin_frames_nb(frames.dtype,par=par)(frames,self._acc,result,nacc,tbin,ibin,jbin,_binning_modes[self.spat_mode],_binning_modes[self.time_mode])
+        self._acc_frame_num=(nacc+n)%tbin
+        if status_line is not None:
+            starts=np.arange(nout)*tbin-nacc
+            if nout:
+                sl=camera_utils.extract_status_line(frames[np.maximum(starts,0)],status_line,copy=True)
+                if starts[0]<0 and self._acc_sline is not None:
+                    sl[0]=self._acc_sline
+                result=camera_utils.insert_status_line(result,status_line,sl,copy=False)
+            last_start=nout*tbin-nacc
+            if self._acc_frame_num and last_start>=0:
+                self._acc_sline=camera_utils.extract_status_line(frames[last_start],status_line,copy=True)
+        return result.astype(dtype)
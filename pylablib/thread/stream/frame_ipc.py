@@ -0,0 +1,77 @@
+"""
+Transfer of frame messages between processes through a shared memory ring (see :class:`.SharedMemRingChannel`).
+
+Each :class:`.FramesMessage` is sent as a single ring message: frame arrays (and array indices and frame info, if present) are copied directly into the shared memory,
+while the rest of the message parameters (metainfo, stream IDs, etc.) are pickled.
+"""
+
+from .stream_message import FramesMessage
+
+import numpy as np
+
+
+
+def _is_plain_array(v):
+    return isinstance(v,np.ndarray) and not v.dtype.hasobject
+
+class FramesMessageRingSender:
+    """
+    Frames message sender.
+
+    Args:
+        channel: :class:`.SharedMemRingChannel` used to send the messages
+    """
+    def __init__(self, channel):
+        self.channel=channel
+    def send(self, msg, timeout=None):
+        """
+        Send :class:`.FramesMessage` `msg`.
+
+        Frame pool blocks (``pool_blocks`` attribute) are process-local, so they are not transferred.
+        Return ``True`` if the message was sent, or ``False`` if it was dropped because the ring is full.
+        """
+        arrays=list(msg.frames)
+        indices=msg.indices
+        array_indices=msg.chunks
+        if array_indices:
+            arrays+=[np.asarray(idx) for idx in indices]
+            indices=None
+        frame_info=msg.frame_info
+        array_info=frame_info is not None and all(_is_plain_array(inf) for inf in frame_info)
+        if array_info:
+            arrays+=frame_info
+            frame_info=None
+        info={"nframes":len(msg.frames),"indices":indices,"frame_info":frame_info,"array_info":array_info,"chunks":msg.chunks,
+            "metainfo":msg.metainfo,"sn":msg.sn,"sid":msg.sid,"mid":msg.mid}
+        return self.channel.send_arrays(arrays,info=info,timeout=timeout)
+
+class FramesMessageRingReceiver:
+    """
+    Frames message receiver.
+
+    Args:
+        channel: :class:`.SharedMemRingChannel` used to receive the messages
+    """
+    def __init__(self, channel):
+        self.channel=channel
+    def recv(self, timeout=None, copy=True):
+        """
+        Receive :class:`.FramesMessage`.
+
+        If ``copy==False``, the frames, indices, and frame info arrays in the message are views of the shared memory,
+        which are only valid until the next receive call or :meth:`release`.
+        If the receive timed out, raise :exc:`TimeoutError`.
+        """
+        arrays,info=self.channel.recv_arrays(timeout=timeout,copy=copy)
+        n=info["nframes"]
+        frames,rest=arrays[:n],arrays[n:]
+        indices=info["indices"]
+        if indices is None:
+            indices,rest=rest[:n],rest[n:]
+        frame_info=info["frame_info"]
+        if info["array_info"]:
+            frame_info=rest[:n]
+        return FramesMessage(frames,indices=indices,frame_info=frame_info,chunks=info["chunks"],metainfo=info["metainfo"],sn=info["sn"],sid=info["sid"],mid=info["mid"])
+    def release(self):
+        """Release the currently held received message, so that its slot can be reused by the sender"""
+        self.channel.release()
@@ -0,0 +1,157 @@
+from ...core.thread import controller
+from ...core.utils import funcargparse
+
+
+import numpy as np
+import os
+import sys
+import traceback
+import collections
+import concurrent.futures
+
+
+
+class ParallelFrameProcessorThread(controller.QTaskThread):
+    """
+    Parallel frame processing thread: receives frames, processes them in a thread or process pool, and re-emits the results in the original order.
+
+    Each frame array in the message (a single 2D frame or a 3D chunk of frames) is processed by the processing function in one of the pool workers;
+    large chunks are additionally split into several tasks. Once all the frames in the message are processed, the message is re-emitted
+    with the frames replaced by the processing results, and with all other parameters (indices, frame info, stream IDs) kept the same.
+    The messages are always emitted in the order they were received, regardless of the order in which the tasks are completed.
+    If processing of any frame array in the message raises an exception, the exception is printed and the whole message is dropped (counted in ``stats/failed``),
+    while the following messages are emitted as usual.
+
+    The thread pool works best for functions which release GIL for most of the processing time (e.g., most of the numpy functions, or Numba functions compiled with ``nogil=True``).
+    The process pool works with any function, but requires the function to be picklable (e.g., defined on the module level),
+    and spends additional time on transferring the frames to and the results from the worker processes.
+
+    Setup args:
+        - ``src``: name of the source thread (usually, a camera)
+        - ``tag_in``: receiving multicast tag (for the source multicast)
+        - ``tag_out``: emitting multicast tag (for the multicast emitted by the processor); by default, ``tag_in+"/processed"``
+        - ``func``: processing function; takes a frame array (2D frame or a 3D chunk of frames) as a single argument, plus additional keyword arguments (see :meth:`set_function`),
+            and returns the processed array; for a chunk, the first axis of the result should correspond to the frame index;
+            results with fewer dimensions than the frames (e.g., a 1D array of ROI sums for a chunk) are padded with trailing unit axes
+        - ``nworkers``: number of workers in the pool (by default, the number of CPU cores)
+        - ``executor``: pool type; can be ``"thread"`` or ``"process"``
+        - ``max_chunk``: maximal number of frames processed in a single task; larger chunks are split into several tasks, and the results are concatenated
+        - ``max_pending``: maximal number of messages being processed simultaneously; if exceeded, newly arrived messages are dropped
+
+    Multicasts:
+        - ``<tag_out>``: emitted with the processed frames
+
+    Variables:
+        - ``enabled``: indicates whether processing is enabled (if disabled, the incoming messages are re-emitted unchanged, still preserving the order)
+        - ``nworkers``: number of workers in the pool
+        - ``executor``: pool type
+        - ``stats/received``: number of received frames
+        - ``stats/processed``: number of processed and emitted frames
+        - ``stats/dropped``: number of frames dropped because of too many pending messages
+        - ``stats/failed``: number of frames dropped because the processing function raised an exception
+        - ``stats/pending``: current number of messages being processed
+        - ``stats/pending_max``: maximal number of messages being processed simultaneously
+
+    Commands:
+        - ``enable``: enable or disable processing
+        - ``set_function``: change the processing function
+    """
+    def setup_task(self, src, tag_in, tag_out=None, func=None, nworkers=None, executor="thread", max_chunk=None, max_pending=None):  # pylint: disable=arguments-differ
+        funcargparse.check_parameter_range(executor,"executor",["thread","process"])
+        self.subscribe_commsync(self.process_input_frames,srcs=src,tags=tag_in,limit_queue=100,on_full_queue="skip_oldest",flow_control=True)
+        self.tag_out=tag_out or tag_in+"/processed"
+        nworkers=nworkers or os.cpu_count() or 1
+        if executor=="thread":
+            self.pool=concurrent.futures.ThreadPoolExecutor(nworkers,thread_name_prefix=self.name)
+        else:
+            self.pool=concurrent.futures.ProcessPoolExecutor(nworkers)
+        self.max_chunk=max_chunk
+        self.max_pending=max_pending or 4*nworkers
+        self.func=func
+        self.func_kwargs={}
+        self._pending=collections.deque()
+        self.v["enabled"]=func is not None
+        self.v["nworkers"]=nworkers
+        self.v["executor"]=executor
+        for k in ["received","processed","dropped","failed","pending","pending_max"]:
+            self.v["stats",k]=0
+        self.add_command("enable")
+        self.add_command("set_function")
+    def finalize_task(self):
+        self.pool.shutdown(wait=True)
+
+    def enable(self, enabled=True):
+        """Enable or disable processing"""
+        if enabled and self.func is None:
+            raise ValueError("processing function is not specified")
+        self.v["enabled"]=enabled
+    def set_function(self, func, kwargs=None):
+        """
+        Set the processing function and its additional keyword arguments.
+
+        The new function is only applied to the newly received messages.
+        If `func` is ``None``, disable the processing.
+        """
+        self.func=func
+        self.func_kwargs=kwargs or {}
+        if func is None:
+            self.v["enabled"]=False
+
+    def _submit_frames(self, frames, chunked):
+        """Submit a single frame array and return the list of futures"""
+        if chunked and self.max_chunk and len(frames)>self.max_chunk:
+            return [self.pool.submit(self.func,frames[s:s+self.max_chunk],**self.func_kwargs) for s in range(0,len(frames),self.max_chunk)]
+        return [self.pool.submit(self.func,frames,**self.func_kwargs)]
+    def _normalize_result(self, result, chunked, chandim):
+        result=np.asarray(result)
+        ndim=(3 if chunked else 2)+chandim
+        if result.ndim<ndim:
+            result=result.reshape(result.shape+(1,)*(ndim-result.ndim))
+        return result
+    def _on_task_done(self, _):
+        self.call_in_thread_commsync(self._emit_done,sync=False,ignore_errors=True)
+    def _collect_results(self, msg, futures):
+        """Combine the processing results into a new message; return ``None`` and print the exception if the processing failed"""
+        try:
+            frames=[]
+            for fs in futures:
+                results=[self._normalize_result(f.result(),msg.chunks,msg.mi.chandim) for f in fs]
+                frames.append(results[0] if len(results)==1 else np.concatenate(results,axis=0))
+            return msg.copy(frames=frames,source=self.name)
+        except Exception as err:  # pylint: disable=broad-except
+            print("Frame processing failed in thread '{}'; dropping the message".format(self.name),file=sys.stderr)
+            traceback.print_exception(type(err),err,err.__traceback__)
+            sys.stderr.flush()
+            return None
+    def _emit_done(self):
+        """Emit all processed messages at the head of the queue"""
+        while self._pending:
+            msg,futures=self._pending[0]
+            if not all(f.done() for fs in futures for f in fs):
+                break
+            self._pending.popleft()
+            if futures:
+                nframes=msg.nframes()
+                msg=self._collect_results(msg,futures)
+                if msg is None:
+                    self.v["stats/failed"]+=nframes
+                    continue
+            self.send_multicast(dst="any",tag=self.tag_out,value=msg)
+            self.v["stats/processed"]+=msg.nframes()
+        self.v["stats/pending"]=len(self._pending)
+
+    def process_input_frames(self, src, tag, msg):  # pylint: disable=unused-argument
+        """Process multicast message with input frames"""
+        nframes=msg.nframes()
+        self.v["stats/received"]+=nframes
+        if len(self._pending)>=self.max_pending:
+            self.v["stats/dropped"]+=nframes
+            return
+        futures=[self._submit_frames(f,msg.chunks) for f in msg.frames] if self.v["enabled"] else []
+        self._pending.append((msg,futures))
+        self.v["stats/pending"]=len(self._pending)
+        self.v["stats/pending_max"]=max(self.v["stats/pending_max"],len(self._pending))
+        for fs in futures:
+            for f in fs:
+                f.add_done_callback(self._on_task_done)
+        self._emit_done()
@@ -0,0 +1,121 @@
+import numpy as np
+
+import threading
+import collections
+import weakref
+import time
+
+
+
+TFramePoolStatus=collections.namedtuple("TFramePoolStatus",["nblocks","block_size","used","acquired","exhausted","hold_time_mean","hold_time_max"])
+class FramePoolBlock:
+    """
+    Handle for a single acquired frame pool block.
+
+    Keeps a reference counter for the block; the block holds no reference to the data itself.
+    The block is returned to the pool once all explicit references are released (using :meth:`release`)
+    and all numpy views of the block data are garbage-collected.
+    Should not be created explicitly, but rather through :meth:`FramePool.acquire`.
+
+    Args:
+        pool: parent pool (``None`` for a block which is not a part of the pool, e.g., allocated when the pool is exhausted)
+        idx: block index within the pool
+        raw: raw flat byte array which holds the data; its lifetime (which includes lifetimes of all the derived views) holds one block reference
+    """
+    def __init__(self, pool, idx, raw):
+        self.pool=pool
+        self.idx=idx
+        self.acquire_time=time.time()
+        self._lock=threading.Lock()
+        self._nrefs=1
+        if pool is not None:
+            weakref.finalize(raw,self.release)
+    def acquire(self):
+        """Add an explicit reference to the block, which prevents it from being returned into the pool until :meth:`release` is called"""
+        with self._lock:
+            if self._nrefs<=0:
+                raise RuntimeError("frame pool block is already released")
+            self._nrefs+=1
+    def release(self):
+        """Release an explicit reference to the block"""
+        with self._lock:
+            if self._nrefs<=0:
+                return
+            self._nrefs-=1
+            released=self._nrefs==0
+        if released and self.pool is not None:
+            self.pool._return_block(self)  # pylint: disable=protected-access
+    def is_released(self):
+        """Check if the block has been returned to the pool"""
+        return self._nrefs<=0
+
+
+class FramePool:
+    """
+    Pool of preallocated contiguous frame memory blocks.
+
+    Blocks are reused in the ring order (the oldest returned block is acquired first), so in the steady state no new frame memory is allocated.
+    Each block is large enough to hold `block_size` bytes, i.e., a single frame chunk.
+    If the pool is exhausted (all blocks are still held by the consumers), or the requested chunk does not fit into a block,
+    a new array is allocated instead, and the corresponding event is recorded in the pool status.
+
+    Args:
+        nblocks: number of preallocated blocks
+        block_size: size of a single block in bytes
+    """
+    def __init__(self, nblocks, block_size):
+        self.nblocks=nblocks
+        self.block_size=block_size
+        self._buffers=[np.empty(block_size,dtype="u1") for _ in range(nblocks)]
+        self._free=collections.deque(range(nblocks))
+        self._lock=threading.Lock()
+        self.reset_status()
+
+    def reset_status(self):
+        """Reset the usage statistics"""
+        with self._lock:
+            self._acquired=0
+            self._exhausted=0
+            self._hold_time_tot=0.
+            self._hold_time_max=0.
+            self._released=0
+    def fits(self, shape, dtype):
+        """Check if an array with the given shape and dtype fits into a single block"""
+        return int(np.prod(shape))*np.dtype(dtype).itemsize<=self.block_size
+    def acquire(self, shape, dtype):
+        """
+        Acquire a block holding an array with the given shape and dtype.
+
+        Return tuple ``(data, block)``, where ``data`` is the (uninitialized) array, and ``block`` is the corresponding :class:`FramePoolBlock` handle.
+        If the pool is exhausted or the array is too large, return a newly allocated array and a non-pooled block.
+        """
+        nbytes=int(np.prod(shape))*np.dtype(dtype).itemsize
+        with self._lock:
+            self._acquired+=1
+            idx=self._free.popleft() if (self._free and nbytes<=self.block_size) else None
+            if idx is None:
+                self._exhausted+=1
+        if idx is None:
+            return np.empty(shape,dtype=dtype),FramePoolBlock(None,None,None)
+        raw=np.frombuffer(memoryview(self._buffers[idx]),dtype="u1")  # separate base object to track derived views lifetime
+        return raw[:nbytes].view(dtype).reshape(shape),FramePoolBlock(self,idx,raw)
+    def _return_block(self, block):
+        with self._lock:
+            dt=time.time()-block.acquire_time
+            self._hold_time_tot+=dt
+            self._hold_time_max=max(self._hold_time_max,dt)
+            self._released+=1
+            self._free.append(block.idx)
+
+    def get_status(self):
+        """
+        Get pool usage status.
+
+        Return tuple ``(nblocks, block_size, used, acquired, exhausted, hold_time_mean, hold_time_max)``
+        with the total number of blocks, block size in bytes, number of currently used blocks, total number of acquire requests,
+        number of requests which could not be satisfied by the pool (i.e., resulted in a new allocation),
+        and the mean and maximal time the blocks were held by the consumers.
+        """
+        with self._lock:
+            hold_time_mean=self._hold_time_tot/self._released if self._released else 0.
+            return TFramePoolStatus(self.nblocks,self.block_size,self.nblocks-len(self._free),self._acquired,self._exhausted,hold_time_mean,self._hold_time_max)
@@ -0,0 +1,172 @@
+from ...core.thread import controller
+from ...core.fileio import stream_writer
+from ...core.utils import funcargparse
+
+from . import stream_manager
+
+import numpy as np
+import time
+
+
+
+class FrameSaverThread(controller.QTaskThread):
+    """
+    Frame saving thread: receives frame messages and streams them into a binary file.
+
+    The frames are coalesced into large preallocated buffers, which are written into the file from a separate I/O thread (see :class:`.StreamFileWriter`),
+    so the saving thread only spends time on copying the frames, and the source thread is never stalled.
+    The file can be either a standard .cam file (each frame stored as ``<u2`` preceded by two ``<u4`` integers with its shape),
+    or a raw binary file (frames are stored in their native data type and byte order without any headers).
+
+    Setup args:
+        - ``src``: name of the source thread (usually, a camera)
+        - ``tag``: receiving multicast tag (for the source multicast)
+
+    Variables:
+        - ``saving``: indicates whether saving is in progress
+        - ``path``: path to the current saving file
+        - ``params``: saving parameters (see :meth:`start_saving`)
+        - ``stats/received``: number of received frames
+        - ``stats/saved``: number of saved (i.e., placed into the write buffer) frames
+        - ``stats/dropped``: number of frames dropped by the saver because the write buffers are full
+        - ``stats/missed``: number of frames missing in the received stream (e.g., skipped because of the full saver message queue)
+        - ``stats/rejected``: number of frames which can not be saved in the current format (multi-channel frames in the ``"cam"`` format)
+        - ``stats/written``: number of bytes written into the file
+        - ``stats/rate``: current write rate (in Mb/s)
+        - ``stats/rate_mean``: write rate averaged over the whole saving (in Mb/s)
+        - ``stats/queue_depth``: current number of buffers waiting to be written
+        - ``stats/queue_depth_max``: maximal number of buffers waiting to be written
+        - ``stats/direct``: indicates whether direct I/O is used
+
+    Commands:
+        - ``start_saving``: start saving into a new file
+        - ``stop_saving``: stop saving and close the file
+    """
+    _stats_update_period=0.5
+    def setup_task(self, src, tag="frames/new"):  # pylint: disable=arguments-differ
+        self.subscribe_commsync(self.process_input_frames,srcs=src,tags=tag,limit_queue=100,on_full_queue="skip_oldest",flow_control=True)
+        self.cnt=stream_manager.StreamIDCounter()
+        self.writer=None
+        self.v["saving"]=False
+        self.v["path"]=None
+        self.v["params"]={}
+        self._reset_stats()
+        self.add_command("start_saving")
+        self.add_command("stop_saving")
+        self.add_job("update_stats",self.update_stats,self._stats_update_period)
+    def finalize_task(self):
+        self.stop_saving()
+
+    def _reset_stats(self):
+        self._last_index=None
+        self._start_time=None
+        self._last_stats=(time.time(),0)
+        for k in ["received","saved","dropped","missed","rejected","written","queue_depth","queue_depth_max"]:
+            self.v["stats",k]=0
+        self.v["stats/rate"]=0.
+        self.v["stats/rate_mean"]=0.
+        self.v["stats/direct"]=False
+    def update_stats(self):
+        """Update the write statistics variables"""
+        if self.writer is None:
+            return
+        status=self.writer.get_status()
+        t=time.time()
+        lt,lw=self._last_stats
+        self.v["stats/written"]=status.written
+        self.v["stats/rate"]=(status.written-lw)/(t-lt)/2**20 if t>lt else 0.
+        self.v["stats/rate_mean"]=status.written/(t-self._start_time)/2**20 if t>self._start_time else 0.
+        self.v["stats/queue_depth"]=status.queue_depth
+        self.v["stats/queue_depth_max"]=status.queue_depth_max
+        self.v["stats/direct"]=status.direct
+        self._last_stats=(t,status.written)
+
+    def start_saving(self, path, fmt="cam", append=False, buffer_size=2**24, nbuffers=2, preallocate=2**28, direct=False, fadvise=True, on_full="drop"):
+        """
+        Start saving into a new file.
+
+        If the saving is already in progress, stop it first.
+
+        Args:
+            path: destination file path
+            fmt: file format; can be ``"cam"`` (standard .cam file, frames are converted to ``<u2``) or ``"raw"`` (raw binary data without any headers);
+                multi-channel frames can only be saved in the ``"raw"`` format, and are skipped and counted in ``"stats/rejected"`` otherwise
+            append: if ``True``, append to the existing file; otherwise, overwrite it
+            buffer_size: size of a single write buffer in bytes; larger buffers result in larger individual writes
+            nbuffers: number of write buffers (2 corresponds to the standard double buffering)
+            preallocate: file preallocation step in bytes (``None`` means no preallocation)
+            direct: if ``True``, use direct I/O (bypassing the OS page cache), if supported by the system and the file system
+            fadvise: if ``True``, use ``posix_fadvise`` hints to drop the written data from the page cache, if supported by the system
+            on_full: action if all the write buffers are full (i.e., the disk can not keep up with the data rate);
+                can be ``"drop"`` (drop the received frames and count them in ``"stats/dropped"``)
+                or ``"wait"`` (wait until the buffers are written, which stalls the saving thread and can lead to frames being missed in the incoming stream)
+        """
+        funcargparse.check_parameter_range(fmt,"fmt",["cam","raw"])
+        funcargparse.check_parameter_range(on_full,"on_full",["drop","wait"])
+        self.stop_saving()
+        self._reset_stats()
+        self.writer=stream_writer.StreamFileWriter(path,append=append,buffer_size=buffer_size,nbuffers=nbuffers,preallocate=preallocate,direct=direct,fadvise=fadvise)
+        self._start_time=time.time()
+        self._last_stats=(self._start_time,0)
+        self.v["path"]=path
+        self.v["params"]={"fmt":fmt,"append":append,"buffer_size":buffer_size,"nbuffers":nbuffers,"preallocate":preallocate,"direct":direct,"fadvise":fadvise,"on_full":on_full}
+        self.v["saving"]=True
+    def stop_saving(self):
+        """Stop saving and close the file"""
+        if self.writer is not None:
+            try:
+                self.writer.close()
+            finally:
+                self.update_stats()
+                self.writer=None
+                self.v["saving"]=False
+
+    def _write_cam_chunk(self, chunk):
+        chunk=chunk.astype("<u2",copy=False)
+        n,h,w=chunk.shape
+        header=np.array([h,w],dtype="<u4")
+        recsize=header.nbytes+h*w*2
+        i=0
+        while i<n:
+            view=self.writer.get_free_view()
+            k=min(len(view)//recsize,n-i)
+            if k: # fill all the records fitting into the current buffer at once
+                rec=view[:k*recsize].reshape(k,recsize)
+                rec[:,:header.nbytes].view("<u4")[:]=header
+                rec[:,header.nbytes:].view("<u2").reshape(k,h,w)[:]=chunk[i:i+k]
+                self.writer.advance(k*recsize)
+                i+=k
+            else: # record spans two buffers
+                self.writer.write(header)
+                self.writer.write(chunk[i])
+                i+=1
+    def _get_frames_nbytes(self, frames, fmt, chandim):
+        if fmt=="cam":
+            return sum(f.size*2+8*(len(f) if f.ndim==3+chandim else 1) for f in frames)
+        return sum(f.nbytes for f in frames)
+    def process_input_frames(self, src, tag, msg):  # pylint: disable=unused-argument
+        """Process multicast message with input frames"""
+        if self.writer is None:
+            return
+        if self.cnt.receive_message(msg):
+            self._last_index=None
+        nframes=msg.nframes()
+        self.v["stats/received"]+=nframes
+        if msg.indices:
+            self.v["stats/missed"]+=max(msg.get_missing_frames_number(self._last_index),0)
+            self._last_index=msg.last_frame_index()
+        fmt=self.v["params/fmt"]
+        chandim=msg.mi.chandim
+        if fmt=="cam" and chandim:
+            self.v["stats/rejected"]+=nframes
+            return
+        nbytes=self._get_frames_nbytes(msg.frames,fmt,chandim)
+        if not self.writer.wait_space(nbytes,timeout=0 if self.v["params/on_full"]=="drop" else None):
+            self.v["stats/dropped"]+=nframes
+            return
+        for f in msg.frames:
+            if fmt=="cam":
+                self._write_cam_chunk(f if f.ndim==3 else f[None])
+            else:
+                self.writer.write(f)
+        self.v["stats/saved"]+=nframes
@@ -1,8 +1,9 @@
 from ...core.thread import controller
 from ...core.dataproc import filters
+from ...core.utils import funcargparse
 
 from ...devices.interface import camera as camera_utils
-from . import stream_manager, stream_message
+from . import stream_manager, stream_message, frame_binning, background_stats
 
 import numpy as np
 import time
@@ -24,31 +25,39 @@ class FrameBinningThread(controller.QTaskThread):
 
     Variables:
         - ``params/spat``: spatial binning parameters: ``"bin"`` for binning size (a 2-tuple) and ``"mode"`` for binning mode
-        - ``params/time``: temporal binning parameters: ``"bin"`` for binning size and ``"mode"`` for binning mode
+        - ``params/time``: temporal binning parameters: ``"bin"`` for binning size, ``"mode"`` for binning mode,
+          and ``"adaptive"`` for the maximal adaptive binning factor (see :meth:`setup_adaptive_binning`)
         - ``params/dtype``: resulting frames type (see :meth:`setup_binning` for parameters)
+        - ``params/engine``: binning engine (see :meth:`setup_binning` for parameters)
+        - ``adaptive_factor``: current adaptive time binning factor (the effective time binning is ``params/time/bin * adaptive_factor``)
         - ``enabled``: indicates whether binning has been enabled
 
     Commands:
         - ``enable_binning``: enable or disable the binning
         - ``setup_binning``: setup binning parameters
+        - ``setup_adaptive_binning``: setup adaptive time binning
     """
     def setup_task(self, src, tag_in, tag_out=None):  # pylint: disable=arguments-differ
-        self.subscribe_commsync(self.process_input_frames,srcs=src,tags=tag_in,limit_queue=2,on_full_queue="wait")
+        self.subscribe_commsync(self.process_input_frames,srcs=src,tags=tag_in,limit_queue=2,on_full_queue="wait",flow_control=True)
         self.tag_out=tag_out or tag_in
         self.v["params/spat"]={"bin":(1,1),"mode":"skip"}
-        self.v["params/time"]={"bin":1,"mode":"skip"}
+        self.v["params/time"]={"bin":1,"mode":"skip","adaptive":1}
+        self.v["adaptive_factor"]=1
         self.v["params/dtype"]=None
+        self.v["params/engine"]="auto"
         self.v["enabled"]=False
+        self._fused_binner=None
         self._recv_acc=stream_message.FramesAccumulator()
         self._clear_buffer()
         self.cnt=stream_manager.StreamIDCounter()
         self.add_command("setup_binning")
+        self.add_command("setup_adaptive_binning")
         self.add_command("enable_binning")
 
     def enable_binning(self, enabled=True):
         """Enable or disable the binning"""
         self.v["enabled"]=enabled
-    def setup_binning(self, spat_bin, spat_bin_mode, time_bin, time_bin_mode, dtype=None):
+    def setup_binning(self, spat_bin, spat_bin_mode, time_bin, time_bin_mode, dtype=None, engine="auto"):
         """
         Setup binning parameters.
 
@@ -61,18 +70,79 @@ class FrameBinningThread(controller.QTaskThread):
                 otherwise, they are converted into the same type as the source frames;
                 note that if the source type is integer and binning mode is ``"mean"`` or ``"sum"``, some information might be lost through rounding or integer overflow;
                 for the purposes of ``"mean"`` and ``"sum"`` binning the frames are always temporarily converted to float
+            engine: binning engine; can be ``"fused"`` (single-pass Numba-compiled binning, see :class:`.FusedFrameBinner`; only works for single-channel frames),
+                ``"numpy"`` (consecutive decimation using numpy), or ``"auto"`` (fused, if Numba is installed and the frames and binning modes are supported, and numpy otherwise)
         """
+        if engine=="fused" and not frame_binning.is_fused_binning_available():
+            raise ImportError("fused binning requires Numba; install it by running 'pip install numba'")
         par=self.v["params"]
-        if spat_bin!=par["spat/bin"] or spat_bin_mode!=par["spat/mode"] or time_bin!=par["time/bin"] or time_bin_mode!=par["time/mode"]:
+        if spat_bin!=par["spat/bin"] or spat_bin_mode!=par["spat/mode"] or time_bin!=par["time/bin"] or time_bin_mode!=par["time/mode"] or engine!=par["engine"]:
             self._clear_buffer()
+            self._fused_binner=None
         self.v["params/spat"]={"bin":spat_bin,"mode":spat_bin_mode}
-        self.v["params/time"]={"bin":time_bin,"mode":time_bin_mode}
+        self.v["params/time/bin"]=time_bin
+        self.v["params/time/mode"]=time_bin_mode
         self.v["params/dtype"]=dtype
+        self.v["params/engine"]=engine
+    def setup_adaptive_binning(self, max_factor=1):
+        """
+        Setup adaptive time binning.
+
+        If the flow-controlled subscribers of the output multicast (e.g., frame savers or other processors) run out of credit,
+        the time binning factor is doubled (up to `max_factor` times the nominal factor) to reduce the output rate;
+        once they have their full credit available again, the factor is halved back.
+        Thus, the frames are combined instead of being dropped from the overfilled downstream queues.
+        ``max_factor=1`` disables adaptive binning.
+        """
+        self.v["params/time/adaptive"]=max(int(max_factor),1)
+        if not self._set_adaptive_factor(1):
+            self._clear_buffer()
+            self._set_adaptive_factor(1)
+
+    def _get_time_bin(self):
+        return self.v["params/time/bin"]*self.v["adaptive_factor"]
+    def _set_adaptive_factor(self, factor):
+        """
+        Set the adaptive time binning factor, keeping the current incomplete time bin.
+
+        Return ``False`` (and keep the current factor) if the incomplete bin already has too many frames for the new factor.
+        """
+        if factor!=self.v["adaptive_factor"]:
+            time_bin=self.v["params/time/bin"]*factor
+            if self.acc_frame_num>=time_bin:
+                return False
+            self.v["adaptive_factor"]=factor
+            if self._fused_binner is not None:
+                self._fused_binner.time_bin=time_bin
+        return True
+    def _update_adaptive_factor(self, credit):
+        """Update the adaptive time binning factor based on the relative downstream `credit` available before sending the last message"""
+        max_factor=self.v["params/time/adaptive"]
+        if max_factor<=1:
+            return
+        factor=self.v["adaptive_factor"]
+        if credit is None or credit>=1:
+            factor=max(factor//2,1)
+        elif credit==0:
+            factor=min(factor*2,max_factor)
+        self._set_adaptive_factor(factor)
 
     def _clear_buffer(self):
         self.acc_frame=None
         self.acc_frame_num=0
         self._recv_acc.clear()
+        if self._fused_binner is not None:
+            self._fused_binner.clear()
+    def _get_fused_binner(self, chandim):
+        """Get the fused binner, or ``None`` if the numpy binning should be used"""
+        par=self.v["params"]
+        if par["engine"]=="numpy" or chandim or not frame_binning.is_fused_binning_available():
+            return None
+        if not all(frame_binning.FusedFrameBinner.is_mode_supported(m) for m in [par["spat/mode"],par["time/mode"]]):
+            return None
+        if self._fused_binner is None:
+            self._fused_binner=frame_binning.FusedFrameBinner(par["spat/bin"],par["spat/mode"],self._get_time_bin(),par["time/mode"])
+        return self._fused_binner
     def _bin_spatial(self, frames, n, dec, status_line, chandim=0):
         if n!=(1,1):
             sl=camera_utils.extract_status_line(frames,status_line,copy=False)
@@ -101,8 +171,13 @@ class FrameBinningThread(controller.QTaskThread):
         if frames.ndim==2+chandim:
             frames=frames[None]
         dtype=frames.dtype if par["dtype"] is None else par["dtype"]
+        binner=self._get_fused_binner(chandim)
+        if binner is not None:
+            frames=binner.bin_frames(frames,status_line=status_line,dtype=dtype)
+            self.acc_frame_num=binner.get_accumulated_number()
+            return frames
         frames=self._bin_spatial(frames,par["spat/bin"],par["spat/mode"],status_line,chandim=chandim)
-        time_bin,time_bin_mode=par["time/bin"],par["time/mode"]
+        time_bin,time_bin_mode=self._get_time_bin(),par["time/mode"]
         if time_bin>1:
             if self.acc_frame is not None and frames.shape[-2-chandim:]!=self.acc_frame.shape:
                 self._clear_buffer()
@@ -149,7 +224,7 @@ class FrameBinningThread(controller.QTaskThread):
             return
         if self.cnt.receive_message(msg):
             self._clear_buffer()
-        time_bin=self.v["params/time/bin"]
+        time_bin=self._get_time_bin()
         self._recv_acc.add_message(msg)
         frames=[]
         for chunk in msg.frames:
@@ -173,8 +248,10 @@ class FrameBinningThread(controller.QTaskThread):
                 mi={"roi":roi}
             else:
                 mi={}
-            msg=msg.copy(frames=frames,indices=indices,frame_info=frame_info,source=self.name,step=msg.mi.step*self.v["params/time/bin"],metainfo=mi)
+            msg=msg.copy(frames=frames,indices=indices,frame_info=frame_info,source=self.name,step=msg.mi.step*time_bin,metainfo=mi)
+            credit=self.get_multicast_credit(tag=self.tag_out,relative=True)  # sending the message consumes the credit, so check it beforehand
             self.send_multicast(dst="any",tag=self.tag_out,value=msg)
+            self._update_adaptive_factor(credit)
 
 
 
@@ -191,7 +268,8 @@ class FrameSlowdownThread(controller.QTaskThread):
 
     Multicasts:
         - ``<tag_out>``: emitted with slowed frames; emitted with the maximal period controlled by the :meth:`set_output_period`,
-            or on every input message if ``output_period`` is ``None``
+            or on every input message if ``output_period`` is ``None``;
+            while flow-controlled subscribers of this multicast have no credit left, the output is postponed (the frames stay in the buffer)
 
     Variables:
         - ``enabled``: indicate whether the slowdown is on
@@ -209,7 +287,7 @@ class FrameSlowdownThread(controller.QTaskThread):
         - ``set_output_period``: set the period of output frames generation
     """
     def setup_task(self, src, tag_in, tag_out=None):  # pylint: disable=arguments-differ
-        self.subscribe_commsync(self.process_input_frames,srcs=src,tags=tag_in,limit_queue=10)
+        self.subscribe_commsync(self.process_input_frames,srcs=src,tags=tag_in,limit_queue=10,flow_control=True)
         self.tag_out=tag_out or tag_in
         self.frames_buffer=[]
         self.buffer_size=1
@@ -273,6 +351,9 @@ class FrameSlowdownThread(controller.QTaskThread):
             self._last_emitted_time=t
             return
         nframes=int((t-self._last_emitted_time)*self.target_fps)
+        if nframes>0 and self.get_multicast_credit(tag=self.tag_out)==0: # downstream is busy; postpone the output instead of dropping frames
+            self._last_emitted_time=t
+            return
         if nframes>0:
             while nframes>0 and self.frames_buffer:
                 if self.frames_buffer[0].nframes()>nframes:
@@ -349,7 +430,8 @@ class BackgroundSubtractionThread(controller.QTaskThread):
             state can be ``"none"`` (none acquired), ``"acquiring"`` (accumulation in progress), ``"valid"`` (acquired and valid), or ``"wrong_size"`` (size mismatch);
             saving method can be ``"none"`` (don't save background), ``"only_bg"`` (only save background frame), or ``"all"`` (save background + all comprising frames).
         - ``running/parameters``: parameters of the snapshot background subtraction: ``"count"`` for number of frames to combine for the background,
-            ``"mode"`` for the combination mode (``"min"``, ``"mean"``, etc.), ``"dtype"`` for the final dtype, ``"offset"`` to enable or disable background offset
+            ``"mode"`` for the combination mode (``"min"``, ``"mean"``, etc.), ``"dtype"`` for the final dtype, ``"offset"`` to enable or disable background offset,
+            ``"engine"`` for the calculation engine (see :meth:`setup_running_subtraction`), ``"nbins"`` for the number of histogram bins of the incremental median
         - ``running/grabbed``: number of grabbed frames in the running background buffer
         - ``running/background``: status of the running background: ``"frame"`` for the final frame and ``"offset"`` for the final offset
 
@@ -364,7 +446,7 @@ class BackgroundSubtractionThread(controller.QTaskThread):
     TStoredFrame=collections.namedtuple("TStoredFrame",["frame","index","info","status_line","metainfo"])
     def setup_task(self, src, tag_in, tag_out=None):  # pylint: disable=arguments-differ
         self.frames_src=stream_manager.StreamSource(builder=stream_message.FramesMessage,use_mid=False)
-        self.subscribe_commsync(self.process_input_frames,srcs=src,tags=tag_in,limit_queue=20,on_full_queue="skip_oldest")
+        self.subscribe_commsync(self.process_input_frames,srcs=src,tags=tag_in,limit_queue=20,on_full_queue="skip_oldest",flow_control=True)
         self.tag_out=tag_out or tag_in+"/show"
         self.v["enabled"]=False
         self.v["overridden"]=False
@@ -382,7 +464,9 @@ class BackgroundSubtractionThread(controller.QTaskThread):
         self.v["snapshot/background/saving"]="none"
         self.running_buffer=[]
         self._running_frame_offset=0
-        self.v["running/parameters"]={"count":1,"step":1,"mode":"mean","dtype":None,"offset":False}
+        self.v["running/parameters"]={"count":1,"step":1,"mode":"mean","dtype":None,"offset":False,"engine":"auto","nbins":256}
+        self._running_acc=None
+        self._running_acc_frames=[]
         self.v["running/grabbed"]=0
         self.v["running/background/frame"]=None
         self.v["running/background/offset"]=None
@@ -397,9 +481,11 @@ class BackgroundSubtractionThread(controller.QTaskThread):
         self.add_job("output_frame",self.output_frame,1.)
 
     def _calculate_background(self, buffer, mode, dtype, use_offset):
-        if dtype is None:
-            dtype="i4" if buffer[0].dtype.kind in "ui" else "f"
         background=filters.decimate_full(buffer,mode,axis=0)
+        return self._finalize_background(background,buffer[0].dtype,dtype,use_offset)
+    def _finalize_background(self, background, src_dtype, dtype, use_offset):
+        if dtype is None:
+            dtype="i4" if src_dtype.kind in "ui" else "f"
         background=background.astype(dtype)
         status_line=self.last_frame.status_line
         if status_line is not None:
@@ -502,7 +588,50 @@ class BackgroundSubtractionThread(controller.QTaskThread):
         else:
             self.running_buffer=updated_frames+self.running_buffer[:count+1-len(updated_frames)]
         self.v["running/grabbed"]=max(len(self.running_buffer)-1,0)
-    def setup_running_subtraction(self, n=1, mode="mean", step=1, dtype=None, offset=False):
+    def _get_running_accumulator(self):
+        """Get the incremental running background accumulator, or ``None`` if the background is calculated from the whole buffer"""
+        par=self.v["running/parameters"]
+        engine,mode=par["engine"],par["mode"]
+        if engine=="full" or mode not in ["mean","sum","median"]:
+            return None
+        frame=self.running_buffer[1]
+        if mode=="median" and engine=="auto" and not (frame.dtype.kind in "ui" and frame.dtype.itemsize==1 and par["nbins"]>=256):
+            return None  # only use the histogram when it is exact
+        if self._running_acc is None:
+            if mode=="median":
+                self._running_acc=background_stats.RunningHistogramAccumulator(nbins=par["nbins"],max_count=par["count"])
+            else:
+                self._running_acc=background_stats.RunningSumAccumulator()
+            self._running_acc_frames=[]
+        if mode=="median" and self._running_acc.get_histogram_size(frame.shape)>self._running_acc.max_memory:
+            return None
+        return self._running_acc
+    def _update_running_accumulator(self, acc):
+        """Update the accumulator to contain the current running background frames, only adding and removing the changed frames"""
+        frames=self.running_buffer[1:]
+        if self._running_acc_frames and frames and self._running_acc_frames[0].shape!=frames[0].shape:
+            acc.clear()
+            self._running_acc_frames=[]
+        new_ids={id(f) for f in frames}
+        old_ids={id(f) for f in self._running_acc_frames}
+        for f in self._running_acc_frames:
+            if id(f) not in new_ids:
+                acc.remove(f)
+        for f in frames:
+            if id(f) not in old_ids:
+                acc.add(f)
+        if isinstance(acc,background_stats.RunningHistogramAccumulator) and acc.is_clipped():  # values drifted outside of the histogram range
+            acc.rebuild(frames)
+        self._running_acc_frames=frames  # keep the references, so the frame ids stay unique
+    def _calculate_running_background(self):
+        par=self.v["running/parameters"]
+        acc=self._get_running_accumulator()
+        if acc is None:
+            return self._calculate_background(self.running_buffer[1:],par["mode"],par["dtype"],par["offset"])
+        self._update_running_accumulator(acc)
+        background=acc.get_value() if par["mode"]=="median" else acc.get_value(par["mode"])
+        return self._finalize_background(background,self.running_buffer[1].dtype,par["dtype"],par["offset"])
+    def setup_running_subtraction(self, n=1, mode="mean", step=1, dtype=None, offset=False, engine="auto", nbins=256):
         """
         Setup running background parameters.
 
@@ -513,9 +642,23 @@ class BackgroundSubtractionThread(controller.QTaskThread):
             dtype: numpy dtype of the final background and the output frames; ``None`` means ``int32`` for integer input frames and ``float`` otherwise
             offset: if ``True``, subtract the median background value from it, so that the background subtracted frames stay roughly in the same
                 range as the original; otherwise, keep it the same, which shifts the background subtracted frames range towards zero.
+            engine: background calculation engine; can be ``"full"`` (recalculate the background from the whole buffer for every output frame),
+                ``"incremental"`` (only add new and remove old frames from the running statistics, which takes time independent of `n`;
+                only supported for ``"mean"``, ``"sum"``, and ``"median"`` modes; the median is approximate for frames other than 8-bit integers, see :class:`.RunningHistogramAccumulator`),
+                or ``"auto"`` (incremental for ``"mean"`` and ``"sum"`` modes, and for ``"median"`` mode with 8-bit integer frames where it is exact, and full otherwise);
+                the median is calculated using the full engine if the incremental histogram would take more than 1 GB of memory
+            nbins: number of histogram bins for the incremental median calculation; larger number increases the precision,
+                but also increases memory usage and calculation time
         """
+        funcargparse.check_parameter_range(engine,"engine",["full","incremental","auto"])
+        if engine=="incremental" and mode not in ["mean","sum","median"]:
+            raise ValueError("incremental engine does not support mode {}".format(mode))
+        new_parameters={"count":n,"step":step,"mode":mode,"dtype":dtype,"offset":offset,"engine":engine,"nbins":nbins}
         step_updated=self.v["running/parameters/step"]!=step
-        self.v["running/parameters"]={"count":n,"step":step,"mode":mode,"dtype":dtype,"offset":offset}
+        if new_parameters!=self.v["running/parameters"]:
+            self._running_acc=None
+            self._running_acc_frames=[]
+        self.v["running/parameters"]=new_parameters
         if step_updated:
             self.running_buffer=[]
             self._running_frame_offset=0
@@ -565,7 +708,7 @@ class BackgroundSubtractionThread(controller.QTaskThread):
         if enabled and method=="running":
             par=self.v["running/parameters"]
             if len(self.running_buffer)==par["count"]+1:
-                background,offset=self._calculate_background(self.running_buffer[1:],par["mode"],par["dtype"],par["offset"])
+                background,offset=self._calculate_running_background()
                 if background.shape!=frame.shape:
                     background,offset=None,None
             self.v["running/background/frame"]=background
@@ -29,7 +29,7 @@ class IStreamMessage:
         self.mid=mid
         self.sn=sn
         self._setup_ids()
-        if not type(self)._init_args:
+        if "_init_args" not in type(self).__dict__:  # defined separately for each subclass
             type(self)._init_args=functions.funcsig(self.__init__).arg_names[1:]
 
     def _setup_ids(self):
@@ -110,7 +110,10 @@ class DataStreamMessage(IStreamMessage):
         self._add_metainfo_args(source=source,tag=tag,creation_time=creation_time)
         if "creation_time" not in self.metainfo:
             self.metainfo["creation_time"]=time.time()
-        self.mi=MetainfoAccessor(self)
+    @property
+    def mi(self):
+        """Metainfo accessor (created on request to avoid reference cycles, so that the message data is released as soon as the message is no longer used)"""
+        return MetainfoAccessor(self)
 
     _metainfo_args={"source","tag","creation_time"}  # creation arguments which are automatically added to the metainfo
     def _add_metainfo_args(self, **kwargs):
@@ -288,6 +291,7 @@ class FramesMessage(DataStreamMessage):
         indices: list of frame indices (if a corresponding array contains several frames, it can be the index of the first frame);
             if ``None``, autofill starting from 0
         frame_info: list of frame chunk infos (one per frame);
+            in the chunk mode, each info is either a 2D array with one row per frame, or a 1D structured array with one record per frame;
             if ``None``, keep as ``None``
         source: frames source, e.g., camera or processor
         tag: extra batch tag
@@ -300,11 +304,13 @@ class FramesMessage(DataStreamMessage):
         metainfo: additional metainfo dictionary; the contents is arbitrary, but it's assumed to be message-wide, i.e., common for all frames in the message;
             `source`, `tag`, `creation_time`, and `step` are stored there;
             common additional keys are ``"status_line"`` (expected position of the status line), or ``"frame_info_field"`` (fields name for frame-info entries)
+        pool_blocks: if frames are stored in a preallocated frame pool (see :class:`.FramePool`), contains a list of the corresponding :class:`.FramePoolBlock` handles;
+            the blocks are returned to the pool once all the frame arrays are released, but the handles can be used to additionally hold or release them explicitly
     
     All of the supplied additional data (source, tag, etc.) is automatically added in the metainfo dictionary.
     It can be either directly, e.g., ``msg.metainfo["source"]``, or through the ``.mi`` accessor, e.g., ``msg.mi.source``.
     """
-    def __init__(self, frames, indices=None, frame_info=None, source=None, tag=None, creation_time=None, step=None, chandim=None, chunks=False, metainfo=None, sn=None, sid=None, mid=None):
+    def __init__(self, frames, indices=None, frame_info=None, source=None, tag=None, creation_time=None, step=None, chandim=None, chunks=False, metainfo=None, pool_blocks=None, sn=None, sid=None, mid=None):
         super().__init__(source=source,tag=tag,creation_time=creation_time,metainfo=metainfo,sn=sn,sid=sid,mid=mid)
         self._add_metainfo_args(step=step,chandim=chandim)
         self._add_default_metainfo_args(step=1,chandim=0)
@@ -329,6 +335,7 @@ class FramesMessage(DataStreamMessage):
             if len(frame_info)!=len(self.frames):
                 raise ValueError("frame info array length {} is different from the frames array length {}".format(len(frame_info),len(self.frames)))
         self.frame_info=frame_info
+        self.pool_blocks=pool_blocks
         self.chunks=chunks
         self._setup_chunks()
 
@@ -365,8 +372,8 @@ class FramesMessage(DataStreamMessage):
             if self.frame_info is not None:
                 for i,f in enumerate(self.frames):
                     inf=self.frame_info[i]
-                    if np.ndim(inf)!=2:
-                        raise ValueError("frame info should be a 2-dimensional array in the chunk mode")
+                    if np.ndim(inf)!=2 and not (np.ndim(inf)==1 and inf.dtype.names is not None):
+                        raise ValueError("frame info should be a 2-dimensional array or a 1-dimensional structured array in the chunk mode")
                     if len(inf)!=len(f):
                         raise ValueError("frames and indices array lengths don't agree: {} vs {}".format(len(f),len(inf)))
 
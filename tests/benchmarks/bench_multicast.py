@@ -0,0 +1,56 @@
+"""
+Multicast dispatching benchmark.
+
+Sends multicasts through a :class:`.MulticastPool` with a typical GUI application subscription structure
+(many device threads, each subscribed to several exact tags, tag patterns, and a few additional filter functions),
+and reports the achieved sending rate.
+
+Run as ``python -m tests.benchmarks.bench_multicast`` from the repository root.
+"""
+
+from pylablib.core.thread import multicast_pool
+
+import time
+import argparse
+
+
+def build_pool(nsubs=200, nsrcs=20):
+    """Build a multicast pool with `nsubs` subscribers spread over `nsrcs` sources"""
+    pool=multicast_pool.MulticastPool()
+    counter=[0]
+    def callback(src, tag, value):  # pylint: disable=unused-argument
+        counter[0]+=1
+    for i in range(nsubs):
+        src="device{}".format(i%nsrcs)
+        kind=i%4
+        if kind==0:
+            pool.subscribe_direct(callback,srcs=src,tags="frames/new",priority=i%3)
+        elif kind==1:
+            pool.subscribe_direct(callback,srcs=src,tags="status/*")
+        elif kind==2:
+            pool.subscribe_direct(callback,srcs="any",dsts="gui{}".format(i),tags=["update","refresh"])
+        else:
+            pool.subscribe_direct(callback,srcs=src,tags="frames/new",filt=lambda src,dst,tag,value: value is not None)
+    return pool,counter
+
+def run(nsubs=200, nsrcs=20, nsend=10**5):
+    """Send `nsend` multicasts and return a dictionary with the benchmark results"""
+    pool,counter=build_pool(nsubs=nsubs,nsrcs=nsrcs)
+    tags=["frames/new","status/acquisition","update","other"]
+    keys=[("device{}".format(i%nsrcs),tags[i%len(tags)]) for i in range(nsrcs*len(tags))]
+    t0=time.perf_counter()
+    for i in range(nsend):
+        src,tag=keys[i%len(keys)]
+        pool.send(src,"any",tag,i)
+    dt=time.perf_counter()-t0
+    return {"subscribers":nsubs,"sent":nsend,"delivered":counter[0],"time":dt,"rate":nsend/dt}
+
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description="Multicast dispatching benchmark")
+    parser.add_argument("--subscribers",type=int,default=200,help="number of subscribers")
+    parser.add_argument("--sources",type=int,default=20,help="number of multicast sources")
+    parser.add_argument("--send",type=int,default=10**5,help="number of sent multicasts")
+    args=parser.parse_args()
+    result=run(nsubs=args.subscribers,nsrcs=args.sources,nsend=args.send)
+    print("{sent} multicasts to {subscribers} subscribers ({delivered} calls) in {time:.3f}s: {rate:.0f} multicasts/s".format(**result))
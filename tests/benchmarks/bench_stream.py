@@ -0,0 +1,306 @@
+"""
+Thread and stream messaging benchmark suite.
+
+Measures the performance of the messaging stack used by the streaming applications:
+    - multicast delivery latency (idle and under load) and throughput to a :class:`.QTaskThread` subscriber
+    - :meth:`.QTaskThread.call_command` synchronous round trip time and asynchronous call throughput
+    - thread variables access rates (local :meth:`.QThreadController.set_variable` and cross-thread :meth:`.QThreadController.get_variable`)
+    - :class:`.StreamFormerThread` row and block forming rate for a synthetic DAQ source
+    - :class:`.FramesAccumulator` adding, slicing, and cutting rate under a synthetic camera load
+    - multicast pool dispatching rate (see :mod:`.bench_multicast`)
+
+All tests are headless (the pure-Python thread backend is used by default) and use fixed parameters,
+so the results are comparable between runs; the results are reported as a JSON-serializable dictionary
+together with the environment description (Python, numpy, and pylablib versions, thread backend, and platform).
+
+Run as ``python -m tests.benchmarks.bench_stream`` from the repository root;
+use ``--output <file>`` to store the results as JSON, and ``--compare <file>`` to compare against previously stored results.
+"""
+
+import os
+import sys
+import time
+import json
+import platform
+import argparse
+import threading
+
+import numpy as np
+
+
+
+def _time_stats(times):
+    """Get statistics of a list of time intervals (in seconds)"""
+    times=np.asarray(times)
+    return {"count":len(times),"mean":float(times.mean()),"p50":float(np.percentile(times,50)),
+        "p99":float(np.percentile(times,99)),"max":float(times.max())}
+
+def _wait_event(event, timeout=60.):
+    if not event.wait(timeout):
+        raise RuntimeError("benchmark timed out")
+
+
+
+def bench_multicast_delivery(controller, nidle=1000, nload=10**4):
+    """Measure multicast latency to a :class:`.QTaskThread` subscriber while idle and under load, and the delivery throughput"""
+    done=threading.Event()
+    state={"latencies":[],"expected":0,"t_end":None}
+    class Receiver(controller.QTaskThread):
+        def setup_task(self):  # pylint: disable=arguments-differ
+            self.subscribe_commsync(self.on_multicast,srcs="bench_runner",tags="bench/latency",limit_queue=None)
+        def on_multicast(self, src, tag, value):  # pylint: disable=unused-argument
+            t=time.perf_counter()
+            state["latencies"].append(t-value)
+            if len(state["latencies"])>=state["expected"]:
+                state["t_end"]=t
+                done.set()
+    recv=Receiver("bench_mc_receiver")
+    recv.start()
+    controller.sync_controller("bench_mc_receiver")
+    ctl=controller.get_controller()
+    try:
+        for i in range(nidle):
+            state["expected"]=i+1
+            done.clear()
+            ctl.send_multicast(tag="bench/latency",value=time.perf_counter())
+            _wait_event(done)
+        idle=_time_stats(state["latencies"])
+        state.update(latencies=[],expected=nload)
+        done.clear()
+        t0=time.perf_counter()
+        for _ in range(nload):
+            ctl.send_multicast(tag="bench/latency",value=time.perf_counter())
+        _wait_event(done)
+        return {"latency_idle":idle,"latency_load":_time_stats(state["latencies"]),"throughput":nload/(state["t_end"]-t0)}
+    finally:
+        recv.stop(sync=True)
+
+def bench_call_command(controller, nsync=2000, nasync=10**4):
+    """Measure synchronous command round trip time and asynchronous command throughput"""
+    class Device(controller.QTaskThread):
+        def setup_task(self):  # pylint: disable=arguments-differ
+            self.add_command("echo")
+        def echo(self, value):
+            return value
+    dev=Device("bench_cmd_device")
+    dev.start()
+    controller.sync_controller("bench_cmd_device")
+    try:
+        times=[]
+        for i in range(nsync):
+            t0=time.perf_counter()
+            dev.cs.echo(i)
+            times.append(time.perf_counter()-t0)
+        t0=time.perf_counter()
+        for i in range(nasync):
+            dev.ca.echo(i)
+        dev.cs.echo(0)
+        return {"round_trip":_time_stats(times),"async_rate":nasync/(time.perf_counter()-t0)}
+    finally:
+        dev.stop(sync=True)
+
+def bench_variables(controller, nset=10**5, nget=10**4):
+    """Measure local thread variable setting rate and cross-thread variable getting rate"""
+    class Device(controller.QTaskThread):
+        def setup_task(self):  # pylint: disable=arguments-differ
+            self.add_command("set_many")
+            self.v["bench/value"]=0
+            self.v["bench/branch"]={"a":1,"b":{"c":2,"d":3}}
+        def set_many(self, n):
+            t0=time.perf_counter()
+            for i in range(n):
+                self.v["bench/value"]=i
+            return n/(time.perf_counter()-t0)
+    dev=Device("bench_var_device")
+    dev.start()
+    controller.sync_controller("bench_var_device")
+    try:
+        set_rate=dev.cs.set_many(nset)
+        t0=time.perf_counter()
+        for _ in range(nget):
+            dev.get_variable("bench/value")
+        get_rate=nget/(time.perf_counter()-t0)
+        t0=time.perf_counter()
+        for _ in range(nget):
+            dev.get_variable("bench/branch")
+        get_branch_rate=nget/(time.perf_counter()-t0)
+        return {"set_rate":set_rate,"get_rate":get_rate,"get_branch_rate":get_branch_rate}
+    finally:
+        dev.stop(sync=True)
+
+def bench_stream_former(controller, nmsg=1000, chunk=100, block_period=1000):
+    """Measure :class:`.StreamFormerThread` forming rate for a DAQ source sending `nmsg` chunks of `chunk` samples in two channels"""
+    from pylablib.thread.stream import blockstream
+    done=threading.Event()
+    state={"rows":0,"blocks":0,"t_end":None}
+    nrows=nmsg*chunk
+    class Former(blockstream.StreamFormerThread):
+        def setup_task(self):  # pylint: disable=arguments-differ
+            super().setup_task()
+            self.block_period=block_period
+            for ch in ["x","y"]:
+                self.add_channel(ch,max_queue_len=None,expand_list=True)
+            self.add_channel("t",func=time.time)
+            self.subscribe_source("daq","bench_runner",tags="daq/data")
+    def on_block(src, tag, block):  # pylint: disable=unused-argument
+        state["rows"]+=len(block)
+        state["blocks"]+=1
+        if state["rows"]>=nrows:
+            state["t_end"]=time.perf_counter()
+            done.set()
+    former=Former("bench_former")
+    former.start()
+    controller.sync_controller("bench_former")
+    ctl=controller.get_controller()
+    sid=ctl.subscribe_direct(on_block,srcs="bench_former",tags="stream/data")
+    try:
+        data=[{"x":list(range(i*chunk,(i+1)*chunk)),"y":[float(i)]*chunk} for i in range(nmsg)]
+        t0=time.perf_counter()
+        for d in data:
+            ctl.send_multicast(tag="daq/data",value=d)
+        _wait_event(done)
+        dt=state["t_end"]-t0
+        return {"rows":state["rows"],"blocks":state["blocks"],"row_rate":state["rows"]/dt,"block_rate":state["blocks"]/dt}
+    finally:
+        ctl.unsubscribe(sid)
+        former.stop(sync=True)
+
+def bench_frames_accumulator(nmsg=2000, chunk=10, shape=(64,64), time_bin=4):
+    """
+    Measure :class:`.FramesAccumulator` rate under a synthetic camera load.
+
+    Every message contains a chunk of `chunk` frames with the given `shape`;
+    the accumulator is used in the same way as in the frame binning: add message, extract every `time_bin`'th frame, and cut the remainder.
+    """
+    from pylablib.thread.stream import stream_manager, stream_message
+    src=stream_manager.StreamSource(builder=stream_message.FramesMessage,sn="bench_cam")
+    rng=np.random.default_rng(0)
+    frames=rng.integers(0,2**12,size=(chunk,)+shape,dtype="u2")
+    msgs=[src.build_message([frames],[i*chunk],source="bench_cam") for i in range(nmsg)]
+    acc=stream_message.FramesAccumulator()
+    nout=0
+    t0=time.perf_counter()
+    for msg in msgs:
+        acc.add_message(msg)
+        _,indices,_=acc.get_slice(0,-(time_bin-1) or None,step=time_bin,flatten=True)
+        nout+=len(indices)
+        acc.cut_to_size(acc.nframes()%time_bin,from_end=True)
+    dt=time.perf_counter()-t0
+    return {"frames":nmsg*chunk,"frames_out":nout,"frame_rate":nmsg*chunk/dt,"message_rate":nmsg/dt}
+
+def bench_multicast_dispatch(nsend=10**5):
+    """Measure multicast pool dispatching rate (see :mod:`.bench_multicast`)"""
+    from . import bench_multicast
+    return bench_multicast.run(nsend=nsend)
+
+
+
+def get_environment():
+    """Get the description of the benchmark environment"""
+    import pylablib
+    from pylablib.core.thread import backend
+    return {"python":platform.python_version(),"implementation":platform.python_implementation(),"platform":platform.platform(),
+        "machine":platform.machine(),"cpus":os.cpu_count(),"numpy":np.__version__,"pylablib":pylablib.__version__,
+        "thread_backend":backend.backend,"time":time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def run(scale=1., tests=None):
+    """
+    Run the benchmark suite and return a dictionary with the results.
+
+    `scale` scales the number of repetitions in all tests (e.g., use ``0.1`` for a quick check).
+    `tests` is an optional list of test names to run (by default, run all tests).
+    """
+    from pylablib.core.thread import controller, backend
+    if backend.backend=="qt":
+        from pylablib.core.gui import QtWidgets
+        app=QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    else:
+        app=backend.QtCore.QCoreApplication.instance() or backend.QtCore.QCoreApplication([])
+    def n(v):
+        return max(int(v*scale),1)
+    thread_tests={
+        "multicast_delivery":lambda: bench_multicast_delivery(controller,nidle=n(1000),nload=n(10**4)),
+        "call_command":lambda: bench_call_command(controller,nsync=n(2000),nasync=n(10**4)),
+        "variables":lambda: bench_variables(controller,nset=n(10**5),nget=n(10**4)),
+        "stream_former":lambda: bench_stream_former(controller,nmsg=n(1000)),
+    }
+    local_tests={
+        "frames_accumulator":lambda: bench_frames_accumulator(nmsg=n(2000)),
+        "multicast_dispatch":lambda: bench_multicast_dispatch(nsend=n(10**5)),
+    }
+    tests=tests or list(thread_tests)+list(local_tests)
+    unknown=[t for t in tests if t not in thread_tests and t not in local_tests]
+    if unknown:
+        raise ValueError("unknown tests: {}".format(", ".join(unknown)))
+    results={}
+    errors=[]
+    class Runner(controller.QThreadController):
+        def run(self):
+            try:
+                for t in tests:
+                    if t in thread_tests:
+                        results[t]=thread_tests[t]()
+            except Exception:  # pylint: disable=broad-except
+                errors.append(sys.exc_info()[1])
+            finally:
+                controller.stop_app()
+    if any(t in thread_tests for t in tests):
+        controller.get_gui_controller()
+        Runner("bench_runner",kind="run").start()
+        app.exec_()
+        if errors:
+            raise errors[0]
+    for t in tests:
+        if t in local_tests:
+            results[t]=local_tests[t]()
+    return {"environment":get_environment(),"scale":scale,"results":{t:results[t] for t in tests}}
+
+
+
+def _flatten(d, prefix=""):
+    res={}
+    for k,v in d.items():
+        if isinstance(v,dict):
+            res.update(_flatten(v,prefix+k+"/"))
+        elif isinstance(v,(int,float)):
+            res[prefix+k]=v
+    return res
+def compare(new, old):
+    """Compare two results dictionaries and return a dictionary ``{name: (old, new, ratio)}`` for all numerical results"""
+    new_values=_flatten(new["results"])
+    old_values=_flatten(old["results"])
+    return {k:(old_values[k],v,(v/old_values[k] if old_values[k] else None)) for k,v in new_values.items() if k in old_values}
+
+def format_results(results):
+    """Format the results as a human-readable text"""
+    lines=["{}: {}".format(k,v) for k,v in results["environment"].items()]
+    for k,v in _flatten(results["results"]).items():
+        lines.append("{:<50} {:.4g}".format(k,v))
+    return "\n".join(lines)
+
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description="Thread and stream messaging benchmark suite")
+    parser.add_argument("tests",nargs="*",help="tests to run (by default, run all tests)")
+    parser.add_argument("--backend",choices=["qt","headless"],default="headless",help="thread backend")
+    parser.add_argument("--scale",type=float,default=1.,help="repetitions scale (e.g., 0.1 for a quick check)")
+    parser.add_argument("--json",action="store_true",help="print results as JSON")
+    parser.add_argument("--output",help="file to store the results as JSON")
+    parser.add_argument("--compare",help="JSON file with the previous results to compare to")
+    args=parser.parse_args()
+    os.environ["PYLABLIB_THREAD_BACKEND"]=args.backend
+    os.environ.setdefault("QT_QPA_PLATFORM","offscreen")
+    all_results=run(scale=args.scale,tests=args.tests)
+    if args.output:
+        with open(args.output,"w") as f:
+            json.dump(all_results,f,indent=2)
+    if args.json:
+        print(json.dumps(all_results))
+    else:
+        print(format_results(all_results))
+    if args.compare:
+        with open(args.compare,"r") as f:
+            previous=json.load(f)
+        print("\n{:<50} {:>12} {:>12} {:>8}".format("result","previous","current","ratio"))
+        for k,(old,new,ratio) in compare(all_results,previous).items():
+            print("{:<50} {:>12.4g} {:>12.4g} {:>8}".format(k,old,new,"" if ratio is None else "{:.2f}".format(ratio)))
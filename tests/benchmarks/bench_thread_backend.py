@@ -0,0 +1,110 @@
+"""
+Thread controller backend benchmark.
+
+Compares Qt and headless (pure-Python) controller backends (see :mod:`pylablib.core.thread.backend`):
+measures the import time, memory footprint, message throughput between two controllers,
+asynchronous command throughput, and synchronous command round trip time.
+Each backend is measured in a separate process, since the backend is selected on import.
+
+Run as ``python -m tests.benchmarks.bench_thread_backend`` from the repository root.
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import subprocess
+
+
+
+def _max_rss():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/2**10
+    except ImportError:
+        return None
+
+def run(nmsg=10**4, ncalls=10**4, nsync=200):
+    """Run the benchmark using the backend selected in the current process and return a dictionary with the results"""
+    t0=time.perf_counter()
+    from pylablib.core.thread import controller, backend
+    import_time=time.perf_counter()-t0
+    if backend.backend=="qt":
+        from pylablib.core.gui import QtWidgets
+        app=QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    else:
+        app=backend.QtCore.QCoreApplication.instance() or backend.QtCore.QCoreApplication([])
+    results={"backend":backend.backend,"import_time":import_time}
+
+    class Receiver(controller.QThreadController):
+        def run(self):
+            for _ in range(nmsg):
+                self.wait_for_message("bench",top_loop=True)
+            results["receive_end"]=time.perf_counter()
+    class Device(controller.QTaskThread):
+        def setup_task(self):
+            self.add_command("echo")
+        def echo(self, value):
+            return value
+    class Runner(controller.QThreadController):
+        def run(self):
+            try:
+                recv=Receiver("bench_receiver",kind="run")
+                recv.start()
+                recv.sync_exec_point("run")
+                t0=time.perf_counter()
+                for i in range(nmsg):
+                    recv.send_message("bench",i)
+                recv.sync_exec_point("stop")
+                results["message_rate"]=nmsg/(results["receive_end"]-t0)
+                dev=Device("bench_device")
+                dev.start()
+                controller.sync_controller("bench_device")
+                t0=time.perf_counter()
+                for i in range(ncalls):
+                    dev.ca.echo(i)
+                dev.cs.echo(0)
+                results["command_rate"]=ncalls/(time.perf_counter()-t0)
+                t0=time.perf_counter()
+                for i in range(nsync):
+                    dev.cs.echo(i)
+                results["sync_call_time"]=(time.perf_counter()-t0)/nsync
+                dev.stop(sync=True)
+                results["max_rss_mb"]=_max_rss()
+            finally:
+                controller.stop_app()
+    controller.get_gui_controller()
+    Runner("bench_runner",kind="run").start()
+    app.exec_()
+    return results
+
+def run_backend(backend, nmsg=10**4, ncalls=10**4, nsync=200):
+    """Run the benchmark with the given backend in a separate process and return a dictionary with the results"""
+    env=dict(os.environ,PYLABLIB_THREAD_BACKEND=backend)
+    env.setdefault("QT_QPA_PLATFORM","offscreen")
+    args=[sys.executable,"-m","tests.benchmarks.bench_thread_backend","--backend",backend,"--json",
+        "--messages",str(nmsg),"--calls",str(ncalls),"--sync-calls",str(nsync)]
+    out=subprocess.run(args,env=env,stdout=subprocess.PIPE,check=True).stdout
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description="Thread controller backend benchmark")
+    parser.add_argument("--backend",choices=["qt","headless"],help="run only the given backend in the current process (by default, compare all backends)")
+    parser.add_argument("--messages",type=int,default=10**4,help="number of sent messages")
+    parser.add_argument("--calls",type=int,default=10**4,help="number of asynchronous command calls")
+    parser.add_argument("--sync-calls",type=int,default=200,help="number of synchronous command calls")
+    parser.add_argument("--json",action="store_true",help="print results as JSON")
+    args=parser.parse_args()
+    if args.backend:
+        os.environ["PYLABLIB_THREAD_BACKEND"]=args.backend
+        all_results=[run(nmsg=args.messages,ncalls=args.calls,nsync=args.sync_calls)]
+    else:
+        all_results=[run_backend(b,nmsg=args.messages,ncalls=args.calls,nsync=args.sync_calls) for b in ["qt","headless"]]
+    for r in all_results:
+        if args.json:
+            print(json.dumps(r))
+        else:
+            print(("{backend:>8}: import {import_time:.3f}s, max RSS {max_rss_mb:.0f}MB, messages {message_rate:.0f}/s, "
+                "async commands {command_rate:.0f}/s, sync command {sync_call_time_ms:.2f}ms").format(sync_call_time_ms=r["sync_call_time"]*1E3,**r))
@@ -0,0 +1,355 @@
+import pytest
+
+import numpy as np
+import threading
+import types
+import time
+
+from pylablib.core.devio import comm_backend, SCPI, interface
+
+
+
+##### Basic import tests #####
+
+def test_imports():
+    """Test general non-failing of imports"""
+    import pylablib.core.devio.comm_backend
+    import pylablib.core.devio.interface
+    import pylablib.core.devio.SCPI
+    import pylablib.core.devio.data_format
+
+
+
+
+##### Buffered reader tests #####
+
+class ChunkSource:
+    """Fake device which returns the given data chunks one by one (each chunk is available as a whole)"""
+    def __init__(self, chunks=()):
+        self.chunks=[bytes(c) for c in chunks if c]
+        self.nreads=0
+    def read(self, size):
+        self.nreads+=1
+        if not self.chunks:
+            return b""
+        data,self.chunks[0]=self.chunks[0][:size],self.chunks[0][size:]
+        if not self.chunks[0]:
+            self.chunks.pop(0)
+        return data
+    def pending(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+def test_buffered_term_reader():
+    """Test reading terminated messages in blocks"""
+    src=ChunkSource([b"a\nbb\r\nccc\n"])
+    reader=comm_backend.BufferedTermReader(src.read,src.pending)
+    assert [reader.read_terms([b"\n"]) for _ in range(3)]==[b"a\n",b"bb\r\n",b"ccc\n"]
+    assert src.nreads==1
+    assert reader.read_terms([b"\n"]) is None
+    src=ChunkSource([b"ab\r",b"\ncd\r\n\r",b"\nef"])  # terminator split between the blocks
+    reader=comm_backend.BufferedTermReader(src.read,src.pending)
+    assert [reader.read_terms([b"\r\n"]) for _ in range(3)]==[b"ab\r\n",b"cd\r\n",b"\r\n"]
+    assert reader.read_terms([b"\r\n"]) is None
+    assert reader.pop()==b"ef"
+    src=ChunkSource([b"x;y\r\n"])  # the earliest terminator is used
+    reader=comm_backend.BufferedTermReader(src.read,src.pending)
+    assert [reader.read_terms([b"\r\n",b";"]) for _ in range(2)]==[b"x;",b"y\r\n"]
+    src=ChunkSource([b"abc\ndef",b"gh\n"])  # mixed fixed-size and terminated reads
+    reader=comm_backend.BufferedTermReader(src.read,src.pending,max_block_size=4)
+    assert reader.read_terms([b"\n"])==b"abc\n"
+    assert len(reader)==0
+    assert reader.read(2)==b"de"
+    assert reader.read_terms([b"\n"])==b"fgh\n"
+    src=ChunkSource([b"ab\ncdef"])
+    reader=comm_backend.BufferedTermReader(src.read,src.pending)
+    assert reader.read_terms([b"\n"])==b"ab\n"
+    assert reader.read(1)==b"c"
+    buffer=bytearray(3)
+    assert reader.read_into(buffer)==3 and buffer==b"def"
+    src=ChunkSource([b"abc"])  # no pending function: byte-by-byte reading
+    reader=comm_backend.BufferedTermReader(src.read)
+    assert reader.read_terms([b"b"])==b"ab"
+    assert src.nreads==2
+    assert reader.read_terms()==None
+    assert reader.pop()==b"c"
+
+
+@pytest.fixture
+def loop_backend():
+    """Serial backend connected to the loopback port"""
+    pytest.importorskip("serial")
+    backend=comm_backend.SerialDeviceBackend("loop://",timeout=0.2,term_read="\n",datatype="bytes")
+    yield backend
+    backend.close()
+
+def _loop_write(backend, data):
+    # loop port blocks on writing large amounts of data until it is read, so write in a separate thread
+    thread=threading.Thread(target=backend.instr.write,args=(data,),daemon=True)
+    thread.start()
+    return thread
+
+def test_serial_buffered_read(loop_backend):
+    """Test buffered reading of the serial backend"""
+    lines=[b"%d,%f"%(i,i*.5) for i in range(2000)]
+    _loop_write(loop_backend,b"".join(l+b"\n" for l in lines))
+    assert [loop_backend.readline() for _ in lines]==lines
+    loop_backend.instr.write(b"ab\r\ncd;ef\r\nXYZ12345\n\n")
+    assert loop_backend.read_multichar_term(["\r\n",";"])==b"ab"
+    assert loop_backend.read_multichar_term(["\r\n",";"])==b"cd"
+    assert loop_backend.readline(remove_term=False)==b"ef\r\n"
+    assert loop_backend.read(3)==b"XYZ"
+    assert loop_backend.readline()==b"12345"
+    assert loop_backend.readline(skip_empty=False)==b""
+    loop_backend.instr.write(b"first\nsecond\nthird")
+    assert loop_backend.readline()==b"first"
+    assert loop_backend.flush_read()==len(b"second\nthird")
+    assert loop_backend.read()==b""
+
+def test_serial_buffered_read_timeout(loop_backend):
+    """Test timeouts during buffered reading of the serial backend"""
+    loop_backend.instr.write(b"tail")
+    assert loop_backend.readline(error_on_timeout=False)==b"tail"
+    loop_backend.instr.write(b"more")
+    with pytest.raises(comm_backend.DeviceBackendError):
+        loop_backend.readline()
+    loop_backend.instr.write(b"\n")
+    assert loop_backend.readline()==b"more"
+    loop_backend.instr.write(b"ab")
+    with pytest.raises(comm_backend.DeviceBackendError):
+        loop_backend.read(3)
+
+
+
+
+##### SCPI query pipelining tests #####
+
+class FakeSCPIBackend(comm_backend.IDeviceCommBackend):
+    """Fake SCPI device backend which replies to queries of the stored values, including compound queries"""
+    _backend="fake"
+    Error=comm_backend.DeviceBackendError
+    def __init__(self, values, compound=True):
+        super().__init__("fake")
+        self.values=values
+        self.compound=compound
+        self.replies=[]
+        self.writes=[]
+        self.timeout=1.
+    def set_timeout(self, timeout):
+        self.timeout=timeout
+    def get_timeout(self):
+        return self.timeout
+    def write(self, data, flush=True, read_echo=False, read_echo_delay=0, read_echo_lines=1):
+        data=data.decode() if isinstance(data,bytes) else data
+        self.writes.append(data)
+        queries=[q.strip().lstrip(":") for q in data.split(";")]
+        if len(queries)>1 and not self.compound:
+            return
+        for q in queries:
+            if not q.endswith("?") and " " in q:
+                name,value=q.split(" ",1)
+                self.values[name]=value
+        replies=[self.values[q[:-1]] for q in queries if q.endswith("?")]
+        if replies:
+            self.replies.append(";".join(replies))
+    def readline(self, remove_term=True, timeout=None, skip_empty=True):  # pylint: disable=arguments-differ
+        if not self.replies:
+            raise self.Error(Exception("timeout during read"))
+        return self.replies.pop(0).encode()
+    def read(self, size=None):
+        if size is None:
+            replies,self.replies=self.replies,[]
+            return "\n".join(replies).encode()
+        raise self.Error(Exception("timeout during read"))
+
+class FakeSCPIDevice(SCPI.SCPIDevice):
+    _id_comm=None
+    def __init__(self, values, compound=True, failsafe=False):
+        super().__init__(FakeSCPIBackend(values,compound=compound),failsafe=failsafe)
+
+_fake_scpi_values={"OUTP:STATE":"1","SOUR:VOLT":"12.5","SOUR:CURR":"0.25","MEAS:VOLT":"12.49","SYST:ERR":'0,"No error"'}
+@pytest.mark.parametrize("mode",[None,"concatenate","separate"])
+def test_scpi_ask_multiple(mode):
+    """Test multiple queries with different pipeline modes"""
+    dev=FakeSCPIDevice(dict(_fake_scpi_values))
+    dev.setup_query_pipeline(mode,size=2)
+    writes=dev.instr.writes
+    queries=["SOUR:VOLT?",("OUTP:STATE?","bool"),"SOUR:CURR?","MEAS:VOLT?",("SYST:ERR?","string")]
+    assert dev.ask_multiple(queries,"float")==[12.5,True,0.25,12.49,'0,"No error"']
+    assert len(writes)==(3 if mode=="concatenate" else 5)
+    if mode=="concatenate":
+        assert writes[0]==":SOUR:VOLT?;:OUTP:STATE?"
+    assert dev.ask_multiple(["OUTP:STATE?"],"bool")==[True]
+    assert dev.ask_multiple([])==[]
+    assert not dev.instr.replies
+
+def test_scpi_ask_multiple_fallback():
+    """Test falling back to sequential queries if pipelined replies can not be split"""
+    values=dict(_fake_scpi_values,**{"SYST:ERR":'0,"No error;ok"'})
+    for failsafe in [False,True]:  # wrong number of replies is not retried even in the failsafe mode
+        dev=FakeSCPIDevice(values,failsafe=failsafe)
+        dev.setup_query_pipeline("concatenate")
+        queries=["SOUR:VOLT?","SYST:ERR?","MEAS:VOLT?"]
+        t0=time.time()
+        assert dev.ask_multiple(queries)==["12.5",'0,"No error;ok"',"12.49"]
+        assert time.time()-t0<1.
+        assert dev.instr.writes==[":SOUR:VOLT?;:SYST:ERR?;:MEAS:VOLT?"]+queries
+        assert not dev.instr.replies
+    dev=FakeSCPIDevice(dict(_fake_scpi_values),compound=False)  # device does not support compound queries
+    dev.setup_query_pipeline("concatenate")
+    assert dev.ask_multiple(["SOUR:VOLT?","MEAS:VOLT?"],"float")==[12.5,12.49]
+
+
+
+
+##### Device variables cache tests #####
+
+class Clock:
+    """Fake clock for time-to-live checks"""
+    def __init__(self):
+        self.t=0.
+    def time(self):
+        return self.t
+
+def test_device_variable_cache(monkeypatch):
+    """Test device variables cache policies"""
+    clock=Clock()
+    monkeypatch.setattr(interface,"time",types.SimpleNamespace(time=clock.time))
+    cache=interface.DeviceVariableCache()
+    calls={}
+    def getter(key):
+        def get():
+            calls[key]=calls.get(key,0)+1
+            return calls[key]
+        return get
+    for key,policy in [("live",None),("const","constant"),("set","set"),("ttl",1.)]:
+        cache.set_policy(key,policy)
+    with pytest.raises(ValueError):
+        cache.set_policy("wrong","always")
+    assert cache.get_policy("live") is None and cache.get_policy("ttl")==1.
+    values=[{k:cache.get(k,getter(k)) for k in ["live","const","set","ttl"]} for _ in range(2)]
+    assert values==[{"live":1,"const":1,"set":1,"ttl":1},{"live":2,"const":1,"set":1,"ttl":1}]
+    assert cache.get_stats()=={"const":(1,1),"set":(1,1),"ttl":(1,1)}
+    clock.t=1.5
+    assert not cache.is_valid("ttl") and cache.is_valid("set")
+    assert cache.get("ttl",getter("ttl"))==2
+    cache.invalidate("set")
+    assert cache.get("set",getter("set"))==2 and cache.get("const",getter("const"))==1
+    cache.invalidate()
+    assert not cache.is_valid("ttl") and cache.is_valid("const")
+    cache.invalidate(constant=True)
+    assert cache.get("const",getter("const"))==2
+    assert cache.get_stats()=={"const":(2,2),"set":(1,2),"ttl":(1,2)}
+    cache.reset_stats()
+    assert cache.get_stats()=={"const":(0,0),"set":(0,0),"ttl":(0,0)}
+    cache.set_policy("const","live")
+    assert cache.get("const",getter("const"))==3
+    assert "const" not in cache.get_stats()
+
+
+class CachedFakeSCPIDevice(FakeSCPIDevice):
+    def __init__(self, values):
+        super().__init__(values)
+        self._add_scpi_parameter("voltage_setpoint","SOUR:VOLT",add_variable=True,cache="set")
+        self._add_scpi_parameter("current_setpoint","SOUR:CURR")
+        self._add_scpi_parameter("voltage","MEAS:VOLT")
+        self._add_scpi_parameter("output","OUTP:STATE",kind="bool")
+        self._add_settings_variable("setpoints",self.get_setpoints,cache="set")
+        self._add_settings_variable("output",lambda: self._get_scpi_parameter("output"),lambda v: self._set_scpi_parameter("output",v))
+        self._add_status_variable("voltage",lambda: self._get_scpi_parameter("voltage"),cache=1.)
+        self._add_info_variable("error",lambda: self.ask("SYST:ERR?"),cache="constant")
+    def get_setpoints(self):
+        return self._get_scpi_parameter("voltage_setpoint"),self._get_scpi_parameter("current_setpoint")
+
+def test_scpi_variable_cache(monkeypatch):
+    """Test device variables caching and invalidation in SCPI devices"""
+    clock=Clock()
+    monkeypatch.setattr(interface,"time",types.SimpleNamespace(time=clock.time))
+    dev=CachedFakeSCPIDevice(dict(_fake_scpi_values))
+    writes=dev.instr.writes
+    full_info={"voltage_setpoint":12.5,"setpoints":(12.5,0.25),"output":True,"voltage":12.49,"error":'0,"No error"'}
+    info=dev.get_full_info()
+    assert {k:info[k] for k in full_info}==full_info
+    nwrites=len(writes)
+    assert dev.get_full_info()==info
+    assert writes[nwrites:]==["OUTP:STATE?"]  # only the non-cached variable is queried
+    assert {k:v for k,v in dev.get_cache_stats().items() if k in full_info}=={"voltage_setpoint":(1,1),"setpoints":(1,1),"voltage":(1,1),"error":(1,1)}
+    dev._set_scpi_parameter("current_setpoint",1)  # used by "setpoints" variable
+    assert dev.dv["setpoints"]==(12.5,1)
+    assert dev.dv["voltage_setpoint"]==12.5
+    assert dev.get_cache_stats()["voltage_setpoint"]==(2,1)
+    dev.set_device_variable("voltage_setpoint",5)
+    nwrites=len(writes)
+    assert dev.get_settings()=={"voltage_setpoint":5,"setpoints":(5,1),"output":True}
+    assert sorted(writes[nwrites:])==sorted(["SOUR:VOLT?","SOUR:VOLT?","SOUR:CURR?","OUTP:STATE?"])
+    dev.apply_settings({"voltage_setpoint":7})
+    assert dev.get_settings(include=["voltage_setpoint","setpoints"])=={"voltage_setpoint":7,"setpoints":(7,1)}
+    dev.instr.values["MEAS:VOLT"]="3"
+    assert dev.dv["voltage"]==12.49
+    clock.t=1.5
+    assert dev.dv["voltage"]==3
+    dev.instr.values["SYST:ERR"]="1"
+    dev.invalidate_cache()
+    assert dev.dv["error"]=='0,"No error"'
+    dev.invalidate_cache(constant=True)
+    assert dev.dv["error"]=="1"
+    dev.instr.values["SYST:ERR"]="2"
+    dev.close()
+    dev.open()
+    assert dev.dv["error"]=="2"
+
+
+
+
+##### SCPI binary blocks tests #####
+
+class LoopSCPIDevice(SCPI.SCPIDevice):
+    _id_comm=None
+
+@pytest.fixture
+def loop_scpi_device():
+    """SCPI device connected to the serial loopback port"""
+    pytest.importorskip("serial")
+    dev=LoopSCPIDevice("loop://",backend="serial",term_read="\n",term_write="\n",timeout=2.)
+    yield dev
+    dev.close()
+
+def _block(data):
+    data=np.asarray(data).tobytes()
+    length=str(len(data)).encode()
+    return b"#"+str(len(length)).encode()+length+data
+
+def test_scpi_binary_block(loop_scpi_device):
+    """Test reading SCPI binary blocks"""
+    dev=loop_scpi_device
+    data=(np.arange(10**4)%5000).astype("<u2")
+    _loop_write(dev.instr,_block(data)+b"\nOK\n")
+    result=dev.read_binary_block("<u2")
+    assert result.dtype==np.dtype("<u2") and np.array_equal(result,data)
+    assert dev.instr.readline()==b"OK"
+    dev.instr.instr.write(_block(data[:10])+b","+_block(data[10:30])+b"; "+_block(data[30:32])+b"\nOK\n")
+    assert np.array_equal(dev.read_binary_block("<u2",nblocks=3),data[:32])
+    assert dev.instr.readline()==b"OK"
+    dev.instr.instr.write(b"#0"+data[:3].tobytes()+b"\nOK\n")
+    assert np.array_equal(dev.read_binary_block("<u2"),data[:3])
+    assert dev.instr.readline()==b"OK"
+    dev.instr.instr.write(_block(np.arange(4,dtype=">f4"))+b"\n")
+    assert np.array_equal(dev.read_binary_block(">f4"),np.arange(4))
+
+def test_scpi_binary_block_out(loop_scpi_device):
+    """Test reading SCPI binary blocks into preallocated arrays"""
+    dev=loop_scpi_device
+    data=np.arange(1000,dtype="<i4")
+    out=np.full(1200,-1,dtype="<i4")
+    dev.instr.instr.write(_block(data[:600])+b","+_block(data[600:])+b"\n")
+    result=dev.read_binary_block("<i4",out=out,nblocks=2)
+    assert np.shares_memory(result,out)
+    assert np.array_equal(result,data)
+    assert np.all(out[1000:]==-1)
+    out=np.zeros(3,dtype="u1")
+    dev.instr.instr.write(b"#0abc\n")
+    assert dev.read_binary_block(out=out).tobytes()==b"abc"
+    dev.instr.instr.write(_block(data[:10])+b"\n")
+    with pytest.raises(SCPI.DeviceError):
+        dev.read_binary_block("<i4",out=np.zeros(5,dtype="<i4"))
+    with pytest.raises(ValueError):
+        dev.read_binary_block("<i4",out=np.zeros((4,4),dtype="<i4")[:,0])
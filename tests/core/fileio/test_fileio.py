@@ -19,6 +19,8 @@ def test_imports():
     import pylablib.core.fileio.parse_csv
     import pylablib.core.fileio.savefile
     import pylablib.core.fileio.table_stream
+    import pylablib.core.fileio.stream_writer
+    import pylablib.core.fileio.frame_stack
 
 
 ##### Table saving tests #####
@@ -134,4 +136,82 @@ def test_dictionary_saving(test_dict, tmpdir):
     path=os.path.join(tmpdir,"test.dat")
     savefile.save_dict(test_dict,path,use_rep_classes=True)
     load_dict=loadfile.load_dict(path)
-    compare_dicts(test_dict,load_dict)
\ No newline at end of file
+    compare_dicts(test_dict,load_dict)
+
+
+##### Stream writer tests #####
+
+from pylablib.core.fileio import stream_writer
+
+@pytest.mark.parametrize("direct",[False,True])
+def test_stream_writer(tmpdir, direct):
+    """Test stream writer consistency with buffer spanning, flushing, and appending"""
+    path=os.path.join(tmpdir,"stream.bin")
+    data=np.random.randint(0,256,size=10**5+123).astype("u1")
+    with stream_writer.StreamFileWriter(path,buffer_size=10**4,preallocate=10**5,direct=direct) as writer:
+        writer.write(data[:500])
+        writer.flush()
+        writer.write(data[500:])
+    assert np.array_equal(np.fromfile(path,dtype="u1"),data)
+    with stream_writer.StreamFileWriter(path,append=True,direct=direct) as writer:
+        writer.write(b"abc")
+    assert os.path.getsize(path)==len(data)+3
+
+
+
+##### Frame stack tests #####
+
+from pylablib.core.fileio import frame_stack, dict_entry
+
+@pytest.mark.parametrize("compression",["none","zlib"])
+def test_frame_stack(tmpdir, compression):
+    """Test frame stack writing, appending, and random access consistency"""
+    path=os.path.join(tmpdir,"frames.bin")
+    frames=np.random.poisson(0.5,size=(200,16,8)).astype("u2")
+    info=np.column_stack((np.arange(200),np.arange(200)*2))
+    with frame_stack.FrameStackWriter(path,chunk_size=16,compression=compression) as writer:
+        writer.add_frames(frames[:100],info[:100])
+        writer.add_frames(frames[100],info[100])
+    with frame_stack.FrameStackWriter(path,append=True) as writer:
+        writer.add_frames(frames[101:],info[101:])
+    with frame_stack.FrameStackReader(path) as reader:
+        assert len(reader)==len(frames)
+        assert np.array_equal(reader.read_all(),frames)
+        assert np.array_equal(reader[-3],frames[-3])
+        assert np.array_equal(reader[[150,2,17]],frames[[150,2,17]])
+        assert np.array_equal(reader.read_info(slice(10,100,3)),info[10:100:3])
+
+def test_frame_stack_structured_info(tmpdir):
+    """Test frame stack writing and reading with structured (record array) frame info"""
+    path=os.path.join(tmpdir,"frames.bin")
+    frames=np.random.poisson(0.5,size=(40,4,4)).astype("u2")
+    info=np.zeros(40,dtype=[("index","<i8"),("timestamp","<f8"),("flags","u1",(2,))])
+    info["index"]=np.arange(40)
+    info["timestamp"]=np.arange(40)*0.1
+    info["flags"]=np.arange(80).reshape(40,2)
+    with frame_stack.FrameStackWriter(path,chunk_size=16) as writer:
+        writer.add_frames(frames[:20],info[:20])
+        writer.add_frames(frames[20],info[20])
+    with frame_stack.FrameStackWriter(path,append=True) as writer:
+        writer.add_frames(frames[21:],info[21:])
+    with frame_stack.FrameStackReader(path) as reader:
+        assert reader.info_fields==["index","timestamp","flags"]
+        assert reader.info_dtype==info.dtype
+        read_frames,read_info=reader.read_all(return_info=True)
+        assert np.array_equal(read_frames,frames)
+        assert np.array_equal(read_info,info)
+        assert reader.read_info(5)==info[5]
+        assert np.array_equal(reader.read_info([30,3]),info[[30,3]])
+
+def test_frame_stack_dict_entry(tmpdir):
+    """Test saving/loading frame stacks as dictionary entries"""
+    frames=np.random.poisson(0.5,size=(50,16,8)).astype("u2")
+    info=np.column_stack((np.arange(50),np.arange(50)*2))
+    d=pll.Dictionary({"frames":dict_entry.ExternalFrameStackDictionaryEntry(frames,chunk_size=16),
+        "frames_info":dict_entry.ExternalFrameStackDictionaryEntry((frames,info))})
+    path=os.path.join(tmpdir,"test.dat")
+    savefile.save_dict(d,path)
+    loaded=loadfile.load_dict(path)
+    assert np.array_equal(loaded["frames"],frames)
+    assert np.array_equal(loaded["frames_info"][0],frames)
+    assert np.array_equal(loaded["frames_info"][1],info)
@@ -107,4 +107,62 @@ def test_dict():
     assert "c/d" in d
     # replacing root
     d[""]={"a":1}
-    assert d.asdict()=={"a":1}
\ No newline at end of file
+    assert d.asdict()=={"a":1}
+
+
+def test_shmem_ring():
+    """Test shared memory ring channel"""
+    from pylablib.core.utils import ipc
+    for on_full in ["wait","drop","drop_oldest"]:
+        ch=ipc.SharedMemRingChannel(nslots=4,slot_size=2**12,on_full=on_full)
+        peer=ipc.SharedMemRingChannel.from_args(*ch.get_peer_args())
+        for i in range(6):
+            sent=ch.send_arrays([np.full((8,8),i,dtype="u2"),np.arange(i)],info={"idx":i},timeout=0)
+            assert sent==(i<4 or on_full=="drop_oldest")
+        assert ch.get_status().dropped==2
+        start=2 if on_full=="drop_oldest" else 0
+        for i in range(start,start+4):
+            (frame,rng),info=peer.recv_arrays()
+            assert info=={"idx":i}
+            assert np.all(frame==i) and np.all(rng==np.arange(i))
+            del frame,rng
+        with pytest.raises(TimeoutError):
+            peer.recv_numpy(timeout=0)
+        ch.send("value")
+        assert peer.recv()=="value"
+        peer.close()
+        ch.close()
+
+
+##### Network tests #####
+
+from pylablib.core.utils import net
+import socket
+
+def test_socket_buffered_recv():
+    """Test buffered delimiter receiving of client sockets"""
+    s1,s2=socket.socketpair()
+    sock=net.ClientSocket(s1,timeout=1.,datatype="bytes")
+    try:
+        s2.sendall(b"ab\r\ncd;ef\r\n0123456789")
+        assert sock.recv_delimiter("\r\n",strict=True)==b"ab\r\n"
+        assert sock.get_buffered_length()>0
+        assert sock.recv_delimiter(["\r\n",";"],strict=True)==b"cd;"
+        assert sock.recv_delimiter("\r\n",strict=True)==b"ef\r\n"
+        assert sock.recv_fixedlen(3)==b"012"
+        buffer=bytearray(4)
+        assert sock.recv_fixedlen_into(buffer)==4 and buffer==b"3456"
+        assert sock.recv_delimiter("9",strict=True)==b"789"
+        assert sock.get_buffered_length()==0
+        sock.recv_block_size=3  # delimiter split between the blocks
+        s2.sendall(b"abcd\r\nefgh\r\nij")
+        assert sock.recv_delimiter("\r\n",strict=True)==b"abcd\r\n"
+        assert sock.recv_delimiter("\r\n",strict=True,lmax=2)==b"efg"
+        assert sock.recv_delimiter("\r\n",strict=True)==b"h\r\n"
+        assert sock.recv_all()==b"ij"
+        with sock.using_timeout(0.01):
+            with pytest.raises(net.SocketTimeout):
+                sock.recv_delimiter("\n",strict=True)
+    finally:
+        sock.close()
+        s2.close()
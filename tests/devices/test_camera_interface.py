@@ -0,0 +1,140 @@
+import pytest
+
+import numpy as np
+
+from pylablib.devices.interface import camera
+
+
+
+class FakeCamera(camera.ICamera):
+    """Software camera with a ring buffer, where frame ``n`` is filled with value ``n``"""
+    _support_output_buffer=False
+    def __init__(self, shape=(4,6), nbuff=8):
+        super().__init__()
+        self.shape=shape
+        self.nbuff=nbuff
+        self.acquired=0
+        self.running=False
+        self.open()
+    def setup_acquisition(self, nframes=8):  # pylint: disable=arguments-differ
+        super().setup_acquisition(nframes=nframes)
+        self.nbuff=nframes
+        self._frame_counter.reset(nframes)
+        self.acquired=0
+    def start_acquisition(self, *args, **kwargs):
+        super().start_acquisition(*args,**kwargs)
+        self.running=True
+    def stop_acquisition(self):
+        self.running=False
+    def acquisition_in_progress(self):
+        return self.running
+    def get_detector_size(self):
+        return self.shape[::-1]
+    def _get_data_dimensions_rc(self):
+        return self.shape
+    def _get_acquired_frames(self):
+        return self.acquired if self._acq_params is not None else None
+    def acquire(self, n):
+        self.acquired+=n
+    def _get_chunks(self, rng):
+        i0,i1=rng
+        if (i1-1)//self.nbuff==i0//self.nbuff:
+            return [(i0,i1-i0)]
+        cut=(i1//self.nbuff)*self.nbuff
+        return [(i0,cut-i0),(cut,i1-cut)]
+    def _read_frames(self, rng, return_info=False):
+        return [np.full((n,)+self.shape,np.arange(i,i+n)[:,None,None],dtype="<u2") for i,n in self._get_chunks(rng)],None
+
+class FakeOutputCamera(FakeCamera):
+    """Fake camera which reads frames directly into the output buffer"""
+    _support_output_buffer=True
+    def _read_frames(self, rng, return_info=False, out=None):  # pylint: disable=arguments-differ
+        if out is None:
+            return super()._read_frames(rng,return_info=return_info)
+        frames=[]
+        for i,n in self._get_chunks(rng):
+            chunk,rct_chunk=self._get_output_chunk(out,n,self.shape,"<u2")
+            rct_chunk[:]=np.arange(i,i+n)[:,None,None]
+            frames.append(chunk)
+        return frames,None
+
+
+
+def test_frame_output_buffer():
+    """Test frame output buffer storing and stacking"""
+    with pytest.raises(ValueError):
+        camera.FrameOutputBuffer(np.zeros((4,6,4),dtype="u2")[:,:,::2])
+    out=np.zeros((10,4,6),dtype="u2")
+    buffer=camera.FrameOutputBuffer(out)
+    frames=[np.full((4,6),i,dtype="u2") for i in range(3)]
+    stored=buffer.store(frames)
+    assert len(stored)==3 and all(np.shares_memory(s,out) for s in stored)
+    stored+=buffer.store([np.full((2,4,6),3,dtype="u2")])
+    assert buffer.nframes==5
+    assert list(out[:,0,0])==[0,1,2,3,3,0,0,0,0,0]
+    stacked=buffer.stack(stored[:3]+list(stored[3]))
+    assert np.shares_memory(stacked,out)
+    assert stacked.shape==(5,4,6)
+    with pytest.raises(ValueError):
+        buffer.store([np.zeros((4,4),dtype="u2")])  # wrong shape
+    with pytest.raises(ValueError):
+        buffer.store([np.zeros((4,6),dtype="u1")])  # wrong dtype
+    with pytest.raises(ValueError):
+        buffer.store([np.zeros((6,4,6),dtype="u2")])  # too many frames
+    chunks=[]
+    def alloc(shape, dtype):
+        chunks.append(np.zeros(shape,dtype=dtype))
+        return chunks[-1]
+    buffer=camera.FrameOutputBuffer(alloc)
+    stored=buffer.store([np.full((4,6),0,dtype="u2"),np.full((4,6),1,dtype="u2"),np.full((3,3),2,dtype="u2")])  # consecutive frames with the same shape are combined
+    assert [c.shape for c in chunks]==[(2,4,6),(1,3,3)]
+    assert [s.shape for s in stored]==[(4,6),(4,6),(3,3)]
+    assert buffer.stack(stored[:2]).shape==(2,4,6)
+    buffer=camera.FrameOutputBuffer(alloc)
+    stored=buffer.store([np.zeros((2,4,6),dtype="u2")])
+    assert buffer.stack(stored) is chunks[-1]
+    buffer=camera.FrameOutputBuffer(lambda shape, dtype: np.zeros(shape,dtype="u1"))
+    with pytest.raises(ValueError):
+        buffer.store([np.zeros((4,6),dtype="u2")])
+
+
+@pytest.mark.parametrize("camcls",[FakeCamera,FakeOutputCamera])
+@pytest.mark.parametrize("frame_format",["list","chunks","array"])
+@pytest.mark.parametrize("callable_out",[False,True])
+def test_read_multiple_images_out(camcls, frame_format, callable_out):
+    """Test reading frames into a caller-supplied output buffer"""
+    cam=camcls()
+    cam.set_frame_format(frame_format)
+    cam.start_acquisition(nframes=8)
+    cam.acquire(6)
+    cam.read_multiple_images()
+    cam.acquire(5)  # the next read wraps around the buffer end, so it consists of two chunks
+    if callable_out:
+        chunks=[]
+        def out(shape, dtype):
+            chunks.append(np.empty(shape,dtype=dtype))
+            return chunks[-1]
+    else:
+        out=np.zeros((8,4,6),dtype="<u2")
+        chunks=[out]
+    frames,info=cam.read_multiple_images(return_info=True,out=out)
+    assert len(chunks)==(2 if callable_out else 1)
+    if frame_format=="array":
+        assert np.shares_memory(frames,out) if not callable_out else frames.flags["OWNDATA"]
+    else:
+        assert all(any(np.shares_memory(f,c) for c in chunks) for f in frames)
+    if frame_format=="chunks":
+        assert [len(ch) for ch in frames]==[2,3]
+        frames=np.concatenate(frames,axis=0)
+        info=np.concatenate(info,axis=0)
+    assert [f[0,0] for f in frames]==list(range(6,11))
+    assert [i[0] for i in info]==list(range(6,11))
+    if not callable_out:
+        assert list(out[:5,0,0])==list(range(6,11))
+    cam.acquire(2)
+    with pytest.raises(ValueError):
+        cam.read_multiple_images(out=np.zeros((8,4,6),dtype="u1"))
+    cam.acquire(2)
+    with pytest.raises(ValueError):
+        cam.read_multiple_images(out=np.zeros((8,6,4),dtype="<u2"))
+    cam.close()
@@ -0,0 +1,121 @@
+import pytest
+
+import numpy as np
+import os
+
+from pylablib.misc.file_formats import cam
+
+
+
+##### Basic import tests #####
+
+def test_imports():
+    """Test general non-failing of imports"""
+    import pylablib.misc.file_formats.cam
+
+
+
+
+##### Cam files tests #####
+
+def _make_frames(n, shape, start=0):
+    return [np.arange(start+i,start+i+np.prod(shape)).reshape(shape).astype("u2") for i in range(n)]
+
+@pytest.mark.parametrize("same_size",[False,True])
+def test_cam_memmap_indexing(tmpdir, same_size):
+    """Test memory-mapped cam reader indexing"""
+    path=os.path.join(tmpdir,"frames.cam")
+    frames=_make_frames(10,(4,6))
+    cam.save_cam(frames,path)
+    with cam.CamMemmapReader(path,same_size=same_size) as reader:
+        assert len(reader)==10
+        assert np.array_equal(reader[3],frames[3])
+        assert np.array_equal(reader[-1],frames[-1])
+        assert np.array_equal(reader[np.int64(2)],frames[2])
+        with pytest.raises(IndexError):
+            reader[10]  # pylint: disable=pointless-statement
+        with pytest.raises(IndexError):
+            reader[-11]  # pylint: disable=pointless-statement
+        assert np.array_equal(reader[2:8:3],np.array(frames[2:8:3]))
+        assert np.array_equal(reader[::-1],np.array(frames[::-1]))
+        assert np.array_equal(reader[[7,1,-2]],np.array([frames[7],frames[1],frames[-2]]))
+        assert np.array_equal(reader[np.array([0,0,5])],np.array([frames[0],frames[0],frames[5]]))
+        assert reader[5:5].shape[0]==0
+        assert all(np.array_equal(f,ef) for f,ef in zip(reader,frames))
+        assert all(np.array_equal(f,ef) for f,ef in zip(reader.iterrange(1,None,4),frames[1::4]))
+        assert not reader[0].flags.writeable
+
+def test_cam_memmap_mixed_shapes(tmpdir):
+    """Test memory-mapped cam reader on files with frames of different shapes"""
+    path=os.path.join(tmpdir,"frames.cam")
+    frames=_make_frames(3,(4,6))+_make_frames(3,(6,4),start=10)+_make_frames(2,(3,3),start=20)
+    cam.save_cam(frames,path)
+    with cam.CamMemmapReader(path) as reader:
+        assert len(reader)==8
+        for i,f in enumerate(frames):
+            assert np.array_equal(reader[i],f)
+        assert np.array_equal(reader[3:5],np.array(frames[3:5]))
+        assert np.array_equal(reader[[4]],np.array(frames[4:5]))
+        assert np.array_equal(reader[-2:],np.array(frames[-2:]))
+        with pytest.raises(ValueError):
+            reader[2:4]  # pylint: disable=pointless-statement
+        with pytest.raises(ValueError):
+            reader[[0,5]]  # pylint: disable=pointless-statement
+    cam.save_cam(frames[:6],path,append=False)  # same frame sizes, but different shapes
+    with cam.CamMemmapReader(path,index=False) as reader:
+        assert len(reader)==6
+        assert reader[3:5].shape==(2,6,4)
+        assert reader[[4]].shape==(1,6,4)
+        assert np.array_equal(reader[3:],np.array(frames[3:6]))
+
+def test_cam_memmap_update(tmpdir):
+    """Test memory-mapped cam reader on files with incomplete frames and appended data"""
+    path=os.path.join(tmpdir,"frames.cam")
+    frames=_make_frames(6,(4,6))
+    cam.save_cam(frames[:4],path)
+    with open(path,"rb") as f:
+        raw=f.read()
+    frame_size=len(raw)//4
+    raw,extra=raw[:3*frame_size],raw[3*frame_size:]
+    with open(path,"wb") as f:
+        f.write(raw+extra[:frame_size//2])  # truncated last frame
+    with cam.CamMemmapReader(path) as reader:
+        assert len(reader)==3
+        assert np.array_equal(reader[-1],frames[2])
+        assert np.array_equal(reader[:],np.array(frames[:3]))
+        with open(path,"ab") as f:
+            f.write(extra[frame_size//2:])
+        cam.save_cam(frames[4:],path)
+        assert len(reader)==3
+        assert reader.update()==6
+        assert np.array_equal(reader[:],np.array(frames))
+        assert np.array_equal(reader[-1],frames[-1])
+        assert reader.update()==6
+
+def test_cam_memmap_index(tmpdir):
+    """Test memory-mapped cam reader sidecar index"""
+    path=os.path.join(tmpdir,"frames.cam")
+    frames=_make_frames(5,(4,6))+_make_frames(3,(2,2))
+    cam.save_cam(frames,path)
+    with cam.CamMemmapReader(path) as reader:
+        offsets=reader._offsets.copy()
+    assert os.path.exists(path+".idx")
+    with cam.CamMemmapReader(path,index=False) as reader:
+        assert reader.load_index()
+        assert np.array_equal(reader._offsets,offsets)
+        assert np.array_equal(reader[6],frames[6])
+    with cam.CamMemmapReader(path) as reader:
+        assert len(reader)==8
+        assert np.array_equal(reader[-1],frames[-1])
+        reader.save_index(path+".copy.idx")
+    with cam.CamMemmapReader(path,index=False) as reader:
+        assert reader.load_index(path+".copy.idx")
+        assert not reader.load_index(path+".missing.idx")
+    new_frames=_make_frames(2,(8,8))
+    cam.save_cam(new_frames,path,append=False)  # overwritten file invalidates the index
+    with cam.CamMemmapReader(path) as reader:
+        assert len(reader)==2
+        assert np.array_equal(reader[:],np.array(new_frames))
+    with cam.CamMemmapReader(path,index=False) as reader:
+        assert reader.load_index()
+        assert len(reader)==2
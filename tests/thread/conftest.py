@@ -0,0 +1,48 @@
+import pytest
+
+import os
+import sys
+import subprocess
+import importlib
+import threading
+import traceback
+
+
+def _run_app(module, func, timeout=60.):
+    """Run function `func` from the given module inside a thread controller and exit with non-zero code if it raises an error"""
+    from pylablib.core.thread import controller, backend
+    failsafe=threading.Timer(timeout,lambda: os._exit(2))
+    failsafe.daemon=True
+    failsafe.start()
+    app=backend.QtCore.QCoreApplication([])
+    result={"code":1}
+    class Runner(controller.QThreadController):
+        def run(self):
+            try:
+                getattr(importlib.import_module(module),func)()
+                result["code"]=0
+            except Exception:  # pylint: disable=broad-except
+                traceback.print_exc()
+            finally:
+                controller.stop_app()
+    controller.get_gui_controller()
+    Runner("test_runner",kind="run").start()
+    app.exec_()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(result["code"])
+
+@pytest.fixture
+def run_in_app(request, root_path):
+    """
+    Function which runs a module-level function with the given name inside a thread controller.
+
+    The function is executed in a separate process using the headless thread backend, since the application can only be started once.
+    """
+    def _runner(func):
+        module=request.module.__name__
+        env=dict(os.environ,PYLABLIB_THREAD_BACKEND="headless")
+        code="from tests.thread.conftest import _run_app; _run_app({!r},{!r})".format(module,func)
+        proc=subprocess.run([sys.executable,"-c",code],cwd=os.path.dirname(root_path),env=env,stdout=subprocess.PIPE,stderr=subprocess.STDOUT)
+        assert proc.returncode==0, proc.stdout.decode()
+    return _runner
@@ -0,0 +1,158 @@
+import pytest
+
+import asyncio
+import time
+
+from pylablib.core.thread import controller, threadprop, asyncio_bridge
+
+
+
+class CommandThread(controller.QTaskThread):
+    def setup_task(self):  # pylint: disable=arguments-differ
+        self.add_command("add")
+        self.add_command("wait")
+        self.add_command("set_later")
+        self.add_command("emit")
+    def add(self, a, b=0):
+        return a+b
+    def wait(self, delay):
+        time.sleep(delay)
+        return delay
+    def set_later(self, name, value, delay=0.1):
+        time.sleep(delay)
+        self.set_variable(name,value)
+    def emit(self, n, tag="values"):
+        for i in range(n):
+            self.send_multicast(tag=tag,value=i)
+
+def _run_async_calls():
+    thread=CommandThread("commands")
+    thread.start()
+    thread.sync_exec_point("run")
+    async def main():
+        assert await asyncio_bridge.call_command(thread,"add",(1,),{"b":2})==3
+        t0=time.time()
+        results=await asyncio.gather(*[asyncio_bridge.call_command("commands","wait",(0.1,)) for _ in range(3)])
+        assert results==[0.1]*3
+        assert time.time()-t0>=0.25  # commands are executed consecutively in the thread
+        with pytest.raises(threadprop.TimeoutThreadError):
+            await asyncio_bridge.call_command(thread,"wait",(0.5,),timeout=0.1)
+        assert await asyncio_bridge.call_command(thread,"wait",(0.5,),timeout=0.1,ignore_errors=True) is None
+        assert await asyncio_bridge.call_in_thread(thread,lambda x: x*2,(4,))==8
+        thread.set_variable("v",0)
+        thread.ca.set_later("v",1)
+        assert await asyncio_bridge.sync_variable(thread,"v",1,timeout=5.)==1
+        thread.ca.set_later("v",{"w":2})
+        assert await asyncio_bridge.sync_variable(thread,"v/w",lambda v: v==2,timeout=5.)==2
+        with pytest.raises(threadprop.TimeoutThreadError):
+            await asyncio_bridge.sync_variable(thread,"v/w",[3,4],timeout=0.1)
+        assert not thread._params_exp  # the waiters are removed
+    try:
+        asyncio.run(main())
+    finally:
+        thread.stop(sync=True)
+    async def stopped():
+        with pytest.raises(threadprop.NoControllerThreadError):
+            await asyncio_bridge.call_command(thread,"add",(1,))
+        assert await asyncio_bridge.call_command(thread,"add",(1,),ignore_errors=True) is None
+    asyncio.run(stopped())
+
+def _run_multicast_iterator():
+    ctl=controller.get_controller()
+    thread=CommandThread("commands")
+    thread.start()
+    thread.sync_exec_point("run")
+    async def main():
+        it=asyncio_bridge.subscribe(tags="values",limit_queue=3)
+        for i in range(5):
+            ctl.send_multicast(tag="values",value=i)
+        ctl.send_multicast(tag="other",value=-1)
+        await asyncio.sleep(0.05)
+        assert (it.qsize(),it.skipped)==(3,2)  # the oldest multicasts are dropped
+        assert [(await it.get()).value for _ in range(3)]==[2,3,4]
+        with pytest.raises(threadprop.TimeoutThreadError):
+            await it.get(timeout=0.1)
+        thread.ca.emit(10)
+        values=[]
+        async for msg in it:
+            assert msg.src=="commands" and msg.tag=="values"
+            values.append(msg.value)
+            if len(values)==3:
+                break
+        await asyncio.sleep(0.1)
+        it.close()
+        assert it.closed()
+        values+=[msg.value async for msg in it]  # the queued values are still received after closing
+        assert values==sorted(values) and values[-1]==9
+        assert len(values)+it.skipped==12
+        with pytest.raises(StopAsyncIteration):
+            await it.get(timeout=1.)
+        async with asyncio_bridge.subscribe(tags="values") as it:
+            thread.ca.emit(3)
+            assert [(await it.get(timeout=5.)).value for _ in range(3)]==[0,1,2]
+        assert it.closed()
+        ctl.send_multicast(tag="values",value=0)
+        await asyncio.sleep(0.05)
+        assert it.qsize()==0
+    try:
+        asyncio.run(main())
+    finally:
+        thread.stop(sync=True)
+
+
+class AsyncioThread(asyncio_bridge.QAsyncioThread):
+    async def run_async(self):
+        self.set_variable("state","running")
+        try:
+            value=await self.wait_for_message_async("message",timeout=5.)
+            self.set_variable("message",value)
+            self.set_variable("result",await self.call_command_async("commands","add",(value,),{"b":1}))
+            async for msg in self.subscribe_async(tags="values"):
+                self.set_variable("last_value",msg.value)
+                if msg.value is None:
+                    return
+        finally:
+            self.set_variable("state","finished")
+
+def _run_asyncio_thread():
+    ctl=controller.get_controller()
+    commands=CommandThread("commands")
+    commands.start()
+    commands.sync_exec_point("run")
+    try:
+        for stop in [True,False]:
+            thread=AsyncioThread("async")
+            thread.start()
+            thread.sync_exec_point("run")
+            thread.sync_variable("state","running",timeout=5.)
+            thread.send_message("message",10)
+            thread.sync_variable("result",11,timeout=5.)
+            assert thread.get_variable("message")==10
+            ctl.wait_until(lambda: len(ctl._multicast_pool._get_route(ctl.name,"any","values"))==1,timeout=5.)  # wait until the thread is subscribed
+            ctl.send_multicast(tag="values",value=1)
+            thread.sync_variable("last_value",1,timeout=5.)
+            t0=time.time()
+            if stop:  # waiting coroutine is cancelled
+                thread.stop(sync=True)
+            else:  # coroutine is done
+                ctl.send_multicast(tag="values",value=None)
+                ctl.wait_until(lambda: not thread.running(),timeout=5.)
+            assert time.time()-t0<2.
+            assert thread.get_variable("state")=="finished"
+            assert not ctl._multicast_pool._get_route(ctl.name,"any","values")  # the subscription is removed
+    finally:
+        commands.stop(sync=True)
+
+
+
+def test_async_calls(run_in_app):
+    """Test awaitable command calls and variable synchronization"""
+    run_in_app("_run_async_calls")
+
+def test_multicast_iterator(run_in_app):
+    """Test multicast async iterators"""
+    run_in_app("_run_multicast_iterator")
+
+def test_asyncio_thread(run_in_app):
+    """Test running and stopping asyncio thread"""
+    run_in_app("_run_asyncio_thread")
@@ -0,0 +1,43 @@
+import pytest
+
+import numpy as np
+
+from pylablib.thread.devices.generic import camera as camera_thread
+
+from ..devices.test_camera_interface import FakeCamera, FakeOutputCamera
+
+
+
+def _read_pool_chunks(camcls, frame_format, frameinfo_format, nframes=5):
+    thread=camera_thread.GenericCameraThread("camera_{}_{}_{}".format(camcls.__name__,frame_format,frameinfo_format))  # not started, so the device is assigned explicitly
+    thread.device=camcls(nbuff=8)
+    thread.device.set_frame_info_format(frameinfo_format)
+    thread.device.set_frame_format(frame_format)  # "array" and "chunks" formats switch infos to the array format
+    thread.setup_frame_pool(4,3*4*6*2)  # 3 frames per block
+    thread.device.setup_acquisition(nframes=8)
+    thread.device.start_acquisition()
+    thread.device.acquire(nframes)
+    frames,infos,pool_chunks=thread._read_pooled_images((0,nframes),return_info=True)
+    chandim=frames[0].ndim-(2 if frame_format=="list" else 3)
+    return thread,thread._collect_pool_chunks(frames,infos,pool_chunks,chandim=chandim),pool_chunks
+
+def _run_pool_chunks():
+    for camcls in [FakeCamera,FakeOutputCamera]:
+        for frame_format in ["list","array","chunks"]:
+            for frameinfo_format in ["namedtuple","list","array"]:
+                thread,(frames,infos,blocks),pool_chunks=_read_pool_chunks(camcls,frame_format,frameinfo_format)
+                assert [len(f) for f in frames]==[1,3,1]  # the first read is a single frame, since the frame size is not known yet
+                assert all(f is ch for f,(ch,_) in zip(frames,pool_chunks))  # pool chunks are sent as they are
+                assert blocks==[blk for _,blk in pool_chunks]
+                assert thread.frame_pool.get_status().acquired==3  # no extra pool blocks
+                assert np.concatenate([f[:,0,0] for f in frames]).tolist()==list(range(5))
+                assert [i[:,0].tolist() for i in infos]==[f[:,0,0].tolist() for f in frames]
+    frames=list(np.zeros((3,4,6)))
+    irregular_infos=[(0,(1,2)),(1,(2,3)),(2,None)]
+    pool_chunks=[(np.zeros((3,4,6)),None)]
+    collected=thread._collect_pool_chunks(frames,irregular_infos,pool_chunks)
+    assert collected[0] is frames and collected[1] is irregular_infos and collected[2]==[None]  # irregular infos are sent unchunked
+
+def test_pool_chunks(run_in_app):
+    """Test collecting read frames and frame infos into the frame pool chunks"""
+    run_in_app("_run_pool_chunks")
@@ -0,0 +1,464 @@
+import pytest
+
+import time
+
+from pylablib.core.thread import controller, multicast_pool, threadprop, callsync
+
+
+
+def test_deadline_scheduler():
+    """Test earliest-deadline-first call ordering"""
+    scheduler=callsync.QDeadlineScheduler()
+    for name,deadline in [("a",3),("b",None),("c",1),("d",2),("e",None),("f",1)]:
+        call=scheduler.build_call(lambda: None)
+        call.name,call.deadline=name,deadline
+        scheduler.schedule(call)
+    names=[]
+    while scheduler.has_calls():
+        names.append(scheduler.pop_call().name)
+    assert names==["c","f","d","a","b","e"]
+
+def test_deadline_multiple_queues():
+    """Test unscheduling of skipped deadline calls from other queues"""
+    limited=callsync.QQueueLengthLimitScheduler(max_len=1)
+    deadline=callsync.QDeadlineScheduler()
+    multischeduler=callsync.QMultiQueueScheduler([limited,deadline],[],deadline=-1,on_expired="skip")
+    call=multischeduler.build_call(lambda: None)
+    assert call.on_expired=="skip" and call.deadline<time.time()
+    multischeduler.schedule(call)
+    assert (len(limited),len(deadline))==(1,1)
+    assert deadline.pop_call() is call
+    call.skip()
+    assert (len(limited),len(deadline))==(0,0)
+    assert call.state=="skip"
+
+
+class CommandThread(controller.QTaskThread):
+    def setup_task(self):  # pylint: disable=arguments-differ
+        self.log=[]
+        self.add_command("set_position")
+        self.add_command("set_value")
+        self.add_command("add")
+        self.add_command("get_log")
+    def set_position(self, axis, position, speed=None):
+        self.log.append(("set_position",axis,position,speed))
+        return position
+    def set_value(self, value):
+        self.log.append(("set_value",value))
+        return value
+    def add(self, a, b=0):
+        self.log.append(("add",a,b))
+        return a+b
+    def get_log(self):
+        log,self.log=self.log,[]
+        return log
+
+
+def _run_command_batch():
+    thread=CommandThread("commands")
+    thread.start()
+    thread.sync_exec_point("run")
+    try:
+        assert thread.call_command_batch([("add",(1,2)),("add",(3,),{"b":4}),("set_value",([5],))])==[3,7,[5]]
+        assert thread.cs.get_log()==[("add",1,2),("add",3,4),("set_value",[5])]
+        synchronizer=thread.call_command_batch([("add",(1,)),("add",(2,))],sync="delayed")
+        assert synchronizer.get_value_sync()==[1,2]
+        thread.cs.get_log()
+        with pytest.raises(KeyError):
+            thread.call_command_batch(["unknown"])
+    finally:
+        thread.stop(sync=True)
+
+def _run_command_batch_coalesce():
+    thread=CommandThread("commands")
+    thread.start()
+    thread.sync_exec_point("run")
+    try:
+        calls=[("set_position",("x",1)),("set_position",("y",2)),("add",(1,)),("set_position",("x",3)),("add",(1,)),
+            ("set_position",("x",4),{"speed":1}),("set_value",(5,)),("set_value",(6,))]
+        assert thread.call_command_batch(calls,coalesce=True)==[3,2,1,3,1,4,6,6]
+        assert thread.cs.get_log()==[("set_position","y",2,None),("add",1,0),("set_position","x",3,None),("add",1,0),
+            ("set_position","x",4,1),("set_value",6)]
+        calls=[("set_value",([1],)),("set_value",([2],)),("set_position",(["x"],1)),("set_position",(["x"],2))]  # unhashable values are fine, but unhashable keys are not coalesced
+        assert thread.call_command_batch(calls,coalesce=True)==[[2],[2],1,2]
+        assert thread.cs.get_log()==[("set_value",[2]),("set_position",["x"],1,None),("set_position",["x"],2,None)]
+        calls=[("set_position",("x",1)),("set_position",("y",2)),("add",(1,)),("add",(2,))]
+        assert thread.call_command_batch(calls,coalesce=lambda name,args,kwargs: name)==[2,2,2,2]
+        assert thread.cs.get_log()==[("set_position","y",2,None),("add",2,0)]
+    finally:
+        thread.stop(sync=True)
+
+def _run_command_batch_accessor():
+    thread=CommandThread("commands")
+    thread.start()
+    thread.sync_exec_point("run")
+    try:
+        with thread.command_batch(coalesce=True) as batch:
+            batch.set_position("x",1)
+            batch.set_position("x",2)
+            batch.add(1,b=2)
+        assert batch.results==[2,2,3]
+        assert thread.cs.get_log()==[("set_position","x",2,None),("add",1,2)]
+        batch=thread.command_batch()
+        batch.add(1)
+        batch.set_value(2)
+        assert batch.execute()==[1,2]
+        assert batch.calls==[]
+        assert batch.execute()==[]
+        with pytest.raises(RuntimeError):
+            with thread.command_batch() as batch:
+                batch.add(1)
+                raise RuntimeError
+        assert batch.results is None
+        assert thread.cs.get_log()==[("add",1,0),("set_value",2)]
+    finally:
+        thread.stop(sync=True)
+
+class CreditThread(controller.QTaskThread):
+    def setup_task(self):  # pylint: disable=arguments-differ
+        self.received=[]
+        self.credit=multicast_pool.MulticastCredit(2,auto_grant=False)
+        self.subscribe_commsync(lambda src,tag,value: self.received.append(value),tags="values",limit_queue=2,flow_control=self.credit)
+        self.add_command("grant")
+        self.add_command("get_received")
+    def grant(self, n=1, delay=0):
+        time.sleep(delay)
+        self.credit.grant(n)
+    def get_received(self):
+        return self.received
+
+def _run_multicast_credit_wait():
+    ctl=controller.get_controller()
+    thread=CreditThread("consumer")
+    thread.start()
+    thread.sync_exec_point("run")
+    try:
+        assert ctl.get_multicast_credit(tag="values")==2
+        assert ctl.get_multicast_credit(tag="other") is None
+        ctl.wait_for_multicast_credit(tag="other",timeout=0)
+        ctl.send_multicast(tag="values",value=0)
+        ctl.send_multicast(tag="values",value=1)
+        assert ctl.get_multicast_credit(tag="values",relative=True)==0
+        ctl.wait_until(lambda: thread.cs.get_received()==[0,1],timeout=5.)
+        assert ctl.get_multicast_credit(tag="values")==0
+        with pytest.raises(threadprop.TimeoutThreadError):
+            ctl.wait_for_multicast_credit(tag="values",timeout=0.1)
+        t0=time.time()
+        thread.ca.grant(delay=0.2)
+        ctl.wait_for_multicast_credit(tag="values",timeout=10.)
+        assert 0.1<time.time()-t0<5.
+        assert ctl.get_multicast_credit(tag="values")==1
+        with pytest.raises(threadprop.TimeoutThreadError):
+            ctl.wait_for_multicast_credit(tag="values",credit=2,timeout=0.1)
+        thread.ca.grant()
+        ctl.wait_for_multicast_credit(tag="values",credit=5,timeout=10.)  # credit above the window waits for the full window
+        assert ctl.get_multicast_credit(tag="values",relative=True)==1
+    finally:
+        thread.stop(sync=True)
+
+
+class VariableThread(controller.QTaskThread):
+    def setup_task(self):  # pylint: disable=arguments-differ
+        self.add_command("set_later")
+    def set_later(self, name, value, delay=0.1):
+        time.sleep(delay)
+        self.set_variable(name,value)
+
+def _run_variable_cache():
+    ctl=controller.get_controller()
+    version=ctl.get_variables_version()
+    ctl.set_variable("a/b",1)
+    assert ctl.get_variable("a/b")==1
+    assert ctl.get_variable("a/b")==1  # cached read
+    ctl.set_variable("a/b",2)
+    assert ctl.get_variable("a/b")==2
+    assert ctl.get_variable("a").as_dict()=={"b":2}
+    ctl.set_variable("a",{"c":3})  # overwrite the branch
+    assert ctl.get_variable("a/b") is None
+    assert ctl.get_variable("a/c")==3
+    ctl.set_variable("a/c/d",4)  # replace the cached leaf with a branch
+    assert ctl.get_variable("a/c").as_dict()=={"d":4}
+    assert ctl.get_variable("a/c/d")==4
+    ctl.set_variable("a",5)  # replace the branch with a leaf
+    assert ctl.get_variable("a/c/d") is None
+    assert ctl.get_variable("a")==5
+    ctl.set_variable("x",{"y":1})
+    assert ctl.get_variable("x/y")==1
+    ctl.set_variable("x",{"z":2},update=True)
+    assert (ctl.get_variable("x/y"),ctl.get_variable("x/z"))==(1,2)
+    ctl.delete_variable("x/y")
+    assert ctl.get_variable("x/y") is None
+    with pytest.raises(KeyError):
+        ctl.get_variable("x/y",missing_error=True)
+    ctl.set_func_variable("x/z",lambda: 10)
+    assert ctl.get_variable("x/z")==10
+    ctl.set_variable("x/z",11)
+    assert ctl.get_variable("x/z")==11
+    assert ctl.get_variables_version()>version
+
+def _run_variable_handle():
+    ctl=controller.get_controller()
+    handle=ctl.get_variable_handle("p/q")
+    assert handle.name=="p/q"
+    assert handle.get() is None
+    handle.set(1)
+    assert handle.get()==1
+    assert ctl.get_variable(handle)==1
+    assert ctl.get_variable("p/q")==1
+    ctl.delete_variable("p")
+    assert handle.get(default=0)==0
+    with pytest.raises(KeyError):
+        handle.get(missing_error=True)
+    ctl.set_variable("p",{"q":7})
+    assert handle.get()==7
+    ctl.set_variable("p",3)
+    assert handle.get() is None
+    ctl.set_variable(handle,8)
+    assert ctl.get_variable("p/q")==8
+    notified=[]
+    ctl.subscribe_sync(lambda src,tag,value: notified.append((tag,value)),tags="changed/p/q")
+    handle.set(9,notify=True)
+    ctl.wait_until(lambda: notified==[("changed/p/q",9)],timeout=5.)
+
+def _run_variable_sync():
+    thread=VariableThread("variables")
+    thread.start()
+    thread.sync_exec_point("run")
+    try:
+        thread.set_variable("s/t",0)
+        assert thread.get_variable("s/t")==0  # cache the value before waiting
+        thread.ca.set_later("s/t",1)
+        assert thread.sync_variable("s/t",1,timeout=5.)==1
+        thread.ca.set_later("s",{"t":2})  # branch change notifies the leaf waiters
+        assert thread.sync_variable(thread.get_variable_handle("s/t"),[2,3],timeout=5.)==2
+        thread.ca.set_later("s/t",3)  # leaf change notifies the branch waiters
+        assert thread.sync_variable("s",lambda v: v["t"]==3,timeout=5.)["t"]==3
+        assert thread.get_variable("s/t")==3
+        with pytest.raises(threadprop.TimeoutThreadError):
+            thread.sync_variable("s/t",4,timeout=0.1)
+    finally:
+        thread.stop(sync=True)
+
+
+
+def _run_job_heap():
+    thread=controller.QTaskThread("jobs")  # not started, so the jobs are only scheduled explicitly
+    calls=[]
+    for name,period in [("slow",30.),("fast",10.),("mid",20.)]:
+        thread.add_job(name,lambda name=name: calls.append(name),period,initial_call=False)
+    jobs=thread.jobs
+    queue=thread._get_priority_queue(-10)
+    def run_scheduled():
+        call=queue.pop_call()
+        while call is not None:
+            call.execute()
+            call=queue.pop_call()
+    t0=jobs["fast"].ctd.end-10
+    assert thread._schedule_pending_jobs(t=t0+5)==pytest.approx(5,abs=1E-3)  # nothing is due yet
+    assert thread._schedule_pending_jobs(t=t0+10)==0
+    assert [n for n,j in jobs.items() if j.scheduled]==["fast"]
+    assert thread._schedule_pending_jobs(t=t0+10)==pytest.approx(10,abs=1E-3)  # scheduled job is not in the heap
+    run_scheduled()
+    assert calls==["fast"]
+    assert thread._schedule_pending_jobs(t=t0+35)==0
+    run_scheduled()
+    assert calls==["fast","fast","mid","slow"]  # in the order of the call times
+    del calls[:]
+    jobs["mid"].pause()
+    assert jobs["mid"].time_left() is None
+    thread.change_job_period("fast",50.)  # now called after the slow job
+    assert thread._schedule_pending_jobs(t=t0+200)==0
+    assert not jobs["mid"].scheduled
+    run_scheduled()
+    assert calls==["slow","fast"]
+    del calls[:]
+    jobs["mid"].pause(False)
+    thread.remove_job("fast")
+    assert thread._schedule_pending_jobs(t=t0+200)==0
+    run_scheduled()
+    assert sorted(calls)==["mid","slow"]
+    jobs["slow"].pause()
+    jobs["mid"].pause()
+    assert thread._schedule_pending_jobs(t=t0+1000) is None
+    assert not thread._jobs_heap
+    jobs["slow"].pause(False)
+    assert len([e for e in thread._jobs_heap if e[-1] is not None])==1
+    assert thread.get_job_stats("slow").calls==3
+
+class JobThread(controller.QTaskThread):
+    def setup_task(self):  # pylint: disable=arguments-differ
+        self.calls=[]
+        self.add_job("fast",lambda: self.calls.append("fast"),0.05,initial_call=False)
+        self.add_job("slow",lambda: self.calls.append("slow"),0.3,initial_call=False)
+        self.add_command("pause_job")
+        self.add_command("get_calls")
+    def pause_job(self, name, paused=True):
+        self.jobs[name].pause(paused)
+    def get_calls(self):
+        calls,self.calls=self.calls,[]
+        return calls
+
+def _run_jobs():
+    thread=JobThread("jobs")
+    thread.start()
+    thread.sync_exec_point("run")
+    try:
+        time.sleep(0.5)
+        calls=thread.cs.get_calls()
+        assert calls.count("slow") in [1,2] and calls.count("fast")>=5
+        thread.cs.pause_job("fast")
+        thread.cs.change_job_period("slow",0.02)
+        thread.cs.get_calls()
+        time.sleep(0.3)
+        calls=thread.cs.get_calls()
+        assert "fast" not in calls and calls.count("slow")>=5
+        thread.cs.pause_job("fast",False)
+        thread.cs.pause_job("slow")
+        thread.cs.get_calls()
+        time.sleep(0.3)
+        calls=thread.cs.get_calls()
+        assert "slow" not in calls and calls.count("fast")>=2
+    finally:
+        thread.stop(sync=True)
+
+
+
+class DeadlineThread(controller.QTaskThread):
+    def setup_task(self):  # pylint: disable=arguments-differ
+        self.log=[]
+        self.add_command("block")
+        self.add_command("record")
+        self.add_command("record_skip",self.record,deadline=0.05,on_expired="skip")
+        self.add_command("record_limited",self.record,limit_queue=1,deadline=0.05,on_expired="skip")
+        self.add_command("get_log")
+    def block(self, delay):
+        time.sleep(delay)
+    def record(self, value):
+        self.log.append(value)
+    def get_log(self):
+        log,self.log=self.log,[]
+        return log
+
+def _run_deadline_calls():
+    thread=DeadlineThread("deadlines")
+    thread.start()
+    thread.sync_exec_point("run")
+    try:
+        thread.ca.block(0.3)
+        time.sleep(0.05)
+        thread.ca.record("plain")
+        thread.call_command("record",("d2",),deadline=2.)
+        thread.call_command("record",("d1",),deadline=1.)
+        thread.call_command("record",("late",),deadline=0.05)  # executed late by default
+        thread.call_command("record",("expired",),deadline=0.05,on_expired="skip")
+        thread.ca.record_skip("expired_command")
+        thread.ca.record_limited("expired_limited")
+        assert thread.cs.get_log()==["late","d1","d2","plain"]  # earliest deadline first, then the calls without deadlines
+        thread.ca.block(0.3)
+        time.sleep(0.05)
+        thread.ca.record_limited("limited")  # the queue is freed after skipping the expired call, so this one is accepted (and then expires as well)
+        time.sleep(0.4)
+        assert thread.cs.get_log()==[]
+        assert thread.call_command("record",("on_time",),deadline=2.,on_expired="skip",sync=True) is None
+        assert thread.cs.get_log()==["on_time"]
+        metrics=thread.cs.get_thread_metrics()
+        assert metrics["calls"]["command/record"].late==1
+        assert metrics["calls"]["command/record"].expired==1
+        assert metrics["calls"]["command/record_skip"].expired==1
+        assert metrics["calls"]["command/record_limited"].expired==2
+        assert metrics["queues"]["command/record_limited"].length==0
+        assert metrics["queues"]["deadline"].length==0
+    finally:
+        thread.stop(sync=True)
+
+
+
+class MetricsThread(controller.QTaskThread):
+    def setup_task(self):  # pylint: disable=arguments-differ
+        self.received=[]
+        self.subscribe_sync(self.on_sync,tags="values",limit_queue=2)
+        self.subscribe_commsync(self.on_commsync,tags="values",limit_queue=1)
+        self.add_command("block")
+        self.add_command("record",limit_queue=1)
+        self.add_command("get_received")
+    def on_sync(self, src, tag, value):
+        self.received.append(("sync",value))
+    def on_commsync(self, src, tag, value):
+        self.received.append(("commsync",value))
+    def block(self, delay):
+        time.sleep(delay)
+    def record(self, value):
+        self.received.append(("record",value))
+    def get_received(self):
+        return self.received
+
+def _run_thread_metrics():
+    ctl=controller.get_controller()
+    thread=MetricsThread("metrics")
+    thread.start()
+    thread.sync_exec_point("run")
+    try:
+        thread.ca.block(0.3)
+        time.sleep(0.05)
+        for v in range(5):
+            ctl.send_multicast(tag="values",value=v)
+        for v in range(3):
+            thread.ca.record(v)
+        ctl.wait_until(lambda: len(thread.cs.get_received())==4,timeout=5.)
+        assert sorted(thread.cs.get_received())==[("commsync",0),("record",0),("sync",0),("sync",1)]
+        metrics=thread.cs.get_thread_metrics(reset=True)
+        queues={(n.rsplit("/",1)[0] if n.startswith("multicast/") else n):q for n,q in metrics["queues"].items()}  # strip subscription ids
+        assert queues["multicast/on_sync"][:5]==(0,2,2,2,3)
+        assert queues["multicast/on_commsync"][:5]==(0,1,1,0,4)  # limiting queues release calls popped from the priority queue without popping them
+        assert queues["command/record"][:5]==(0,1,1,0,2)
+        assert metrics["calls"]["command/record"].count==1
+        metrics=thread.cs.get_thread_metrics()
+        assert all(q.scheduled==q.popped==q.skipped==0 for n,q in metrics["queues"].items() if not n.startswith("priority/"))
+    finally:
+        thread.stop(sync=True)
+
+
+
+def test_command_batch(run_in_app):
+    """Test batched command calls"""
+    run_in_app("_run_command_batch")
+
+def test_command_batch_coalesce(run_in_app):
+    """Test coalescing of batched command calls"""
+    run_in_app("_run_command_batch_coalesce")
+
+def test_command_batch_accessor(run_in_app):
+    """Test command batch accessor"""
+    run_in_app("_run_command_batch_accessor")
+
+def test_multicast_credit_wait(run_in_app):
+    """Test waiting for multicast credit"""
+    run_in_app("_run_multicast_credit_wait")
+
+def test_variable_cache(run_in_app):
+    """Test thread variable cache invalidation"""
+    run_in_app("_run_variable_cache")
+
+def test_variable_handle(run_in_app):
+    """Test thread variable handles"""
+    run_in_app("_run_variable_handle")
+
+def test_variable_sync(run_in_app):
+    """Test synchronizing on thread variables"""
+    run_in_app("_run_variable_sync")
+
+def test_job_heap(run_in_app):
+    """Test scheduling jobs from the jobs heap"""
+    run_in_app("_run_job_heap")
+
+def test_jobs(run_in_app):
+    """Test running, pausing, and changing periods of thread jobs"""
+    run_in_app("_run_jobs")
+
+def test_deadline_calls(run_in_app):
+    """Test scheduling, ordering, and expiration of commands with deadlines"""
+    run_in_app("_run_deadline_calls")
+
+def test_thread_metrics(run_in_app):
+    """Test queue and call counts in the thread metrics"""
+    run_in_app("_run_thread_metrics")
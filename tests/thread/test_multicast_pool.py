@@ -0,0 +1,178 @@
+import pytest
+
+from pylablib.core.thread import multicast_pool, callsync
+
+
+
+def test_multicast_credit():
+    """Test multicast credit consuming and granting"""
+    with pytest.raises(ValueError):
+        multicast_pool.MulticastCredit(0)
+    credit=multicast_pool.MulticastCredit(2)
+    granted=[]
+    credit.add_listener(lambda: granted.append(credit.available()))
+    credit.consume()
+    credit.consume()
+    credit.consume()
+    assert (credit.available(),credit.outstanding())==(0,3)
+    credit.grant()
+    assert (credit.available(),credit.outstanding())==(0,2)
+    credit.grant(5)
+    assert (credit.available(),credit.outstanding())==(2,0)
+    assert granted==[0,2]
+    credit.consume()
+    credit.reset()
+    assert credit.available()==2
+
+def test_multicast_credit_direct():
+    """Test multicast credit of direct subscriptions"""
+    pool=multicast_pool.MulticastPool()
+    credit=multicast_pool.MulticastCredit(2)
+    available=[]
+    def callback(src, tag, value):
+        available.append(credit.available())
+        if value is None:
+            raise ValueError("no value")
+    pool.subscribe_direct(callback,tags="t",credit=credit)
+    assert pool.get_credit("src",tag="t")==2
+    assert pool.get_credit("src",tag="other") is None
+    pool.send("src",tag="t",value=1)
+    with pytest.raises(ValueError):
+        pool.send("src",tag="t",value=None)
+    assert available==[1,1]
+    assert credit.available()==2
+
+def test_multicast_credit_scheduled():
+    """Test multicast credit consuming and granting on execution, skipping, and failing of scheduled calls"""
+    pool=multicast_pool.MulticastPool()
+    credit=multicast_pool.MulticastCredit(3)
+    scheduler=callsync.QQueueLengthLimitScheduler(max_len=2,on_full_queue="skip_oldest")
+    received=[]
+    pool.subscribe_direct(lambda src,tag,value: received.append(value),tags="t",scheduler=scheduler,credit=credit)
+    pool.send("src",tag="t",value=0)
+    assert (pool.get_credit("src",tag="t"),pool.get_credit("src",tag="t",relative=True))==(2,2/3)
+    scheduler.pop_call().execute()
+    assert received==[0]
+    assert credit.available()==3
+    for v in range(1,4):  # the first call is skipped on the full queue
+        pool.send("src",tag="t",value=v)
+    assert credit.outstanding()==2
+    scheduler.clear(close=False)  # skip all calls
+    assert credit.available()==3
+    pool.send("src",tag="t",value=4)
+    assert credit.outstanding()==1
+    scheduler.clear(close=True)  # fail all calls
+    assert credit.available()==3
+    pool.send("src",tag="t",value=5)  # scheduler is closed, so the call fails immediately
+    assert credit.available()==3
+    assert received==[0]
+
+def test_multicast_credit_manual():
+    """Test manually granted multicast credit"""
+    pool=multicast_pool.MulticastPool()
+    credit=multicast_pool.MulticastCredit(2,auto_grant=False)
+    scheduler=callsync.QQueueScheduler()
+    pool.subscribe_direct(lambda src,tag,value: value,tags="t",scheduler=scheduler,credit=credit)
+    pool.subscribe_direct(lambda src,tag,value: value,tags="t")
+    pool.send("src",tag="t",value=0)
+    pool.send("src",tag="t",value=1)
+    scheduler.pop_call().execute()
+    scheduler.pop_call().execute()
+    assert pool.get_credit("src",tag="t")==0
+    credit.grant()
+    assert pool.get_credit("src",tag="t")==1
+    scheduler.clear(close=False)
+    pool.send("src",tag="t",value=2)
+    scheduler.clear(close=False)
+    assert pool.get_credit("src",tag="t")==0
+    credit.grant(2)
+    assert pool.get_credit("src",tag="t",relative=True)==1
+
+
+
+def _subscribe_recorder(pool, received, name, **kwargs):
+    return pool.subscribe_direct(lambda src,tag,value: received.append((name,tag,value)),**kwargs)
+
+def test_multicast_routes():
+    """Test multicast routing and route cache invalidation on subscription changes"""
+    pool=multicast_pool.MulticastPool()
+    received=[]
+    sid_a=_subscribe_recorder(pool,received,"a",tags="t")
+    pool.send("src",tag="t",value=0)
+    pool.send("src",tag="other",value=1)
+    assert received==[("a","t",0)]
+    sid_b=_subscribe_recorder(pool,received,"b",tags=["t","other"])
+    del received[:]
+    pool.send("src",tag="t",value=2)
+    pool.send("src",tag="other",value=3)
+    assert received==[("a","t",2),("b","t",2),("b","other",3)]
+    pool.unsubscribe(sid_a)
+    del received[:]
+    pool.send("src",tag="t",value=4)
+    assert received==[("b","t",4)]
+    _subscribe_recorder(pool,received,"any")  # all tags
+    pool.unsubscribe(sid_b)
+    del received[:]
+    pool.send("src",tag="t",value=5)
+    pool.send("src",value=6)
+    assert received==[("any","t",5),("any",None,6)]
+    with pytest.raises(KeyError):
+        pool.unsubscribe(sid_b)
+    with pytest.raises(ValueError):
+        pool.subscribe_direct(lambda *args: None,sid=pool.subscribe_direct(lambda *args: None))
+
+def test_multicast_route_filters():
+    """Test multicast source, destination, and additional filters"""
+    pool=multicast_pool.MulticastPool()
+    received=[]
+    _subscribe_recorder(pool,received,"src",srcs="cam",tags="t")
+    _subscribe_recorder(pool,received,"dst",dsts=["proc","saver"],tags="t")
+    _subscribe_recorder(pool,received,"filt",tags="t",filt=lambda src,dst,tag,value: value>0)
+    pool.send("cam",tag="t",value=0)
+    assert [r[0] for r in received]==["src"]
+    del received[:]
+    pool.send("other",dst="saver",tag="t",value=1)
+    assert [r[0] for r in received]==["dst","filt"]
+    del received[:]
+    pool.send("all",dst="all",tag="t",value=1)
+    assert [r[0] for r in received]==["src","dst","filt"]
+    del received[:]
+    pool.send("any",tag="t",value=1)
+    assert [r[0] for r in received]==["filt"]
+
+def test_multicast_route_patterns():
+    """Test multicast routing with glob tag patterns"""
+    pool=multicast_pool.MulticastPool()
+    received=[]
+    _subscribe_recorder(pool,received,"glob",tags="frames/*")
+    _subscribe_recorder(pool,received,"single",tags="fr?mes")
+    _subscribe_recorder(pool,received,"set",tags="[ab]x")
+    _subscribe_recorder(pool,received,"mixed",tags=["frames/new","frames/*"])  # matches both the exact tag and the pattern, but is called once
+    for tag in ["frames/new","frames/old","frames","frumes","ax","cx","frames/"]:
+        pool.send("src",tag=tag,value=None)
+    assert [(r[0],r[1]) for r in received]==[("glob","frames/new"),("mixed","frames/new"),("glob","frames/old"),("mixed","frames/old"),
+        ("single","frames"),("single","frumes"),("set","ax"),("glob","frames/"),("mixed","frames/")]
+    pool.unsubscribe(pool.subscribe_direct(lambda *args: None,tags="frames/*"))
+    del received[:]
+    pool.send("src",tag="frames/new",value=None)
+    assert [r[0] for r in received]==["glob","mixed"]
+
+def test_multicast_route_priority():
+    """Test multicast subscription priority order"""
+    pool=multicast_pool.MulticastPool()
+    received=[]
+    _subscribe_recorder(pool,received,"low",tags="t",priority=-1)
+    _subscribe_recorder(pool,received,"default1",tags="t*")
+    _subscribe_recorder(pool,received,"high",tags="t",priority=5)
+    _subscribe_recorder(pool,received,"default2",tags="t")
+    _subscribe_recorder(pool,received,"any_high",priority=10)
+    pool.send("src",tag="t",value=None)
+    assert [r[0] for r in received]==["any_high","high","default1","default2","low"]
+    del received[:]
+    sid=_subscribe_recorder(pool,received,"highest",tags="t",priority=20)
+    pool.send("src",tag="t",value=None)
+    assert [r[0] for r in received]==["highest","any_high","high","default1","default2","low"]
+    pool.unsubscribe(sid)
+    del received[:]
+    pool.send("src",tag="t",value=None)
+    assert received[0][0]=="any_high"
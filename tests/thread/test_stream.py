@@ -0,0 +1,306 @@
+import pytest
+
+import numpy as np
+import itertools
+import os
+import tempfile
+
+from pylablib.core.thread import controller, multicast_pool
+from pylablib.core.dataproc import filters
+from pylablib.core.utils import ipc
+from pylablib.thread.stream import stream_message, frame_pool, frame_parallel, background_stats, frame_ipc, frameproc, frame_binning, frame_saver
+from pylablib.misc.file_formats import cam
+
+
+
+def test_imports():
+    """Test general non-failing of imports"""
+    import pylablib.thread.stream.frameproc
+    import pylablib.thread.stream.frame_parallel
+    import pylablib.thread.stream.background_stats
+    import pylablib.thread.stream.frame_pool
+    import pylablib.thread.stream.frame_ipc
+
+
+def test_frames_message_copy():
+    """Test copying of frame messages with pooled frames"""
+    stream_message.DataStreamMessage()  # make sure that the base class signature is not used for subclasses
+    pool=frame_pool.FramePool(2,2**10)
+    chunk,block=pool.acquire((2,4,4),"u2")
+    chunk[:]=np.arange(2)[:,None,None]
+    msg=stream_message.FramesMessage([chunk],indices=[10],pool_blocks=[block],source="cam")
+    del chunk
+    cmsg=msg.copy(source="proc")
+    assert cmsg.pool_blocks==[block]
+    assert cmsg.mi.source=="proc"
+    assert np.all(cmsg.frames[0]==msg.frames[0])
+    assert list(cmsg.indices[0])==[10,11]
+    assert pool.get_status().used==1
+    last_frame=msg.last_frame().copy()
+    del msg,cmsg
+    assert pool.get_status().used==0
+    assert np.all(last_frame==1)
+
+
+
+def test_frames_message_ring():
+    """Test sending frame messages through shared memory ring"""
+    ch=ipc.SharedMemRingChannel(nslots=4,slot_size=2**16)
+    peer=ipc.SharedMemRingChannel.from_args(*ch.get_peer_args())
+    sender=frame_ipc.FramesMessageRingSender(ch)
+    receiver=frame_ipc.FramesMessageRingReceiver(peer)
+    info=np.zeros(3,dtype=[("index","i8"),("timestamp","f8")])
+    info["index"]=np.arange(3)
+    msgs=[stream_message.FramesMessage([np.full((3,4,4),i,dtype="u2"),np.full((2,4,4),i+1,dtype="u2")],indices=[10*i,10*i+3],
+                frame_info=[info,info[:2]],source="cam",tag="frames",metainfo={"frame_info_field":["index","timestamp"]},sn="cam",sid=1,mid=i)
+            for i in range(2)]
+    msgs.append(stream_message.FramesMessage([np.arange(16).reshape(4,4),np.zeros((4,4))],indices=[5,6],frame_info=[(1,"a"),(2,"b")],source="proc"))
+    for msg in msgs:
+        assert sender.send(msg,timeout=0)
+    for i,msg in enumerate(msgs):
+        rmsg=receiver.recv(timeout=0,copy=(i!=1))
+        assert rmsg.chunks==msg.chunks
+        assert rmsg.metainfo==msg.metainfo
+        assert rmsg.get_ids()==msg.get_ids()
+        assert len(rmsg.frames)==len(msg.frames)
+        for rf,f in zip(rmsg.frames,msg.frames):
+            assert rf.dtype==f.dtype and np.array_equal(rf,f)
+        for ri,idx in zip(rmsg.indices,msg.indices):
+            assert np.array_equal(ri,idx)
+        for rinf,inf in zip(rmsg.frame_info,msg.frame_info):
+            assert np.array_equal(rinf,inf) if isinstance(inf,np.ndarray) else rinf==inf
+        assert rmsg.nframes()==msg.nframes()
+        assert rmsg.last_frame_index()==msg.last_frame_index()
+        del rmsg
+    receiver.release()
+    with pytest.raises(TimeoutError):
+        receiver.recv(timeout=0)
+    peer.close()
+    ch.close()
+
+
+def test_running_histogram_exact():
+    """Test running median of 8-bit frames in a sliding window"""
+    frames=np.random.randint(0,256,size=(40,8,8)).astype("u1")
+    acc=background_stats.RunningHistogramAccumulator(max_count=9)
+    for i,f in enumerate(frames):
+        if i>=9:
+            acc.remove(frames[i-9])
+        acc.add(f)
+        if i>=8:
+            assert np.array_equal(acc.get_value(),np.median(frames[i-8:i+1],axis=0))
+    assert not acc.is_clipped()
+
+def test_running_histogram_drift():
+    """Test running median of drifting 16-bit frames"""
+    frames=(np.random.randint(0,100,size=(60,8,8))+np.arange(60)[:,None,None]*200).astype("u2")
+    acc=background_stats.RunningHistogramAccumulator(max_count=5)
+    window=[]
+    for f in frames:
+        if len(window)==5:
+            acc.remove(window.pop(0))
+        acc.add(f)
+        window.append(f)
+        if acc.is_clipped():
+            acc.rebuild(window)
+            assert not acc.is_clipped()
+        lo,hi=np.min(window),np.max(window)
+        assert np.all(np.abs(acc.get_value()-np.median(window,axis=0))<=(hi-lo)/64+1)
+
+@pytest.mark.parametrize("q",[50,25,90])
+def test_running_histogram_even(q):
+    """Test running percentile of 8-bit frames in a sliding window with an even number of frames"""
+    frames=np.random.randint(0,256,size=(30,8,8)).astype("u1")
+    frames[:4,0,0]=[1,2,3,4]
+    acc=background_stats.RunningHistogramAccumulator(q=q,max_count=4)
+    for i,f in enumerate(frames):
+        if i>=4:
+            acc.remove(frames[i-4])
+        acc.add(f)
+        assert np.allclose(acc.get_value(),np.percentile(frames[max(i-3,0):i+1],q,axis=0))
+        if i==3 and q==50:
+            assert acc.get_value()[0,0]==2.5
+
+def test_running_histogram_memory():
+    """Test running histogram memory limit"""
+    acc=background_stats.RunningHistogramAccumulator(nbins=256,max_memory=2**20)
+    assert acc.get_histogram_size((2048,2048))==2**31
+    with pytest.raises(ValueError):
+        acc.add(np.zeros((2048,2048),dtype="u2"))
+    acc.add(np.zeros((32,32),dtype="u2"))
+    assert acc.count==1
+
+
+def _square_nonnegative(frames):
+    if np.any(frames<0):
+        raise ValueError("negative frame values")
+    return frames**2
+def _run_parallel_processor_errors():
+    ctl=controller.get_controller()
+    received=[]
+    ctl.subscribe_sync(lambda src,tag,msg: received.append(msg),tags="frames/processed")
+    proc=frame_parallel.ParallelFrameProcessorThread("processor",kwargs={"src":ctl.name,"tag_in":"frames","func":_square_nonnegative,"nworkers":2})
+    proc.start()
+    proc.sync_exec_point("run")
+    for i in range(6):
+        frame=np.full((4,4),-1 if i==2 else i,dtype="i4")
+        ctl.send_multicast(tag="frames",value=stream_message.FramesMessage([frame],indices=[i],source=ctl.name))
+    ctl.wait_until(lambda: len(received)==5,timeout=10.)
+    assert [m.first_frame_index() for m in received]==[0,1,3,4,5]
+    assert [m.frames[0][0,0] for m in received]==[0,1,9,16,25]
+    stats=proc.get_variable("stats")
+    assert (stats["received"],stats["processed"],stats["failed"],stats["pending"])==(6,5,1,0)
+    proc.stop(sync=True)
+def test_parallel_processor_errors(run_in_app):
+    """Test that processing errors in parallel frame processor drop the message without breaking the following ones"""
+    run_in_app("_run_parallel_processor_errors")
+
+
+
+binning_modes=["skip","sum","mean","min","max"]
+@pytest.mark.skipif(not frame_binning.is_fused_binning_available(),reason="requires Numba")
+@pytest.mark.parametrize("spat_mode,time_mode",list(itertools.product(binning_modes,binning_modes)))
+def test_fused_binning(spat_mode, time_mode):
+    """Test fused frame binning against the consecutive numpy decimation"""
+    frames=np.random.randint(0,2**12,size=(17,11,14)).astype("u2")
+    binner=frame_binning.FusedFrameBinner((2,3),spat_mode,3,time_mode)
+    binned=[]
+    for start,end in [(0,1),(1,3),(3,10),(10,10),(10,12),(12,17)]:  # incomplete time bins are carried over between the calls
+        res=binner.bin_frames(frames[start:end],dtype="f8")
+        assert len(res)==(end//3)-(start//3)
+        assert binner.get_accumulated_number()==end%3
+        binned.append(res)
+    binned.append(binner.bin_frames(frames[0],dtype="f8"))  # single 2D frame
+    expected=filters.decimate(filters.decimate(frames,2,dec=spat_mode,axis=-2),3,dec=spat_mode,axis=-1)
+    expected=filters.decimate(expected,3,dec=time_mode,axis=0)
+    assert np.allclose(np.concatenate(binned[:-1]),expected)
+    assert binned[-1].shape==(1,5,4)
+    binner.clear()
+    assert binner.get_accumulated_number()==0
+    assert binner.bin_frames(frames[:2]).dtype==frames.dtype
+
+def _run_fused_binning_thread():
+    ctl=controller.get_controller()
+    received={}
+    for engine in ["numpy","fused"]:
+        received[engine]=[]
+        ctl.subscribe_sync(lambda src,tag,msg,engine=engine: received[engine].append(msg),tags="frames/"+engine)
+        thread=frameproc.FrameBinningThread("binner_"+engine,kwargs={"src":ctl.name,"tag_in":"frames","tag_out":"frames/"+engine})
+        thread.start()
+        thread.sync_exec_point("run")
+    try:
+        sline=("test",(0,0,0,3))
+        for spat_mode,time_mode in itertools.product(binning_modes,binning_modes):
+            for chandim in [0,1]:
+                for engine in received:
+                    binner=controller.get_controller("binner_"+engine)
+                    binner.cs.setup_binning((2,2),spat_mode,3,time_mode,dtype="f8",engine=engine)
+                    binner.cs.enable_binning(True)
+                    received[engine]=[]
+                shape=(9,8)+((3,) if chandim else ())
+                idx=0
+                for n in [1,4,2,3,5]:
+                    frames=np.random.randint(0,2**12,size=(n,)+shape).astype("u2")
+                    frames[:,0,:4]=np.arange(idx,idx+n)[:,None,None] if chandim else np.arange(idx,idx+n)[:,None]
+                    ctl.send_multicast(tag="frames",value=stream_message.FramesMessage([frames],indices=[idx],chandim=chandim,source=ctl.name,metainfo={"status_line":sline}))
+                    idx+=n
+                ctl.wait_until(lambda: all(sum(m.nframes() for m in r)==5 for r in received.values()),timeout=10.)
+                numpy_msgs,fused_msgs=received["numpy"],received["fused"]
+                assert [m.nframes() for m in numpy_msgs]==[m.nframes() for m in fused_msgs]
+                for nm,fm in zip(numpy_msgs,fused_msgs):
+                    assert np.allclose(nm.frames[0],fm.frames[0])
+                    assert list(nm.indices[0])==list(fm.indices[0])
+                for msgs in [numpy_msgs,fused_msgs]:  # status line is taken from the first frame in the bin
+                    assert list(np.concatenate([m.frames[0][:,0,0,0] if chandim else m.frames[0][:,0,0] for m in msgs]))==[0,3,6,9,12]
+    finally:
+        for engine in received:
+            controller.get_controller("binner_"+engine).stop(sync=True)
+def test_fused_binning_thread(run_in_app):
+    """Test that fused and numpy binning engines give the same results in the frame binning thread, including the status line, multichannel frames, and incomplete time bins"""
+    run_in_app("_run_fused_binning_thread")
+
+
+class FramesSinkThread(controller.QTaskThread):
+    def setup_task(self, tag, window=1):  # pylint: disable=arguments-differ
+        self.received=[]
+        self.credit=multicast_pool.MulticastCredit(window,auto_grant=False)
+        self.subscribe_commsync(self.process_input_frames,tags=tag,limit_queue=10,flow_control=self.credit)
+        self.add_command("grant")
+        self.add_command("get_received")
+    def process_input_frames(self, src, tag, msg):  # pylint: disable=unused-argument
+        self.received.append(list(np.concatenate([np.reshape(c,(-1,)+c.shape[-2:]) for c in msg.frames])[:,0,0]))
+    def grant(self):
+        self.credit.reset()
+    def get_received(self):
+        return self.received
+
+def _run_adaptive_binning():
+    ctl=controller.get_controller()
+    engines=["numpy","fused"] if frame_binning.is_fused_binning_available() else ["numpy"]
+    for engine in engines:
+        sink=FramesSinkThread("sink",kwargs={"tag":"frames/binned"})
+        sink.start()
+        binner=frameproc.FrameBinningThread("binner",kwargs={"src":ctl.name,"tag_in":"frames","tag_out":"frames/binned"})
+        binner.start()
+        binner.sync_exec_point("run")
+        sink.sync_exec_point("run")
+        try:
+            binner.cs.setup_binning((1,1),"skip",1,"sum",engine=engine)
+            binner.cs.setup_adaptive_binning(4)
+            binner.cs.enable_binning(True)
+            idx=[0]
+            def send(n, nout, expected=None, grant=False):
+                if grant:
+                    sink.cs.grant()
+                ctl.send_multicast(tag="frames",value=stream_message.FramesMessage([np.ones((n,4,4),dtype="u2")],indices=[idx[0]],source=ctl.name))
+                idx[0]+=n
+                ctl.wait_until(lambda: len(sink.cs.get_received())==nout,timeout=5.)
+                if expected is not None:
+                    ctl.wait_until(lambda: binner.get_variable("adaptive_factor")==expected,timeout=5.)
+            send(1,1,expected=1)  # credit is available before sending
+            send(1,2,expected=2)  # no credit: grow
+            send(3,3,expected=4)  # the incomplete bin with 1 frame is carried over
+            send(3,4,expected=4)
+            send(6,5,expected=4,grant=True)  # the incomplete bin with 2 frames does not fit into the smaller bin
+            send(1,5,grant=True)
+            send(1,6,expected=2)  # consumer caught up: shrink
+            send(3,7,expected=2,grant=True)
+            send(1,8,expected=1,grant=True)
+            assert sink.cs.get_received()==[[1],[1],[2],[4],[4],[4],[2],[2]]
+        finally:
+            binner.stop(sync=True)
+            sink.stop(sync=True)
+def test_adaptive_binning(run_in_app):
+    """Test adaptive time binning growing and shrinking with the downstream credit"""
+    run_in_app("_run_adaptive_binning")
+
+
+
+def _run_frame_saver():
+    ctl=controller.get_controller()
+    saver=frame_saver.FrameSaverThread("saver",kwargs={"src":ctl.name,"tag":"frames"})
+    saver.start()
+    saver.sync_exec_point("run")
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for fmt in ["cam","raw"]:
+                path=os.path.join(tmpdir,"frames."+fmt)
+                saver.cs.start_saving(path,fmt=fmt,buffer_size=2**10,preallocate=None)
+                ctl.send_multicast(tag="frames",value=stream_message.FramesMessage([np.full((2,3,4),i,dtype="u2") for i in [0,2]],indices=[0,2],source=ctl.name))
+                ctl.send_multicast(tag="frames",value=stream_message.FramesMessage(np.full((2,3,4,3),4,dtype="u2"),indices=[4],chandim=1,source=ctl.name))
+                ctl.send_multicast(tag="frames",value=stream_message.FramesMessage(np.full((3,4),6,dtype="u2"),indices=[6],source=ctl.name))
+                ctl.wait_until(lambda: saver.get_variable("stats/received")==7,timeout=5.)
+                saver.cs.stop_saving()  # the saver thread is still running after the multi-channel frames
+                stats=saver.get_variable("stats")
+                if fmt=="cam":
+                    assert (stats["saved"],stats["rejected"],stats["missed"])==(5,2,0)
+                    assert [f[0,0] for f in cam.load_cam(path)]==[0,0,2,2,6]
+                else:
+                    assert (stats["saved"],stats["rejected"],stats["missed"])==(7,0,0)
+                    assert os.path.getsize(path)==(4+2*3+1)*3*4*2
+                assert stats["written"]==os.path.getsize(path)
+    finally:
+        saver.stop(sync=True)
+def test_frame_saver(run_in_app):
+    """Test saving frames in the frame saver thread, including skipping multi-channel frames in the cam format"""
+    run_in_app("_run_frame_saver")